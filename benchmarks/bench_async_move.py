@@ -0,0 +1,137 @@
+"""move_files と asyncio エンジン（--concurrency）の比較（遅延を入れたファイルシステム）
+
+ネットワーク共有を模して、os のファイル操作（stat・mkdir・rename・scandir など）の
+呼び出しごとに --latency ミリ秒待つようにしてから、同じカードのダンプを
+move_files（拡張子ごとに順に処理、CLI と同じ）と AsyncMover（並列数ごと）で移動する。
+待ち時間は GIL を解放するため、スレッドで並列に発行した操作は重なって待つ。
+
+    PYTHONPATH=$(pwd) python benchmarks/bench_async_move.py --files 500 --latency 2
+"""
+
+import contextlib
+import json
+import os
+import tempfile
+import time
+
+import click
+
+from benchmarks.cardgen import generate_card
+from common.dircache import clear_dir_cache
+from move.async_engine import AsyncMover
+from move.main import get_suffixes, move_files
+
+# 遅延を入れる os の関数
+SLOW_OPERATIONS = ("stat", "lstat", "mkdir", "rename", "replace", "unlink", "scandir")
+
+
+@contextlib.contextmanager
+def inject_latency(seconds: float):
+    """os のファイル操作の呼び出しごとに seconds 秒待つようにする"""
+    originals = {name: getattr(os, name) for name in SLOW_OPERATIONS}
+
+    def slow(func):
+        def wrapper(*args, **kwargs):
+            time.sleep(seconds)
+            return func(*args, **kwargs)
+
+        return wrapper
+
+    for name, func in originals.items():
+        setattr(os, name, slow(func))
+    try:
+        yield
+    finally:
+        for name, func in originals.items():
+            setattr(os, name, func)
+
+
+def run_sync(card_dir: str, export_dir: str) -> tuple:
+    success = errors = 0
+    for suffix in get_suffixes():
+        s, e = move_files(suffix, card_dir, export_dir)
+        success += s
+        errors += e
+    return success, errors
+
+
+def run_async(card_dir: str, export_dir: str, concurrency: int) -> tuple:
+    return AsyncMover(card_dir, export_dir, concurrency=concurrency).run(get_suffixes())
+
+
+def measure(work_dir: str, files: int, seed: int, latency: float, mode, concurrency):
+    card_dir = os.path.join(work_dir, "card")
+    export_dir = os.path.join(work_dir, "export")
+    counts = generate_card(card_dir, files, layout="flat", seed=seed, days=3)
+    clear_dir_cache()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        with inject_latency(latency):
+            start = time.perf_counter()
+            if mode == "sync":
+                success, errors = run_sync(card_dir, export_dir)
+            else:
+                success, errors = run_async(card_dir, export_dir, concurrency)
+            seconds = time.perf_counter() - start
+    if success != counts["files"] or errors:
+        raise click.ClickException(
+            f"{mode}: moved {success}/{counts['files']} files, {errors} errors"
+        )
+    return {
+        "mode": mode,
+        "concurrency": concurrency,
+        "files": success,
+        "seconds": seconds,
+    }
+
+
+@click.command()
+@click.option("--files", default=300, show_default=True, help="Number of shots")
+@click.option("--seed", default=0, show_default=True)
+@click.option(
+    "--latency",
+    default=2.0,
+    show_default=True,
+    help="Milliseconds added to every filesystem call",
+)
+@click.option(
+    "--concurrency",
+    "concurrency_list",
+    default="8,32,64",
+    show_default=True,
+    help="Comma-separated AsyncMover concurrency levels",
+)
+@click.option("--work-dir", type=click.Path(file_okay=False), default=None)
+@click.option("--output", type=click.Path(dir_okay=False), help="JSON output path")
+def main(files, seed, latency, concurrency_list, work_dir, output):
+    """遅延を入れたファイルシステムで move_files と AsyncMover を比較する"""
+    runs = [("sync", None)]
+    runs += [("async", int(c)) for c in concurrency_list.split(",") if c.strip()]
+    results = []
+    for mode, concurrency in runs:
+        with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+            results.append(measure(tmp, files, seed, latency / 1000, mode, concurrency))
+
+    baseline = results[0]["seconds"]
+    click.echo(f"{results[0]['files']} files, {latency} ms per filesystem call")
+    for r in results:
+        label = r["mode"] if r["concurrency"] is None else f"async x{r['concurrency']}"
+        click.echo(
+            f"  {label:<10} {r['seconds']:7.2f}s  "
+            f"{r['files'] / r['seconds']:8.0f} files/s  "
+            f"{baseline / r['seconds']:5.1f}x"
+        )
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "benchmark": "async_move",
+                    "latency_ms": latency,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
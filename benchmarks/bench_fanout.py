@@ -0,0 +1,102 @@
+"""ミラー（--mirror）のコピー計測
+
+同じファイルをコピー先ごとに読み直してコピーする場合（ツールを複数回実行するのと
+同じ）と、CopyEngine.copy_many でコピー元を1回だけ読んで全てのコピー先に書き込む
+場合の時間と読み込み量を比較する。コピー元の読み込みが遅い（SD カードリーダー
+など）ほど差が大きくなるため、実際のカードを --source-dir に指定して計測する。
+
+    PYTHONPATH=$(pwd) python benchmarks/bench_fanout.py --size 1G --files 4 --mirrors 2
+"""
+
+import json
+import os
+import tempfile
+import time
+
+import click
+
+from common import transfer
+from common.throttle import parse_size
+from common.transfer import CopyEngine, format_size
+from benchmarks.bench_copy import _evict, _write_source
+
+MODES = ("sequential", "fanout")
+
+
+def measure(work_dir: str, sources, mirrors: int, mode: str, buffer_size: int):
+    """mode でコピー元を 1 + mirrors か所にコピーし、時間と読み込み量を返す"""
+    engine = CopyEngine(buffer_size)
+    roots = [tempfile.mkdtemp(dir=work_dir) for _ in range(1 + mirrors)]
+    read_bytes = 0
+    read_into = transfer._read_into
+
+    def counting(fd, view):
+        nonlocal read_bytes
+        n = read_into(fd, view)
+        read_bytes += n
+        return n
+
+    for src in sources:
+        _evict(src)
+    transfer._read_into = counting
+    try:
+        start = time.perf_counter()
+        for src in sources:
+            dsts = [os.path.join(root, os.path.basename(src)) for root in roots]
+            if mode == "fanout":
+                _, failed = engine.copy_many(src, dsts)
+                if failed:
+                    raise next(iter(failed.values()))
+            else:
+                for dst in dsts:
+                    _evict(src)
+                    engine.copy(src, dst)
+        elapsed = time.perf_counter() - start
+    finally:
+        transfer._read_into = read_into
+    return {"mode": mode, "seconds": elapsed, "read_bytes": read_bytes}
+
+
+@click.command()
+@click.option("--size", default="256M", show_default=True, help="Size of each file")
+@click.option("--files", default=4, show_default=True, help="Number of files")
+@click.option("--mirrors", default=1, show_default=True, help="Number of mirrors")
+@click.option("--buffer-size", default="1M", show_default=True)
+@click.option(
+    "--source-dir",
+    type=click.Path(exists=True, file_okay=False),
+    default=None,
+    help="Directory for the source files (e.g. a mounted card)",
+)
+@click.option("--work-dir", type=click.Path(file_okay=False), default=None)
+@click.option("--output", type=click.Path(dir_okay=False), help="JSON output path")
+def main(size, files, mirrors, buffer_size, source_dir, work_dir, output):
+    """コピー先ごとのコピーと、1回の読み込みで全てに書き込むコピーを比較する"""
+    size_bytes = parse_size(size)
+    results = []
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+        with tempfile.TemporaryDirectory(dir=source_dir or tmp) as src_dir:
+            sources = []
+            for i in range(files):
+                path = os.path.join(src_dir, f"src_{i}.bin")
+                _write_source(path, size_bytes)
+                sources.append(path)
+            for mode in MODES:
+                results.append(
+                    measure(tmp, sources, mirrors, mode, parse_size(buffer_size))
+                )
+
+    total = format_size(size_bytes * files)
+    click.echo(f"Copied {files} x {format_size(size_bytes)} ({total}) to 1 + {mirrors}")
+    for r in results:
+        click.echo(
+            f"  {r['mode']:<10} {r['seconds']:8.2f}s  "
+            f"read {format_size(r['read_bytes'])}"
+        )
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump({"benchmark": "fanout", "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
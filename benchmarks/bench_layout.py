@@ -0,0 +1,105 @@
+"""移動先フォルダの計算（FileMover._get_export_dir）のマイクロベンチマーク
+
+以前の実装（ファイルごとに Path を連結して YYYY/MM月/YYYY-MM-DD/EXT を作る）と、
+コンパイル済みレイアウト（(日付, 拡張子) ごとに記憶）を --files 件で比較する。
+stat 結果は合成したものを使い、ファイルシステムには触れない。
+レイアウトの方が遅い場合は終了コード 1 を返す。
+
+    PYTHONPATH=$(pwd) python benchmarks/bench_layout.py --files 1000000
+"""
+
+import json
+import os
+import random
+import time
+from pathlib import Path
+
+import click
+
+from move.layout import DEFAULT_LAYOUT, Layout
+from move.main import FileMover, get_suffixes
+
+BASE_TIMESTAMP = 1700000000
+
+
+def legacy_export_dir(mover: FileMover, base_dir: str) -> Path:
+    """レイアウト導入前の FileMover._get_export_dir"""
+    stat = mover.stat
+    ymd = f"{stat.year:04d}-{stat.month:02d}-{stat.day:02d}"
+    return (
+        Path(base_dir) / str(stat.year) / f"{stat.month:02d}月" / ymd / mover.extension
+    )
+
+
+def layout_export_dir(layout: Layout):
+    def export_dir(mover: FileMover, base_dir: str) -> Path:
+        return layout.directory(base_dir, mover.stat, mover.extension)
+
+    return export_dir
+
+
+def make_movers(files: int, days: int, seed: int):
+    rng = random.Random(seed)
+    suffixes = get_suffixes()
+    movers = []
+    for i in range(files):
+        mtime = BASE_TIMESTAMP + rng.randrange(days * 86400)
+        st = os.stat_result((0o100644, 0, 0, 1, 0, 0, 1024, mtime, mtime, mtime))
+        name = f"/card/DSC{i:07d}.{suffixes[rng.randrange(len(suffixes))]}"
+        movers.append(FileMover(name, stat_result=st))
+    return movers
+
+
+def measure(func, movers, base_dir="export") -> float:
+    start = time.perf_counter()
+    for mover in movers:
+        func(mover, base_dir)
+    return time.perf_counter() - start
+
+
+@click.command()
+@click.option("--files", default=1000000, show_default=True)
+@click.option("--days", default=30, show_default=True, help="Distinct capture dates")
+@click.option("--seed", default=0, show_default=True)
+@click.option("--repeat", default=3, show_default=True, help="Best of N runs")
+@click.option("--output", type=click.Path(dir_okay=False), help="JSON output path")
+def main(files, days, seed, repeat, output):
+    """以前の Path 連結とコンパイル済みレイアウトの速度を比較する"""
+    movers = make_movers(files, days, seed)
+    layout = Layout(DEFAULT_LAYOUT)
+    candidates = {
+        "legacy": legacy_export_dir,
+        "layout": layout_export_dir(layout),
+    }
+    sample = movers[: min(files, 1000)]
+    for mover in sample:
+        assert legacy_export_dir(mover, "export") == layout.directory(
+            "export", mover.stat, mover.extension
+        )
+
+    results = {}
+    for name, func in candidates.items():
+        results[name] = min(measure(func, movers) for _ in range(repeat))
+    click.echo(f"{files} files over {days} days")
+    for name, seconds in results.items():
+        click.echo(f"  {name:<7} {seconds:7.3f}s  {seconds / files * 1e9:7.0f} ns/file")
+    ratio = results["layout"] / results["legacy"]
+    click.echo(f"  layout / legacy: {ratio:.2f}")
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "benchmark": "layout",
+                    "files": files,
+                    "days": days,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+    if ratio > 1:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""photo_organizer のピークメモリ（最大 RSS）の計測
+
+cardgen の organizer レイアウトに対して、--memory-budget なし（dict）と
+指定した予算ごとに photo_organizer/main.py を --dry-run で実行し、
+子プロセスの最大 RSS（os.wait4 の ru_maxrss）と所要時間を比較する。
+予算はインデックス・ソート用のデータに対するもので、Python 自体の
+メモリ（数十 MB）は含まない。
+
+    PYTHONPATH=$(pwd) python benchmarks/bench_memory.py --files 1000000 --budgets 256M,64M
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import click
+
+from benchmarks.cardgen import generate_card
+from common.throttle import parse_size
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(root_dir: str, budget=None) -> dict:
+    """photo_organizer を1回実行し、所要時間と最大 RSS（バイト）を返す"""
+    args = [sys.executable, "photo_organizer/main.py", "--root-dir", root_dir]
+    args += ["--dry-run", "--isolate-orphans"]
+    if budget:
+        args += ["--memory-budget", budget]
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        args,
+        cwd=REPO_ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    _, status, usage = os.wait4(proc.pid, 0)
+    seconds = time.perf_counter() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode:
+        raise click.ClickException(f"photo_organizer failed: {' '.join(args)}")
+    # Linux の ru_maxrss は KiB 単位
+    return {"budget": budget, "seconds": seconds, "peak_rss": usage.ru_maxrss * 1024}
+
+
+@click.command()
+@click.option("--files", default=200000, show_default=True, help="Number of shots")
+@click.option("--seed", default=0, show_default=True)
+@click.option(
+    "--budgets",
+    default="256M,16M",
+    show_default=True,
+    help="Comma-separated --memory-budget values to compare with the default",
+)
+@click.option("--work-dir", type=click.Path(file_okay=False), default=None)
+@click.option("--output", type=click.Path(dir_okay=False), help="JSON output path")
+def main(files, seed, budgets, work_dir, output):
+    """--memory-budget ごとの photo_organizer の最大 RSS を計測する"""
+    budget_list = [b.strip() for b in budgets.split(",") if b.strip()]
+    for budget in budget_list:
+        parse_size(budget)
+
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+        counts = generate_card(tmp, files, layout="organizer", seed=seed)
+        results = [measure(tmp)]
+        results += [measure(tmp, budget) for budget in budget_list]
+
+    click.echo(f"Tree: {counts['JPG']} JPG, {counts['ARW']} ARW")
+    for r in results:
+        label = r["budget"] or "default"
+        line = (
+            f"  {label:<9} {r['seconds']:7.2f}s  peak RSS "
+            f"{r['peak_rss'] / 1024 / 1024:8.1f} MiB"
+        )
+        click.echo(line)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "benchmark": "memory",
+                    "files": files,
+                    "seed": seed,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
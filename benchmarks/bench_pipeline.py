@@ -0,0 +1,118 @@
+"""ツールを順に実行する場合とパイプラインの比較（エンドツーエンド）
+
+cardgen で合成したカードのダンプ（flat レイアウト）に対して、
+move/main.py → 日付フォルダごとの photo_organizer/main.py を実行する場合と、
+pipeline/main.py を実行する場合の時間を比較する。
+合成した動画はデコードできないため、どちらもプレビューは作成しない。
+
+    PYTHONPATH=$(pwd) python benchmarks/bench_pipeline.py --files 2000 --days 5
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import click
+
+from benchmarks.cardgen import generate_card
+from common.throttle import parse_size
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run(args):
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    subprocess.run(
+        [sys.executable, *args],
+        cwd=REPO_ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        check=True,
+    )
+
+
+def run_chained(card_dir: str, export_dir: str) -> float:
+    start = time.perf_counter()
+    _run(["move/main.py", "--import-dir", card_dir, "--export-dir", export_dir])
+    for year in sorted(os.listdir(export_dir)):
+        for month in sorted(os.listdir(os.path.join(export_dir, year))):
+            month_dir = os.path.join(export_dir, year, month)
+            for day in sorted(os.listdir(month_dir)):
+                _run(
+                    [
+                        "photo_organizer/main.py",
+                        "--root-dir",
+                        os.path.join(month_dir, day),
+                    ]
+                )
+    return time.perf_counter() - start
+
+
+def run_pipeline(card_dir: str, export_dir: str) -> float:
+    start = time.perf_counter()
+    _run(
+        [
+            "pipeline/main.py",
+            "--import-dir",
+            card_dir,
+            "--export-dir",
+            export_dir,
+            "--no-previews",
+        ]
+    )
+    return time.perf_counter() - start
+
+
+@click.command()
+@click.option("--files", default=1000, show_default=True, help="Number of shots")
+@click.option("--days", default=5, show_default=True, help="Distinct capture dates")
+@click.option("--seed", default=0, show_default=True)
+@click.option("--photo-size", default="64K", show_default=True)
+@click.option("--raw-size", default="256K", show_default=True)
+@click.option("--work-dir", type=click.Path(file_okay=False), default=None)
+@click.option("--output", type=click.Path(dir_okay=False), help="JSON output path")
+def main(files, days, seed, photo_size, raw_size, work_dir, output):
+    """順に実行する CLI とパイプラインの所要時間を比較する"""
+    results = []
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+        for name, runner in (("chained", run_chained), ("pipeline", run_pipeline)):
+            card_dir = os.path.join(tmp, name, "card")
+            export_dir = os.path.join(tmp, name, "export")
+            counts = generate_card(
+                card_dir,
+                files,
+                layout="flat",
+                seed=seed,
+                days=days,
+                photo_size=parse_size(photo_size),
+                raw_size=parse_size(raw_size),
+            )
+            seconds = runner(card_dir, export_dir)
+            results.append({"mode": name, "seconds": seconds})
+
+    files = counts["files"]
+    click.echo(f"Card dump: {files} files over {days} days")
+    for r in results:
+        click.echo(
+            f"  {r['mode']:<9} {r['seconds']:7.2f}s  {files / r['seconds']:8.0f} files/s"
+        )
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "benchmark": "pipeline",
+                    "files": files,
+                    "days": days,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""区間ごとの並列プレビュー作成（make_segmented_preview）のスケーリング
+
+合成した動画（seed で決まるノイズを横に流す 1280x720）に対して、1回で作成する
+make_preview_movie と、区間に分けて 1, 2, 4, ... プロセスで作成する場合の時間を
+比べる。速度向上率と並列化効率（速度向上率 / プロセス数）は1プロセスで区間ごとに
+作成した時間が基準（make_preview_movie はフレームごとに cv2.waitKey を呼ぶため、
+参考として表示するだけ）。OpenCV が必要。
+
+    PYTHONPATH=$(pwd) python benchmarks/bench_segmented.py --seconds 120 --segment-seconds 10
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import click
+
+DEFAULT_SIZE = (1280, 720)
+
+
+def make_clip(path: str, seconds: float, fps: int = 30, size=DEFAULT_SIZE, seed=0):
+    """seconds 秒の合成動画を作る"""
+    import cv2
+    import numpy as np
+
+    width, height = size
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    for i in range(int(seconds * fps)):
+        writer.write(np.roll(frame, i * 8, axis=1))
+    writer.release()
+
+
+def measure(clip: str, work_dir: str, workers: int, segment_seconds: float) -> float:
+    """workers が 0 なら make_preview_movie（1回で作成）の時間"""
+    from make_preview.encoders import Encoder
+    from make_preview.make_preview import make_preview_movie
+    from make_preview.segmented import make_segmented_preview
+
+    output_dir = os.path.join(work_dir, f"preview-{workers}")
+    encoder = Encoder("any", "mp4v")
+    start = time.perf_counter()
+    if workers == 0:
+        make_preview_movie(clip, output_dir, encoder, progress=None)
+    else:
+        make_segmented_preview(
+            clip, output_dir, segment_seconds, workers, encoder=encoder
+        )
+    elapsed = time.perf_counter() - start
+    shutil.rmtree(output_dir)
+    return elapsed
+
+
+@click.command()
+@click.option("--seconds", default=60.0, show_default=True, help="Clip length")
+@click.option("--segment-seconds", default=5.0, show_default=True)
+@click.option(
+    "--workers",
+    "workers_list",
+    default=None,
+    help="Comma-separated process counts (default: 1,2,4,... up to the CPU count)",
+)
+@click.option("--seed", default=0, show_default=True)
+@click.option("--output", type=click.Path(dir_okay=False), help="JSON output path")
+def main(seconds, segment_seconds, workers_list, seed, output):
+    """1回で作成する場合と区間ごとの並列作成の時間を比べる"""
+    try:
+        import cv2  # noqa: F401
+    except ImportError as e:
+        raise click.ClickException(f"OpenCV is required: {e}")
+    if workers_list:
+        counts = [int(n) for n in workers_list.split(",")]
+    else:
+        cpus = os.cpu_count() or 1
+        counts = [n for n in (1, 2, 4, 8, 16, 32) if n <= cpus]
+    if 1 not in counts:
+        counts.insert(0, 1)
+
+    with tempfile.TemporaryDirectory(prefix="bench-segmented-") as work_dir:
+        clip = os.path.join(work_dir, "C0001.MP4")
+        make_clip(clip, seconds, seed=seed)
+        single = measure(clip, work_dir, 0, segment_seconds)
+        results = [{"workers": 0, "seconds": single}]
+        click.echo(f"{seconds:.0f}s clip, {segment_seconds:.0f}s segments")
+        click.echo(f"  single run     {single:7.2f}s")
+        baseline = None
+        for workers in sorted(counts):
+            elapsed = measure(clip, work_dir, workers, segment_seconds)
+            baseline = baseline or elapsed
+            speedup = baseline / elapsed
+            results.append({"workers": workers, "seconds": elapsed, "speedup": speedup})
+            click.echo(
+                f"  {workers:2d} processes   {elapsed:7.2f}s  x{speedup:5.2f}  "
+                f"efficiency {speedup / workers:4.0%}"
+            )
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "benchmark": "segmented",
+                    "seconds": seconds,
+                    "segment_seconds": segment_seconds,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""CLI 起動時間の計測（python -X importtime）
+
+各シナリオを `python -X importtime` で起動し、モジュール読み込み時間（self の合計）と
+起動から終了までの時間を計測する。IMPORT_BUDGETS_US を超えたシナリオは回帰として
+扱う。時間はマシンの負荷で変わるため、test_startup.py では読み込んだモジュールの数
+（`python -c pass` で読み込むものを除く）を MODULE_BUDGETS と比べる。
+
+    PYTHONPATH=$(pwd) python benchmarks/bench_startup.py --runs 5
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import click
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# シナリオ名 -> main.py 以降の引数（{empty} は空のディレクトリ、{jobs} は
+# import_dir が空のディレクトリのジョブ "empty" を書いたジョブファイル、{photos} は
+# 空の ARW/ と JPG/ を持つディレクトリに置き換える）
+SCENARIOS = {
+    "move-empty": ["move/main.py", "--import-dir", "{empty}"],
+    "move-job-empty": ["move/main.py", "--jobs-file", "{jobs}", "--job", "empty"],
+    "move-help": ["move/main.py", "--help"],
+    "photo_organizer-empty": ["photo_organizer/main.py", "--root-dir", "{photos}"],
+    "photo_organizer-help": ["photo_organizer/main.py", "--help"],
+}
+PLACEHOLDERS = ("{empty}", "{jobs}", "{photos}")
+
+# モジュール読み込み時間の予算（マイクロ秒、遅い CI でも通る程度の余裕を含む）
+IMPORT_BUDGETS_US = {
+    "move-empty": 15_000,
+    "move-job-empty": 30_000,
+    "move-help": 100_000,
+    "photo_organizer-empty": 15_000,
+    "photo_organizer-help": 100_000,
+}
+
+# 読み込むモジュール数の予算（インタープリターの起動で読み込むものを除く）。
+# 数は負荷に左右されないため、単体テストでも検査できる（Python の版の差を見込んだ余裕を含む）
+MODULE_BUDGETS = {
+    "move-empty": 10,
+    "move-job-empty": 45,
+    "move-help": 150,
+    "photo_organizer-empty": 10,
+    "photo_organizer-help": 170,
+}
+
+# 空のフォルダに対する実行で読み込んではいけないモジュール
+EMPTY_RUN_FORBIDDEN = (
+    "click",
+    "logging",
+    "typing",
+    "common.logger",
+    "common.transfer",
+    "cv2",
+)
+# --help でも読み込まないモジュール（動画処理のライブラリ）
+HELP_FORBIDDEN = ("cv2", "numpy")
+# ジョブの検証結果のキャッシュがある場合（TOML を解析し直さない）
+JOB_RUN_FORBIDDEN = EMPTY_RUN_FORBIDDEN + ("tomllib",)
+
+
+def parse_importtime(stderr: str) -> dict:
+    """`-X importtime` の出力をモジュール名 -> self 時間（μs）に変換する"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # ヘッダー行
+        modules[fields[2].strip()] = int(fields[0])
+    return modules
+
+
+def _prepare(work_dir: str) -> dict:
+    """空のディレクトリとジョブファイルを作り、置き換える値を返す"""
+    empty_dir = os.path.join(work_dir, "empty")
+    os.makedirs(empty_dir, exist_ok=True)
+    jobs_file = os.path.join(work_dir, "jobs.toml")
+    with open(jobs_file, "w", encoding="utf-8") as f:
+        f.write(f"[jobs.empty]\nimport_dir = {json.dumps(empty_dir)}\n")
+    photos_dir = os.path.join(work_dir, "photos")
+    for name in ("ARW", "JPG"):
+        os.makedirs(os.path.join(photos_dir, name), exist_ok=True)
+    return {
+        "{empty}": empty_dir,
+        "{jobs}": jobs_file,
+        "{photos}": photos_dir,
+        "cache": work_dir,
+    }
+
+
+def measure(scenario: str, paths: dict) -> dict:
+    """シナリオを1回実行して読み込んだモジュールと時間を返す"""
+    args = SCENARIOS[scenario]
+    for placeholder in PLACEHOLDERS:
+        args = [a.replace(placeholder, paths[placeholder]) for a in args]
+    # ジョブの検証結果のキャッシュは作業用のディレクトリに置く
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT, XDG_CACHE_HOME=paths["cache"])
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=REPO_ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+    wall = time.perf_counter() - start
+    modules = parse_importtime(proc.stderr)
+    return {
+        "scenario": scenario,
+        "wall_seconds": wall,
+        "import_us": sum(modules.values()),
+        "modules": modules,
+    }
+
+
+def baseline_modules() -> set:
+    """インタープリターの起動だけで読み込むモジュール（`python -c pass`）"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "pass"],
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+    return set(parse_importtime(proc.stderr))
+
+
+def run_scenarios(runs: int = 3, scenarios=None) -> list:
+    """各シナリオを runs 回実行し、最速の結果を返す（1回目はバイトコード生成を含む）"""
+    results = []
+    baseline = baseline_modules()
+    with tempfile.TemporaryDirectory() as work_dir:
+        paths = _prepare(work_dir)
+        for scenario in scenarios or SCENARIOS:
+            measure(scenario, paths)
+            best = min(
+                (measure(scenario, paths) for _ in range(runs)),
+                key=lambda r: r["import_us"],
+            )
+            best["budget_us"] = IMPORT_BUDGETS_US[scenario]
+            best["module_count"] = len(set(best["modules"]) - baseline)
+            best["module_budget"] = MODULE_BUDGETS[scenario]
+            results.append(best)
+    return results
+
+
+@click.command()
+@click.option("--runs", default=5, show_default=True, help="Runs per scenario")
+@click.option("--top", default=5, show_default=True, help="Slowest modules to list")
+@click.option("--output", type=click.Path(dir_okay=False), help="JSON output path")
+def main(runs, top, output):
+    """move / photo_organizer の起動時間を計測して予算と比較する"""
+    results = run_scenarios(runs)
+    over = False
+    for r in results:
+        ok = (
+            r["import_us"] <= r["budget_us"] and r["module_count"] <= r["module_budget"]
+        )
+        over |= not ok
+        click.echo(
+            f"{r['scenario']:<22} imports {r['import_us'] / 1000:7.1f} ms "
+            f"(budget {r['budget_us'] / 1000:.0f} ms) "
+            f"modules {r['module_count']:4d} (budget {r['module_budget']}) "
+            f"wall {r['wall_seconds'] * 1000:7.1f} ms  {'OK' if ok else 'OVER'}"
+        )
+        slowest = sorted(r["modules"].items(), key=lambda kv: -kv[1])[:top]
+        for name, us in slowest:
+            click.echo(f"    {us / 1000:6.1f} ms  {name}")
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump({"benchmark": "startup", "results": results}, f, indent=2)
+    if over:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
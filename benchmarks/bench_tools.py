@@ -0,0 +1,247 @@
+"""ファイル処理関数のベンチマーク（結果を JSON に保存して推移を比較する）
+
+cardgen で作った決まったツリーに対して、次の関数の所要時間を計測する。
+- find_raw_files / sync_raw_to_jpg_structure: organizer レイアウト
+- move_files: flat レイアウト（対応する全拡張子）
+- make_preview_movie: OpenCV で合成した動画（OpenCV が無ければ skipped）
+
+ツリーの生成は計測に含めない。標準出力への表示は捨てて計測する。
+
+    PYTHONPATH=$(pwd) python benchmarks/bench_tools.py --files 100000 --output tools.json
+    PYTHONPATH=$(pwd) python benchmarks/bench_tools.py --files 100000 --compare tools.json
+"""
+
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+
+import click
+
+from benchmarks.cardgen import generate_card
+from move.main import get_suffixes, move_files
+from photo_organizer.main import (
+    DEFAULT_JPG_EXTENSIONS,
+    DEFAULT_RAW_EXTENSIONS,
+    find_raw_files,
+    sync_raw_to_jpg_structure,
+)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Skipped(Exception):
+    """この環境では計測できない"""
+
+
+@contextlib.contextmanager
+def _quiet():
+    with open(os.devnull, "w") as devnull:
+        with contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+            yield
+
+
+def bench_find_raw_files(work_dir: str, files: int, seed: int):
+    generate_card(work_dir, files, layout="organizer", seed=seed)
+    raw_dir = os.path.join(work_dir, "ARW")
+    start = time.perf_counter()
+    raw_files = find_raw_files(raw_dir, DEFAULT_RAW_EXTENSIONS)
+    return time.perf_counter() - start, len(raw_files)
+
+
+def bench_sync_raw_to_jpg_structure(work_dir: str, files: int, seed: int):
+    generate_card(work_dir, files, layout="organizer", seed=seed)
+    raw_dir = os.path.join(work_dir, "ARW")
+    raw_files = find_raw_files(raw_dir, DEFAULT_RAW_EXTENSIONS)
+    stats = Counter()
+    with _quiet():
+        start = time.perf_counter()
+        sync_raw_to_jpg_structure(
+            os.path.join(work_dir, "JPG"),
+            raw_dir,
+            raw_files,
+            DEFAULT_JPG_EXTENSIONS,
+            False,
+            False,
+            None,
+            stats=stats,
+        )
+        elapsed = time.perf_counter() - start
+    return elapsed, stats["processed"] + stats["skipped"] + stats["missing_raw"]
+
+
+def bench_move_files(work_dir: str, files: int, seed: int):
+    card_dir = os.path.join(work_dir, "card")
+    counts = generate_card(card_dir, files, layout="flat", seed=seed)
+    export_dir = os.path.join(work_dir, "export")
+    with _quiet():
+        start = time.perf_counter()
+        for suffix in get_suffixes():
+            move_files(suffix, card_dir, export_dir)
+        elapsed = time.perf_counter() - start
+    return elapsed, counts["files"]
+
+
+def bench_make_preview_movie(work_dir: str, frames: int, seed: int):
+    try:
+        import cv2
+        import numpy as np
+
+        from make_preview.make_preview import make_preview_movie
+    except ImportError as e:
+        raise Skipped(str(e))
+
+    # frames フレームの 1920x1080 動画（seed で決まるノイズ画像）
+    path = os.path.join(work_dir, "C0001.MP4")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 30, (1920, 1080))
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(0, 256, (1080, 1920, 3), dtype=np.uint8)
+    for i in range(frames):
+        writer.write(np.roll(frame, i * 8, axis=1))
+    writer.release()
+
+    with _quiet():
+        start = time.perf_counter()
+        make_preview_movie(path, os.path.join(work_dir, "preview"))
+        elapsed = time.perf_counter() - start
+    return elapsed, frames
+
+
+# 名前 -> 計測関数（引数はツリーの撮影数。make_preview_movie はフレーム数）
+BENCHMARKS = {
+    "find_raw_files": bench_find_raw_files,
+    "sync_raw_to_jpg_structure": bench_sync_raw_to_jpg_structure,
+    "move_files": bench_move_files,
+    "make_preview_movie": bench_make_preview_movie,
+}
+
+
+def run_benchmarks(
+    names,
+    files: int,
+    seed: int,
+    repeat: int,
+    work_dir=None,
+    preview_frames: int = 150,
+):
+    """各ベンチマークを repeat 回（毎回ツリーを作り直して）実行し、最速の結果を返す"""
+    results = []
+    for name in names:
+        func = BENCHMARKS[name]
+        size = preview_frames if name == "make_preview_movie" else files
+        best = None
+        try:
+            for _ in range(repeat):
+                with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+                    seconds, items = func(tmp, size, seed)
+                if best is None or seconds < best[0]:
+                    best = (seconds, items)
+        except Skipped as e:
+            results.append({"name": name, "skipped": str(e)})
+            continue
+        seconds, items = best
+        results.append(
+            {
+                "name": name,
+                "items": items,
+                "seconds": seconds,
+                "items_per_sec": items / seconds if seconds else None,
+            }
+        )
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _print_results(results, previous=None):
+    before = {
+        r["name"]: r["seconds"]
+        for r in (previous or {}).get("results", [])
+        if "seconds" in r
+    }
+    for r in results:
+        if "skipped" in r:
+            click.echo(f"{r['name']:<26} skipped ({r['skipped']})")
+            continue
+        line = (
+            f"{r['name']:<26} {r['seconds']:8.3f}s  "
+            f"{r['items']:>9} items  {r['items_per_sec'] or 0:10.0f} items/s"
+        )
+        if r["name"] in before and before[r["name"]]:
+            change = r["seconds"] / before[r["name"]] - 1
+            line += f"  {change * 100:+6.1f}% vs previous"
+        click.echo(line)
+
+
+@click.command()
+@click.option("--files", default=10000, show_default=True, help="Shots per tree")
+@click.option("--seed", default=0, show_default=True)
+@click.option("--repeat", default=3, show_default=True, help="Best of N runs")
+@click.option(
+    "--preview-frames",
+    default=150,
+    show_default=True,
+    help="Frames of the 1080p video for make_preview_movie",
+)
+@click.option(
+    "--only",
+    type=click.Choice(tuple(BENCHMARKS)),
+    multiple=True,
+    help="Run only these benchmarks (repeatable)",
+)
+@click.option("--work-dir", type=click.Path(file_okay=False), default=None)
+@click.option("--output", type=click.Path(dir_okay=False), help="JSON output path")
+@click.option(
+    "--compare",
+    type=click.Path(exists=True, dir_okay=False),
+    help="Previous JSON result to compare against",
+)
+def main(files, seed, repeat, preview_frames, only, work_dir, output, compare):
+    """find_raw_files / sync_raw_to_jpg_structure / move_files / make_preview_movie を計測する"""
+    results = run_benchmarks(
+        only or tuple(BENCHMARKS), files, seed, repeat, work_dir, preview_frames
+    )
+    previous = None
+    if compare:
+        with open(compare, encoding="utf-8") as f:
+            previous = json.load(f)
+    _print_results(results, previous)
+
+    if output:
+        report = {
+            "benchmark": "tools",
+            "meta": {
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "commit": _git_commit(),
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "files": files,
+                "seed": seed,
+                "repeat": repeat,
+                "preview_frames": preview_frames,
+            },
+            "results": results,
+        }
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""コピー検証のオーバーヘッド計測
+
+検証なしのコピーと、--verify（readback / manifest）付きのコピーの時間を比較する。
+目標は検証なしに対して 15% 未満。検証なしのコピーはページキャッシュへの
+書き込みで終わるため、実際の取り込み先（--work-dir）で RAM を超える総量を
+コピーしないとオーバーヘッドが過大に見える点に注意。
+
+    PYTHONPATH=$(pwd) python benchmarks/bench_verify.py --size 1G --files 4
+"""
+
+import json
+import os
+import tempfile
+import time
+
+import click
+
+from common import verify
+from common.throttle import parse_size
+from common.transfer import CopyEngine, copy_file, format_size, set_copy_engine
+from benchmarks.bench_copy import _evict, _write_source
+
+TARGET_OVERHEAD = 0.15
+
+
+def _run(work_dir: str, sources, mode):
+    verify.configure_verifier(mode)
+    out_dir = tempfile.mkdtemp(dir=work_dir)
+    for src in sources:
+        _evict(src)
+    start = time.perf_counter()
+    for src in sources:
+        copy_file(src, os.path.join(out_dir, os.path.basename(src)))
+    elapsed = time.perf_counter() - start
+    verifier = verify.get_verifier()
+    verify.set_verifier(None)
+    return elapsed, verifier
+
+
+@click.command()
+@click.option("--size", default="256M", show_default=True, help="Size of each file")
+@click.option("--files", default=4, show_default=True, help="Number of files")
+@click.option("--buffer-size", default="4M", show_default=True)
+@click.option("--work-dir", type=click.Path(file_okay=False), default=None)
+@click.option("--output", type=click.Path(dir_okay=False), help="JSON output path")
+def main(size, files, buffer_size, work_dir, output):
+    """検証ありのコピーと検証なしのコピーの時間を比較する"""
+    size_bytes = parse_size(size)
+    set_copy_engine(CopyEngine(parse_size(buffer_size)))
+    results = []
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+        sources = []
+        for i in range(files):
+            path = os.path.join(tmp, f"src_{i}.bin")
+            _write_source(path, size_bytes)
+            sources.append(path)
+
+        baseline, _ = _run(tmp, sources, None)
+        results.append({"mode": "none", "seconds": baseline, "overhead": 0.0})
+        for mode in verify.VERIFY_MODES:
+            elapsed, verifier = _run(tmp, sources, mode)
+            results.append(
+                {
+                    "mode": mode,
+                    "seconds": elapsed,
+                    "overhead": elapsed / baseline - 1,
+                    "hash_seconds": verifier.hash_seconds,
+                    "readback_seconds": verifier.readback_seconds,
+                }
+            )
+    set_copy_engine(None)
+
+    total = format_size(size_bytes * files)
+    click.echo(f"Copied {files} x {format_size(size_bytes)} ({total}) per mode")
+    for r in results:
+        mark = "OK" if r["overhead"] < TARGET_OVERHEAD else "OVER"
+        click.echo(
+            f"  {r['mode']:<9} {r['seconds']:8.2f}s  "
+            f"overhead {r['overhead'] * 100:6.1f}%  {mark}"
+        )
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump({"benchmark": "verify", "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""ベンチマーク用の合成カードダンプ生成
+
+同じ seed からは常に同じツリー（ファイル名・種類・サイズ・更新時刻）を作る。
+
+レイアウト:
+- dcim: カメラのカードと同じ DCIM/100MSDCF/DSC00001.JPG（1フォルダ最大
+  per_folder 枚）と PRIVATE/M4ROOT/CLIP/C0001.MP4（+ XML サイドカー・LRF）
+- flat: 全ファイルを1つのフォルダに置く（move / pipeline の --import-dir 用）
+- organizer: photo_organizer の入力と同じ JPG/<日付>/<サブフォルダ>/ と平らな ARW/
+
+ファイルの中身は photo_size / raw_size バイトの決まったデータ（0 なら空ファイル）。
+動画は video_size バイトのスパースファイルにするため、大きな動画や
+数百万エントリのツリーでもディスクをほとんど使わない。
+
+    PYTHONPATH=$(pwd) python -m benchmarks.cardgen /tmp/card --files 1000000 --layout dcim
+"""
+
+import os
+import random
+from collections import Counter
+from typing import Dict
+
+import click
+
+from common.throttle import parse_size
+from move.main import SUPPORTED_EXTENSIONS
+
+LAYOUTS = ("dcim", "flat", "organizer")
+BASE_TIMESTAMP = 1700000000
+_DAY = 86400
+
+# JPG・RAW・動画以外で混ぜるファイルの種類（SUPPORTED_EXTENSIONS から）
+OTHER_EXTENSIONS = tuple(
+    ext
+    for exts in SUPPORTED_EXTENSIONS.values()
+    for ext in exts
+    if ext not in ("JPG", "ARW", "MP4", "LRF", "XML")
+)
+
+
+class _Writer:
+    """同じ中身のブロックを使い回してファイルを書く"""
+
+    def __init__(self, seed: int, max_size: int):
+        self.block = random.Random(seed).randbytes(min(max_size, 1024 * 1024))
+
+    def write(self, path: str, size: int, mtime: float, sparse: bool = False):
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            if sparse:
+                os.ftruncate(fd, size)
+            else:
+                remaining = size
+                while remaining > 0:
+                    remaining -= os.write(fd, self.block[:remaining])
+            os.utime(fd, (mtime, mtime))
+        finally:
+            os.close(fd)
+
+
+def generate_card(
+    root: str,
+    files: int = 1000,
+    layout: str = "dcim",
+    seed: int = 0,
+    raw_ratio: float = 0.7,
+    orphan_ratio: float = 0.05,
+    video_ratio: float = 0.02,
+    other_ratio: float = 0.03,
+    days: int = 3,
+    photo_size: int = 0,
+    raw_size: int = 0,
+    video_size: int = 0,
+    per_folder: int = 9999,
+) -> Dict[str, int]:
+    """files 回の撮影分のツリーを root に作る
+
+    Args:
+        files: 撮影数（1回の撮影で JPG+RAW など複数のファイルができる）
+        raw_ratio: 静止画のうち RAW も記録する割合
+        orphan_ratio: RAW を記録した撮影のうち、JPG が無い（削除された）割合
+        video_ratio: 動画の割合（organizer レイアウトでは作らない）
+        other_ratio: PNG・HIF・WAV などその他の形式の割合（organizer では作らない）
+        days: 撮影日数（更新時刻を days 日に分散）
+
+    Returns:
+        拡張子ごとのファイル数と "files"（合計）、"bytes"（見かけの合計サイズ）
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout: {layout}")
+    rng = random.Random(seed)
+    writer = _Writer(seed, max(photo_size, raw_size, 1))
+    counts = Counter()
+    made_dirs = set()
+
+    def place(directory: str, name: str, size: int, mtime: float, sparse=False):
+        if directory not in made_dirs:
+            os.makedirs(directory, exist_ok=True)
+            made_dirs.add(directory)
+        writer.write(os.path.join(directory, name), size, mtime, sparse)
+        counts[os.path.splitext(name)[1][1:].upper()] += 1
+        counts["files"] += 1
+        counts["bytes"] += size
+
+    organizer = layout == "organizer"
+    clip = 0
+    for i in range(files):
+        day = i * days // max(files, 1)
+        mtime = BASE_TIMESTAMP + day * _DAY + (i % 36000)
+        number = i + 1
+        if layout == "dcim":
+            photo_dir = os.path.join(root, "DCIM", f"{100 + i // per_folder}MSDCF")
+            video_dir = os.path.join(root, "PRIVATE", "M4ROOT", "CLIP")
+        elif layout == "flat":
+            photo_dir = video_dir = root
+        else:
+            # 選別済みの JPG は日付・サブフォルダに分かれ、RAW は平らに置かれている
+            photo_dir = os.path.join(root, "JPG", f"day{day + 1}", f"pick{i % 4}")
+            raw_dir = os.path.join(root, "ARW")
+
+        kind = rng.random()
+        if not organizer and kind < video_ratio:
+            clip += 1
+            stem = f"C{clip:04d}"
+            place(video_dir, f"{stem}.MP4", video_size, mtime, sparse=True)
+            place(video_dir, f"{stem}M01.XML", 512 if photo_size else 0, mtime)
+            place(video_dir, f"{stem}.LRF", video_size // 16, mtime, sparse=True)
+            continue
+        if not organizer and kind < video_ratio + other_ratio:
+            ext = OTHER_EXTENSIONS[rng.randrange(len(OTHER_EXTENSIONS))]
+            place(photo_dir, f"DSC{number:05d}.{ext}", photo_size, mtime)
+            continue
+
+        stem = f"DSC{number:05d}"
+        with_raw = rng.random() < raw_ratio
+        orphan = with_raw and rng.random() < orphan_ratio
+        if not orphan:
+            place(photo_dir, f"{stem}.JPG", photo_size, mtime)
+        if with_raw:
+            place(raw_dir if organizer else photo_dir, f"{stem}.ARW", raw_size, mtime)
+    return dict(counts)
+
+
+@click.command()
+@click.argument("root", type=click.Path(file_okay=False))
+@click.option("--files", default=1000, show_default=True, help="Number of shots")
+@click.option("--layout", type=click.Choice(LAYOUTS), default="dcim", show_default=True)
+@click.option("--seed", default=0, show_default=True)
+@click.option("--raw-ratio", default=0.7, show_default=True)
+@click.option("--orphan-ratio", default=0.05, show_default=True)
+@click.option("--video-ratio", default=0.02, show_default=True)
+@click.option("--other-ratio", default=0.03, show_default=True)
+@click.option("--days", default=3, show_default=True)
+@click.option("--photo-size", default="0", show_default=True)
+@click.option("--raw-size", default="0", show_default=True)
+@click.option("--video-size", default="4G", show_default=True, help="Sparse")
+def main(root, photo_size, raw_size, video_size, **options):
+    """合成したカードダンプを ROOT に作る"""
+    counts = generate_card(
+        root,
+        photo_size=parse_size(photo_size),
+        raw_size=parse_size(raw_size),
+        video_size=parse_size(video_size),
+        **options,
+    )
+    for key, value in sorted(counts.items()):
+        click.echo(f"{key:>6}: {value}")
+
+
+if __name__ == "__main__":
+    main()
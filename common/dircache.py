@@ -0,0 +1,71 @@
+"""作成済みディレクトリのキャッシュ
+
+同じ移動先ディレクトリに大量のファイルを書き込む際、ファイルごとに
+makedirs を呼ぶとパスの各要素が毎回 stat される。一度作成（または存在を確認）
+したディレクトリをプロセス全体で記憶し、2回目以降のシステムコールを省く。
+
+相対パスの基準にする作業ディレクトリは、キャッシュごとに1回だけ取得する
+（os.path.abspath はパスごとに getcwd を呼ぶため）。os.chdir した場合は
+clear_dir_cache() を呼ぶ。
+"""
+
+import os
+import threading
+from typing import Optional, Set, Union
+
+PathLike = Union[str, "os.PathLike[str]"]
+
+_known_dirs: Set[str] = set()
+_cwd: Optional[str] = None
+_lock = threading.Lock()
+
+
+def _key(path: PathLike) -> str:
+    global _cwd
+    path = os.fspath(path)
+    if not os.path.isabs(path):
+        if _cwd is None:
+            _cwd = os.getcwd()
+        path = os.path.join(_cwd, path)
+    return os.path.normpath(path)
+
+
+def ensure_dir(path: PathLike) -> bool:
+    """ディレクトリを作成する（作成済みならシステムコールを発行しない）
+
+    Returns:
+        実際に makedirs を呼んだ場合 True
+    """
+    key = _key(path)
+    if key in _known_dirs:
+        return False
+
+    os.makedirs(key, exist_ok=True)
+
+    # 親ディレクトリも存在が確定するので合わせて記憶する
+    with _lock:
+        current = key
+        while current not in _known_dirs:
+            _known_dirs.add(current)
+            parent = os.path.dirname(current)
+            if parent == current:
+                break
+            current = parent
+    return True
+
+
+def invalidate_dir(path: PathLike):
+    """ディレクトリとその配下をキャッシュから外す（エラー発生時に呼ぶ）"""
+    key = _key(path)
+    prefix = key.rstrip(os.sep) + os.sep
+    with _lock:
+        stale = [d for d in _known_dirs if d == key or d.startswith(prefix)]
+        _known_dirs.difference_update(stale)
+
+
+def clear_dir_cache():
+    """キャッシュを全て破棄する（作業ディレクトリも取得し直す）"""
+    global _cwd
+    with _lock:
+        _known_dirs.clear()
+        _cwd = None
@@ -0,0 +1,183 @@
+"""拡張子の分類
+
+正規化した拡張子（小文字・先頭の . なし）から分類名への表を1回だけ作り、
+読み取り専用の dict（MappingProxyType）として全ツールで共有する。
+
+- 大文字小文字は区別しない（DSC00001.ARW と dsc00001.arw は同じ分類）
+- 複合拡張子（"arw.xmp" など）は単一の拡張子より優先する
+- 分類は JSON / TOML の設定ファイルで追加・変更できる（--extensions-config）
+
+設定ファイルの例（TOML）:
+
+    replace_defaults = false   # true なら既定の分類を使わない
+
+    [categories]
+    raw = ["arw", "dng"]
+    sidecars = ["arw.xmp", "xmp"]
+
+同じ名前の分類は置き換え、新しい名前の分類は追加する。設定に書いた拡張子は
+既定の分類から外れる（例: raw = ["arw"] なら arw は images ではなく raw）。
+"""
+
+import json
+import os
+import re
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+# 既定の分類（move の SUPPORTED_EXTENSIONS の元）
+DEFAULT_CATEGORIES: Mapping[str, Tuple[str, ...]] = MappingProxyType(
+    {
+        "images": ("jpeg", "jpg", "png", "gif", "bmp", "hif", "arw"),
+        "videos": ("mov", "mp4", "mpg", "mts", "lrf", "lrv"),
+        "documents": ("xml",),
+        "audio": ("wav", "mp3"),
+        "design": ("psd",),
+    }
+)
+
+# 動画のサイドカーのステム（C0001M01.XML → C0001）
+SIDECAR_STEM = re.compile(r"^(.+)M\d{2}$")
+
+
+def normalize(ext: str) -> str:
+    """ ".JPG" / "JPG" / " jpg " -> "jpg" """
+    return ext.strip().lstrip(".").lower()
+
+
+class ExtensionClassifier:
+    """正規化した拡張子 -> 分類名 の読み取り専用の表"""
+
+    def __init__(self, categories: Mapping[str, Iterable[str]]):
+        table: Dict[str, str] = {}
+        for category, extensions in categories.items():
+            for ext in extensions:
+                key = normalize(ext)
+                if not key:
+                    raise ValueError(f"Empty extension in category {category!r}")
+                if table.get(key, category) != category:
+                    raise ValueError(
+                        f"Extension {key!r} is in both {table[key]!r} and {category!r}"
+                    )
+                table[key] = category
+        self.table: Mapping[str, str] = MappingProxyType(table)
+        self.categories: Tuple[str, ...] = tuple(categories)
+        # 複合拡張子を調べる最大の . の数（単一の拡張子だけなら 1）
+        self._depth = max((key.count(".") + 1 for key in table), default=1)
+        self._suffixes: Optional[Tuple[str, ...]] = None
+
+    def split(self, name: str) -> Tuple[str, str, Optional[str]]:
+        """ファイル名を (ステム, 拡張子（元の大文字小文字）, 分類) に分ける
+
+        分類が無い拡張子は (splitext のステム, 拡張子, None)
+        """
+        lower = name.lower()
+        end = len(name)
+        found = None
+        for _ in range(self._depth):
+            end = lower.rfind(".", 0, end)
+            if end <= 0:
+                break
+            category = self.table.get(lower[end + 1 :])
+            if category is not None:
+                found = (end, category)
+        if found is None:
+            dot = name.rfind(".")
+            if dot <= 0:
+                return name, "", None
+            return name[:dot], name[dot + 1 :], None
+        end, category = found
+        return name[:end], name[end + 1 :], category
+
+    def category(self, name: str) -> Optional[str]:
+        """ファイル名の分類（対象外なら None）"""
+        return self.split(name)[2]
+
+    def extensions(self, category: Optional[str] = None) -> List[str]:
+        """分類（省略時は全分類）の拡張子（正規化済み、設定の順）"""
+        return [ext for ext, cat in self.table.items() if category in (None, cat)]
+
+    def suffixes(self) -> Tuple[str, ...]:
+        """大文字・小文字の両方を含む拡張子の一覧（ソート済み、1回だけ作る）"""
+        if self._suffixes is None:
+            self._suffixes = tuple(
+                sorted({s for ext in self.table for s in (ext, ext.upper())})
+            )
+        return self._suffixes
+
+    def classify_dir(self, directory: str) -> Dict[str, List[os.DirEntry]]:
+        """フォルダを1回だけ走査し、ファイルを分類ごとにまとめる（対象外は含めない）
+
+        DirEntry の stat はキャッシュされるため、呼び出し側で追加の stat は不要
+        """
+        result: Dict[str, List[os.DirEntry]] = {}
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                category = self.split(entry.name)[2]
+                if category is not None and entry.is_file():
+                    result.setdefault(category, []).append(entry)
+        return result
+
+
+def load_categories(path: str) -> Dict[str, Tuple[str, ...]]:
+    """設定ファイル（.json または .toml）から分類を読み、既定の分類と合わせる"""
+    if path.lower().endswith(".toml"):
+        import tomllib
+
+        with open(path, "rb") as f:
+            config = tomllib.load(f)
+    else:
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+    categories = config.get("categories")
+    if not isinstance(categories, dict) or not all(
+        isinstance(exts, list) for exts in categories.values()
+    ):
+        raise ValueError(
+            f"{path}: 'categories' must map category names to extension lists"
+        )
+    merged = {}
+    if not config.get("replace_defaults"):
+        # 設定に書いた拡張子は既定の分類から外す（設定の分類を優先）
+        configured = {normalize(ext) for exts in categories.values() for ext in exts}
+        for name, exts in DEFAULT_CATEGORIES.items():
+            rest = tuple(ext for ext in exts if ext not in configured)
+            if rest and name not in categories:
+                merged[name] = rest
+    merged.update({name: tuple(exts) for name, exts in categories.items()})
+    return merged
+
+
+def for_suffixes(suffixes: Iterable[str]) -> ExtensionClassifier:
+    """拡張子ごとに分類する表（分類名は正規化した拡張子。"JPG" と "jpg" は同じ）"""
+    return ExtensionClassifier({normalize(s): (s,) for s in suffixes if normalize(s)})
+
+
+def extension_set(extensions: Iterable[str]) -> frozenset:
+    """拡張子の一覧（".arw" / "ARW" など）を splitext の結果と比べる frozenset にする"""
+    return frozenset(f".{normalize(ext)}" for ext in extensions if normalize(ext))
+
+
+_classifier: Optional[ExtensionClassifier] = None
+
+
+def set_classifier(classifier: Optional[ExtensionClassifier]):
+    """プロセス全体で使う分類を設定する（None で既定に戻す）"""
+    global _classifier
+    _classifier = classifier
+
+
+def get_classifier() -> ExtensionClassifier:
+    """現在の分類（未設定なら既定の分類）"""
+    global _classifier
+    if _classifier is None:
+        _classifier = ExtensionClassifier(DEFAULT_CATEGORIES)
+    return _classifier
+
+
+def configure_classifier(config_path: Optional[str] = None) -> ExtensionClassifier:
+    """CLI のオプションから分類を設定する"""
+    categories = load_categories(config_path) if config_path else DEFAULT_CATEGORIES
+    classifier = ExtensionClassifier(categories)
+    set_classifier(classifier)
+    return classifier
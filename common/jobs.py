@@ -0,0 +1,324 @@
+"""ジョブ（名前付きの実行設定）の読み込み
+
+「カード A → アーカイブ B に、4並列・ハードリンク・検証付きで」のような決まった
+実行を JSON / TOML のジョブファイルに名前を付けて書いておき、`--job NAME` で
+呼び出す。move・photo_organizer・pipeline・make_preview が同じファイルを共有する。
+
+    [jobs.card-a]
+    description = "カード A → アーカイブ B"
+    import_dir = "/media/card-a"          # 共通の項目（その項目を持つツールに適用）
+    export_dir = "/archive/b"
+    max_bandwidth = "100M"
+    verify = "readback"
+
+    [jobs.card-a.move]                    # ツールごとの項目
+    concurrency = 4
+    layout = "{year}/{date}/{ext}"
+
+    [jobs.card-a.photo_organizer]
+    root_dir = "/archive/b"
+    copy = true
+    link_mode = "hardlink"
+
+    [jobs.card-a.make_preview]
+    workers = 4
+    encoder_cache = "/var/cache/my-data-backup/encoder.json"
+
+項目名は各 CLI のオプション名（--max-bandwidth → max_bandwidth）。コマンドラインで
+指定したオプションはジョブの値より優先する。
+
+検証済みのジョブは $XDG_CACHE_HOME/my-data-backup/jobs/ に JSON で保存し、
+ジョブファイルが変わらない限り、次回からは TOML の解析と検証を省く（cron から
+定期実行する場合の起動時間を短くするため）。
+
+起動時の判定（common.startup）からも使うため、click と typing はここでは読み込まない
+（click はオプションの検証・追加時にだけ読み込む）。
+"""
+
+import json
+import os
+
+# ツールごとの項目を書くテーブル名（still_preview は静止画プレビュー）
+TOOLS = ("move", "photo_organizer", "pipeline", "make_preview", "still_preview")
+
+# ジョブの直下に書ける共通の項目（その項目をオプションに持つツールにだけ適用する）
+SHARED_KEYS = frozenset(
+    {
+        "import_dir",
+        "export_dir",
+        "output_dir",
+        "dry_run",
+        "extensions_config",
+        "log_file",
+        "log_format",
+        "log_max_size",
+        "log_rotate",
+        "log_backups",
+        "max_bandwidth",
+        "max_iops",
+        "low_priority",
+        "drop_cache",
+        "buffer_size",
+        "direct_io",
+        "verify",
+        "workers",
+    }
+)
+
+# ジョブに書けない項目（ジョブの選択自体）
+_JOB_PARAMS = ("jobs_file", "job")
+
+_CACHE_VERSION = 1
+
+
+def default_jobs_file() -> str:
+    base = os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+    return os.path.join(base, "my-data-backup", "jobs.toml")
+
+
+def cache_file(path: str) -> str:
+    """ジョブファイルの検証結果のキャッシュ（パスの / を % に置き換えた名前）"""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    name = os.path.abspath(path).strip(os.sep).replace(os.sep, "%")
+    return os.path.join(base, "my-data-backup", "jobs", f"{name}.json")
+
+
+def _parse(path: str) -> dict:
+    if path.lower().endswith(".toml"):
+        import tomllib
+
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _is_value(value) -> bool:
+    """オプションの値として書ける型か（TOML の日時などは不可）"""
+    if isinstance(value, list):
+        return all(isinstance(v, (str, int, float, bool)) for v in value)
+    return isinstance(value, (str, int, float, bool))
+
+
+def check_jobs(config, path: str) -> dict:
+    """ジョブファイルの構造を検証し、ジョブ名 -> ジョブ の dict を返す"""
+    jobs = config.get("jobs") if isinstance(config, dict) else None
+    if not isinstance(jobs, dict):
+        raise ValueError(f"{path}: 'jobs' must be a table of named jobs")
+    for name, job in jobs.items():
+        if not isinstance(job, dict):
+            raise ValueError(f"{path}: job {name!r} must be a table")
+        for key, value in job.items():
+            where = f"{path}: job {name!r}"
+            if key in TOOLS:
+                if not isinstance(value, dict):
+                    raise ValueError(f"{where}: '{key}' must be a table")
+                for option, item in value.items():
+                    if not _is_value(item):
+                        raise ValueError(f"{where}: {key}.{option}: unsupported value")
+            elif key == "description":
+                continue
+            elif key not in SHARED_KEYS:
+                raise ValueError(
+                    f"{where}: unknown key {key!r} (put tool options in one of the "
+                    f"tables: {', '.join(TOOLS)})"
+                )
+            elif not _is_value(value):
+                raise ValueError(f"{where}: {key}: unsupported value")
+    return jobs
+
+
+def _stamp(path: str) -> list:
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _read_cache(path: str, stamp: list):
+    try:
+        with open(cache_file(path), encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (
+        not isinstance(cached, dict)
+        or cached.get("version") != _CACHE_VERSION
+        or cached.get("source") != os.path.abspath(path)
+        or cached.get("stamp") != stamp
+    ):
+        return None
+    return cached
+
+
+def _write_cache(path: str, cached: dict):
+    target = cache_file(path)
+    try:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp = f"{target}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(cached, f, ensure_ascii=False)
+        os.replace(tmp, target)
+    except OSError:
+        pass
+
+
+def _load(path: str):
+    """(キャッシュの内容, キャッシュを書き直す必要があるか)"""
+    stamp = _stamp(path)
+    cached = _read_cache(path, stamp)
+    if cached is not None:
+        return cached, False
+    cached = {
+        "version": _CACHE_VERSION,
+        "source": os.path.abspath(path),
+        "stamp": stamp,
+        "jobs": check_jobs(_parse(path), path),
+        "validated": {},
+    }
+    return cached, True
+
+
+def read_jobs(path: str) -> dict:
+    """ジョブファイルを読む（変わっていなければキャッシュから）"""
+    cached, changed = _load(path)
+    if changed:
+        _write_cache(path, cached)
+    return cached["jobs"]
+
+
+def job_names(path: str) -> list:
+    return sorted(read_jobs(path))
+
+
+def resolve_job(jobs: dict, name: str, tool: str) -> dict:
+    """tool 向けのジョブの値（共通の項目にツールごとの項目を重ねる）"""
+    if name not in jobs:
+        available = ", ".join(sorted(jobs)) or "none"
+        raise ValueError(f"Unknown job: {name!r} (available: {available})")
+    job = jobs[name]
+    values = {key: value for key, value in job.items() if key in SHARED_KEYS}
+    values.update(job.get(tool, {}))
+    return values
+
+
+def _signature(command) -> str:
+    """コマンドのオプション構成（変わったら検証し直す）"""
+    return ";".join(f"{p.name}:{p.type.name}" for p in command.params)
+
+
+def validate_values(command, values: dict, where: str):
+    """ジョブの値を command（click のコマンド）のオプションとして検証する
+
+    型（Choice・IntRange など）とコールバック（サイズの書式など）を確認する。
+    パスの存在は実行時に click が確認する（カードを挿す前に定義したジョブのため）。
+    """
+    import click
+
+    params = {p.name: p for p in command.params}
+    ctx = click.Context(command)
+    for key, value in values.items():
+        param = params[key]
+        try:
+            many = param.multiple or param.nargs != 1
+            if many and not isinstance(value, list):
+                raise click.BadParameter("expected a list")
+            if isinstance(param.type, click.Path):
+                if not all(isinstance(v, str) for v in (value if many else [value])):
+                    raise click.BadParameter("expected a path")
+            else:
+                value = param.type_cast_value(ctx, value)
+            if param.callback is not None:
+                param.callback(ctx, param, value)
+        except click.BadParameter as e:
+            raise ValueError(f"{where}: {key}: {e.message}")
+
+
+def load_job(path: str, name: str, tool: str, command=None) -> dict:
+    """ジョブを読み込み、command のオプションとして検証した値を返す
+
+    返り値は click の default_map に渡せる dict（command が持たない共通の項目は除く）。
+    ジョブに書けるのはオプションだけで、引数は書けない。
+    検証結果はキャッシュに記録し、ジョブファイルとコマンドのオプション構成が
+    同じなら次回は検証を省く。
+    """
+    cached, changed = _load(path)
+    values = resolve_job(cached["jobs"], name, tool)
+    if command is not None:
+        # 引数（MOVIES など）はコマンドラインで指定する
+        params = {p.name for p in command.params if p.param_type_name == "option"}
+        params -= set(_JOB_PARAMS)
+        key = f"{tool}/{name}"
+        signature = _signature(command)
+        if cached["validated"].get(key) != signature:
+            where = f"{path}: job {name!r}"
+            unknown = sorted(set(cached["jobs"][name].get(tool, {})) - params)
+            if unknown:
+                raise ValueError(
+                    f"{where}: {tool} has no option {', '.join(map(repr, unknown))}"
+                )
+            validate_values(
+                command, {k: v for k, v in values.items() if k in params}, where
+            )
+            cached["validated"][key] = signature
+            changed = True
+        values = {k: v for k, v in values.items() if k in params}
+    if changed:
+        _write_cache(path, cached)
+    return values
+
+
+def job_value(path, name: str, tool: str, key: str):
+    """ジョブの1項目（起動時の判定用。読めない場合は None で、エラーは click に任せる）"""
+    try:
+        return resolve_job(read_jobs(path or default_jobs_file()), name, tool).get(key)
+    except (OSError, ValueError):
+        return None
+
+
+def job_options(tool: str):
+    """--jobs-file と --job を追加する click のデコレーター
+
+    どちらも eager なオプションで、他のオプションより先にジョブを読み込み、
+    ctx.default_map に設定する（コマンドラインの値はジョブより優先される）。
+    """
+    import click
+
+    def apply(ctx, param, value):
+        ctx.meta[f"common.jobs.{param.name}"] = value
+        if not all(f"common.jobs.{name}" in ctx.meta for name in _JOB_PARAMS):
+            return
+        name = ctx.meta["common.jobs.job"]
+        if not name or ctx.resilient_parsing:
+            return
+        path = ctx.meta["common.jobs.jobs_file"] or default_jobs_file()
+        try:
+            values = load_job(path, name, tool, ctx.command)
+        except OSError as e:
+            raise click.BadParameter(
+                f"cannot read {path}: {e.strerror}", ctx, param_hint="--jobs-file"
+            )
+        except ValueError as e:
+            raise click.BadParameter(str(e), ctx, param_hint="--job")
+        ctx.default_map = {**(ctx.default_map or {}), **values}
+
+    def decorator(f):
+        f = click.option(
+            "--job",
+            metavar="NAME",
+            callback=apply,
+            is_eager=True,
+            expose_value=False,
+            help="Use the options of this job from --jobs-file "
+            "(options given on the command line take precedence)",
+        )(f)
+        f = click.option(
+            "--jobs-file",
+            type=click.Path(dir_okay=False),
+            callback=apply,
+            is_eager=True,
+            expose_value=False,
+            help="JSON/TOML file of named jobs "
+            "(default: $XDG_CONFIG_HOME/my-data-backup/jobs.toml)",
+        )(f)
+        return f
+
+    return decorator
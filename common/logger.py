@@ -1,10 +1,223 @@
 """統一ログ機構"""
 
+import json
 import logging
+import os
 import sys
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, List, Optional
+
+# ファイル出力の形式
+LOG_FORMATS = ("text", "json")
+
+# 時間によるローテーションの間隔（秒）
+ROTATE_INTERVALS = {"hourly": 3600, "daily": 86400}
+DEFAULT_LOG_BACKUPS = 7
+
+
+class _EventText:
+    """イベントの人間向け表示（ハンドラーが書き出す時まで文字列化しない）"""
+
+    __slots__ = ("event", "fields")
+
+    def __init__(self, event: str, fields: dict):
+        self.event = event
+        self.fields = fields
+
+    def __str__(self) -> str:
+        parts = [self.event]
+        src, dst = self.fields.get("src"), self.fields.get("dst")
+        if src is not None and dst is not None:
+            parts.append(f"{src} -> {dst}")
+        for key, value in self.fields.items():
+            if key not in ("src", "dst") and value is not None:
+                parts.append(f"{key}={value}")
+        return " ".join(parts)
+
+
+class JsonFormatter(logging.Formatter):
+    """1レコード1行の JSON（JSON Lines）形式で出力するフォーマッター
+
+    event() で記録したイベントはフィールドをそのまま出力し、メッセージの
+    文字列化は行わない。通常のログは event="message" として出力する。
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+        }
+        event = getattr(record, "event", None)
+        if event is not None:
+            data["event"] = event
+            data.update(record.fields)
+        else:
+            data["event"] = "message"
+            data["message"] = record.getMessage()
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def _next_boundary(t: float, interval: int) -> float:
+    """t より後の最初の区切り時刻（ローカル時刻の毎時0分・毎日0時）"""
+    offset = time.localtime(t).tm_gmtoff
+    return ((t + offset) // interval + 1) * interval - offset
+
+
+def _gzip_file(path: str):
+    """path を path.gz に圧縮して元のファイルを削除する"""
+    import gzip
+    import shutil
+
+    tmp = path + ".gz.tmp"
+    with open(path, "rb") as src, gzip.open(tmp, "wb") as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    os.replace(tmp, path + ".gz")
+    os.unlink(path)
+
+
+class RotatingLogHandler(logging.FileHandler):
+    """サイズ・時間でローテーションするファイルハンドラー
+
+    ローテーション時はファイルを `<log_file>.<YYYYmmdd-HHMMSS-ffffff>` に
+    リネームして開き直すだけで、gzip 圧縮と古い世代の削除はバックグラウンドの
+    スレッドで行う（ログを書くスレッドは圧縮を待たない）。
+    1つのログファイルに書き込むプロセスは1つであることを前提とする。
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        max_bytes: int = 0,
+        rotate: Optional[str] = None,
+        backup_count: int = DEFAULT_LOG_BACKUPS,
+        compress: bool = True,
+        encoding: str = "utf-8",
+    ):
+        """
+        Args:
+            filename: ログファイルパス
+            max_bytes: この大きさを超えたらローテーション（0 はサイズで切り替えない）
+            rotate: 時間によるローテーション（"hourly" / "daily"、None は行わない）
+            backup_count: 残す世代数（0 は無制限）
+            compress: ローテーションしたファイルを gzip 圧縮するか
+        """
+        # ローテーションを使わない実行の起動時間に影響しないよう、ここで読み込む
+        import queue
+        import re
+
+        if rotate is not None and rotate not in ROTATE_INTERVALS:
+            raise ValueError(f"Unknown rotation interval: {rotate}")
+        super().__init__(filename, mode="a", encoding=encoding)
+        self.max_bytes = max_bytes
+        self.interval = ROTATE_INTERVALS.get(rotate)
+        self.backup_count = backup_count
+        self.compress = compress
+        self._pattern = re.compile(
+            re.escape(os.path.basename(self.baseFilename))
+            + r"\.\d{8}-\d{6}-\d{6}(\.gz)?$"
+        )
+        self._jobs: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+
+        self._rollover_at = None
+        if self.interval:
+            # cron のように短時間で終わる実行でも区切りをまたいだら切り替える
+            st = os.stat(self.baseFilename)
+            start = st.st_mtime if st.st_size else time.time()
+            self._rollover_at = _next_boundary(start, self.interval)
+
+        # 前回の実行で圧縮されずに残ったファイルを処理する
+        for name in self.rotated_files():
+            if not name.endswith(".gz") and compress:
+                self._submit(name)
+
+    def rotated_files(self) -> List[str]:
+        """ローテーション済みのファイル（古い順）"""
+        directory = os.path.dirname(self.baseFilename)
+        names = sorted(n for n in os.listdir(directory) if self._pattern.match(n))
+        return [os.path.join(directory, n) for n in names]
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            if self._rollover_at is not None and record.created >= self._rollover_at:
+                self.rollover()
+        except Exception:
+            self.handleError(record)
+        super().emit(record)
+        try:
+            if self.max_bytes > 0 and self.stream is not None:
+                if self.stream.tell() >= self.max_bytes:
+                    self.rollover()
+        except Exception:
+            self.handleError(record)
+
+    def rollover(self):
+        """現在のファイルをリネームして新しいファイルに切り替える（ロック内で呼ぶ）"""
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+        if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename):
+            rotated = f"{self.baseFilename}.{datetime.now():%Y%m%d-%H%M%S-%f}"
+            while os.path.exists(rotated) or os.path.exists(rotated + ".gz"):
+                time.sleep(1e-6)
+                rotated = f"{self.baseFilename}.{datetime.now():%Y%m%d-%H%M%S-%f}"
+            os.rename(self.baseFilename, rotated)
+            self._submit(rotated)
+        if self.interval:
+            self._rollover_at = _next_boundary(time.time(), self.interval)
+        self.stream = self._open()
+
+    def _submit(self, path: str):
+        self._jobs.put(path)
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(
+                target=self._work, name="log-rotation", daemon=True
+            )
+            self._worker.start()
+
+    def _work(self):
+        while True:
+            path = self._jobs.get()
+            try:
+                if path is None:
+                    return
+                if self.compress and os.path.exists(path):
+                    _gzip_file(path)
+                self._prune()
+            except OSError as e:
+                # ログ自体には書かない（再帰を避ける）
+                sys.stderr.write(f"Log rotation failed for {path}: {e}\n")
+            finally:
+                self._jobs.task_done()
+
+    def _prune(self):
+        if self.backup_count <= 0:
+            return
+        rotated = self.rotated_files()
+        for path in rotated[: max(0, len(rotated) - self.backup_count)]:
+            os.unlink(path)
+
+    def wait_for_compression(self):
+        """バックグラウンドの圧縮・削除が終わるまで待つ"""
+        self._jobs.join()
+
+    def close(self):
+        self.acquire()
+        try:
+            worker, self._worker = self._worker, None
+            if worker is not None:
+                self._jobs.put(None)
+        finally:
+            self.release()
+        if worker is not None:
+            worker.join()
+        super().close()
 
 
 class UnifiedLogger:
@@ -16,6 +229,10 @@ class UnifiedLogger:
         log_file: Optional[str] = None,
         console: bool = True,
         level: int = logging.INFO,
+        log_format: str = "text",
+        max_bytes: int = 0,
+        rotate: Optional[str] = None,
+        backup_count: int = DEFAULT_LOG_BACKUPS,
     ):
         """
         Args:
@@ -23,11 +240,19 @@ class UnifiedLogger:
             log_file: ログファイルパス（Noneの場合はファイル出力なし）
             console: コンソール出力の有無
             level: ログレベル
+            log_format: ファイル出力の形式（"text" または "json"、コンソールは常に text）
+            max_bytes: ログファイルをローテーションする大きさ（0 はしない）
+            rotate: 時間によるローテーション（"hourly" / "daily"）
+            backup_count: ローテーションで残す世代数（0 は無制限）
         """
+        if log_format not in LOG_FORMATS:
+            raise ValueError(f"Unknown log format: {log_format}")
         self.logger = logging.getLogger(name)
         self.logger.setLevel(level)
 
-        # 既存のハンドラーをクリア（重複を防ぐ）
+        # 既存のハンドラーを閉じてクリア（重複を防ぐ）
+        for handler in self.logger.handlers:
+            handler.close()
         self.logger.handlers.clear()
 
         # フォーマッター
@@ -45,8 +270,15 @@ class UnifiedLogger:
         if log_file:
             # ログファイルのディレクトリを作成
             Path(log_file).parent.mkdir(parents=True, exist_ok=True)
-            file_handler = logging.FileHandler(log_file, encoding="utf-8")
-            file_handler.setFormatter(formatter)
+            if max_bytes or rotate:
+                file_handler = RotatingLogHandler(
+                    log_file, max_bytes, rotate, backup_count
+                )
+            else:
+                file_handler = logging.FileHandler(log_file, encoding="utf-8")
+            file_handler.setFormatter(
+                JsonFormatter() if log_format == "json" else formatter
+            )
             self.logger.addHandler(file_handler)
 
     def debug(self, message: str):
@@ -69,6 +301,72 @@ class UnifiedLogger:
         """重大エラーログ"""
         self.logger.critical(message)
 
+    def event(
+        self,
+        event_type: str,
+        message: str = "",
+        *args,
+        level: int = logging.INFO,
+        **fields,
+    ):
+        """構造化イベントログ
+
+        JSON 形式のハンドラーには event_type と fields（src, dst, bytes, duration,
+        error など）がそのまま出力される。text 形式では message を args で
+        % 書式化したもの（省略時はフィールドの一覧）を出力する。
+        どのハンドラーも書き出さないレベルでは何も組み立てない。
+        """
+        if not self.logger.isEnabledFor(level):
+            return
+        msg = message or _EventText(event_type, fields)
+        self.logger.log(
+            level, msg, *args, extra={"event": event_type, "fields": fields}
+        )
+
+    def _file_handlers(self) -> List[logging.Handler]:
+        return [h for h in self.logger.handlers if isinstance(h, logging.FileHandler)]
+
+    def write_file(self, message: str, level: int = logging.INFO):
+        """ファイルのハンドラーにだけ書く（コンソールには呼び出し側が表示済みの行）
+
+        ローテーションはファイルのハンドラーが行う
+        """
+        if not self.logger.isEnabledFor(level):
+            return
+        record = self.logger.makeRecord(
+            self.logger.name, level, "", 0, message, (), None
+        )
+        for handler in self._file_handlers():
+            handler.handle(record)
+
+    def replay(self, records: Iterable[dict]):
+        """他のプロセスが JSON で記録したレコードをファイルにだけ書き出す
+
+        ts・level・logger を含むフィールドはそのまま出力する（ワーカーごとのログを
+        まとめる用途。ローテーションはこのロガーのハンドラーが行う）
+        """
+        handlers = self._file_handlers()
+        for data in records:
+            fields = dict(data)
+            event = fields.pop("event", "message")
+            level = logging.getLevelName(fields.get("level", "INFO"))
+            if not isinstance(level, int):
+                level = logging.INFO
+            record = self.logger.makeRecord(
+                self.logger.name,
+                level,
+                "",
+                0,
+                _EventText(event, fields),
+                (),
+                None,
+                extra={"event": event, "fields": fields},
+            )
+            if isinstance(fields.get("ts"), (int, float)):
+                record.created = fields["ts"]
+            for handler in handlers:
+                handler.handle(record)
+
     def success(self, message: str):
         """成功ログ（情報レベル + 絵文字）"""
         self.logger.info(f"✅ {message}")
@@ -102,9 +400,22 @@ def create_logger(
     log_file: Optional[str] = None,
     console: bool = True,
     level: int = logging.INFO,
+    log_format: str = "text",
+    max_bytes: int = 0,
+    rotate: Optional[str] = None,
+    backup_count: int = DEFAULT_LOG_BACKUPS,
 ) -> UnifiedLogger:
     """統一ログインスタンスを作成"""
-    return UnifiedLogger(name=name, log_file=log_file, console=console, level=level)
+    return UnifiedLogger(
+        name=name,
+        log_file=log_file,
+        console=console,
+        level=level,
+        log_format=log_format,
+        max_bytes=max_bytes,
+        rotate=rotate,
+        backup_count=backup_count,
+    )
 
 
 def create_file_logger(name: str, log_file: str, console: bool = True) -> UnifiedLogger:
@@ -0,0 +1,111 @@
+"""JSON Lines ログの集計ツール
+
+--log-format json で出力したログを読み、イベント種別ごとの件数・転送量・
+スループット・処理時間の分布を表示する。
+
+    python -m common.logstats move.jsonl [--json]
+"""
+
+import json
+import sys
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+import click
+
+from common.throttle import format_size
+
+
+def _percentile(sorted_values: List[float], ratio: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(ratio * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def iter_events(lines: Iterable[str]) -> Iterable[dict]:
+    """JSON として読めない行（テキスト形式の混在など）は読み飛ばす"""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(record, dict):
+            yield record
+
+
+def aggregate(events: Iterable[dict]) -> Dict[str, dict]:
+    """イベント種別ごとの統計を計算する"""
+    groups = defaultdict(lambda: {"count": 0, "bytes": 0, "durations": []})
+    first_ts = last_ts = None
+
+    for record in events:
+        ts = record.get("ts")
+        if isinstance(ts, (int, float)):
+            first_ts = ts if first_ts is None else min(first_ts, ts)
+            last_ts = ts if last_ts is None else max(last_ts, ts)
+
+        event = record.get("event", "message")
+        if event == "message":
+            continue
+        group = groups[event]
+        group["count"] += 1
+        if isinstance(record.get("bytes"), int):
+            group["bytes"] += record["bytes"]
+        if isinstance(record.get("duration"), (int, float)):
+            group["durations"].append(float(record["duration"]))
+
+    wall = (last_ts - first_ts) if first_ts is not None else 0.0
+    result = {}
+    for event, group in sorted(groups.items()):
+        durations = sorted(group["durations"])
+        busy = sum(durations)
+        result[event] = {
+            "count": group["count"],
+            "bytes": group["bytes"],
+            "busy_seconds": busy,
+            "throughput_bytes_per_sec": group["bytes"] / busy if busy else None,
+            "files_per_sec": group["count"] / wall if wall else None,
+            "duration_p50": _percentile(durations, 0.5),
+            "duration_p95": _percentile(durations, 0.95),
+            "duration_max": durations[-1] if durations else None,
+        }
+    return {"wall_seconds": wall, "events": result}
+
+
+def _print_report(stats: dict):
+    click.echo(f"Wall time: {stats['wall_seconds']:.2f}s")
+    for event, s in stats["events"].items():
+        click.echo(f"[{event}] {s['count']} events, {format_size(s['bytes'])}")
+        if s["throughput_bytes_per_sec"]:
+            click.echo(
+                f"  throughput: {format_size(s['throughput_bytes_per_sec'])}/s "
+                f"(busy {s['busy_seconds']:.2f}s)"
+            )
+        if s["files_per_sec"]:
+            click.echo(f"  rate: {s['files_per_sec']:.1f} files/s")
+        if s["duration_p50"] is not None:
+            click.echo(
+                f"  duration p50/p95/max: {s['duration_p50'] * 1000:.1f} / "
+                f"{s['duration_p95'] * 1000:.1f} / {s['duration_max'] * 1000:.1f} ms"
+            )
+
+
+@click.command()
+@click.argument("log_files", nargs=-1, type=click.File("r", encoding="utf-8"))
+@click.option("--json", "as_json", is_flag=True, help="Print the result as JSON")
+def main(log_files, as_json):
+    """JSON Lines ログ（LOG_FILES、省略時は標準入力）をスループット統計に集計する"""
+    sources = log_files or [sys.stdin]
+    stats = aggregate(record for source in sources for record in iter_events(source))
+    if as_json:
+        click.echo(json.dumps(stats, indent=2))
+    else:
+        _print_report(stats)
+
+
+if __name__ == "__main__":
+    main()
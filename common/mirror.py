@@ -0,0 +1,88 @@
+"""ミラー（複数のコピー先への同時書き込み）の設定と集計
+
+カードをアーカイブとバックアップの2か所に置く場合、ツールを2回実行すると遅い
+SD カードリーダーから同じデータを2回読むことになる。--mirror DIR を指定すると、
+整理先（base）に置くファイルを DIR の同じ相対パスにも書き込む。コピーは
+common.transfer の CopyEngine.copy_many でコピー元を1回だけ読み、全てのコピー先に
+並列に書き込む。
+
+ミラーへの書き込みの失敗はコピー先ごとに分離する（整理先への移動・コピーは
+そのまま成功とし、失敗したミラーは集計して最後に表示する）。
+"""
+
+import os
+import threading
+from typing import List, Optional, Sequence, Tuple
+
+from common.dircache import ensure_dir
+
+
+class Mirrors:
+    """base 配下のファイルを roots の同じ相対パスにも書き込む設定と、その集計"""
+
+    def __init__(self, base: str, roots: Sequence[str]):
+        self.base = os.path.abspath(base)
+        self.roots = [os.path.abspath(root) for root in roots]
+        for root in self.roots:
+            if _contains(self.base, root) or _contains(root, self.base):
+                raise ValueError(f"Mirror {root} must not overlap with {self.base}")
+        self._lock = threading.Lock()
+        self.files = 0
+        self.bytes = 0
+        self.failures: List[Tuple[str, str]] = []
+
+    def targets(self, dst: str) -> List[str]:
+        """dst に対応するミラーのパス（base の外のファイルは対象外）"""
+        path = os.path.abspath(dst)
+        if not _contains(self.base, path):
+            return []
+        rel = os.path.relpath(path, self.base)
+        return [os.path.join(root, rel) for root in self.roots]
+
+    def prepare(self, target: str):
+        """ミラーのフォルダを作る（作成済みなら何もしない）"""
+        ensure_dir(os.path.dirname(target))
+
+    def record(self, target: str, nbytes: int, error: Optional[BaseException] = None):
+        with self._lock:
+            if error is None:
+                self.files += 1
+                self.bytes += nbytes
+            else:
+                self.failures.append((target, str(error)))
+
+    def summary_lines(self) -> List[str]:
+        lines = [
+            f"Mirrored: {self.files} files to {len(self.roots)} "
+            f"mirror{'s' if len(self.roots) > 1 else ''}, "
+            f"failures: {len(self.failures)}"
+        ]
+        for target, error in self.failures:
+            lines.append(f"Mirror failed: {target}: {error}")
+        return lines
+
+
+def _contains(directory: str, path: str) -> bool:
+    return path == directory or path.startswith(directory.rstrip(os.sep) + os.sep)
+
+
+# プロセス全体で共有するミラー設定（None の場合はミラーしない）
+_mirrors: Optional[Mirrors] = None
+
+
+def set_mirrors(mirrors: Optional[Mirrors]):
+    """全てのコピー・移動で使うミラー設定を指定する"""
+    global _mirrors
+    _mirrors = mirrors
+
+
+def get_mirrors() -> Optional[Mirrors]:
+    """現在のミラー設定を取得する"""
+    return _mirrors
+
+
+def configure_mirrors(base: str, roots: Sequence[str]) -> Optional[Mirrors]:
+    """CLI オプションからミラー設定を作成して指定する"""
+    mirrors = Mirrors(base, roots) if roots else None
+    set_mirrors(mirrors)
+    return mirrors
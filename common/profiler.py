@@ -0,0 +1,242 @@
+"""ファイルシステム操作の計測（--profile）
+
+有効にすると os モジュールのファイル操作（stat・open・rename・mkdir・scandir など）と
+組み込みの open、ログファイルへの書き込みをラッパーに差し替え、操作ごとの
+呼び出し回数とレイテンシのヒストグラムを記録する。FileMover・move_or_copy・
+find_raw_files・ロガーはどれもこれらの関数を使うため、呼び出し側は変更しない。
+無効な場合は何も差し替えないので、オーバーヘッドは無い。
+
+os.DirEntry.stat() のように os の関数を経由しない呼び出しは数えない。
+"""
+
+import builtins
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+# 計測する os の関数（存在しないものはプラットフォームに無いので無視する）
+OS_OPERATIONS = (
+    "stat",
+    "lstat",
+    "open",
+    "close",
+    "readv",
+    "write",
+    "sendfile",
+    "copy_file_range",
+    "fsync",
+    "fdatasync",
+    "posix_fadvise",
+    "rename",
+    "replace",
+    "link",
+    "unlink",
+    "mkdir",
+    "rmdir",
+    "scandir",
+    "listdir",
+    "utime",
+    "chmod",
+)
+
+# ヒストグラムの区切り（μs、2 のべき乗）
+_BUCKET_LIMITS_US = [2**i for i in range(0, 25)]
+
+
+def _bucket(elapsed_ns: int) -> int:
+    us = elapsed_ns // 1000
+    return min(us.bit_length(), len(_BUCKET_LIMITS_US) - 1)
+
+
+class _OperationStats:
+    __slots__ = ("count", "total_ns", "max_ns", "histogram")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.histogram = [0] * len(_BUCKET_LIMITS_US)
+
+    def percentile_us(self, ratio: float) -> int:
+        """ヒストグラムから求めたパーセンタイル（バケットの上限、最大値以下、μs）"""
+        target = self.count * ratio
+        seen = 0
+        limit = _BUCKET_LIMITS_US[-1]
+        for index, n in enumerate(self.histogram):
+            seen += n
+            if n and seen >= target:
+                limit = _BUCKET_LIMITS_US[index]
+                break
+        return min(limit, -(-self.max_ns // 1000))
+
+
+class IOProfiler:
+    """ファイル操作の呼び出し回数とレイテンシを記録する
+
+    with IOProfiler() as profiler: の範囲、または install() から uninstall() までの
+    プロセス全体（他のスレッドを含む）の呼び出しを数える。
+    """
+
+    _active: Optional["IOProfiler"] = None
+
+    def __init__(self):
+        self._stats: Dict[str, _OperationStats] = {}
+        self._lock = threading.Lock()
+        self._originals: List[tuple] = []
+        self.started = None
+        self.elapsed = 0.0
+
+    def _record(self, name: str, elapsed_ns: int):
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = _OperationStats()
+            stats.count += 1
+            stats.total_ns += elapsed_ns
+            if elapsed_ns > stats.max_ns:
+                stats.max_ns = elapsed_ns
+            stats.histogram[_bucket(elapsed_ns)] += 1
+
+    def _wrap(self, name: str, func):
+        record = self._record
+        clock = time.perf_counter_ns
+
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, clock() - start)
+
+        wrapper.__wrapped__ = func
+        return wrapper
+
+    def _patch(self, owner, attr: str, name: str):
+        original = getattr(owner, attr)
+        self._originals.append((owner, attr, original))
+        setattr(owner, attr, self._wrap(name, original))
+
+    def install(self):
+        """ファイル操作をラッパーに差し替えて計測を開始する"""
+        if IOProfiler._active is not None:
+            raise RuntimeError("Another IOProfiler is already installed")
+        IOProfiler._active = self
+        for name in OS_OPERATIONS:
+            if hasattr(os, name):
+                self._patch(os, name, name)
+        self._patch(builtins, "open", "open")
+        self._patch(logging.FileHandler, "emit", "log_write")
+        self.started = time.perf_counter()
+
+    def uninstall(self):
+        """差し替えを元に戻して計測を終了する"""
+        for owner, attr, original in reversed(self._originals):
+            setattr(owner, attr, original)
+        self._originals.clear()
+        if self.started is not None:
+            self.elapsed += time.perf_counter() - self.started
+            self.started = None
+        if IOProfiler._active is self:
+            IOProfiler._active = None
+
+    def __enter__(self) -> "IOProfiler":
+        self.install()
+        return self
+
+    def __exit__(self, *exc):
+        self.uninstall()
+
+    def counts(self) -> Dict[str, int]:
+        """操作ごとの呼び出し回数"""
+        with self._lock:
+            return {name: s.count for name, s in self._stats.items()}
+
+    def report(self) -> dict:
+        """JSON に出力できる形式の結果"""
+        with self._lock:
+            operations = {
+                name: {
+                    "count": s.count,
+                    "total_ms": s.total_ns / 1e6,
+                    "avg_us": s.total_ns / s.count / 1000,
+                    "p50_us": s.percentile_us(0.5),
+                    "p99_us": s.percentile_us(0.99),
+                    "max_us": s.max_ns / 1000,
+                    "histogram_us": {
+                        f"<{limit}": n
+                        for limit, n in zip(_BUCKET_LIMITS_US, s.histogram)
+                        if n
+                    },
+                }
+                for name, s in sorted(self._stats.items())
+            }
+        return {"wall_seconds": self.elapsed, "operations": operations}
+
+    def summary_lines(self) -> List[str]:
+        report = self.report()
+        lines = [
+            f"I/O profile (wall {report['wall_seconds']:.2f}s)",
+            f"  {'operation':<16}{'calls':>9}{'total ms':>11}{'avg us':>9}"
+            f"{'p50 us':>9}{'p99 us':>9}{'max us':>10}",
+        ]
+        for name, op in report["operations"].items():
+            lines.append(
+                f"  {name:<16}{op['count']:>9}{op['total_ms']:>11.1f}"
+                f"{op['avg_us']:>9.1f}{op['p50_us']:>9}{op['p99_us']:>9}"
+                f"{op['max_us']:>10.0f}"
+            )
+        return lines
+
+
+def start_cli_profiling(
+    enabled: bool, output: Optional[str] = None, cprofile_path: Optional[str] = None
+) -> Optional[IOProfiler]:
+    """CLI の --profile / --profile-output / --cprofile を処理する
+
+    計測を開始し、click のコマンドが終わった時点でレポートを標準エラーに表示して
+    output（JSON）と cprofile_path（pstats 形式）に書き出す。I/O の計測
+    （os 関数の置き換え）は --profile / --profile-output の場合だけ行い、
+    --cprofile だけなら cProfile の結果に置き換えた関数が混ざらないようにする。
+
+    Returns:
+        I/O を計測している IOProfiler（計測しない場合は None）
+    """
+    if not (enabled or output or cprofile_path):
+        return None
+
+    import click
+
+    profiler = None
+    if enabled or output:
+        profiler = IOProfiler()
+        profiler.install()
+    cprofiler = None
+    if cprofile_path:
+        import cProfile
+
+        cprofiler = cProfile.Profile()
+        cprofiler.enable()
+
+    def finish():
+        if cprofiler is not None:
+            cprofiler.disable()
+        if profiler is not None:
+            profiler.uninstall()
+            for line in profiler.summary_lines():
+                click.echo(line, err=True)
+        if output:
+            with open(output, "w", encoding="utf-8") as f:
+                json.dump(profiler.report(), f, indent=2)
+        if cprofiler is not None:
+            cprofiler.dump_stats(cprofile_path)
+            click.echo(
+                f"cProfile stats written to {cprofile_path} "
+                f"(python -m pstats {cprofile_path})",
+                err=True,
+            )
+
+    click.get_current_context().call_on_close(finish)
+    return profiler
@@ -0,0 +1,87 @@
+"""CLI の起動を速くするための軽量な処理
+
+cron から毎分起動されるような使い方では、処理するファイルが無い実行でも
+click やログ機構の読み込みが実行時間の大半を占める。ここでは標準ライブラリの
+os / sys だけを使い、重いモジュールを読み込む前に「何もすることがない」実行を
+判定して終了できるようにする（typing も読み込まない）。
+"""
+
+import os
+import sys
+
+
+def option_value(args: list, name: str, default: str = None) -> str:
+    """コマンドライン引数からオプションの値を取り出す（click と同じく後勝ち）
+
+    `--name value` と `--name=value` の両方に対応する。
+    """
+    value = default
+    for i, arg in enumerate(args):
+        if arg == "--":
+            break
+        if arg == name and i + 1 < len(args):
+            value = args[i + 1]
+        elif arg.startswith(name + "="):
+            value = arg[len(name) + 1 :]
+    return value
+
+
+def has_files(directory: str, recursive: bool = False) -> bool:
+    """ディレクトリ直下（recursive ならサブディレクトリも）に通常ファイルが1つでもあるか
+
+    ディレクトリが読めない場合は True を返し、通常の処理にエラー報告を任せる。
+    """
+    pending = [directory]
+    while pending:
+        try:
+            with os.scandir(pending.pop()) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        return True
+                    if recursive and entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+        except OSError:
+            return True
+    return False
+
+
+def dir_value(args: list, dir_option: str, default_dir: str = ".", tool: str = None):
+    """dir_option で指定されたディレクトリ
+
+    tool を渡すと、dir_option が無い場合に --job のジョブ（common.jobs のキャッシュ）
+    から読む。どちらにも無ければ default_dir。
+    """
+    directory = option_value(args, dir_option)
+    job = option_value(args, "--job")
+    if directory is None and job and tool:
+        from common.jobs import job_value
+
+        key = dir_option.lstrip("-").replace("-", "_")
+        directory = job_value(option_value(args, "--jobs-file"), job, tool, key)
+    return default_dir if directory is None else directory
+
+
+def exit_if_empty(directory: str, message: str = "", recursive: bool = False):
+    """directory にファイルが無ければすぐに終了する（存在しなければ何もしない）"""
+    if not os.path.isdir(directory) or has_files(directory, recursive):
+        return
+    if message:
+        print(message.format(directory=directory))
+    sys.exit(0)
+
+
+def exit_if_no_files(
+    args: list,
+    dir_option: str,
+    default_dir: str = ".",
+    message: str = "",
+    tool: str = None,
+):
+    """dir_option で指定されたディレクトリが空ならすぐに終了する
+
+    --help が指定されている場合やディレクトリが存在しない場合は何もしない
+    （click による通常の処理・エラー表示に任せる）。tool は dir_value に渡す。
+    """
+    if "--help" in args:
+        return
+    exit_if_empty(dir_value(args, dir_option, default_dir, tool), message)
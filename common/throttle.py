@@ -0,0 +1,186 @@
+"""I/O 帯域・IOPS の制限と優先度制御
+
+営業時間中のバックグラウンド取り込みで NAS を占有しないよう、
+全ての転送処理が共有するトークンバケットで帯域と IOPS を制限する。
+"""
+
+import os
+import re
+import threading
+import time
+from typing import Callable, Optional
+
+_SIZE_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+_SIZE_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([KMGT]?)(?:I?B)?(?:/S)?\s*$")
+
+
+def parse_size(text: str) -> int:
+    """サイズ指定（"100M" や "1.5G"）をバイト数に変換（1K = 1024）"""
+    match = _SIZE_PATTERN.match(text.upper())
+    if not match:
+        raise ValueError(f"Invalid size: {text}")
+    value, unit = match.groups()
+    return int(float(value) * _SIZE_UNITS[unit])
+
+
+def format_size(num_bytes: int) -> str:
+    """バイト数を読みやすい単位に変換"""
+    size = float(num_bytes)
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if size < 1024 or unit == "TB":
+            return f"{size:.1f} {unit}" if unit != "B" else f"{int(size)} B"
+        size /= 1024
+
+
+def validate_size(ctx, param, value):
+    """サイズを指定する click オプション（--max-bandwidth など）のコールバック
+
+    書式だけを検証し、値は文字列のまま返す（変換は parse_size で行う）
+    """
+    if value is None:
+        return None
+    try:
+        parse_size(value)
+    except ValueError as e:
+        # CLI からだけ呼ばれるため、ここで読み込む
+        import click
+
+        raise click.BadParameter(str(e))
+    return value
+
+
+class TokenBucket:
+    """スレッドセーフなトークンバケット
+
+    要求量がバケット容量を超えても、残高をマイナスにして超過分だけ待つため
+    大きなチャンクでも平均レートが保たれる。バケットは空の状態から始まるので、
+    開始直後のバーストで目標レートを超えることはない。
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = 0.0
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def consume(self, amount: float = 1):
+        """amount 分のトークンを消費する（不足時は補充されるまで待つ）"""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._last) * self.rate
+            )
+            self._last = now
+            self._tokens -= amount
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            self._sleep(wait)
+
+
+class IOThrottle:
+    """帯域（バイト/秒）と IOPS の制限をまとめたもの
+
+    IOPS はチャンク単位の読み書き1回、またはリネーム・リンク1回を1操作と数える。
+    """
+
+    def __init__(
+        self,
+        max_bandwidth: Optional[int] = None,
+        max_iops: Optional[int] = None,
+        **bucket_kwargs,
+    ):
+        self.bandwidth = (
+            TokenBucket(max_bandwidth, **bucket_kwargs) if max_bandwidth else None
+        )
+        self.iops = TokenBucket(max_iops, **bucket_kwargs) if max_iops else None
+
+    def io(self, nbytes: int = 0):
+        """1回の I/O 操作（nbytes バイト）を制限に従って待機させる"""
+        if self.iops:
+            self.iops.consume(1)
+        if self.bandwidth and nbytes:
+            self.bandwidth.consume(nbytes)
+
+
+# プロセス全体で共有する制限（None の場合は無制限）
+_throttle: Optional[IOThrottle] = None
+
+
+def set_throttle(throttle: Optional[IOThrottle]):
+    """全ての転送処理で使う制限を設定する"""
+    global _throttle
+    _throttle = throttle
+
+
+def get_throttle() -> Optional[IOThrottle]:
+    """現在の制限を取得する"""
+    return _throttle
+
+
+def configure_throttle(
+    max_bandwidth: Optional[str] = None,
+    max_iops: Optional[int] = None,
+) -> Optional[IOThrottle]:
+    """CLI オプションから制限を作成して設定する"""
+    bandwidth = parse_size(max_bandwidth) if max_bandwidth else None
+    if not (bandwidth or max_iops):
+        set_throttle(None)
+        return None
+    throttle = IOThrottle(bandwidth, max_iops)
+    set_throttle(throttle)
+    return throttle
+
+
+# ioprio_set(2) のシステムコール番号
+_SYS_IOPRIO_SET = {"x86_64": 251, "aarch64": 30, "i386": 289, "i686": 289}
+_IOPRIO_WHO_PROCESS = 1
+_IOPRIO_CLASS_SHIFT = 13
+IOPRIO_CLASS_BE = 2
+IOPRIO_CLASS_IDLE = 3
+
+
+def set_io_priority(io_class: int = IOPRIO_CLASS_BE, level: int = 7) -> bool:
+    """現在のプロセスの I/O 優先度を下げる（Linux のみ）
+
+    Returns:
+        設定に成功した場合 True
+    """
+    # ctypes は起動時間に響くため、使う時にだけ読み込む
+    import ctypes
+    import ctypes.util
+    import platform
+
+    nr = _SYS_IOPRIO_SET.get(platform.machine())
+    if nr is None or platform.system() != "Linux":
+        return False
+    libc_name = ctypes.util.find_library("c")
+    if not libc_name:
+        return False
+    libc = ctypes.CDLL(libc_name, use_errno=True)
+    ioprio = (io_class << _IOPRIO_CLASS_SHIFT) | level
+    return libc.syscall(nr, _IOPRIO_WHO_PROCESS, 0, ioprio) == 0
+
+
+def lower_priority(nice_increment: int = 10) -> bool:
+    """CPU（nice）と I/O の優先度を下げる
+
+    Returns:
+        I/O 優先度の設定に成功した場合 True
+    """
+    if hasattr(os, "nice"):
+        try:
+            os.nice(nice_increment)
+        except OSError:
+            pass
+    return set_io_priority()
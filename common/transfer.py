@@ -0,0 +1,671 @@
+"""ファイル転送（コピー・リンク）の共通処理"""
+
+import errno
+import os
+import shutil
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from common.mirror import Mirrors, get_mirrors
+
+# format_size は common.throttle に移した（互換のため再エクスポート）
+from common.throttle import (  # noqa: F401
+    IOThrottle,
+    format_size,
+    get_throttle,
+    parse_size,
+)
+from common.verify import Verifier, VerifyError, get_verifier
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# コピー時の配置方式
+LINK_MODES = ("copy", "hardlink", "reflink", "auto")
+
+# チャンク単位コピーのバッファサイズ
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+
+# O_DIRECT のバッファ・サイズ境界（多くのデバイスの論理ブロックサイズ以上）
+DIRECT_IO_ALIGNMENT = 4096
+_O_DIRECT = getattr(os, "O_DIRECT", 0)
+
+# ページキャッシュを破棄する間隔（コピー完了まで溜め込まない）
+DROP_CACHE_WINDOW = 32 * 1024 * 1024
+
+# 複数のコピー先に書き込む場合のリングバッファのチャンク数
+# （遅いコピー先は最大でこのチャンク数だけ読み込みから遅れられる）
+FANOUT_SLOTS = 8
+
+# linux/fs.h: _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+# この errno で失敗した場合は「そのデバイスでは未対応」とみなす
+_UNSUPPORTED_ERRNOS = {
+    errno.EXDEV,
+    errno.EPERM,
+    errno.EINVAL,
+    errno.ENOTTY,
+    errno.ENOSYS,
+    errno.EOPNOTSUPP,
+    getattr(errno, "ENOTSUP", errno.EOPNOTSUPP),
+}
+
+# 移動先デバイスごとの未対応方式と、ディレクトリごとのデバイス番号
+_unsupported: Dict[int, Set[str]] = {}
+_dir_devices: Dict[str, int] = {}
+_lock = threading.Lock()
+
+
+def _fadvise(fd: int, offset: int, length: int, advice_name: str):
+    """posix_fadvise のヒントを与える（未対応の OS では何もしない）"""
+    advice = getattr(os, advice_name, None)
+    if advice is not None and hasattr(os, "posix_fadvise"):
+        os.posix_fadvise(fd, offset, length, advice)
+
+
+def _sync_data(fd: int):
+    if hasattr(os, "fdatasync"):
+        os.fdatasync(fd)
+    else:
+        os.fsync(fd)
+
+
+def _align(size: int) -> int:
+    return -(-size // DIRECT_IO_ALIGNMENT) * DIRECT_IO_ALIGNMENT
+
+
+class CopyEngine:
+    """チューニング可能なコピー処理（コピー・デバイス間移動で使用）
+
+    ページ境界に揃った mmap バッファで読み書きするため O_DIRECT にも対応する。
+    """
+
+    def __init__(
+        self,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        direct: bool = False,
+        drop_cache: bool = False,
+        readahead: bool = True,
+    ):
+        """
+        Args:
+            buffer_size: 1回の読み書きサイズ（O_DIRECT の境界に切り上げる）
+            direct: O_DIRECT でページキャッシュを経由しない（未対応なら通常 I/O）
+            drop_cache: コピーしたデータをページキャッシュから破棄する
+            readahead: 読み込み元に SEQUENTIAL / WILLNEED のヒントを与える
+        """
+        self.buffer_size = _align(max(buffer_size, 1))
+        self.direct = direct and _O_DIRECT != 0
+        self.drop_cache = drop_cache
+        self.readahead = readahead
+
+    def copy(
+        self,
+        src: str,
+        dst: str,
+        throttle: Optional[IOThrottle] = None,
+        digest=None,
+    ) -> int:
+        """メタデータ込みでファイルをコピーする
+
+        digest（hashlib 互換オブジェクト）を渡すと、読み込んだデータを
+        そのまま流し込んでチェックサムを同時に計算する。
+
+        Returns:
+            コピーしたバイト数
+        """
+        src_fd = self._open(src, os.O_RDONLY)
+        try:
+            dst_fd = self._open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+            try:
+                copied = self._copy_fds(src_fd, dst_fd, throttle, digest)
+            finally:
+                os.close(dst_fd)
+        finally:
+            os.close(src_fd)
+        shutil.copystat(src, dst)
+        return copied
+
+    def _open(self, path: str, flags: int) -> int:
+        if self.direct:
+            try:
+                return os.open(path, flags | _O_DIRECT, 0o666)
+            except OSError as e:
+                # tmpfs など O_DIRECT 非対応のファイルシステム
+                if e.errno != errno.EINVAL:
+                    raise
+        return os.open(path, flags, 0o666)
+
+    def _copy_fds(
+        self, src_fd: int, dst_fd: int, throttle: Optional[IOThrottle], digest=None
+    ) -> int:
+        size = self.buffer_size
+        if self.readahead:
+            _fadvise(src_fd, 0, 0, "POSIX_FADV_SEQUENTIAL")
+
+        import mmap
+
+        buffer = mmap.mmap(-1, size)
+        view = memoryview(buffer)
+        copied = 0
+        dropped = 0
+        try:
+            while True:
+                if self.readahead:
+                    # 次のチャンクを先読みさせる
+                    _fadvise(src_fd, copied + size, size, "POSIX_FADV_WILLNEED")
+                n = _read_into(src_fd, view)
+                if n == 0:
+                    break
+                if throttle:
+                    throttle.io(n)
+                if self.direct and n % DIRECT_IO_ALIGNMENT:
+                    # 末尾の端数は O_DIRECT では書けないため通常 I/O に戻す
+                    _clear_direct(dst_fd)
+                _write_all(dst_fd, view[:n])
+                if digest is not None:
+                    digest.update(view[:n])
+                copied += n
+
+                if self.drop_cache and copied - dropped >= DROP_CACHE_WINDOW:
+                    self._drop(src_fd, dst_fd, dropped, copied - dropped)
+                    dropped = copied
+            if self.drop_cache and copied > dropped:
+                self._drop(src_fd, dst_fd, dropped, copied - dropped)
+        finally:
+            view.release()
+            buffer.close()
+        return copied
+
+    def copy_many(
+        self,
+        src: str,
+        dsts: List[str],
+        throttle: Optional[IOThrottle] = None,
+        digest=None,
+        slots: int = FANOUT_SLOTS,
+    ) -> Tuple[int, Dict[str, BaseException]]:
+        """src を1回だけ読み、dsts の全てにメタデータ込みで並列に書き込む
+
+        呼び出し元のスレッドがリングバッファ（mmap のチャンク × slots）に読み込み、
+        コピー先ごとのスレッドが同じチャンクを書き込む。チャンクは全てのコピー先が
+        書き終えてから再利用する。帯域制限とチェックサムは読み込んだデータで1回だけ。
+
+        コピー先ごとに失敗を分離する。書き込みに失敗したコピー先は以降のチャンクを
+        待たずに抜け、途中まで書いたファイルは削除する。
+
+        Returns:
+            (コピーしたバイト数, 失敗したコピー先 -> 例外)
+
+        Raises:
+            OSError: コピー元を読めない場合（全てのコピー先を削除する）
+        """
+        failed: Dict[str, BaseException] = {}
+        src_fd = self._open(src, os.O_RDONLY)
+        fds = {}
+        for dst in dsts:
+            try:
+                fds[dst] = self._open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+            except OSError as e:
+                failed[dst] = e
+
+        # 小さなファイルでは使わないチャンクを確保しない
+        chunks = -(-os.fstat(src_fd).st_size // self.buffer_size)
+        ring = _Ring(max(1, min(slots, chunks)), self.buffer_size, len(fds))
+        writers = [
+            threading.Thread(
+                target=self._write_ring,
+                args=(ring, fd, dst, failed),
+                name=f"copy-many-{i}",
+                daemon=True,
+            )
+            for i, (dst, fd) in enumerate(fds.items())
+        ]
+        for writer in writers:
+            writer.start()
+        copied = None
+        try:
+            copied = self._read_ring(src_fd, ring, throttle, digest)
+        finally:
+            for writer in writers:
+                writer.join()
+            os.close(src_fd)
+            for dst, fd in fds.items():
+                try:
+                    os.close(fd)
+                except OSError as e:
+                    failed.setdefault(dst, e)
+            ring.close()
+            # コピー元を読めなかった場合は全てのコピー先を削除する
+            for dst in fds:
+                if copied is None or dst in failed:
+                    _remove_partial(dst)
+
+        for dst in fds:
+            if dst not in failed:
+                try:
+                    shutil.copystat(src, dst)
+                except OSError as e:
+                    failed[dst] = e
+                    _remove_partial(dst)
+        return copied, failed
+
+    def _read_ring(
+        self, src_fd: int, ring: "_Ring", throttle: Optional[IOThrottle], digest
+    ) -> int:
+        """copy_many の読み込み側（呼び出し元のスレッド）"""
+        size = self.buffer_size
+        if self.readahead:
+            _fadvise(src_fd, 0, 0, "POSIX_FADV_SEQUENTIAL")
+        copied = 0
+        dropped = 0
+        seq = 0
+        try:
+            while True:
+                slot = seq % ring.slots
+                with ring.cond:
+                    # 全てのコピー先がこのチャンクを書き終えるまで待つ
+                    while ring.pending[slot] and ring.active:
+                        ring.cond.wait()
+                    if not ring.active:
+                        break  # 全てのコピー先が失敗した
+                if self.readahead:
+                    _fadvise(src_fd, copied + size, size, "POSIX_FADV_WILLNEED")
+                n = _read_into(src_fd, ring.views[slot])
+                if n == 0:
+                    break
+                if throttle:
+                    throttle.io(n)
+                if digest is not None:
+                    with ring.views[slot][:n] as chunk:
+                        digest.update(chunk)
+                copied += n
+                with ring.cond:
+                    ring.lengths[slot] = n
+                    ring.pending[slot] = ring.active
+                    ring.produced = seq + 1
+                    ring.cond.notify_all()
+                seq += 1
+
+                if self.drop_cache and copied - dropped >= DROP_CACHE_WINDOW:
+                    _fadvise(src_fd, dropped, copied - dropped, "POSIX_FADV_DONTNEED")
+                    dropped = copied
+        except BaseException:
+            with ring.cond:
+                ring.aborted = True
+                ring.cond.notify_all()
+            raise
+        with ring.cond:
+            ring.eof = True
+            ring.cond.notify_all()
+        if self.drop_cache and copied > dropped:
+            _fadvise(src_fd, dropped, copied - dropped, "POSIX_FADV_DONTNEED")
+        return copied
+
+    def _write_ring(
+        self, ring: "_Ring", fd: int, dst: str, failed: Dict[str, BaseException]
+    ):
+        """copy_many の書き込み側（コピー先ごとのスレッド）"""
+        seq = 0
+        written = 0
+        dropped = 0
+        try:
+            while True:
+                slot = seq % ring.slots
+                with ring.cond:
+                    while ring.produced <= seq and not (ring.eof or ring.aborted):
+                        ring.cond.wait()
+                    if ring.aborted or ring.produced <= seq:
+                        return
+                    n = ring.lengths[slot]
+                if self.direct and n % DIRECT_IO_ALIGNMENT:
+                    _clear_direct(fd)
+                with ring.views[slot][:n] as chunk:
+                    _write_all(fd, chunk)
+                written += n
+                with ring.cond:
+                    ring.pending[slot] -= 1
+                    if not ring.pending[slot]:
+                        ring.cond.notify_all()
+                seq += 1
+
+                if self.drop_cache and written - dropped >= DROP_CACHE_WINDOW:
+                    _sync_data(fd)
+                    _fadvise(fd, dropped, written - dropped, "POSIX_FADV_DONTNEED")
+                    dropped = written
+        except Exception as e:
+            failed[dst] = e
+            with ring.cond:
+                # 読み込み済みで未処理のチャンクを手放し、以降は数に入れない
+                for pending in range(seq, ring.produced):
+                    ring.pending[pending % ring.slots] -= 1
+                ring.active -= 1
+                ring.cond.notify_all()
+
+    @staticmethod
+    def _drop(src_fd: int, dst_fd: int, offset: int, length: int):
+        # 書き込み済みのページでないと破棄されないため先に同期する
+        _sync_data(dst_fd)
+        _fadvise(dst_fd, offset, length, "POSIX_FADV_DONTNEED")
+        _fadvise(src_fd, offset, length, "POSIX_FADV_DONTNEED")
+
+
+class _Ring:
+    """copy_many で読み込み1つと書き込み複数が共有するチャンクのリングバッファ"""
+
+    def __init__(self, slots: int, size: int, writers: int):
+        import mmap
+
+        self.slots = slots
+        self.buffers = [mmap.mmap(-1, size) for _ in range(slots)]
+        self.views = [memoryview(buffer) for buffer in self.buffers]
+        self.lengths = [0] * slots
+        # チャンクごとの、まだ書き終えていないコピー先の数
+        self.pending = [0] * slots
+        # 読み込んだチャンクの数と、書き込み中のコピー先の数
+        self.produced = 0
+        self.active = writers
+        self.eof = False
+        self.aborted = False
+        self.cond = threading.Condition()
+
+    def close(self):
+        for view in self.views:
+            view.release()
+        for buffer in self.buffers:
+            buffer.close()
+
+
+def _remove_partial(path: str):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+def _read_into(fd: int, view: memoryview) -> int:
+    if hasattr(os, "readv"):
+        return os.readv(fd, [view])
+    data = os.read(fd, len(view))
+    view[: len(data)] = data
+    return len(data)
+
+
+def _write_all(fd: int, view: memoryview):
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+
+def _clear_direct(fd: int):
+    if _O_DIRECT and fcntl is not None:
+        flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+        if flags & _O_DIRECT:
+            fcntl.fcntl(fd, fcntl.F_SETFL, flags & ~_O_DIRECT)
+
+
+# プロセス全体で共有するコピー設定（None の場合は shutil.copy2）
+_engine: Optional[CopyEngine] = None
+
+
+def set_copy_engine(engine: Optional[CopyEngine]):
+    """全てのコピー処理で使う設定を指定する"""
+    global _engine
+    _engine = engine
+
+
+def get_copy_engine() -> Optional[CopyEngine]:
+    """現在のコピー設定を取得する"""
+    return _engine
+
+
+def configure_copy_engine(
+    buffer_size: Optional[str] = None,
+    direct: bool = False,
+    drop_cache: bool = False,
+) -> Optional[CopyEngine]:
+    """CLI オプションからコピー設定を作成して指定する"""
+    if not (buffer_size or direct or drop_cache):
+        set_copy_engine(None)
+        return None
+    engine = CopyEngine(
+        parse_size(buffer_size) if buffer_size else DEFAULT_BUFFER_SIZE,
+        direct=direct,
+        drop_cache=drop_cache,
+    )
+    set_copy_engine(engine)
+    return engine
+
+
+def copy_file(
+    src: str,
+    dst: str,
+    throttle: Optional[IOThrottle] = None,
+    engine: Optional[CopyEngine] = None,
+) -> int:
+    """メタデータ込みでファイルをコピーする（shutil.copy2 相当）
+
+    制限・コピー設定を省略した場合はプロセス全体の設定を使い、
+    どれも無ければ shutil.copy2 にそのまま任せる。検証が有効な場合は
+    コピー中に計算したチェックサムで検証し、不一致ならコピー先を削除する。
+    ミラーが設定されていれば、同じ読み込みでミラーにも書き込む。
+
+    Returns:
+        コピーしたバイト数
+
+    Raises:
+        VerifyError: 検証に失敗した場合
+    """
+    throttle = throttle or get_throttle()
+    engine = engine or get_copy_engine()
+    verifier = get_verifier()
+    mirrors = get_mirrors()
+    targets = mirrors.targets(dst) if mirrors else []
+    if targets:
+        return _copy_to_all(src, dst, targets, mirrors, throttle, engine, verifier)
+    if throttle is None and engine is None and verifier is None:
+        shutil.copy2(src, dst)
+        return os.path.getsize(dst)
+
+    engine = engine or CopyEngine()
+    if verifier is None:
+        return engine.copy(src, dst, throttle)
+
+    digest = verifier.new_digest()
+    start = time.perf_counter()
+    copied = engine.copy(src, dst, throttle, digest)
+    elapsed = time.perf_counter() - start
+    try:
+        verifier.check(dst, digest, copied, elapsed)
+    except VerifyError:
+        os.unlink(dst)
+        raise
+    return copied
+
+
+def _copy_to_all(
+    src: str,
+    dst: Optional[str],
+    targets: List[str],
+    mirrors: Mirrors,
+    throttle: Optional[IOThrottle],
+    engine: Optional[CopyEngine],
+    verifier: Optional[Verifier],
+) -> int:
+    """src を1回だけ読み、dst（None ならミラーだけ）とミラーに書き込む
+
+    ミラーの失敗は mirrors に記録して続け、dst の失敗だけを例外にする。
+    """
+    dsts = [] if dst is None else [dst]
+    for target in targets:
+        try:
+            mirrors.prepare(target)
+            dsts.append(target)
+        except OSError as e:
+            mirrors.record(target, 0, e)
+
+    digest = verifier.new_digest() if verifier else None
+    start = time.perf_counter()
+    copied, failed = (engine or CopyEngine()).copy_many(src, dsts, throttle, digest)
+    elapsed = time.perf_counter() - start
+    if verifier:
+        for path in dsts:
+            if path in failed:
+                continue
+            try:
+                verifier.check(path, digest, copied, elapsed)
+            except VerifyError as e:
+                os.unlink(path)
+                failed[path] = e
+
+    for target in dsts:
+        if target != dst:
+            mirrors.record(target, copied, failed.get(target))
+    if dst is not None and dst in failed:
+        raise failed[dst]
+    return copied
+
+
+def _copy_to_mirrors(path: str, throttle: Optional[IOThrottle] = None):
+    """リネーム・リンクで配置したファイルをミラーにコピーする"""
+    mirrors = get_mirrors()
+    targets = mirrors.targets(path) if mirrors else []
+    if targets:
+        engine, verifier = get_copy_engine(), get_verifier()
+        _copy_to_all(path, None, targets, mirrors, throttle, engine, verifier)
+
+
+def move_file(src: str, dst: str, throttle: Optional[IOThrottle] = None) -> str:
+    """ファイルを移動する（shutil.move 相当）
+
+    同一ファイルシステム内ではリネーム、異なる場合はコピー＋削除を行う。
+    コピーを検証する場合、検証に成功するまで移動元は削除しない。
+    ミラーにはコピーと同じ読み込みで（リネームの場合は移動先から）書き込む。
+
+    Returns:
+        移動後のパス
+    """
+    throttle = throttle or get_throttle()
+    mirrors = get_mirrors()
+    if (
+        throttle is None
+        and get_copy_engine() is None
+        and get_verifier() is None
+        and not (mirrors and mirrors.targets(dst))
+    ):
+        return shutil.move(src, dst)
+
+    if throttle:
+        throttle.io()
+    try:
+        os.rename(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        copy_file(src, dst, throttle)
+        os.unlink(src)
+        return dst
+    _copy_to_mirrors(dst, throttle)
+    return dst
+
+
+def _device_of(dir_path: str) -> int:
+    dev = _dir_devices.get(dir_path)
+    if dev is None:
+        dev = os.stat(dir_path).st_dev
+        _dir_devices[dir_path] = dev
+    return dev
+
+
+def _mark_unsupported(dev: int, method: str):
+    with _lock:
+        _unsupported.setdefault(dev, set()).add(method)
+
+
+def _candidates(link_mode: str):
+    if link_mode == "auto":
+        return ("reflink", "hardlink")
+    if link_mode in ("reflink", "hardlink"):
+        return (link_mode,)
+    return ()
+
+
+def _reflink(src: str, dst: str):
+    """FICLONE ioctl でブロックを共有したコピーを作る（btrfs / XFS 等）"""
+    if fcntl is None or not sys.platform.startswith("linux"):
+        raise OSError(errno.EOPNOTSUPP, "reflink is not supported on this platform")
+
+    with open(src, "rb") as fsrc:
+        fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+        try:
+            fcntl.ioctl(fd, FICLONE, fsrc.fileno())
+        except OSError:
+            os.close(fd)
+            os.unlink(dst)
+            raise
+        os.close(fd)
+    shutil.copystat(src, dst)
+
+
+def _hardlink(src: str, dst: str):
+    """ハードリンクを作る（既存ファイルは置き換える）"""
+    try:
+        os.link(src, dst)
+    except FileExistsError:
+        # 同じファイルを複数のプロセス・スレッドが同時に置いても衝突しない一時名
+        tmp = f"{dst}.{os.getpid()}-{threading.get_ident()}.link-tmp"
+        os.link(src, tmp)
+        try:
+            os.replace(tmp, dst)
+        except OSError:
+            _remove_partial(tmp)
+            raise
+
+
+def link_or_copy(src: str, dst: str, link_mode: str = "copy") -> str:
+    """link_mode に従ってファイルを配置する
+
+    リンク方式に対応していないデバイスでは、最初の失敗でデバイスごとに記録し、
+    以降は試行せずに次の方式（最終的には shutil.copy2）へフォールバックする。
+
+    Returns:
+        実際に使用した方式 ("reflink" / "hardlink" / "copy")
+    """
+    methods = _candidates(link_mode)
+    if methods:
+        dev = _device_of(os.path.dirname(os.path.abspath(dst)))
+        unsupported = _unsupported.get(dev, ())
+        for method in methods:
+            if method in unsupported:
+                continue
+            throttle = get_throttle()
+            try:
+                if throttle:
+                    throttle.io()
+                if method == "reflink":
+                    _reflink(src, dst)
+                else:
+                    _hardlink(src, dst)
+            except OSError as e:
+                if e.errno not in _UNSUPPORTED_ERRNOS:
+                    raise
+                _mark_unsupported(dev, method)
+                continue
+            # ミラーへのコピーの失敗は、このデバイスのリンク方式の対応状況とは無関係
+            _copy_to_mirrors(dst, throttle)
+            return method
+
+    copy_file(src, dst)
+    return "copy"
+
+
+def reset_link_probe():
+    """デバイスごとの対応状況キャッシュを破棄する"""
+    with _lock:
+        _unsupported.clear()
+        _dir_devices.clear()
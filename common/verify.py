@@ -0,0 +1,236 @@
+"""コピー後の検証とチェックサムマニフェスト
+
+コピー中にチェックサムを同時計算し（コピー元の読み込みは1回）、ページキャッシュを
+経由せずにコピー先を読み直して比較する。どちらのモードも書き込みや媒体の不良を検出する。
+- readback: 読み直して比較するだけ
+- manifest: さらにマニフェストの前回の記録と比べ、コピー元が変わったファイルを報告する
+
+チェックサムは移動先の日付フォルダごとに `sha256sum -c` 互換のマニフェストへ追記する
+（後から `sha256sum -c` で劣化を検出するためのもの。同じファイルは最後の行が有効）。
+"""
+
+import errno
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+VERIFY_MODES = ("readback", "manifest")
+MANIFEST_NAME = "CHECKSUMS.sha256"
+
+_READ_BUFFER_SIZE = 1024 * 1024
+_O_DIRECT = getattr(os, "O_DIRECT", 0)
+
+
+class VerifyError(Exception):
+    """コピー先の内容がコピー元と一致しない"""
+
+
+class TimedDigest:
+    """チェックサム計算にかかった時間を記録するラッパー"""
+
+    def __init__(self):
+        import hashlib
+
+        self._hash = hashlib.sha256()
+        self.seconds = 0.0
+
+    def update(self, data):
+        start = time.perf_counter()
+        self._hash.update(data)
+        self.seconds += time.perf_counter() - start
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+def _open_uncached(path: str) -> int:
+    """ページキャッシュを経由せずに読むためにファイルを開く"""
+    if _O_DIRECT:
+        try:
+            return os.open(path, os.O_RDONLY | _O_DIRECT)
+        except OSError as e:
+            if e.errno != errno.EINVAL:
+                raise
+    fd = os.open(path, os.O_RDONLY)
+    # O_DIRECT が使えない場合は書き込みを確定させ、キャッシュを捨ててから読む
+    if hasattr(os, "posix_fadvise"):
+        os.fsync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    return fd
+
+
+def read_back_digest(path: str) -> str:
+    """ファイルをディスクから読み直してチェックサムを計算する"""
+    import hashlib
+    import mmap
+
+    digest = hashlib.sha256()
+    buffer = mmap.mmap(-1, _READ_BUFFER_SIZE)
+    view = memoryview(buffer)
+    fd = _open_uncached(path)
+    try:
+        while True:
+            if hasattr(os, "readv"):
+                n = os.readv(fd, [view])
+            else:
+                data = os.read(fd, _READ_BUFFER_SIZE)
+                n = len(data)
+                view[:n] = data
+            if n == 0:
+                break
+            digest.update(view[:n])
+    finally:
+        os.close(fd)
+        view.release()
+        buffer.close()
+    return digest.hexdigest()
+
+
+class Manifest:
+    """1つのフォルダのチェックサム一覧（`<hex>  <相対パス>` 形式）"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = os.path.join(directory, MANIFEST_NAME)
+        self.entries: Dict[str, str] = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    digest, sep, name = line.rstrip("\n").partition("  ")
+                    if sep:
+                        self.entries[name] = digest
+
+    def relpath(self, file_path: str) -> str:
+        return os.path.relpath(file_path, self.directory).replace(os.sep, "/")
+
+    def add(self, file_path: str, digest: str):
+        """エントリを追記する（同じ内容が記録済みなら何もしない。違う内容なら後の行が有効）"""
+        name = self.relpath(file_path)
+        if self.entries.get(name) == digest:
+            return
+        self.entries[name] = digest
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(f"{digest}  {name}\n")
+
+
+class Verifier:
+    """コピー結果を検証し、マニフェストと統計を管理する"""
+
+    def __init__(self, mode: str = "readback", manifest_depth: int = 0):
+        """
+        Args:
+            mode: "readback" または "manifest"
+            manifest_depth: コピー先ファイルのフォルダから何階層上にマニフェストを置くか
+                            （move はレイアウトの Layout.manifest_depth）
+        """
+        if mode not in VERIFY_MODES:
+            raise ValueError(f"Unknown verify mode: {mode}")
+        self.mode = mode
+        self.manifest_depth = manifest_depth
+        self._manifests: Dict[str, Manifest] = {}
+        self._lock = threading.Lock()
+        self.files = 0
+        self.bytes = 0
+        self.failures = 0
+        self.copy_seconds = 0.0
+        self.hash_seconds = 0.0
+        self.readback_seconds = 0.0
+        # manifest: 前回の記録と違う（コピー元が変わった）ため記録を更新したファイル
+        self.changed: List[str] = []
+
+    def new_digest(self) -> TimedDigest:
+        return TimedDigest()
+
+    def _manifest_for(self, dst: str) -> Manifest:
+        directory = os.path.dirname(os.path.abspath(dst))
+        for _ in range(self.manifest_depth):
+            directory = os.path.dirname(directory)
+        manifest = self._manifests.get(directory)
+        if manifest is None:
+            manifest = Manifest(directory)
+            self._manifests[directory] = manifest
+        return manifest
+
+    def check(
+        self, dst: str, digest: TimedDigest, nbytes: int, copy_seconds: float
+    ) -> str:
+        """コピー直後に呼び出して検証する
+
+        コピー先は常に読み直し、コピー中に計算したチェックサムと比べる。マニフェストの
+        記録が違う場合はコピー元が変わった（コピー先は読み直しで確認済み）ため記録を更新する
+
+        Raises:
+            VerifyError: 内容が一致しない場合
+        """
+        expected = digest.hexdigest()
+        start = time.perf_counter()
+        actual = read_back_digest(dst)
+        readback = time.perf_counter() - start
+
+        with self._lock:
+            self.files += 1
+            self.bytes += nbytes
+            self.copy_seconds += copy_seconds
+            self.hash_seconds += digest.seconds
+            self.readback_seconds += readback
+            if actual != expected:
+                self.failures += 1
+                raise VerifyError(
+                    f"Checksum mismatch for {dst}: expected {expected}, got {actual}"
+                )
+            manifest = self._manifest_for(dst)
+            recorded = manifest.entries.get(manifest.relpath(dst))
+            if self.mode == "manifest" and recorded not in (None, expected):
+                self.changed.append(dst)
+            manifest.add(dst, expected)
+        return expected
+
+    @property
+    def overhead(self) -> Optional[float]:
+        """未検証のコピーに対する検証コストの割合"""
+        base = self.copy_seconds - self.hash_seconds
+        if base <= 0:
+            return None
+        return (self.hash_seconds + self.readback_seconds) / base
+
+    def summary_lines(self) -> List[str]:
+        lines = [
+            f"Verified: {self.files} files ({self.mode}), failures: {self.failures}",
+        ]
+        if self.changed:
+            lines.append(
+                f"Manifest entries updated (source changed): {len(self.changed)}"
+            )
+        if self.overhead is not None:
+            lines.append(
+                f"Verify overhead: {self.overhead * 100:.1f}% "
+                f"(hash {self.hash_seconds:.2f}s, "
+                f"read-back {self.readback_seconds:.2f}s, "
+                f"copy {self.copy_seconds - self.hash_seconds:.2f}s)"
+            )
+        return lines
+
+
+# プロセス全体で共有する検証設定（None の場合は検証しない）
+_verifier: Optional[Verifier] = None
+
+
+def set_verifier(verifier: Optional[Verifier]):
+    """全てのコピー処理で使う検証設定を指定する"""
+    global _verifier
+    _verifier = verifier
+
+
+def get_verifier() -> Optional[Verifier]:
+    """現在の検証設定を取得する"""
+    return _verifier
+
+
+def configure_verifier(
+    mode: Optional[str], manifest_depth: int = 0
+) -> Optional[Verifier]:
+    """CLI オプションから検証設定を作成して指定する"""
+    verifier = Verifier(mode, manifest_depth) if mode else None
+    set_verifier(verifier)
+    return verifier
@@ -0,0 +1,285 @@
+"""動画プレビューのエンコーダー（OpenCV の videoio バックエンドと FourCC）の選択
+
+使えるバックエンド（FFMPEG・GStreamer）と FourCC の組み合わせで合成した短い動画を
+書き出して読み直し、最も速く動いた組み合わせをマシンごとにキャッシュする
+（$XDG_CACHE_HOME/my-data-backup/encoder.json）。キャッシュは OpenCV のバージョン・
+ホスト名・使えるバックエンドが変わると作り直す。
+
+プレビューは元の動画と同じ拡張子で書き出すため、探索もその形式（コンテナ）の
+ファイルで行い、結果は形式ごとに記録する。出力が最も小さい組み合わせの
+MAX_SIZE_RATIO 倍を超えるもの（MJPG など）は、速くても他に無い場合にだけ選ぶ。
+
+cv2 は呼び出し側から渡すため、このモジュール自体は OpenCV なしで読み込める。
+"""
+
+import json
+import os
+import platform
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+# 名前 -> cv2 の定数名
+BACKENDS = {"ffmpeg": "CAP_FFMPEG", "gstreamer": "CAP_GSTREAMER", "any": "CAP_ANY"}
+FOURCCS = ("avc1", "mp4v", "XVID", "MJPG")
+DEFAULT_ENCODER = ("any", "mp4v")
+
+# 探索に使う合成動画（プレビューと同じ大きさ）
+PROBE_FRAMES = 30
+PROBE_SIZE = (640, 480)
+PROBE_FPS = 30
+# 出力サイズの上限（動いた組み合わせのうち最も小さい出力に対する倍率）
+MAX_SIZE_RATIO = 3.0
+DEFAULT_CONTAINER = ".mp4"
+
+
+class Encoder:
+    """プレビューの読み込み・書き出しに使うバックエンドと FourCC"""
+
+    def __init__(self, backend: str = "any", fourcc: str = "mp4v"):
+        if backend not in BACKENDS:
+            raise ValueError(
+                f"Unknown backend: {backend} (available: {', '.join(BACKENDS)})"
+            )
+        if len(fourcc) != 4:
+            raise ValueError(f"FourCC must be 4 characters: {fourcc!r}")
+        self.backend = backend
+        self.fourcc = fourcc
+
+    def api(self, cv2) -> int:
+        return getattr(cv2, BACKENDS[self.backend], cv2.CAP_ANY)
+
+    def open_capture(self, cv2, path: str):
+        return cv2.VideoCapture(path, self.api(cv2))
+
+    def open_writer(self, cv2, path: str, fps: float, size):
+        fourcc = cv2.VideoWriter_fourcc(*self.fourcc)
+        return cv2.VideoWriter(path, self.api(cv2), fourcc, fps, size)
+
+    def __eq__(self, other):
+        return isinstance(other, Encoder) and (self.backend, self.fourcc) == (
+            other.backend,
+            other.fourcc,
+        )
+
+    def __repr__(self):
+        return f"Encoder({self.backend!r}, {self.fourcc!r})"
+
+
+def default_cache_file() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "my-data-backup", "encoder.json")
+
+
+def container_of(path: str) -> str:
+    """プレビューの形式（拡張子を小文字にしたもの。無ければ DEFAULT_CONTAINER）"""
+    return os.path.splitext(path)[1].lower() or DEFAULT_CONTAINER
+
+
+def available_backends(cv2) -> List[str]:
+    """このビルドの OpenCV で書き出しに使えるバックエンド（ffmpeg・gstreamer の順）"""
+    names = [
+        name for name in BACKENDS if name != "any" and hasattr(cv2, BACKENDS[name])
+    ]
+    registry = getattr(cv2, "videoio_registry", None)
+    if registry is None:
+        return names
+    writers = set(registry.getWriterBackends())
+    return [name for name in names if getattr(cv2, BACKENDS[name]) in writers]
+
+
+def _synthetic_frames(frames: int, size):
+    """動きのある合成フレーム（グラデーションを横に流す）"""
+    import numpy as np
+
+    width, height = size
+    x = np.arange(width, dtype=np.uint16)
+    y = np.arange(height, dtype=np.uint16)[:, None]
+    base = np.empty((height, width, 3), dtype=np.uint8)
+    base[..., 0] = ((x + y) % 256).astype(np.uint8)
+    base[..., 1] = ((x * 2) % 256).astype(np.uint8)
+    base[..., 2] = ((y * 3) % 256).astype(np.uint8)
+    return [np.roll(base, i * 8, axis=1) for i in range(frames)]
+
+
+def measure_encoder(
+    cv2,
+    encoder: Encoder,
+    work_dir: str,
+    frames,
+    size,
+    container: str = DEFAULT_CONTAINER,
+) -> Dict:
+    """合成動画を container の形式で書き出して読み直し、速度と出力サイズを返す"""
+    result = {"backend": encoder.backend, "fourcc": encoder.fourcc, "ok": False}
+    path = os.path.join(work_dir, f"{encoder.backend}-{encoder.fourcc}{container}")
+    start = time.perf_counter()
+    writer = encoder.open_writer(cv2, path, PROBE_FPS, size)
+    if not writer.isOpened():
+        return result
+    for frame in frames:
+        writer.write(frame)
+    writer.release()
+    encode_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    capture = encoder.open_capture(cv2, path)
+    decoded = 0
+    while capture.isOpened():
+        ret, _ = capture.read()
+        if not ret:
+            break
+        decoded += 1
+    capture.release()
+    decode_seconds = time.perf_counter() - start
+    # 一部のフレームしか読めない組み合わせは使えないものとして扱う
+    if decoded < len(frames):
+        return result
+
+    result.update(
+        ok=True,
+        bytes=os.path.getsize(path),
+        encode_fps=len(frames) / max(encode_seconds, 1e-9),
+        decode_fps=decoded / max(decode_seconds, 1e-9),
+        seconds=encode_seconds + decode_seconds,
+    )
+    return result
+
+
+def benchmark_codecs(
+    cv2,
+    frames: int = PROBE_FRAMES,
+    size=PROBE_SIZE,
+    backends: Optional[Sequence[str]] = None,
+    fourccs: Sequence[str] = FOURCCS,
+    container: str = DEFAULT_CONTAINER,
+) -> List[Dict]:
+    """バックエンドと FourCC の全組み合わせを計測する
+
+    速い順で、出力が大きすぎるもの（oversized）はその後、動かないものは最後
+    """
+    clip = _synthetic_frames(frames, size)
+    backends = list(backends or available_backends(cv2) or ["any"])
+    results = []
+    with tempfile.TemporaryDirectory(prefix="codecs-") as work_dir:
+        for backend in backends:
+            for fourcc in fourccs:
+                encoder = Encoder(backend, fourcc)
+                try:
+                    results.append(
+                        measure_encoder(cv2, encoder, work_dir, clip, size, container)
+                    )
+                except cv2.error:
+                    results.append({"backend": backend, "fourcc": fourcc, "ok": False})
+    sizes = [r["bytes"] for r in results if r["ok"]]
+    for r in results:
+        if r["ok"]:
+            r["oversized"] = r["bytes"] > min(sizes) * MAX_SIZE_RATIO
+    return sorted(
+        results,
+        key=lambda r: (not r["ok"], r.get("oversized", False), r.get("seconds", 0)),
+    )
+
+
+def _machine_key(cv2) -> Dict:
+    return {
+        "opencv": cv2.__version__,
+        "host": platform.node(),
+        "backends": available_backends(cv2),
+    }
+
+
+def probe_encoder(
+    cv2,
+    cache_file: Optional[str] = None,
+    backend: Optional[str] = None,
+    fourcc: Optional[str] = None,
+    refresh: bool = False,
+    container: str = DEFAULT_CONTAINER,
+) -> Encoder:
+    """container の形式で最も速く動く組み合わせを選ぶ（キャッシュがあれば計測しない）
+
+    backend / fourcc を指定した場合は、その条件に合う組み合わせだけから選ぶ。
+    """
+    cache_file = cache_file or default_cache_file()
+    key = _machine_key(cv2)
+    try:
+        with open(cache_file, encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        cached = None
+    if cached is None or cached.get("machine") != key or "containers" not in cached:
+        cached = {"machine": key, "containers": {}}
+    # refresh では container の結果だけを計測し直す（他の形式の記録は残す）
+    results = None if refresh else cached["containers"].get(container)
+    if results is None:
+        results = benchmark_codecs(cv2, container=container)
+        cached["containers"][container] = results
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            tmp = f"{cache_file}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(cached, f, indent=2)
+            os.replace(tmp, cache_file)
+        except OSError:
+            pass
+
+    for result in results:
+        if not result["ok"]:
+            continue
+        if backend and result["backend"] != backend:
+            continue
+        if fourcc and result["fourcc"] != fourcc:
+            continue
+        return Encoder(result["backend"], result["fourcc"])
+    return Encoder(backend or DEFAULT_ENCODER[0], fourcc or DEFAULT_ENCODER[1])
+
+
+_encoder: Optional[Encoder] = None
+# 形式ごとの探索結果（_encoder が設定されていれば使わない）
+_probed: Dict[str, Encoder] = {}
+_override: Dict[str, Optional[str]] = {
+    "backend": None,
+    "fourcc": None,
+    "cache_file": None,
+}
+_lock = threading.Lock()
+
+
+def set_encoder(encoder: Optional[Encoder]):
+    """プロセス全体で全ての形式に使うエンコーダーを設定する（None で次回に探索し直す）"""
+    global _encoder
+    _encoder = encoder
+    _probed.clear()
+
+
+def get_encoder(cv2, container: str = DEFAULT_CONTAINER) -> Encoder:
+    """container の形式に使うエンコーダー
+
+    未設定なら探索する（形式ごとに1回だけ。複数スレッドからの呼び出しでも同じ）
+    """
+    with _lock:
+        if _encoder is not None:
+            return _encoder
+        if container not in _probed:
+            _probed[container] = probe_encoder(cv2, container=container, **_override)
+        return _probed[container]
+
+
+def configure_encoder(
+    backend: Optional[str] = None,
+    codec: Optional[str] = None,
+    cache_file: Optional[str] = None,
+):
+    """CLI のオプションからエンコーダーを設定する
+
+    両方指定すれば探索しない。片方だけなら、もう片方は探索結果から選ぶ。
+    cache_file は探索結果のキャッシュ（省略時は default_cache_file()）。
+    """
+    if backend is not None and backend not in BACKENDS:
+        raise ValueError(f"Unknown backend: {backend}")
+    if codec is not None and len(codec) != 4:
+        raise ValueError(f"FourCC must be 4 characters: {codec!r}")
+    _override.update(backend=backend, fourcc=codec, cache_file=cache_file)
+    set_encoder(Encoder(backend, codec) if backend and codec else None)
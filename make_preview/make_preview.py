@@ -1,6 +1,28 @@
+import json
 import os
+
+import click
 import cv2
-from light_progress import ProgressBar
+
+from common.jobs import job_options
+from make_preview.encoders import (
+    BACKENDS,
+    FOURCCS,
+    PROBE_FRAMES,
+    DEFAULT_CONTAINER,
+    Encoder,
+    benchmark_codecs,
+    configure_encoder,
+    container_of,
+    get_encoder,
+    probe_encoder,
+)
+from make_preview.progress import (
+    DEFAULT_INTERVAL,
+    ProgressTracker,
+    estimate_duration,
+    print_progress,
+)
 
 
 def color_print(text, color_name):
@@ -8,6 +30,21 @@ def color_print(text, color_name):
     print("\033[{}m{}\033[0m".format(color, text))
 
 
+# HighGUI の無い OpenCV（opencv-python-headless）では waitKey が例外になる
+_highgui = True
+
+
+def _esc_pressed():
+    """ESC キーが押されたか（HighGUI が無ければ常に False）"""
+    global _highgui
+    if _highgui:
+        try:
+            return cv2.waitKey(10) == 27  # ESC key
+        except cv2.error:
+            _highgui = False
+    return False
+
+
 def reduction_image(img, width=640, height=480):
     img = cv2.resize(img, (width, height))
     # ビットレートを下げる
@@ -24,7 +61,18 @@ def reduction_image(img, width=640, height=480):
     return img
 
 
-def make_preview_movie(movie_path, output_dir="preview"):
+def make_preview_movie(
+    movie_path,
+    output_dir="preview",
+    encoder=None,
+    progress=print_progress,
+    progress_interval=DEFAULT_INTERVAL,
+):
+    # encoder を省略すると、マシンごとに出力の形式（元の動画の拡張子）で探索した
+    # 最も速いバックエンドと FourCC を使う
+    # progress には progress_interval 秒ごとに ProgressEvent が渡される（None で表示しない）
+    encoder = encoder or get_encoder(cv2, container_of(movie_path))
+
     # make output dir
     if not os.path.exists(output_dir):
         os.makedirs(output_dir, exist_ok=True)
@@ -39,7 +87,7 @@ def make_preview_movie(movie_path, output_dir="preview"):
         return
 
     # open movie
-    capture = cv2.VideoCapture(movie_path)
+    capture = encoder.open_capture(cv2, movie_path)
     if not capture.isOpened():
         color_print(f"Failed to open {movie_path}.", "red")
         return
@@ -51,31 +99,202 @@ def make_preview_movie(movie_path, output_dir="preview"):
     size = (640, 480)
 
     # make writer
-    writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    writer = encoder.open_writer(cv2, output_path, fps, size)
+    if not writer.isOpened():
+        color_print(f"Failed to open writer ({encoder}) for {output_path}.", "red")
+        capture.release()
+        return
+
+    # 進捗は再生位置と長さで表す（フレーム数が当てにならない形式があるため）
+    tracker = ProgressTracker(
+        movie_path,
+        estimate_duration(cv2, capture, movie_path),
+        fps,
+        progress,
+        progress_interval,
+        position=lambda: capture.get(cv2.CAP_PROP_POS_MSEC) / 1000,
+    )
 
     # make preview movie
-    with ProgressBar(int(capture.get(cv2.CAP_PROP_FRAME_COUNT))) as pbar:
-        while capture.isOpened():
-            ret, frame = capture.read()
-            if not ret:
-                color_print("Movie is finished.", "green")
-                break
+    while capture.isOpened():
+        ret, frame = capture.read()
+        if not ret:
+            color_print("Movie is finished.", "green")
+            break
 
-            if cv2.waitKey(10) == 27:  # ESC key
-                color_print("ESC key is pressed.", "red")
-                break
+        if _esc_pressed():
+            color_print("ESC key is pressed.", "red")
+            break
 
-            frame = reduction_image(frame, 640, 480)
-            writer.write(frame)
-            pbar.update(int(capture.get(cv2.CAP_PROP_POS_FRAMES)))
+        frame = reduction_image(frame, 640, 480)
+        writer.write(frame)
+        tracker.frame()
+    event = tracker.finish()
 
     # release
     capture.release()
     writer.release()
+    return event
+
 
+def _configure(backend, codec, cache_file=None):
+    try:
+        configure_encoder(backend, codec, cache_file)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
 
+
+@click.group()
 def main():
-    make_preview_movie("movie.mp4", "preview")
+    """動画のプレビューを作る"""
+
+
+@main.command("preview")
+@job_options("make_preview")
+@click.argument("movies", nargs=-1, required=True, type=click.Path(exists=True))
+@click.option("--output-dir", default="preview", show_default=True)
+@click.option(
+    "--backend",
+    type=click.Choice(list(BACKENDS)),
+    default=None,
+    help="VideoCapture/VideoWriter backend (default: fastest probed)",
+)
+@click.option(
+    "--codec", default=None, help="FourCC of the preview (default: fastest probed)"
+)
+@click.option(
+    "--encoder-cache",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Cache of the probed encoder "
+    "(default: $XDG_CACHE_HOME/my-data-backup/encoder.json)",
+)
+@click.option(
+    "--segment-seconds",
+    type=click.FloatRange(min=0),
+    default=0,
+    help="Encode time ranges of this length in parallel processes (0: single run)",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Processes for --segment-seconds (default: CPU count)",
+)
+@click.option(
+    "--playlist",
+    is_flag=True,
+    help="With --segment-seconds, keep the segments and write an M3U playlist "
+    "(recommended for long movies: joining re-encodes in a single process)",
+)
+def preview(
+    movies,
+    output_dir,
+    backend,
+    codec,
+    encoder_cache,
+    segment_seconds,
+    workers,
+    playlist,
+):
+    """MOVIES のプレビューを作る"""
+    _configure(backend, codec, encoder_cache)
+    containers = set()
+    failed = 0
+    for movie in movies:
+        if container_of(movie) not in containers:
+            containers.add(container_of(movie))
+            encoder = get_encoder(cv2, container_of(movie))
+            click.echo(f"Encoder ({container_of(movie)}): {encoder}")
+        if not segment_seconds:
+            make_preview_movie(movie, output_dir)
+            continue
+        # 区間ごとの並列作成（完了した区間は記録され、再実行では残りだけを作る）
+        from make_preview.segmented import SegmentError, make_segmented_preview
+
+        try:
+            result = make_segmented_preview(
+                movie,
+                output_dir,
+                segment_seconds,
+                workers,
+                join=not playlist,
+                progress=print_progress,
+            )
+        except SegmentError as e:
+            failed += 1
+            color_print(str(e), "red")
+            continue
+        color_print(
+            f"{result['output']}: {result['encoded']} segments encoded, "
+            f"{result['reused']} reused",
+            "green",
+        )
+    if failed:
+        raise click.ClickException(
+            f"{failed} movie(s) have failed segments; run again to retry them"
+        )
+
+
+@main.command("benchmark-codecs")
+@click.option("--frames", default=PROBE_FRAMES * 4, show_default=True)
+@click.option("--width", default=640, show_default=True)
+@click.option("--height", default=480, show_default=True)
+@click.option(
+    "--backend",
+    "backends",
+    type=click.Choice(list(BACKENDS)),
+    multiple=True,
+    help="Backends to try (default: all available)",
+)
+@click.option("--codec", "codecs", multiple=True, help="FourCCs to try (default: all)")
+@click.option(
+    "--refresh-cache",
+    is_flag=True,
+    help="Probe again and store the fastest encoder for this machine",
+)
+@click.option(
+    "--container",
+    default=DEFAULT_CONTAINER,
+    show_default=True,
+    help="Extension of the output file (previews keep the movie's extension)",
+)
+@click.option("--output", type=click.Path(dir_okay=False), help="JSON output path")
+def benchmark(
+    frames, width, height, backends, codecs, refresh_cache, container, output
+):
+    """合成動画をエンコードし、組み合わせごとの fps と出力サイズを表示する"""
+    container = container_of(f"x.{container.lstrip('.')}")
+    results = benchmark_codecs(
+        cv2, frames, (width, height), backends or None, codecs or FOURCCS, container
+    )
+    click.echo(f"{frames} frames at {width}x{height} ({container})")
+    for r in results:
+        name = f"{r['backend']}/{r['fourcc']}"
+        if not r["ok"]:
+            click.echo(f"  {name:<16} unavailable")
+            continue
+        click.echo(
+            f"  {name:<16} encode {r['encode_fps']:8.1f} fps  "
+            f"decode {r['decode_fps']:8.1f} fps  {r['bytes'] / 1024:9.1f} KiB"
+            + ("  (too large)" if r["oversized"] else "")
+        )
+    if refresh_cache:
+        encoder = probe_encoder(cv2, refresh=True, container=container)
+        click.echo(f"Cached encoder: {encoder}")
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "benchmark": "codecs",
+                    "frames": frames,
+                    "size": [width, height],
+                    "container": container,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
 
 
 if __name__ == "__main__":
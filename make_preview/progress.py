@@ -0,0 +1,218 @@
+"""動画プレビュー作成の進捗
+
+MTS（AVCHD）などでは CAP_PROP_FRAME_COUNT が 0 や誤った値になるため、進捗は
+フレーム数ではなく再生位置（秒）と動画の長さで表す。長さはフレーム数と fps、
+それが使えなければビットレートとファイルサイズから見積もる。
+
+フレームごとの処理は数えるだけで、一定の間隔（既定 0.5 秒）ごとにだけ再生位置を
+問い合わせ、コールバックに ProgressEvent を渡す。複数の動画の進捗は
+ProgressAggregator でまとめられる（GUI やバッチ処理向け）。
+"""
+
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+DEFAULT_INTERVAL = 0.5
+# フレーム数が当てにならない形式（ビットレートから長さを見積もる方が正確）
+UNRELIABLE_FRAME_COUNT = frozenset({".mts", ".m2ts"})
+
+
+class ProgressEvent:
+    """進捗の通知（path が None のものは ProgressAggregator による合計）
+
+    position・duration は秒。duration が分からない場合は fraction・eta も None
+    """
+
+    __slots__ = (
+        "path",
+        "frames",
+        "position",
+        "duration",
+        "elapsed",
+        "fps",
+        "fraction",
+        "eta",
+        "done",
+    )
+
+    def __init__(
+        self,
+        path: Optional[str],
+        frames: int,
+        position: float,
+        duration: Optional[float],
+        elapsed: float,
+        done: bool = False,
+    ):
+        self.path = path
+        self.frames = frames
+        self.position = position
+        self.duration = duration
+        self.elapsed = elapsed
+        self.done = done
+        self.fps = frames / elapsed if elapsed > 0 else 0.0
+        if done:
+            self.fraction, self.eta = 1.0, 0.0
+        elif duration:
+            self.fraction = min(position / duration, 1.0)
+            # 再生位置の進む速さ（動画の秒 / 実時間の秒）から残り時間を見積もる
+            rate = position / elapsed if elapsed > 0 else 0.0
+            self.eta = (duration - position) / rate if rate > 0 else None
+        else:
+            self.fraction, self.eta = None, None
+
+    def as_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+ProgressCallback = Callable[[ProgressEvent], None]
+
+
+def estimate_duration(cv2, capture, path: str) -> Optional[float]:
+    """動画の長さ（秒）を見積もる。分からなければ None"""
+    fps = capture.get(cv2.CAP_PROP_FPS)
+    frame_count = capture.get(cv2.CAP_PROP_FRAME_COUNT)
+    by_frames = frame_count / fps if fps > 0 and frame_count > 0 else None
+
+    by_bitrate = None
+    prop = getattr(cv2, "CAP_PROP_BITRATE", None)
+    if prop is not None:
+        kbps = capture.get(prop)
+        if kbps > 0:
+            by_bitrate = os.path.getsize(path) * 8 / (kbps * 1000)
+
+    if os.path.splitext(path)[1].lower() in UNRELIABLE_FRAME_COUNT:
+        return by_bitrate or by_frames
+    return by_frames or by_bitrate
+
+
+class ProgressTracker:
+    """1本の動画の進捗を数え、interval 秒ごとにコールバックを呼ぶ
+
+    Args:
+        nominal_fps: 再生位置を frames / nominal_fps で求める（0 なら position を使う）
+        position: 通知の時にだけ呼ぶ、実際の再生位置（秒）を返す関数
+    """
+
+    def __init__(
+        self,
+        path: str,
+        duration: Optional[float] = None,
+        nominal_fps: float = 0.0,
+        callback: Optional[ProgressCallback] = None,
+        interval: float = DEFAULT_INTERVAL,
+        position: Optional[Callable[[], float]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.path = path
+        self.duration = duration if duration and duration > 0 else None
+        self.nominal_fps = nominal_fps if nominal_fps > 0 else 0.0
+        self.callback = callback
+        self.interval = interval
+        self._position = position
+        self._clock = clock
+        self.frames = 0
+        self._start = clock()
+        self._next = self._start + interval
+
+    def frame(self):
+        """1フレーム処理するごとに呼ぶ"""
+        self.frames += 1
+        if self.callback is not None and self._clock() >= self._next:
+            self._emit(False)
+
+    def finish(self) -> ProgressEvent:
+        """最後の通知（fraction は 1.0）"""
+        return self._emit(True)
+
+    def position(self) -> float:
+        if self._position is not None:
+            position = self._position()
+            if position > 0:
+                return position
+        if self.nominal_fps:
+            return self.frames / self.nominal_fps
+        return 0.0
+
+    def _emit(self, done: bool) -> ProgressEvent:
+        now = self._clock()
+        self._next = now + self.interval
+        position = self.position()
+        if done and position > 0:
+            self.duration = position
+        elif self.duration is not None and position > self.duration:
+            # 見積もりより長かった（メタデータが誤っている）ので長さは分からない
+            self.duration = None
+        event = ProgressEvent(
+            self.path, self.frames, position, self.duration, now - self._start, done
+        )
+        if self.callback is not None:
+            self.callback(event)
+        return event
+
+
+class ProgressAggregator:
+    """複数の動画の進捗をまとめて callback に渡す（スレッドセーフ）
+
+    各動画の ProgressTracker のコールバックにこのオブジェクトを渡す。
+    合計の fraction・eta は、長さが分かっている動画だけから求める
+    """
+
+    def __init__(
+        self,
+        callback: Optional[ProgressCallback] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.callback = callback
+        self._clock = clock
+        self._start = clock()
+        self._events: Dict[str, ProgressEvent] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event: ProgressEvent):
+        with self._lock:
+            self._events[event.path] = event
+            summary = self._summary()
+        if self.callback is not None:
+            self.callback(summary)
+
+    def summary(self) -> ProgressEvent:
+        with self._lock:
+            return self._summary()
+
+    def _summary(self) -> ProgressEvent:
+        events = list(self._events.values())
+        known = [e for e in events if e.duration]
+        done = bool(events) and all(e.done for e in events)
+        return ProgressEvent(
+            None,
+            sum(e.frames for e in events),
+            sum(e.position for e in known),
+            sum(e.duration for e in known) if known else None,
+            self._clock() - self._start,
+            done,
+        )
+
+
+def _format_seconds(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}:{seconds:02d}"
+
+
+def print_progress(event: ProgressEvent, stream=None):
+    """進捗を1行で表示する（コンソール用のコールバック）"""
+    stream = stream or sys.stderr
+    name = os.path.basename(event.path) if event.path else "total"
+    parts = [name]
+    if event.fraction is not None:
+        parts.append(f"{event.fraction * 100:5.1f}%")
+    else:
+        parts.append(_format_seconds(event.position))
+    parts.append(f"{event.fps:6.1f} fps")
+    if event.eta is not None and not event.done:
+        parts.append(f"ETA {_format_seconds(event.eta)}")
+    stream.write("\r" + "  ".join(parts) + ("\n" if event.done else ""))
+    stream.flush()
@@ -0,0 +1,396 @@
+"""長い動画のプレビューを区間に分けて並列に作成する
+
+動画を segment_seconds 秒ごとの区間に分け、区間ごとに別のプロセスで先頭まで
+シークしてエンコードする。区間の境界はフレーム番号で決める（[開始, 終了)）。
+シークはキーフレームに止まる形式（長い GOP の H.264 など）があるため、読んだフレームの
+タイムスタンプで位置を確かめ、合わなければ読み進める。これで区間をつなげると1回で
+作成した場合と同じフレームになる。行き過ぎた・確かめられない場合は先頭から数えて読むと
+区間ごとに読み直しが増える（全体で区間数の2乗）ため、作成前に最初の境界で1回だけ
+シークを試し、合わなければ区間に分けずに1回で作成する。
+
+- 作成済みの区間は <名前>.segments/index.json に記録し、再実行では足りない区間だけを作る
+  （元の動画のサイズ・更新時刻、区間の長さ・数、エンコーダーが変わった場合は作り直す）
+- 全区間がそろったら1つの動画につなげて区間を削除する（join）か、区間のまま
+  拡張 M3U のプレイリスト（<名前>.m3u）にする。OpenCV ではつなげる時に1プロセスで
+  エンコードし直すため、長い動画ではプレイリストの方が速い
+
+フレーム数が当てにならない形式（MTS など）は、progress.estimate_duration で見積もった
+長さから区間を決め、再生位置（CAP_PROP_POS_MSEC）でシークして、区間の始まりと終わりを
+タイムスタンプで判定する（見積もりがずれても最後の区間が末尾まで読む）。
+長さが分からない動画（フレーム数も fps も取れない）は1区間として作成する。
+"""
+
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Tuple
+
+from make_preview.progress import (
+    UNRELIABLE_FRAME_COUNT,
+    ProgressEvent,
+    estimate_duration,
+)
+
+DEFAULT_SEGMENT_SECONDS = 300
+PREVIEW_SIZE = (640, 480)
+INDEX_NAME = "index.json"
+# シークがこれより手前（秒）に止まった場合は、読み進めずにシークできないものとする
+MAX_SEEK_SKIP_SECONDS = 10
+
+
+class SeekError(RuntimeError):
+    """シークした位置をタイムスタンプで確かめられない"""
+
+
+class SegmentError(RuntimeError):
+    """作成できなかった区間がある（作成済みの区間は記録済みで、再実行で残りを作る）"""
+
+    def __init__(self, movie_path: str, failed: Dict[int, str]):
+        self.movie_path = movie_path
+        self.failed = failed
+        details = "; ".join(f"segment {i}: {failed[i]}" for i in sorted(failed))
+        super().__init__(f"{movie_path}: {len(failed)} segment(s) failed ({details})")
+
+
+def plan_segments(
+    frame_count: int, fps: float, segment_seconds: float
+) -> List[Tuple[int, Optional[int]]]:
+    """区間ごとの (最初のフレーム, 最後の次のフレーム) 。最後の区間の終わりは None（末尾まで）"""
+    if frame_count <= 0 or fps <= 0 or segment_seconds <= 0:
+        return [(0, None)]
+    step = max(1, round(segment_seconds * fps))
+    starts = list(range(0, frame_count, step))
+    return [
+        (start, starts[i + 1] if i + 1 < len(starts) else None)
+        for i, start in enumerate(starts)
+    ]
+
+
+def segments_dir(output_dir: str, movie_path: str) -> str:
+    return os.path.join(output_dir, os.path.basename(movie_path) + ".segments")
+
+
+def segment_name(index: int, movie_path: str) -> str:
+    return f"seg-{index:04d}{os.path.splitext(movie_path)[1]}"
+
+
+def _source_key(
+    movie_path: str, segment_seconds: float, encoder, segments: int = 1
+) -> Dict:
+    st = os.stat(movie_path)
+    return {
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "segment_seconds": segment_seconds,
+        "segments": segments,
+        "encoder": [encoder.backend, encoder.fourcc],
+    }
+
+
+def load_index(directory: str, key: Dict) -> Dict[int, Dict]:
+    """作成済みの区間（ファイルがあり、条件が同じもの）"""
+    try:
+        with open(os.path.join(directory, INDEX_NAME), encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if index.get("source") != key:
+        return {}
+    return {
+        int(i): entry
+        for i, entry in index.get("segments", {}).items()
+        if os.path.exists(os.path.join(directory, entry["file"]))
+    }
+
+
+def save_index(directory: str, key: Dict, segments: Dict[int, Dict]):
+    """チェックポイントを書く（途中で止まっても壊れないように置き換える）"""
+    path = os.path.join(directory, INDEX_NAME)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "source": key,
+                "segments": {str(i): segments[i] for i in sorted(segments)},
+            },
+            f,
+            indent=2,
+        )
+    os.replace(tmp, path)
+
+
+def _frame_index(cv2, capture, fps: float) -> Optional[int]:
+    """直前に読んだフレームの番号（タイムスタンプから求める。分からなければ None）"""
+    msec = capture.get(cv2.CAP_PROP_POS_MSEC)
+    if fps <= 0 or msec < 0:
+        return None
+    return round(msec * fps / 1000)
+
+
+def seek_frame(cv2, capture, first: int, fps: float, by_time: bool = False):
+    """first 番目のフレームを読む（続きは capture.read() で読める）
+
+    シーク後に読んだフレームのタイムスタンプを確かめ、手前に止まった場合は読み進める。
+    by_time ならフレーム番号ではなく再生位置（first / fps 秒）でシークする。
+
+    Returns:
+        (ret, frame)。末尾より後なら (False, None)
+
+    Raises:
+        SeekError: 行き過ぎた・タイムスタンプが無い・MAX_SEEK_SKIP_SECONDS より手前に止まった
+    """
+    if by_time:
+        capture.set(cv2.CAP_PROP_POS_MSEC, first * 1000 / fps)
+    else:
+        capture.set(cv2.CAP_PROP_POS_FRAMES, first)
+    ret, frame = capture.read()
+    index = _frame_index(cv2, capture, fps) if ret else None
+    skip = MAX_SEEK_SKIP_SECONDS * fps
+    while ret and index is not None and first - skip <= index < first:
+        ret, frame = capture.read()
+        index = _frame_index(cv2, capture, fps) if ret else None
+    if not ret:
+        return False, None
+    if index != first:
+        raise SeekError(f"Seek to frame {first} landed on {index}")
+    return ret, frame
+
+
+def can_seek(cv2, encoder, movie_path: str, first: int, by_time: bool) -> bool:
+    """first 番目のフレームへ正確にシークできるか（区間に分ける前に1回だけ試す）"""
+    capture = encoder.open_capture(cv2, movie_path)
+    try:
+        ret, _ = seek_frame(cv2, capture, first, capture.get(cv2.CAP_PROP_FPS), by_time)
+    except SeekError:
+        return False
+    finally:
+        capture.release()
+    # 見積もった長さが長すぎて境界が末尾より後なら、分けても意味がない
+    return ret
+
+
+def encode_segment(
+    movie_path: str,
+    output_path: str,
+    first: int,
+    end: Optional[int],
+    backend: str,
+    fourcc: str,
+    by_time: bool = False,
+) -> Dict:
+    """フレーム [first, end) をエンコードする（ワーカープロセスで実行）
+
+    by_time なら再生位置でシークし、タイムスタンプが end に達したフレームで止める。
+    first が末尾より後なら 0 フレームの区間になる
+    """
+    import cv2
+
+    from make_preview.encoders import Encoder
+    from make_preview.make_preview import reduction_image
+
+    encoder = Encoder(backend, fourcc)
+    capture = encoder.open_capture(cv2, movie_path)
+    if not capture.isOpened():
+        raise RuntimeError(f"Failed to open {movie_path}")
+    fps = capture.get(cv2.CAP_PROP_FPS)
+    try:
+        if first:
+            ret, frame = seek_frame(cv2, capture, first, fps, by_time)
+        else:
+            ret, frame = capture.read()
+    except SeekError:
+        capture.release()
+        raise
+
+    name, ext = os.path.splitext(output_path)
+    tmp = f"{name}.part{ext}"
+    writer = encoder.open_writer(cv2, tmp, fps, PREVIEW_SIZE)
+    if not writer.isOpened():
+        capture.release()
+        raise RuntimeError(f"Failed to open writer ({encoder}) for {tmp}")
+    frames = 0
+    try:
+        while ret:
+            writer.write(reduction_image(frame, *PREVIEW_SIZE))
+            frames += 1
+            if end is not None and not by_time and first + frames >= end:
+                break
+            ret, frame = capture.read()
+            if ret and end is not None and by_time:
+                index = _frame_index(cv2, capture, fps)
+                if (first + frames if index is None else index) >= end:
+                    break
+    finally:
+        capture.release()
+        writer.release()
+    os.replace(tmp, output_path)
+    return {
+        "file": os.path.basename(output_path),
+        "first": first,
+        "frames": frames,
+        "seconds": frames / fps if fps > 0 else 0.0,
+    }
+
+
+def join_segments(directory: str, segments: Dict[int, Dict], output_path: str, encoder):
+    """区間を順に読み、1つの動画に書き出す
+
+    OpenCV では映像をそのままつなげられないため、1プロセスでエンコードし直す
+    （プレビューの大きさなので読み直しは軽いが、長い動画では --playlist の方が速い）
+    """
+    import cv2
+
+    name, ext = os.path.splitext(output_path)
+    tmp = f"{name}.part{ext}"
+    writer = None
+    try:
+        for i in sorted(segments):
+            if not segments[i]["frames"]:
+                continue
+            capture = encoder.open_capture(
+                cv2, os.path.join(directory, segments[i]["file"])
+            )
+            if writer is None:
+                fps = capture.get(cv2.CAP_PROP_FPS)
+                writer = encoder.open_writer(cv2, tmp, fps, PREVIEW_SIZE)
+                if not writer.isOpened():
+                    raise RuntimeError(f"Failed to open writer ({encoder}) for {tmp}")
+            while True:
+                ret, frame = capture.read()
+                if not ret:
+                    break
+                writer.write(frame)
+            capture.release()
+    finally:
+        if writer is not None:
+            writer.release()
+    os.replace(tmp, output_path)
+
+
+def write_playlist(directory: str, segments: Dict[int, Dict], playlist_path: str):
+    """区間を順に再生する拡張 M3U のプレイリストを書く（パスは相対）"""
+    relative = os.path.relpath(directory, os.path.dirname(playlist_path) or ".")
+    lines = ["#EXTM3U"]
+    for i in sorted(segments):
+        entry = segments[i]
+        if not entry["frames"]:
+            continue
+        lines.append(f"#EXTINF:{entry['seconds']:.3f},{entry['file']}")
+        lines.append(f"{relative}/{entry['file']}")
+    with open(playlist_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def make_segmented_preview(
+    movie_path: str,
+    output_dir: str = "preview",
+    segment_seconds: float = DEFAULT_SEGMENT_SECONDS,
+    workers: Optional[int] = None,
+    join: bool = True,
+    encoder=None,
+    progress: Optional[Callable[[ProgressEvent], None]] = None,
+) -> Dict:
+    """区間ごとに並列でプレビューを作る
+
+    Raises:
+        SegmentError: 作成できなかった区間がある（つなげず、プレイリストも書かない）
+
+    Returns:
+        segments（区間数）・encoded（今回作成）・reused（チェックポイントから再利用）・
+        output（つなげた動画またはプレイリストのパス）
+    """
+    import cv2
+
+    from make_preview.encoders import container_of, get_encoder
+
+    encoder = encoder or get_encoder(cv2, container_of(movie_path))
+    joined = os.path.join(output_dir, os.path.basename(movie_path))
+    if join and os.path.exists(joined):
+        return {"segments": 0, "encoded": 0, "reused": 0, "output": joined}
+    capture = encoder.open_capture(cv2, movie_path)
+    if not capture.isOpened():
+        raise RuntimeError(f"Failed to open {movie_path}")
+    fps = capture.get(cv2.CAP_PROP_FPS)
+    by_time = os.path.splitext(movie_path)[1].lower() in UNRELIABLE_FRAME_COUNT
+    if by_time:
+        # フレーム数の代わりに見積もった長さから区間（再生位置の範囲）を決める
+        duration = estimate_duration(cv2, capture, movie_path)
+        frame_count = int(duration * fps) if duration and fps > 0 else 0
+    else:
+        frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        duration = frame_count / fps if frame_count > 0 and fps > 0 else None
+    capture.release()
+
+    plan = plan_segments(frame_count, fps, segment_seconds)
+    if len(plan) > 1 and not can_seek(cv2, encoder, movie_path, plan[1][0], by_time):
+        # 区間ごとに先頭から読み直すより、1回で作る方が速い
+        plan = [(0, None)]
+    directory = segments_dir(output_dir, movie_path)
+    os.makedirs(directory, exist_ok=True)
+    key = _source_key(movie_path, segment_seconds, encoder, len(plan))
+    done = {i: e for i, e in load_index(directory, key).items() if i < len(plan)}
+    reused = len(done)
+
+    start = time.monotonic()
+
+    def report(finished: bool):
+        if progress is not None:
+            progress(
+                ProgressEvent(
+                    movie_path,
+                    sum(e["frames"] for e in done.values()),
+                    sum(e["seconds"] for e in done.values()),
+                    duration,
+                    time.monotonic() - start,
+                    finished,
+                )
+            )
+
+    missing = [i for i in range(len(plan)) if i not in done]
+    if missing:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(
+                    encode_segment,
+                    movie_path,
+                    os.path.join(directory, segment_name(i, movie_path)),
+                    plan[i][0],
+                    plan[i][1],
+                    encoder.backend,
+                    encoder.fourcc,
+                    by_time,
+                ): i
+                for i in missing
+            }
+            failed = {}
+            for future in as_completed(futures):
+                try:
+                    done[futures[future]] = future.result()
+                except Exception as e:
+                    # 他の区間は続ける（できた区間は記録し、再実行で残りだけを作る）
+                    failed[futures[future]] = f"{type(e).__name__}: {e}"
+                    continue
+                save_index(directory, key, done)
+                report(False)
+        if failed:
+            raise SegmentError(movie_path, failed)
+    else:
+        save_index(directory, key, done)
+
+    if join:
+        output = joined
+        join_segments(directory, done, output, encoder)
+        # つなげた動画ができたら区間は不要（次回は出力があるので何もしない）
+        shutil.rmtree(directory)
+    else:
+        output = os.path.join(output_dir, os.path.basename(movie_path) + ".m3u")
+        write_playlist(directory, done, output)
+    report(True)
+    return {
+        "segments": len(plan),
+        "encoded": len(missing),
+        "reused": reused,
+        "output": output,
+    }
@@ -0,0 +1,362 @@
+"""静止画（ARW・JPG など）のプレビュー画像の作成
+
+- RAW（ARW・DNG など TIFF 形式）は IFD を解析して埋め込みの JPEG プレビューの
+  位置を調べ、その範囲だけを読む（RAW データ本体はデコードしない）
+- JPEG は先頭のマーカーから大きさを調べ、OpenCV の縮小デコード
+  （IMREAD_REDUCED_COLOR_2/4/8）で必要な大きさに近い解像度で読み込む
+- 作成したプレビューは内容アドレスのキャッシュ（cache_dir/ab/abcdef....jpg）に置き、
+  出力フォルダへはハードリンク（できなければコピー）する。キーは元ファイルの
+  サイズ・更新時刻（mtime）または内容のハッシュ（content）
+- 複数ファイルはプロセスプールで並列に処理する
+
+HIF（HEIF）は OpenCV で読めないため対象外（unsupported）として数える。
+
+    PYTHONPATH=$(pwd) python make_preview/still_preview.py /archive/2024/05月/2024-05-01/ARW --output-dir preview
+"""
+
+import hashlib
+import os
+import struct
+import tempfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, Optional, Tuple
+
+import click
+
+from common.jobs import job_options
+from common.transfer import link_or_copy
+
+# 埋め込みの JPEG を取り出す TIFF 形式の RAW
+TIFF_RAW_EXTENSIONS = {".arw", ".srf", ".sr2", ".dng", ".nef", ".cr2", ".tif", ".tiff"}
+JPEG_EXTENSIONS = {".jpg", ".jpeg"}
+STILL_EXTENSIONS = TIFF_RAW_EXTENSIONS | JPEG_EXTENSIONS | {".hif", ".heic"}
+
+DEFAULT_MAX_SIZE = 640
+DEFAULT_QUALITY = 80
+CACHE_KEYS = ("mtime", "content")
+
+# TIFF タグ
+_TAG_COMPRESSION = 0x0103
+_TAG_STRIP_OFFSETS = 0x0111
+_TAG_STRIP_BYTE_COUNTS = 0x0117
+_TAG_SUB_IFDS = 0x014A
+_TAG_JPEG_OFFSET = 0x0201
+_TAG_JPEG_LENGTH = 0x0202
+_TAG_EXIF_IFD = 0x8769
+# 型ごとの1要素のバイト数（BYTE, ASCII, SHORT, LONG, RATIONAL, ... , IFD）
+_TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 6: 1, 7: 1, 8: 2, 9: 4, 10: 8, 13: 4}
+_MAX_IFDS = 64
+
+# 大きさを持つ JPEG のマーカー（SOF0〜SOF15。DHT・JPG・DAC を除く）
+_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def default_cache_dir() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "my-data-backup", "thumbnails")
+
+
+def _read_at(f, offset: int, size: int) -> bytes:
+    f.seek(offset)
+    return f.read(size)
+
+
+def find_embedded_jpeg(path: str) -> Optional[Tuple[int, int]]:
+    """TIFF 形式の RAW に埋め込まれた最も大きい JPEG の (位置, 長さ)
+
+    IFD0 から続く IFD・SubIFD・EXIF IFD をたどり、JPEGInterchangeFormat
+    （0x0201/0x0202）と、JPEG 圧縮の1ストリップの画像を候補にする。
+    読むのはヘッダーと IFD だけ。TIFF でなければ None
+    """
+    with open(path, "rb") as f:
+        header = f.read(8)
+        if len(header) < 8 or header[:2] not in (b"II", b"MM"):
+            return None
+        order = "<" if header[:2] == b"II" else ">"
+        if struct.unpack(order + "H", header[2:4])[0] != 42:
+            return None
+        file_size = os.fstat(f.fileno()).st_size
+
+        candidates = []
+        pending = [struct.unpack(order + "I", header[4:8])[0]]
+        visited = set()
+        while pending and len(visited) < _MAX_IFDS:
+            offset = pending.pop()
+            if offset in visited or not 8 <= offset < file_size:
+                continue
+            visited.add(offset)
+            data = _read_at(f, offset, 2)
+            if len(data) < 2:
+                continue
+            count = struct.unpack(order + "H", data)[0]
+            data = _read_at(f, offset + 2, count * 12 + 4)
+            if len(data) < count * 12 + 4:
+                continue
+            tags = {}
+            for i in range(count):
+                tag, type_, n, value = struct.unpack(
+                    order + "HHI4s", data[i * 12 : i * 12 + 12]
+                )
+                tags[tag] = (type_, n, value)
+            next_ifd = struct.unpack(order + "I", data[-4:])[0]
+            if next_ifd:
+                pending.append(next_ifd)
+            for tag in (_TAG_SUB_IFDS, _TAG_EXIF_IFD):
+                if tag in tags:
+                    pending.extend(_values(f, order, *tags[tag]))
+
+            if _TAG_JPEG_OFFSET in tags and _TAG_JPEG_LENGTH in tags:
+                start = _values(f, order, *tags[_TAG_JPEG_OFFSET])[0]
+                length = _values(f, order, *tags[_TAG_JPEG_LENGTH])[0]
+                candidates.append((start, length))
+            compression = tags.get(_TAG_COMPRESSION)
+            if (
+                compression
+                and _values(f, order, *compression)[0] in (6, 7)
+                and tags.get(_TAG_STRIP_OFFSETS, (0, 0))[1] == 1
+                and _TAG_STRIP_BYTE_COUNTS in tags
+            ):
+                start = _values(f, order, *tags[_TAG_STRIP_OFFSETS])[0]
+                length = _values(f, order, *tags[_TAG_STRIP_BYTE_COUNTS])[0]
+                candidates.append((start, length))
+
+        candidates = [
+            (start, length)
+            for start, length in candidates
+            if length > 2 and start + length <= file_size
+        ]
+        for start, length in sorted(candidates, key=lambda c: -c[1]):
+            if _read_at(f, start, 2) == b"\xff\xd8":
+                return start, length
+    return None
+
+
+def _values(f, order: str, type_: int, count: int, raw: bytes) -> List[int]:
+    """IFD エントリの整数値（4バイトに収まらない場合は指す位置から読む）"""
+    size = _TYPE_SIZES.get(type_, 1) * count
+    fmt = {3: "H", 4: "I", 13: "I", 1: "B", 7: "B"}.get(type_)
+    if fmt is None:
+        return [0]
+    data = (
+        raw[:size]
+        if size <= 4
+        else _read_at(f, struct.unpack(order + "I", raw)[0], size)
+    )
+    if len(data) < size:
+        return [0]
+    return list(struct.unpack(f"{order}{count}{fmt}", data))
+
+
+def jpeg_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """JPEG の (幅, 高さ) を SOF マーカーから調べる（見つからなければ None）"""
+    if data[:2] != b"\xff\xd8":
+        return None
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            pos += 1
+            continue
+        if marker in (0x01,) or 0xD0 <= marker <= 0xD9:
+            pos += 2
+            continue
+        length = struct.unpack(">H", data[pos + 2 : pos + 4])[0]
+        if marker in _SOF_MARKERS:
+            if pos + 9 > len(data):
+                return None
+            height, width = struct.unpack(">HH", data[pos + 5 : pos + 9])
+            return width, height
+        pos += 2 + length
+    return None
+
+
+def reduced_decode_flag(cv2, source_size: Optional[Tuple[int, int]], max_size: int):
+    """元の大きさから、max_size 以上を保てる最も小さい縮小デコードのフラグを選ぶ"""
+    if source_size:
+        longest = max(source_size)
+        for factor, flag in (
+            (8, cv2.IMREAD_REDUCED_COLOR_8),
+            (4, cv2.IMREAD_REDUCED_COLOR_4),
+            (2, cv2.IMREAD_REDUCED_COLOR_2),
+        ):
+            if longest // factor >= max_size:
+                return flag
+    return cv2.IMREAD_COLOR
+
+
+def read_jpeg_bytes(path: str) -> Optional[bytes]:
+    """プレビューの元になる JPEG のデータ（RAW は埋め込みの JPEG の範囲だけを読む）"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in JPEG_EXTENSIONS:
+        with open(path, "rb") as f:
+            return f.read()
+    if ext in TIFF_RAW_EXTENSIONS:
+        found = find_embedded_jpeg(path)
+        if found is None:
+            return None
+        with open(path, "rb") as f:
+            return _read_at(f, *found)
+    return None
+
+
+def cache_key(path: str, key: str = "mtime", max_size: int = DEFAULT_MAX_SIZE) -> str:
+    """キャッシュのキー（mtime: サイズ・更新時刻・ファイル名、content: 内容の SHA-256）"""
+    digest = hashlib.sha256(f"{max_size}:{DEFAULT_QUALITY}:".encode())
+    if key == "content":
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+    else:
+        st = os.stat(path)
+        digest.update(
+            f"{os.path.basename(path)}:{st.st_size}:{st.st_mtime_ns}".encode()
+        )
+    return digest.hexdigest()
+
+
+def cache_path(cache_dir: str, digest: str) -> str:
+    return os.path.join(cache_dir, digest[:2], f"{digest}.jpg")
+
+
+def render_thumbnail(data: bytes, max_size: int = DEFAULT_MAX_SIZE) -> bytes:
+    """JPEG データを縮小デコードし、長辺 max_size の JPEG にする"""
+    import cv2
+    import numpy as np
+
+    flag = reduced_decode_flag(cv2, jpeg_size(data), max_size)
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flag)
+    if image is None:
+        raise ValueError("Failed to decode JPEG data")
+    height, width = image.shape[:2]
+    scale = max_size / max(width, height)
+    if scale < 1:
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+    ok, encoded = cv2.imencode(
+        ".jpg", image, [int(cv2.IMWRITE_JPEG_QUALITY), DEFAULT_QUALITY]
+    )
+    if not ok:
+        raise ValueError("Failed to encode thumbnail")
+    return encoded.tobytes()
+
+
+def make_cached_thumbnail(
+    path: str, cache_dir: str, max_size: int = DEFAULT_MAX_SIZE, key: str = "mtime"
+) -> Tuple[str, Optional[str]]:
+    """1ファイルのプレビューをキャッシュに作る（プロセスプールの各ワーカーで実行）
+
+    Returns:
+        (結果, キャッシュのパス)。結果は cached / created / unsupported / error:<内容>
+    """
+    try:
+        target = cache_path(cache_dir, cache_key(path, key, max_size))
+        if os.path.exists(target):
+            return "cached", target
+        data = read_jpeg_bytes(path)
+        if data is None:
+            return "unsupported", None
+        thumbnail = render_thumbnail(data, max_size)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(thumbnail)
+        os.replace(tmp, target)
+        return "created", target
+    except Exception as e:
+        return f"error:{e}", None
+
+
+def make_still_previews(
+    paths: Iterable[str],
+    output_dir: str = "preview",
+    cache_dir: Optional[str] = None,
+    max_size: int = DEFAULT_MAX_SIZE,
+    workers: Optional[int] = None,
+    key: str = "mtime",
+) -> Counter:
+    """静止画のプレビューを output_dir に <元のファイル名>.jpg として作る
+
+    Returns:
+        結果ごとの件数（cached・created・unsupported・errors）
+    """
+    cache_dir = cache_dir or default_cache_dir()
+    paths = [p for p in paths if os.path.splitext(p)[1].lower() in STILL_EXTENSIONS]
+    stats = Counter()
+    if not paths:
+        return stats
+    os.makedirs(output_dir, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(
+            make_cached_thumbnail,
+            paths,
+            [cache_dir] * len(paths),
+            [max_size] * len(paths),
+            [key] * len(paths),
+            chunksize=max(1, len(paths) // ((workers or os.cpu_count() or 1) * 4)),
+        )
+        for path, (status, thumbnail) in zip(paths, results):
+            if status.startswith("error:"):
+                stats["errors"] += 1
+                click.echo(f"Failed: {path}: {status[6:]}", err=True)
+                continue
+            stats[status] += 1
+            if thumbnail is None:
+                continue
+            dest = os.path.join(output_dir, os.path.basename(path) + ".jpg")
+            if os.path.exists(dest):
+                os.unlink(dest)
+            link_or_copy(thumbnail, dest, "hardlink")
+    return stats
+
+
+def _collect(sources) -> List[str]:
+    paths = []
+    for source in sources:
+        if os.path.isdir(source):
+            with os.scandir(source) as entries:
+                paths.extend(e.path for e in entries if e.is_file())
+        else:
+            paths.append(source)
+    return sorted(paths)
+
+
+@click.command()
+@job_options("still_preview")
+@click.argument("sources", nargs=-1, required=True, type=click.Path(exists=True))
+@click.option("--output-dir", default="preview", show_default=True)
+@click.option(
+    "--cache-dir",
+    default=None,
+    help="Thumbnail cache (default: $XDG_CACHE_HOME/my-data-backup/thumbnails)",
+)
+@click.option(
+    "--max-size",
+    type=click.IntRange(min=1),
+    default=DEFAULT_MAX_SIZE,
+    show_default=True,
+    help="Longest side of the thumbnails in pixels",
+)
+@click.option("--workers", type=click.IntRange(min=1), default=None)
+@click.option(
+    "--key",
+    type=click.Choice(CACHE_KEYS),
+    default="mtime",
+    show_default=True,
+    help="Cache key: file size and mtime (fast) or a hash of the contents",
+)
+def main(sources, output_dir, cache_dir, max_size, workers, key):
+    """SOURCES（ファイルまたはフォルダ）の静止画のプレビューを作る"""
+    stats = make_still_previews(
+        _collect(sources), output_dir, cache_dir, max_size, workers, key
+    )
+    click.echo(
+        f"Previews: {stats['created']} created, {stats['cached']} from cache, "
+        f"{stats['unsupported']} unsupported, {stats['errors']} failed"
+    )
+
+
+if __name__ == "__main__":
+    main()
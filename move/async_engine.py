@@ -0,0 +1,187 @@
+"""asyncio による並列移動エンジン（--concurrency）
+
+ネットワーク共有のように1回のシステムコールの往復が長い環境では、move_files の
+「stat → mkdir → 存在確認 → rename」を1ファイルずつ順に待つと、ほとんどの時間が
+待ち時間になる。このエンジンはスレッドプールで最大 concurrency 個の操作を同時に
+実行し、ファイルごとの段階（stat・mkdir・移動）を複数のファイルで重ねて処理する。
+
+- 背圧: 走査結果は上限付きのキューに入れ、処理が追いつくまで走査を止める
+- 同じ移動先フォルダの作成は1回だけ行い、他のファイルはその完了を待つ
+- Ctrl-C: 新しいファイルの処理を止め、実行中の移動（コピー＋削除を含む）が
+  完了するのを待ってから戻る。途中まで移動したファイルは残らない
+- 結果は move_files と同じ (成功数, 失敗数)
+"""
+
+import asyncio
+import os
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from common.dircache import ensure_dir
+from common.extensions import for_suffixes
+from common.logger import UnifiedLogger
+from move.main import COLORS, FileMover, color_print
+
+DEFAULT_CONCURRENCY = 32
+
+
+class AsyncMover:
+    """インポートフォルダのファイルを並列に日付・拡張子フォルダへ移動する"""
+
+    def __init__(
+        self,
+        import_dir: str = ".",
+        export_dir: str = ".",
+        dry_run: bool = False,
+        logger: Optional[UnifiedLogger] = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+    ):
+        self.import_dir = import_dir
+        self.export_dir = export_dir
+        self.dry_run = dry_run
+        self.logger = logger
+        self.concurrency = concurrency
+        # Ctrl-C（interrupt()）で処理を打ち切ったか
+        self.interrupted = False
+        self._stop = threading.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._dirs: Dict[Path, asyncio.Future] = {}
+
+    def run(self, suffixes: Iterable[str]) -> Tuple[int, int]:
+        """拡張子が suffixes（大文字小文字は区別しない）のファイルを移動する
+
+        Returns:
+            (成功数, 失敗数)。打ち切った場合、未処理のファイルはどちらにも数えない
+        """
+        return asyncio.run(self._run(for_suffixes(suffixes)))
+
+    def interrupt(self):
+        """新しいファイルの処理を止める（実行中の移動は完了させる）"""
+        if not self.interrupted:
+            self.interrupted = True
+            color_print(
+                "Interrupted: finishing in-flight moves, no new files will be started",
+                COLORS["yellow"],
+            )
+        self._stop.set()
+
+    async def _run(self, suffixes) -> Tuple[int, int]:
+        self._loop = asyncio.get_running_loop()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="move"
+        )
+        self._dirs = {}
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        results = [0, 0]
+        handles_sigint = self._handle_sigint(True)
+        try:
+            workers = [
+                asyncio.create_task(self._worker(queue, results))
+                for _ in range(self.concurrency)
+            ]
+            try:
+                await asyncio.to_thread(self._scan, queue, suffixes)
+            except FileNotFoundError as e:
+                color_print(f"Directory error: {e}", COLORS["red"])
+                if self.logger:
+                    self.logger.error(f"Directory error: {e}")
+                results[1] += 1
+            finally:
+                for _ in workers:
+                    await queue.put(None)
+                await asyncio.gather(*workers)
+        finally:
+            if handles_sigint:
+                self._handle_sigint(False)
+            # 実行中の操作が全て終わるまで待つ
+            self._executor.shutdown(wait=True)
+        return results[0], results[1]
+
+    def _handle_sigint(self, install: bool) -> bool:
+        """Ctrl-C で interrupt() を呼ぶ（Windows・メインスレッド以外では何もしない）"""
+        try:
+            if install:
+                self._loop.add_signal_handler(signal.SIGINT, self.interrupt)
+            else:
+                self._loop.remove_signal_handler(signal.SIGINT)
+        except (NotImplementedError, RuntimeError, ValueError):
+            return False
+        return True
+
+    def _scan(self, queue: asyncio.Queue, suffixes):
+        """対象ファイルをキューに入れる（キューが一杯の間は待つ）"""
+        if not os.path.isdir(self.import_dir):
+            raise FileNotFoundError(f"Import directory not found: {self.import_dir}")
+        with os.scandir(self.import_dir) as entries:
+            for entry in entries:
+                if self._stop.is_set():
+                    return
+                if suffixes.category(entry.name) is None:
+                    continue
+                if not entry.is_file():
+                    continue
+                asyncio.run_coroutine_threadsafe(
+                    queue.put(entry.path), self._loop
+                ).result()
+
+    async def _call(self, func, *args):
+        return await self._loop.run_in_executor(self._executor, func, *args)
+
+    async def _worker(self, queue: asyncio.Queue, results: list):
+        while True:
+            path = await queue.get()
+            if path is None:
+                return
+            if self._stop.is_set():
+                continue
+            if await self._move_one(path):
+                results[0] += 1
+            else:
+                results[1] += 1
+
+    async def _ensure_dir(self, directory: Path):
+        """移動先フォルダを作成する（同じフォルダは最初の1ファイルだけが作成する）"""
+        future = self._dirs.get(directory)
+        if future is None:
+            future = asyncio.ensure_future(self._call(ensure_dir, directory))
+            self._dirs[directory] = future
+        try:
+            await future
+        except Exception:
+            # 失敗した作成は残さない（次のファイルで作り直す）
+            if self._dirs.get(directory) is future:
+                del self._dirs[directory]
+            raise
+
+    async def _move_one(self, path: str) -> bool:
+        try:
+            mover = FileMover(path, await self._call(os.stat, path))
+            if not self.dry_run:
+                await self._ensure_dir(mover._get_export_dir(self.export_dir))
+            return await self._call(
+                mover.move, self.export_dir, self.dry_run, self.logger
+            )
+        except Exception as e:
+            name = os.path.basename(path)
+            color_print(f"Error processing {name}: {e}", COLORS["red"])
+            if self.logger:
+                self.logger.error(f"Error processing {name}: {e}")
+            return False
+
+
+def move_files_async(
+    suffixes: Iterable[str],
+    import_dir: str = ".",
+    export_dir: str = ".",
+    dry_run: bool = False,
+    logger: Optional[UnifiedLogger] = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> tuple:
+    """move_files の並列版（複数の拡張子を1回の走査で処理する）"""
+    return AsyncMover(import_dir, export_dir, dry_run, logger, concurrency).run(
+        suffixes
+    )
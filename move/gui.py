@@ -13,6 +13,8 @@ import sys
 import os
 from pathlib import Path
 
+from common.jobs import default_jobs_file, job_names, read_jobs, resolve_job
+
 # CustomTkinter の外観設定
 ctk.set_appearance_mode("auto")  # "dark", "light", "auto"
 ctk.set_default_color_theme("blue")  # "blue", "green", "dark-blue"
@@ -39,6 +41,8 @@ class ModernFileOrganizerGUI:
         self.log_path = ctk.StringVar()
         self.dry_run_var = ctk.BooleanVar(value=True)  # デフォルトでオン
         self.verbose_var = ctk.BooleanVar()
+        self.jobs_file = ctk.StringVar(value=default_jobs_file())
+        self.job_name = ctk.StringVar(value="")
 
         # インポートディレクトリが変更された時にエクスポートディレクトリも更新
         self.import_dir.trace_add("write", self.on_import_dir_changed)
@@ -57,6 +61,9 @@ class ModernFileOrganizerGUI:
         )
         title_label.pack(pady=(0, 20))
 
+        # ジョブセクション
+        self.create_job_section(main_frame)
+
         # ディレクトリ選択セクション
         self.create_directory_section(main_frame)
 
@@ -81,6 +88,93 @@ class ModernFileOrganizerGUI:
         # 拡張子情報セクション
         self.create_extension_info_section(main_frame)
 
+    def create_job_section(self, parent):
+        """ジョブ（ジョブファイルに名前を付けて書いた実行設定）セクション"""
+        job_frame = ctk.CTkFrame(parent)
+        job_frame.pack(fill="x", pady=(0, 15))
+
+        ctk.CTkLabel(
+            job_frame,
+            text="🗂️ ジョブ（任意）",
+            font=ctk.CTkFont(size=16, weight="bold"),
+        ).pack(anchor="w", padx=20, pady=(15, 10))
+
+        file_frame = ctk.CTkFrame(job_frame)
+        file_frame.pack(fill="x", padx=20, pady=(0, 10))
+
+        ctk.CTkLabel(file_frame, text="ジョブファイル:", width=100).pack(
+            side="left", padx=(10, 10), pady=10
+        )
+        ctk.CTkEntry(file_frame, textvariable=self.jobs_file).pack(
+            side="left", fill="x", expand=True, padx=(0, 10), pady=10
+        )
+        ctk.CTkButton(
+            file_frame, text="参照...", command=self.choose_jobs_file, width=80
+        ).pack(side="right", padx=(0, 10), pady=10)
+
+        select_frame = ctk.CTkFrame(job_frame)
+        select_frame.pack(fill="x", padx=20, pady=(0, 15))
+
+        ctk.CTkLabel(select_frame, text="ジョブ:", width=100).pack(
+            side="left", padx=(10, 10), pady=10
+        )
+        self.job_menu = ctk.CTkOptionMenu(
+            select_frame, variable=self.job_name, values=[""], command=self.apply_job
+        )
+        self.job_menu.pack(side="left", fill="x", expand=True, padx=(0, 10), pady=10)
+        ctk.CTkButton(
+            select_frame, text="再読み込み", command=self.reload_jobs, width=80
+        ).pack(side="right", padx=(0, 10), pady=10)
+        self.reload_jobs()
+
+    def choose_jobs_file(self):
+        """ジョブファイルを選択"""
+        path = filedialog.askopenfilename(
+            title="ジョブファイルを選択",
+            filetypes=[("Job files", "*.toml *.json"), ("All files", "*.*")],
+        )
+        if path:
+            self.jobs_file.set(path)
+            self.reload_jobs()
+
+    def reload_jobs(self):
+        """ジョブファイルからジョブの一覧を読み込む"""
+        path = self.jobs_file.get().strip()
+        names = []
+        if path and os.path.exists(path):
+            try:
+                names = job_names(path)
+            except (OSError, ValueError) as e:
+                messagebox.showerror("エラー", f"ジョブファイルを読み込めません:\n{e}")
+        self.job_menu.configure(values=[""] + names)
+        if self.job_name.get() not in names:
+            self.job_name.set("")
+
+    def apply_job(self, name):
+        """選んだジョブの値を画面に反映する
+
+        画面に無い項目（--concurrency・--verify など）は実行時に --job で CLI に渡す。
+        """
+        if not name:
+            return
+        try:
+            values = resolve_job(read_jobs(self.jobs_file.get()), name, "move")
+        except (OSError, ValueError) as e:
+            messagebox.showerror("エラー", f"ジョブを読み込めません:\n{e}")
+            return
+        # エクスポート先はインポート元の変更で書き換わるため後で設定する
+        for key, var in (
+            ("import_dir", self.import_dir),
+            ("export_dir", self.export_dir),
+            ("suffix", self.suffix),
+            ("log_file", self.log_path),
+            ("dry_run", self.dry_run_var),
+            ("verbose", self.verbose_var),
+        ):
+            if key in values:
+                var.set(values[key])
+        self.add_log(f"🗂️ ジョブを読み込みました: {name}")
+
     def create_directory_section(self, parent):
         """ディレクトリ選択セクション"""
         dir_frame = ctk.CTkFrame(parent)
@@ -404,6 +498,7 @@ class ModernFileOrganizerGUI:
 📁 インポート元: {self.import_dir.get()}
 📁 エクスポート先: {self.export_dir.get()}
 📄 拡張子: {suffix_text}
+🗂️ ジョブ: {self.job_name.get() or "なし"}
 📝 実行モード: {mode}
 🔍 詳細出力: {"有効" if self.verbose_var.get() else "無効"}"""
 
@@ -427,6 +522,9 @@ class ModernFileOrganizerGUI:
             command = [sys.executable, "main.py"]
             command.extend(["--import-dir", self.import_dir.get()])
             command.extend(["--export-dir", self.export_dir.get()])
+            if self.job_name.get():
+                command.extend(["--jobs-file", self.jobs_file.get()])
+                command.extend(["--job", self.job_name.get()])
 
             if self.suffix.get().strip():
                 command.extend(["--suffix", self.suffix.get().strip()])
@@ -0,0 +1,140 @@
+"""整理先フォルダのレイアウトテンプレート（--layout）
+
+"{year}/{month:02}月/{date}/{ext}" のようなテンプレートを一度だけ解析・検証して
+Layout にコンパイルする。移動先フォルダ（Path）は (基準フォルダ, 日付, 拡張子)
+ごとに記憶するため、同じ日・同じ拡張子の2件目以降は辞書の参照だけで返る。
+--verify のマニフェストは日付のフォルダ（{date} または {day} を含む最後の階層）に置く。
+
+使えるフィールド（書式指定可: {month:02}）:
+- year, month, day: 更新日時の年・月・日
+- date: YYYY-MM-DD
+- ext: 拡張子（元の大文字小文字のまま）、ext_upper / ext_lower: 大文字・小文字に揃えた拡張子
+- それ以外の名前: variables（--layout-var NAME=VALUE）で与える定数（イベント名など）
+"""
+
+import os
+import re
+import string
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+# 名前で指定できるレイアウト
+LAYOUTS = {
+    "default": "{year}/{month:02}月/{date}/{ext}",
+    "date": "{date}/{ext}",
+    "date-only": "{date}",
+    "month": "{year}/{year}-{month:02}/{ext_upper}",
+    "event": "{year}/{event}/{date}/{ext}",
+}
+DEFAULT_LAYOUT = LAYOUTS["default"]
+
+# ファイルごとに決まるフィールド
+FILE_FIELDS = ("year", "month", "day", "date", "ext", "ext_upper", "ext_lower")
+
+# 1日ごとのフォルダを作るフィールド（マニフェストを置く階層）
+DATE_FIELDS = frozenset({"date", "day"})
+
+
+class Layout:
+    """コンパイル済みのレイアウト"""
+
+    def __init__(self, template: str, variables: Optional[Dict[str, str]] = None):
+        template = LAYOUTS.get(template, template)
+        variables = dict(variables or {})
+        self.template = template
+        self.variables = variables
+        self._format = _compile(template, variables)
+        self._cache: Dict[tuple, Path] = {}
+        self.manifest_depth = _manifest_depth(template)
+
+    def directory(self, base_dir, when: datetime, ext: str) -> Path:
+        """when（更新日時）・ext（拡張子、. なし）のファイルの移動先フォルダ"""
+        key = (base_dir, when.year, when.month, when.day, ext)
+        path = self._cache.get(key)
+        if path is None:
+            relative = self._format(
+                year=when.year,
+                month=when.month,
+                day=when.day,
+                date=f"{when.year:04d}-{when.month:02d}-{when.day:02d}",
+                ext=ext,
+                ext_upper=ext.upper(),
+                ext_lower=ext.lower(),
+            )
+            path = self._cache[key] = Path(base_dir, relative)
+        return path
+
+
+def _compile(template: str, variables: Dict[str, str]):
+    """テンプレートを検証し、定数を埋め込んだ書式文字列の format 関数を返す"""
+    parts = []
+    try:
+        parsed = list(string.Formatter().parse(template))
+    except ValueError as e:
+        raise ValueError(f"Invalid layout {template!r}: {e}")
+    for literal, field, spec, conversion in parsed:
+        parts.append(literal.replace("{", "{{").replace("}", "}}"))
+        if field is None:
+            continue
+        if conversion or "{" in (spec or ""):
+            raise ValueError(f"Unsupported field in layout: {{{field}}}")
+        if field in FILE_FIELDS:
+            parts.append(f"{{{field}:{spec}}}" if spec else f"{{{field}}}")
+        elif field in variables:
+            value = format(variables[field], spec or "")
+            parts.append(value.replace("{", "{{").replace("}", "}}"))
+        else:
+            raise ValueError(
+                f"Unknown field {{{field}}} in layout (available: "
+                f"{', '.join(FILE_FIELDS)}, or define it with --layout-var)"
+            )
+    fmt = "".join(parts)
+    # 書式指定の誤り（{year:zz} など）と、基準フォルダの外を指すレイアウトを検出する
+    sample = dict(zip(FILE_FIELDS, (2024, 1, 2, "2024-01-02", "JPG", "JPG", "jpg")))
+    try:
+        relative = fmt.format(**sample)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid layout {template!r}: {e}")
+    if os.path.isabs(relative) or ".." in Path(relative).parts:
+        raise ValueError(f"Layout must stay inside the export directory: {template}")
+    return fmt.format
+
+
+def _manifest_depth(template: str) -> int:
+    """日付のフォルダの下にある階層の数（日付のフォルダが無ければ 0: ファイルのフォルダ）
+
+    default（{year}/{month:02}月/{date}/{ext}）は 1、date-only（{date}）は 0
+    """
+    components = re.split(r"[\\/]", template)
+    for depth, component in enumerate(reversed(components)):
+        fields = {field for _, field, _, _ in string.Formatter().parse(component)}
+        if fields & DATE_FIELDS:
+            return depth
+    return 0
+
+
+_layout: Optional[Layout] = None
+
+
+def set_layout(layout: Optional[Layout]):
+    """プロセス全体で使うレイアウトを設定する（None で既定に戻す）"""
+    global _layout
+    _layout = layout
+
+
+def get_layout() -> Layout:
+    """現在のレイアウト（未設定なら既定のレイアウト）"""
+    global _layout
+    if _layout is None:
+        _layout = Layout(DEFAULT_LAYOUT)
+    return _layout
+
+
+def configure_layout(
+    template: Optional[str] = None, variables: Optional[Dict[str, str]] = None
+) -> Layout:
+    """CLI のオプションからレイアウトを設定する"""
+    layout = Layout(template or DEFAULT_LAYOUT, variables)
+    set_layout(layout)
+    return layout
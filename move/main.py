@@ -1,23 +1,60 @@
 import os
-import shutil
 import sys
+
+if __name__ == "__main__":
+    # 空のインポートフォルダに対する実行（cron での定期実行など）は
+    # click やログ機構を読み込む前に終了する
+    from common.startup import exit_if_no_files
+
+    exit_if_no_files(
+        sys.argv[1:],
+        "--import-dir",
+        message="No files to import in {directory}",
+        tool="move",
+    )
+
+import logging
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 import click
 
 # 共通ログ機構をインポート
-from common.logger import UnifiedLogger
+from common.dircache import ensure_dir, invalidate_dir
+from common.extensions import (
+    DEFAULT_CATEGORIES,
+    SIDECAR_STEM,
+    configure_classifier,
+    for_suffixes,
+    get_classifier,
+    normalize,
+)
+from common.jobs import job_options
+from common.logger import (
+    DEFAULT_LOG_BACKUPS,
+    LOG_FORMATS,
+    ROTATE_INTERVALS,
+    UnifiedLogger,
+)
+from common.mirror import configure_mirrors, get_mirrors
+from common.profiler import start_cli_profiling
+from common.throttle import (
+    configure_throttle,
+    lower_priority,
+    parse_size,
+    validate_size,
+)
+from common.transfer import configure_copy_engine, move_file
+from common.verify import VERIFY_MODES, configure_verifier, get_verifier
+from move.layout import LAYOUTS, configure_layout, get_layout
 
 
-# 対応ファイル拡張子の定義
+# 対応ファイル拡張子の定義（既定の分類。--extensions-config で変更可能）
 SUPPORTED_EXTENSIONS = {
-    "images": ["JPEG", "JPG", "PNG", "GIF", "BMP", "HIF", "ARW"],
-    "videos": ["MOV", "MP4", "MPG", "MTS", "LRF", "LRV"],
-    "documents": ["XML"],
-    "audio": ["WAV", "MP3"],
-    "design": ["PSD"],
+    category: [ext.upper() for ext in extensions]
+    for category, extensions in DEFAULT_CATEGORIES.items()
 }
 
 # カラーコード
@@ -27,46 +64,60 @@ COLORS = {"red": "31", "green": "32", "yellow": "33", "blue": "34"}
 class FileMover:
     """ファイルを日付・拡張子ごとに整理するクラス"""
 
-    def __init__(self, path: str):
+    def __init__(
+        self,
+        path: str,
+        stat_result: Optional[os.stat_result] = None,
+        capture_time: Optional[datetime] = None,
+    ):
+        """
+        Args:
+            path: 移動するファイル
+            stat_result: スキャン時に取得済みの stat 結果（渡すと再度 stat しない）
+            capture_time: 移動先の日付を決める日時（省略時は更新日時。
+                RAW+JPG などの組では組全体で同じ日時を使う）
+        """
         self.path = Path(path)
-        if not self.path.exists():
+        if stat_result is None and not self.path.exists():
             raise FileNotFoundError(f"File not found: {path}")
+        self._stat_result = stat_result
+        self.capture_time = capture_time
+        # 移動（またはスキップ）後のファイルパス
+        self.destination: Optional[Path] = None
+
+    def _file_stat(self) -> os.stat_result:
+        """stat 結果を取得（1ファイルにつき1回だけ stat する）"""
+        if self._stat_result is None:
+            self._stat_result = self.path.stat()
+        return self._stat_result
 
     @classmethod
     def get_file_names(cls, suffix: str, import_dir: str = ".") -> List[str]:
         """指定された拡張子のファイル一覧を取得"""
-        import_path = Path(import_dir)
-        if not import_path.exists():
+        if not os.path.exists(import_dir):
             raise FileNotFoundError(f"Import directory not found: {import_dir}")
 
-        return [
-            f.name
-            for f in import_path.iterdir()
-            if f.is_file() and f.name.lower().endswith(f".{suffix.lower()}")
-        ]
+        entries = for_suffixes([suffix]).classify_dir(import_dir)
+        return [entry.name for entry in entries.get(normalize(suffix), [])]
 
     @property
     def stat(self) -> datetime:
         """ファイルの更新日時を取得"""
-        return datetime.fromtimestamp(self.path.stat().st_mtime)
+        return datetime.fromtimestamp(self._file_stat().st_mtime)
 
     @property
     def extension(self) -> str:
         """ファイルの拡張子を取得"""
         return self.path.suffix[1:]  # .を除いた拡張子
 
+    def get_date_dir(self, base_dir: str = ".") -> Path:
+        """移動先の日付フォルダ（拡張子フォルダの親）を取得"""
+        return self._get_export_dir(base_dir).parent
+
     def _get_export_dir(self, base_dir: str = ".") -> Path:
-        """エクスポート先ディレクトリパスを生成"""
-        stat = self.stat
-        ymd = f"{stat.year:04d}-{stat.month:02d}-{stat.day:02d}"
-
-        return (
-            Path(base_dir)
-            / str(stat.year)
-            / f"{stat.month:02d}月"
-            / ymd
-            / self.extension
-        )
+        """エクスポート先ディレクトリパスを生成（レイアウトは --layout で変更可能）"""
+        when = self.capture_time or self.stat
+        return get_layout().directory(base_dir, when, self.extension)
 
     def move(
         self,
@@ -84,26 +135,45 @@ class FileMover:
             return True
 
         try:
-            # ディレクトリ作成
-            dir_name.mkdir(parents=True, exist_ok=True)
+            # ディレクトリ作成（作成済みならスキップ）
+            ensure_dir(dir_name)
 
             # 移動先のファイルパス
             dest_path = self._get_destination_path(dir_name)
 
             # ファイル移動
-            shutil.move(str(self.path), str(dest_path))
+            start = time.perf_counter()
+            move_file(str(self.path), str(dest_path))
+            self.destination = dest_path
             color_print(f"Moved: {self.path} -> {dest_path}", COLORS["green"])
 
             if logger:
-                logger.info(f"Moved: {self.path} -> {dest_path}")
+                logger.event(
+                    "move",
+                    "Moved: %s -> %s",
+                    self.path,
+                    dest_path,
+                    src=str(self.path),
+                    dst=str(dest_path),
+                    bytes=self._file_stat().st_size,
+                    duration=round(time.perf_counter() - start, 6),
+                )
 
             return True
 
         except Exception as e:
-            error_msg = f"Error moving {self.path}: {e}"
-            color_print(error_msg, COLORS["red"])
+            invalidate_dir(dir_name)
+            color_print(f"Error moving {self.path}: {e}", COLORS["red"])
             if logger:
-                logger.error(error_msg)
+                logger.event(
+                    "error",
+                    "Error moving %s: %s",
+                    self.path,
+                    e,
+                    level=logging.ERROR,
+                    src=str(self.path),
+                    error=str(e),
+                )
             return False
 
     def _get_destination_path(self, dir_name: Path) -> Path:
@@ -115,7 +185,7 @@ class FileMover:
             return dest_path
 
         # ファイルサイズが同じ場合はスキップ（元のパスを返す）
-        if dest_path.stat().st_size == self.path.stat().st_size:
+        if dest_path.stat().st_size == self._file_stat().st_size:
             color_print(f"Skipped (already exists): {self.path.name}", COLORS["yellow"])
             return dest_path
 
@@ -130,22 +200,27 @@ def color_print(text: str, color: str):
 
 
 def get_suffixes() -> List[str]:
-    """サポートされているファイル拡張子の一覧を取得"""
-    suffixes = []
-    for category in SUPPORTED_EXTENSIONS.values():
-        suffixes.extend(category)
-
-    # 大文字小文字両方を追加
-    all_suffixes = []
-    for suffix in suffixes:
-        all_suffixes.extend([suffix.lower(), suffix.upper()])
+    """サポートされているファイル拡張子の一覧を取得（大文字・小文字の両方、ソート済み）"""
+    return list(get_classifier().suffixes())
 
-    return sorted(list(set(all_suffixes)))
 
-
-def setup_logging(log_file: Optional[str] = None) -> UnifiedLogger:
+def setup_logging(
+    log_file: Optional[str] = None,
+    log_format: str = "text",
+    max_bytes: int = 0,
+    rotate: Optional[str] = None,
+    backup_count: int = DEFAULT_LOG_BACKUPS,
+) -> UnifiedLogger:
     """ログ設定"""
-    return UnifiedLogger(name="file_mover", log_file=log_file, console=False)
+    return UnifiedLogger(
+        name="file_mover",
+        log_file=log_file,
+        console=False,
+        log_format=log_format,
+        max_bytes=max_bytes,
+        rotate=rotate,
+        backup_count=backup_count,
+    )
 
 
 def move_files(
@@ -206,7 +281,129 @@ def _process_single_file(
         return 0, 1
 
 
+def group_files(import_dir: str, suffixes: List[str]) -> List[List[FileMover]]:
+    """インポート元を1回だけ走査し、同じステムのファイルを組にする
+
+    DSC00001.ARW / DSC00001.JPG / DSC00001.HIF のようにステムが同じファイルと、
+    動画のサイドカー（C0001.MP4 に対する C0001M01.XML）を1つの組にする。
+    組の全ファイルの capture_time には、組の中で最も古い更新日時を設定する。
+    """
+    wanted = for_suffixes(suffixes)
+    groups: Dict[str, List[FileMover]] = {}
+    with os.scandir(import_dir) as entries:
+        for entry in entries:
+            stem, _, category = wanted.split(entry.name)
+            if category is None or not entry.is_file():
+                continue
+            mover = FileMover(entry.path, stat_result=entry.stat())
+            groups.setdefault(stem, []).append(mover)
+
+    # サイドカー（<動画のステム>M01.XML など）を動画の組に入れる
+    for stem in list(groups):
+        match = SIDECAR_STEM.match(stem)
+        if match and match.group(1) in groups:
+            sidecars = [m for m in groups[stem] if m.extension.lower() == "xml"]
+            if sidecars:
+                groups[match.group(1)].extend(sidecars)
+                rest = [m for m in groups[stem] if m not in sidecars]
+                if rest:
+                    groups[stem] = rest
+                else:
+                    del groups[stem]
+
+    result = []
+    for stem in sorted(groups):
+        movers = sorted(groups[stem], key=lambda m: m.path.name)
+        earliest = min(m.stat for m in movers)
+        for mover in movers:
+            mover.capture_time = earliest
+        result.append(movers)
+    return result
+
+
+def move_group(
+    movers: List[FileMover],
+    export_dir: str = ".",
+    dry_run: bool = False,
+    logger: Optional[UnifiedLogger] = None,
+) -> tuple:
+    """組のファイルをまとめて移動する（途中で失敗したら移動済みのファイルを戻す）
+
+    Returns:
+        (成功数, 失敗数)。失敗した組は全ファイルを失敗として数える
+    """
+    moved = []
+    for mover in movers:
+        if mover.move(export_dir, dry_run, logger):
+            moved.append(mover)
+            continue
+        if len(movers) > 1:
+            _rollback(moved, logger)
+        return 0, len(movers)
+    return len(movers), 0
+
+
+def _rollback(moved: List[FileMover], logger: Optional[UnifiedLogger]):
+    """move_group で移動済みのファイルを元の場所に戻す"""
+    for mover in reversed(moved):
+        if mover.destination is None:
+            continue
+        try:
+            move_file(str(mover.destination), str(mover.path))
+            color_print(f"Rolled back: {mover.path}", COLORS["yellow"])
+            if logger:
+                logger.warning(f"Rolled back: {mover.destination} -> {mover.path}")
+            mover.destination = None
+        except OSError as e:
+            color_print(f"Error rolling back {mover.path}: {e}", COLORS["red"])
+            if logger:
+                logger.error(f"Error rolling back {mover.path}: {e}")
+
+
+def move_paired(
+    suffixes: List[str],
+    import_dir: str = ".",
+    export_dir: str = ".",
+    dry_run: bool = False,
+    logger: Optional[UnifiedLogger] = None,
+) -> tuple:
+    """全拡張子を1回の走査で処理し、同じステムのファイルを同じ日付フォルダへ移動する"""
+    try:
+        groups = group_files(import_dir, suffixes)
+    except FileNotFoundError as e:
+        color_print(f"Directory error: {e}", COLORS["red"])
+        if logger:
+            logger.error(f"Directory error: {e}")
+        return 0, 1
+
+    paired = sum(1 for movers in groups if len(movers) > 1)
+    color_print(
+        f"Processing {sum(map(len, groups))} files in {len(groups)} groups "
+        f"({paired} with several files)",
+        COLORS["blue"],
+    )
+    success_count = 0
+    error_count = 0
+    for movers in groups:
+        success, errors = move_group(movers, export_dir, dry_run, logger)
+        success_count += success
+        error_count += errors
+    return success_count, error_count
+
+
+def _parse_layout_vars(ctx, param, value):
+    """--layout-var NAME=VALUE を辞書にする"""
+    variables = {}
+    for item in value:
+        name, sep, text = item.partition("=")
+        if not sep or not name.isidentifier():
+            raise click.BadParameter(f"Expected NAME=VALUE: {item}")
+        variables[name] = text
+    return variables
+
+
 @click.command()
+@job_options("move")
 @click.option("--import-dir", default=".", help="Import directory")
 @click.option("--export-dir", default="export", help="Export directory")
 @click.option(
@@ -214,22 +411,198 @@ def _process_single_file(
     default=None,
     help="File suffix to move (if not specified, all supported extensions will be processed)",
 )
+@click.option(
+    "--extensions-config",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="JSON/TOML file adding or overriding extension categories",
+)
 @click.option(
     "--dry-run",
     is_flag=True,
     help="Show what would be done without actually moving files",
 )
 @click.option("--log-file", type=click.Path(), help="Log file path")
+@click.option(
+    "--log-format",
+    type=click.Choice(LOG_FORMATS),
+    default="text",
+    show_default=True,
+    help="Log file format: human-readable text or JSON Lines (one event per line)",
+)
+@click.option(
+    "--log-max-size",
+    default=None,
+    callback=validate_size,
+    help="Rotate the log file when it exceeds this size, e.g. 100M",
+)
+@click.option(
+    "--log-rotate",
+    type=click.Choice(tuple(ROTATE_INTERVALS)),
+    default=None,
+    help="Rotate the log file every hour or day",
+)
+@click.option(
+    "--log-backups",
+    type=click.IntRange(min=0),
+    default=DEFAULT_LOG_BACKUPS,
+    show_default=True,
+    help="Number of rotated (gzip-compressed) log files to keep (0 = unlimited)",
+)
 @click.option("--verbose", is_flag=True, help="Verbose output")
-def main(import_dir, export_dir, suffix, dry_run, log_file, verbose):
+@click.option(
+    "--max-bandwidth",
+    default=None,
+    callback=validate_size,
+    help="Limit transfer bandwidth, e.g. 100M (bytes/sec, 1K = 1024)",
+)
+@click.option(
+    "--max-iops",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Limit I/O operations per second",
+)
+@click.option(
+    "--low-priority",
+    is_flag=True,
+    help="Lower CPU (nice) and I/O (ioprio) priority of this process",
+)
+@click.option(
+    "--drop-cache",
+    is_flag=True,
+    help="Drop copied data from the page cache (posix_fadvise DONTNEED)",
+)
+@click.option(
+    "--buffer-size",
+    default=None,
+    callback=validate_size,
+    help="Copy buffer size, e.g. 4M (default: 1M when a tuned copy is used)",
+)
+@click.option(
+    "--direct-io",
+    is_flag=True,
+    help="Bypass the page cache with O_DIRECT where the filesystem supports it",
+)
+@click.option(
+    "--verify",
+    type=click.Choice(VERIFY_MODES),
+    is_flag=False,
+    flag_value="readback",
+    default=None,
+    help="Verify copies by re-reading the destination bypassing the cache and "
+    "comparing with the checksum computed during the copy; manifest also reports "
+    "files whose checksum differs from the folder's manifest (source changed)",
+)
+@click.option(
+    "--mirror",
+    multiple=True,
+    type=click.Path(file_okay=False),
+    metavar="DIR",
+    help="Also write every file placed under the export directory to the same relative "
+    "path under DIR, reading the source once for all destinations (repeatable)",
+)
+@click.option(
+    "--layout",
+    default=None,
+    help="Folder layout under the export directory: a template such as "
+    "'{year}/{month:02}月/{date}/{ext}' or one of: " + ", ".join(LAYOUTS),
+)
+@click.option(
+    "--layout-var",
+    multiple=True,
+    callback=_parse_layout_vars,
+    metavar="NAME=VALUE",
+    help="Constant used by --layout, e.g. event=wedding for {event} (repeatable)",
+)
+@click.option(
+    "--pair",
+    is_flag=True,
+    help="Scan once and move files sharing a stem (RAW+JPG+HIF, video+XML "
+    "sidecar) together into the date folder of the group's earliest file",
+)
+@click.option(
+    "--concurrency",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Move with the asyncio engine, keeping up to N filesystem operations "
+    "in flight (for high-latency network shares)",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    help="Count filesystem calls and their latency and print a report to stderr",
+)
+@click.option(
+    "--profile-output",
+    type=click.Path(dir_okay=False),
+    help="Also write the --profile report as JSON (implies --profile)",
+)
+@click.option(
+    "--cprofile",
+    type=click.Path(dir_okay=False),
+    help="Write cProfile statistics (pstats format) to this file",
+)
+def main(
+    import_dir,
+    export_dir,
+    suffix,
+    extensions_config,
+    dry_run,
+    log_file,
+    log_format,
+    log_max_size,
+    log_rotate,
+    log_backups,
+    verbose,
+    max_bandwidth,
+    max_iops,
+    low_priority,
+    drop_cache,
+    buffer_size,
+    direct_io,
+    verify,
+    mirror,
+    layout,
+    layout_var,
+    pair,
+    concurrency,
+    profile,
+    profile_output,
+    cprofile,
+):
     """
     ファイルを日付・拡張子ごとに整理するスクリプト
 
     ファイルは以下の構造で整理されます:
     export_dir/YYYY/MM月/YYYY-MM-DD/拡張子/ファイル名
     """
+    start_cli_profiling(profile, profile_output, cprofile)
+
+    if pair and concurrency:
+        raise click.UsageError("--pair cannot be combined with --concurrency")
+    try:
+        configure_layout(layout, layout_var)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--layout")
+    try:
+        configure_classifier(extensions_config)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--extensions-config")
+    try:
+        configure_mirrors(export_dir, mirror)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--mirror")
+
     # ログ設定
-    logger = setup_logging(log_file) if log_file else None
+    logger = None
+    if log_file:
+        logger = setup_logging(
+            log_file,
+            log_format,
+            max_bytes=parse_size(log_max_size) if log_max_size else 0,
+            rotate=log_rotate,
+            backup_count=log_backups,
+        )
 
     if logger:
         logger.info("🚀 Move ツールを開始")
@@ -260,16 +633,40 @@ def main(import_dir, export_dir, suffix, dry_run, log_file, verbose):
             logger.error(error_msg)
         return
 
+    # 帯域制限・優先度・コピー方式・検証の設定
+    configure_throttle(max_bandwidth, max_iops)
+    configure_copy_engine(buffer_size, direct_io, drop_cache)
+    # マニフェストはレイアウトの日付フォルダ単位（日付フォルダが無ければファイルのフォルダ）
+    configure_verifier(verify, manifest_depth=get_layout().manifest_depth)
+    if low_priority:
+        lower_priority()
+
     # 拡張子の決定
     suffixes = get_suffixes() if suffix is None else [suffix]
 
-    # 各拡張子について処理
-    total_success, total_errors = _process_all_suffixes(
-        suffixes, import_dir, export_dir, dry_run, logger, verbose
-    )
+    # 各拡張子について処理（--concurrency・--pair 指定時は全拡張子を1回の走査で処理）
+    mover = None
+    if concurrency:
+        from move.async_engine import AsyncMover
+
+        color_print(
+            f"Async engine: up to {concurrency} operations in flight", COLORS["blue"]
+        )
+        mover = AsyncMover(import_dir, export_dir, dry_run, logger, concurrency)
+        total_success, total_errors = mover.run(suffixes)
+    elif pair:
+        total_success, total_errors = move_paired(
+            suffixes, import_dir, export_dir, dry_run, logger
+        )
+    else:
+        total_success, total_errors = _process_all_suffixes(
+            suffixes, import_dir, export_dir, dry_run, logger, verbose
+        )
 
     # 結果サマリー
     _print_summary(total_success, total_errors, dry_run, logger)
+    if mover is not None and mover.interrupted:
+        raise SystemExit(130)
 
 
 def _process_all_suffixes(
@@ -280,17 +677,39 @@ def _process_all_suffixes(
     logger: Optional[UnifiedLogger],
     verbose: bool,
 ) -> tuple:
-    """全ての拡張子について処理を実行"""
+    """全ての拡張子について処理を実行
+
+    インポート元は1回だけ走査して拡張子ごとに分け（大文字小文字は区別しない）、
+    suffixes の順に移動する。
+    """
     total_success = 0
     total_errors = 0
 
+    try:
+        buckets = for_suffixes(suffixes).classify_dir(import_dir)
+    except FileNotFoundError as e:
+        color_print(f"Directory error: {e}", COLORS["red"])
+        if logger:
+            logger.error(f"Directory error: {e}")
+        return 0, 1
+
     for suffix in suffixes:
+        entries = buckets.pop(normalize(suffix), None)
         if verbose:
             color_print(f"Processing extension: {suffix}", COLORS["blue"])
+        if not entries:
+            continue
 
-        success, errors = move_files(suffix, import_dir, export_dir, dry_run, logger)
-        total_success += success
-        total_errors += errors
+        color_print(
+            f"Processing {len(entries)} files with extension: {suffix}",
+            COLORS["blue"],
+        )
+        for entry in entries:
+            success, errors = _process_single_file(
+                entry.name, import_dir, export_dir, dry_run, logger
+            )
+            total_success += success
+            total_errors += errors
 
     return total_success, total_errors
 
@@ -308,6 +727,20 @@ def _print_summary(
     if total_errors > 0:
         color_print(f"Errors: {total_errors} files", COLORS["red"])
 
+    verifier = get_verifier()
+    if verifier:
+        for line in verifier.summary_lines():
+            color_print(line, COLORS["red"] if verifier.failures else COLORS["green"])
+            if logger:
+                logger.info(line)
+
+    mirrors = get_mirrors()
+    if mirrors and not dry_run:
+        for line in mirrors.summary_lines():
+            color_print(line, COLORS["red"] if mirrors.failures else COLORS["green"])
+            if logger:
+                logger.info(line)
+
     if logger:
         logger.end_operation("File Organization", total_success, total_errors)
 
@@ -324,6 +757,8 @@ if __name__ == "__main__":
 def show_supported_extensions():
     """サポートされている拡張子を表示"""
     print("Supported file extensions:")
-    for category, extensions in SUPPORTED_EXTENSIONS.items():
+    classifier = get_classifier()
+    for category in classifier.categories:
+        extensions = [ext.upper() for ext in classifier.extensions(category)]
         print(f"  {category.title()}: {', '.join(extensions)}")
     print(f"\nTotal: {len(get_suffixes())} extensions")
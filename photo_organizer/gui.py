@@ -12,6 +12,8 @@ import threading
 import sys
 import os
 
+from common.jobs import default_jobs_file, job_names, read_jobs, resolve_job
+
 # CustomTkinter の外観設定
 ctk.set_appearance_mode("auto")  # "dark", "light", "auto"
 ctk.set_default_color_theme("blue")  # "blue", "green", "dark-blue"
@@ -37,6 +39,8 @@ class ModernPhotoOrganizerGUI:
         self.copy_var = ctk.BooleanVar()
         self.isolate_var = ctk.BooleanVar()
         self.dryrun_var = ctk.BooleanVar(value=True)  # デフォルトでオン
+        self.jobs_file = ctk.StringVar(value=default_jobs_file())
+        self.job_name = ctk.StringVar(value="")
 
     def setup_widgets(self):
         """ウィジェットの配置"""
@@ -52,6 +56,9 @@ class ModernPhotoOrganizerGUI:
         )
         title_label.pack(pady=(0, 20))
 
+        # ジョブセクション
+        self.create_job_section(main_frame)
+
         # ディレクトリ選択セクション
         self.create_directory_section(main_frame)
 
@@ -70,6 +77,93 @@ class ModernPhotoOrganizerGUI:
         # 出力セクション
         self.create_output_section(main_frame)
 
+    def create_job_section(self, parent):
+        """ジョブ（ジョブファイルに名前を付けて書いた実行設定）セクション"""
+        job_frame = ctk.CTkFrame(parent)
+        job_frame.pack(fill="x", pady=(0, 15))
+
+        ctk.CTkLabel(
+            job_frame,
+            text="🗂️ ジョブ（任意）",
+            font=ctk.CTkFont(size=16, weight="bold"),
+        ).pack(anchor="w", padx=20, pady=(15, 10))
+
+        file_frame = ctk.CTkFrame(job_frame)
+        file_frame.pack(fill="x", padx=20, pady=(0, 10))
+
+        ctk.CTkLabel(file_frame, text="ジョブファイル:", width=100).pack(
+            side="left", padx=(10, 10), pady=10
+        )
+        ctk.CTkEntry(file_frame, textvariable=self.jobs_file).pack(
+            side="left", fill="x", expand=True, padx=(0, 10), pady=10
+        )
+        ctk.CTkButton(
+            file_frame, text="参照...", command=self.choose_jobs_file, width=80
+        ).pack(side="right", padx=(0, 10), pady=10)
+
+        select_frame = ctk.CTkFrame(job_frame)
+        select_frame.pack(fill="x", padx=20, pady=(0, 15))
+
+        ctk.CTkLabel(select_frame, text="ジョブ:", width=100).pack(
+            side="left", padx=(10, 10), pady=10
+        )
+        self.job_menu = ctk.CTkOptionMenu(
+            select_frame, variable=self.job_name, values=[""], command=self.apply_job
+        )
+        self.job_menu.pack(side="left", fill="x", expand=True, padx=(0, 10), pady=10)
+        ctk.CTkButton(
+            select_frame, text="再読み込み", command=self.reload_jobs, width=80
+        ).pack(side="right", padx=(0, 10), pady=10)
+        self.reload_jobs()
+
+    def choose_jobs_file(self):
+        """ジョブファイルを選択"""
+        path = filedialog.askopenfilename(
+            title="ジョブファイルを選択",
+            filetypes=[("Job files", "*.toml *.json"), ("All files", "*.*")],
+        )
+        if path:
+            self.jobs_file.set(path)
+            self.reload_jobs()
+
+    def reload_jobs(self):
+        """ジョブファイルからジョブの一覧を読み込む"""
+        path = self.jobs_file.get().strip()
+        names = []
+        if path and os.path.exists(path):
+            try:
+                names = job_names(path)
+            except (OSError, ValueError) as e:
+                messagebox.showerror("エラー", f"ジョブファイルを読み込めません:\n{e}")
+        self.job_menu.configure(values=[""] + names)
+        if self.job_name.get() not in names:
+            self.job_name.set("")
+
+    def apply_job(self, name):
+        """選んだジョブの値を画面に反映する
+
+        画面に無い項目（--link-mode・--verify など）は実行時に --job で CLI に渡す。
+        """
+        if not name:
+            return
+        try:
+            values = resolve_job(
+                read_jobs(self.jobs_file.get()), name, "photo_organizer"
+            )
+        except (OSError, ValueError) as e:
+            messagebox.showerror("エラー", f"ジョブを読み込めません:\n{e}")
+            return
+        for key, var in (
+            ("root_dir", self.root_dir),
+            ("log_file", self.log_path),
+            ("dry_run", self.dryrun_var),
+            ("copy", self.copy_var),
+            ("isolate_orphans", self.isolate_var),
+        ):
+            if key in values:
+                var.set(values[key])
+        self.add_log(f"🗂️ ジョブを読み込みました: {name}")
+
     def create_directory_section(self, parent):
         """ディレクトリ選択セクション"""
         dir_frame = ctk.CTkFrame(parent)
@@ -243,6 +337,7 @@ class ModernPhotoOrganizerGUI:
         confirm_msg = f"""RAWファイル整理を開始しますか？
 
 📁 処理ディレクトリ: {self.root_dir.get()}
+🗂️ ジョブ: {self.job_name.get() or "なし"}
 📝 実行モード: {mode}
 📋 処理方式: {copy_mode}
 🎯 RAW分離モード: {isolate_mode}"""
@@ -265,15 +360,17 @@ class ModernPhotoOrganizerGUI:
 
             # コマンド構築
             command = [sys.executable, "main.py"]
-            command.append(self.root_dir.get())
-            command.append(self.root_dir.get())  # 出力先は同じディレクトリ
+            command.extend(["--root-dir", self.root_dir.get()])
+            if self.job_name.get():
+                command.extend(["--jobs-file", self.jobs_file.get()])
+                command.extend(["--job", self.job_name.get()])
 
             if self.dryrun_var.get():
                 command.append("--dry-run")
             if self.copy_var.get():
                 command.append("--copy")
             if self.isolate_var.get():
-                command.append("--isolate")
+                command.append("--isolate-orphans")
             if self.log_path.get().strip():
                 command.extend(["--log-file", self.log_path.get()])
 
@@ -1,15 +1,72 @@
 import os
 import sys
-import shutil
+
+if __name__ == "__main__":
+    # RAW フォルダにファイルが1つも無い実行（cron での定期実行など）は
+    # click やログ機構を読み込む前に終了する（--join はシャードの結果をまとめるので除く）
+    from common.startup import dir_value, exit_if_empty
+
+    if "--help" not in sys.argv[1:] and "--join" not in sys.argv[1:]:
+        exit_if_empty(
+            os.path.join(
+                dir_value(sys.argv[1:], "--root-dir", ".", "photo_organizer"),
+                # DEFAULT_RAW_DIR
+                dir_value(sys.argv[1:], "--raw-dir", "ARW", "photo_organizer"),
+            ),
+            "No RAW files in {directory}",
+            recursive=True,
+        )
+
+import itertools
+import logging
+import time
+from collections import Counter
+
 import click
 
-from common.logger import UnifiedLogger
+from common.dircache import ensure_dir, invalidate_dir
+from common.extensions import SIDECAR_STEM, configure_classifier, extension_set
+from common.jobs import job_options
+from common.logger import (
+    DEFAULT_LOG_BACKUPS,
+    LOG_FORMATS,
+    ROTATE_INTERVALS,
+    UnifiedLogger,
+)
+from common.mirror import configure_mirrors, get_mirrors
+from common.profiler import start_cli_profiling
+from common.throttle import (
+    configure_throttle,
+    format_size,
+    lower_priority,
+    parse_size,
+    validate_size,
+)
+from common.transfer import (
+    LINK_MODES,
+    configure_copy_engine,
+    link_or_copy,
+    move_file,
+)
+from common.verify import VERIFY_MODES, configure_verifier, get_verifier
+from photo_organizer.raw_index import (
+    MatchedStems,
+    OnDemandStats,
+    RawIndex,
+    SortedRuns,
+    SortedStemSet,
+    SpilledRawFiles,
+    SpilledSidecars,
+    chunk_records,
+)
 
 # デフォルト値を定数として定義
 DEFAULT_RAW_DIR = "ARW"
 DEFAULT_JPG_DIR = "JPG"
 DEFAULT_RAW_EXTENSIONS = [".arw"]
 DEFAULT_JPG_EXTENSIONS = [".jpg"]
+# RAW と一緒に移動するサイドカー（Lightroom の XMP、ソニーの XML、RawTherapee の PP3）
+DEFAULT_SIDECAR_EXTENSIONS = [".xmp", ".xml", ".pp3"]
 DEFAULT_ORPHAN_DIR = "orphans"
 
 
@@ -17,77 +74,325 @@ def normalize_ext(filename):
     return os.path.splitext(filename)[0]
 
 
-def find_raw_files(raw_dir, raw_extensions):
-    """RAWファイルをステム名でマッピングして返す"""
+def sidecar_stem(filename, raw_extensions, sidecar_extensions):
+    """サイドカーが属する RAW のステム（サイドカーでなければ None）
+
+    DSC00001.xmp・DSC00001.ARW.xmp・DSC00001.ARW.pp3 → DSC00001、
+    C0001M01.XML → C0001。拡張子は extension_set で正規化したものを渡す
+    """
+    base, ext = os.path.splitext(filename)
+    ext = ext.lower()
+    if not base or ext not in sidecar_extensions:
+        return None
+    stem, raw_ext = os.path.splitext(base)
+    if stem and raw_ext.lower() in raw_extensions:
+        return stem
+    if ext == ".xml":
+        match = SIDECAR_STEM.match(base)
+        if match:
+            return match.group(1)
+    return base
+
+
+def find_raw_files(
+    raw_dir,
+    raw_extensions,
+    file_stats=None,
+    sidecars=None,
+    sidecar_extensions=DEFAULT_SIDECAR_EXTENSIONS,
+):
+    """RAWファイルをステム名でマッピングして返す
+
+    file_stats に辞書を渡すと、見つかった全RAWファイルの (サイズ, 更新時刻) を
+    正規化済みパスをキーにして記録する（コピー時の冪等性チェック用）。
+    sidecars に辞書を渡すと、同じ走査で見つけたサイドカーのパスをステムごとに記録する
+    """
     raw_files = {}
     if not os.path.exists(raw_dir):
         return raw_files
+    raw_extensions = extension_set(raw_extensions)
+    sidecar_extensions = extension_set(
+        sidecar_extensions if sidecars is not None else ()
+    )
 
     for root, dirs, files in os.walk(raw_dir):
         for file in files:
             stem, ext = os.path.splitext(file)
-            if ext.lower() in raw_extensions:
-                raw_files[stem] = os.path.join(root, file)
+            ext = ext.lower()
+            if ext in raw_extensions:
+                path = os.path.join(root, file)
+                raw_files[stem] = path
+            elif ext in sidecar_extensions:
+                path = os.path.join(root, file)
+                owner = sidecar_stem(file, raw_extensions, sidecar_extensions)
+                sidecars.setdefault(owner, []).append(path)
+            else:
+                continue
+            if file_stats is not None:
+                st = os.stat(path)
+                file_stats[os.path.normpath(path)] = (
+                    st.st_size,
+                    int(st.st_mtime),
+                )
     return raw_files
 
 
+# find_raw_files_bounded が索引の大きさを予算と比べる間隔（ファイル数）
+BUDGET_CHECK_ENTRIES = 256
+
+
+def _spill_index(index, memory_budget, temp_dir):
+    """RawIndex の全件をディスク上のソート済みラン（RAW・サイドカー）に移す"""
+    runs = SortedRuns(chunk_records(memory_budget), temp_dir)
+    for seq, (stem, path) in enumerate(index.items()):
+        runs.add((stem, seq, path))
+    sidecar_runs = SortedRuns(runs.chunk, temp_dir)
+    for stem, paths in index.sidecars.items():
+        for path in paths:
+            sidecar_runs.add((stem, path))
+    return runs, sidecar_runs
+
+
+def find_raw_files_bounded(
+    raw_dir, raw_extensions, memory_budget, temp_dir=None, sidecar_extensions=()
+):
+    """保持するデータを memory_budget バイト程度に抑えて RAW ファイルを検索する
+
+    まず RawIndex（コンパクトな Mapping）に記録し、その大きさが予算の半分を
+    超えた時点で全件をディスク上のソート済みランに移して SpilledRawFiles を返す
+    （sync_raw_to_jpg_structure は JPG 一覧とのマージジョインで同期する）。
+    大きさは BUDGET_CHECK_ENTRIES 件ごとに確かめ、1つのディレクトリに大量の
+    ファイルがあっても走査の途中で移す。
+    sidecar_extensions のサイドカーは同じ走査で RAW 一覧の sidecars に記録する
+    """
+    index = RawIndex()
+    if not os.path.exists(raw_dir):
+        return index
+    raw_extensions = extension_set(raw_extensions)
+    sidecar_extensions = extension_set(sidecar_extensions)
+
+    runs = sidecar_runs = None
+    seq = 0
+    added = 0
+    for root, dirs, files in os.walk(raw_dir):
+        for file in files:
+            stem, ext = os.path.splitext(file)
+            ext = ext.lower()
+            if ext in sidecar_extensions and ext not in raw_extensions:
+                owner = sidecar_stem(file, raw_extensions, sidecar_extensions)
+                if runs is not None:
+                    sidecar_runs.add((owner, os.path.join(root, file)))
+                    continue
+                index.add_sidecar(owner, os.path.join(root, file))
+            elif ext not in raw_extensions:
+                continue
+            elif runs is not None:
+                runs.add((stem, seq, os.path.join(root, file)))
+                seq += 1
+                continue
+            else:
+                index.add(root, file)
+            added += 1
+            if added % BUDGET_CHECK_ENTRIES == 0 and index.nbytes > memory_budget // 2:
+                runs, sidecar_runs = _spill_index(index, memory_budget, temp_dir)
+                seq = len(index)
+                index = None
+        if runs is None and index.nbytes > memory_budget // 2:
+            runs, sidecar_runs = _spill_index(index, memory_budget, temp_dir)
+            seq = len(index)
+            index = None
+    if runs is None:
+        return index
+    return SpilledRawFiles(runs, SpilledSidecars(sidecar_runs))
+
+
+# --log-max-size / --log-rotate を指定したテキストのログ (パス, UnifiedLogger)。
+# このパスへの書き込みはロガーのハンドラーを通してローテーションさせる
+_rotating_log = None
+
+
+def set_rotating_log(log_file=None, logger=None):
+    """テキストのログ log_file を logger のハンドラーに書かせる（None で解除）"""
+    global _rotating_log
+    _rotating_log = (log_file, logger) if log_file and logger else None
+
+
+def write_log(logfile, message, error=False):
+    """ログファイルに1行書く（ローテーションするログはハンドラーを通す）"""
+    if _rotating_log is not None and logfile == _rotating_log[0]:
+        _rotating_log[1].write_file(message, logging.ERROR if error else logging.INFO)
+        return
+    with open(logfile, "a", encoding="utf-8") as f:
+        f.write(message + "\n")
+
+
 def log_and_echo(message, logfile=None, error=False):
     if error:
         click.echo(message, err=True)
     else:
         click.echo(message)
     if logfile:
-        with open(logfile, "a", encoding="utf-8") as f:
-            f.write(message + "\n")
+        write_log(logfile, message, error)
+
+
+def is_already_in_place(src, dst, copy=False, file_stats=None):
+    """移動・コピーが不要かどうかを判定する
+
+    スキャン時に取得した情報だけで判定し、追加のシステムコールは発行しない。
+    - 移動: 計算した移動先が現在のパスと同じ
+    - コピー: 移動先に同じサイズ・更新時刻のファイルが既に存在する
+    """
+    src = os.path.normpath(src)
+    dst = os.path.normpath(dst)
+    if src == dst:
+        return True
+    if copy and file_stats:
+        dst_stat = file_stats.get(dst)
+        return dst_stat is not None and dst_stat == file_stats.get(src)
+    return False
+
+
+def _log_transfer_event(logger, action, src, dst, copy, dry_run, start, error):
+    """転送結果を構造化イベントとして記録する"""
+    if error is not None:
+        logger.event(
+            "error",
+            "❌ Error processing %s: %s",
+            src,
+            error,
+            level=logging.ERROR,
+            src=src,
+            dst=dst,
+            error=str(error),
+        )
+        return
+    logger.event(
+        "copy" if copy else "move",
+        "📝 %s: %s → %s",
+        action,
+        src,
+        dst,
+        src=src,
+        dst=dst,
+        bytes=os.path.getsize(src if dry_run else dst),
+        duration=round(time.perf_counter() - start, 6),
+        dry_run=dry_run,
+    )
+
 
+def move_or_copy(
+    src,
+    dst,
+    copy=False,
+    dry_run=False,
+    logfile=None,
+    link_mode="copy",
+    stats=None,
+    logger=None,
+):
+    """ファイルを移動またはコピーする
 
-def move_or_copy(src, dst, copy=False, dry_run=False, logfile=None):
+    コピー時は link_mode に従ってハードリンク・reflink を優先し、
+    stats（Counter）に方式ごとの件数とコピーを回避したバイト数を加算する。
+    logger（UnifiedLogger）を渡すと、テキストの代わりに転送イベントを記録する
+    """
     action = (
         "Would copy"
         if copy
         else "Would move" if dry_run else "Copying" if copy else "Moving"
     )
-    message = f"{action}: {src} → {dst}"
-    log_and_echo(f"📝 {message}", logfile)
+    if logger is None:
+        log_and_echo(f"📝 {action}: {src} → {dst}", logfile)
+    start = time.perf_counter()
+    error = None
     if not dry_run:
         try:
-            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            ensure_dir(os.path.dirname(dst))
             if copy:
-                shutil.copy2(src, dst)
+                method = link_or_copy(src, dst, link_mode)
+                if stats is not None:
+                    stats[f"placed_by_{method}"] += 1
+                    if method != "copy":
+                        stats["bytes_avoided"] += os.path.getsize(dst)
             else:
-                shutil.move(src, dst)
+                move_file(src, dst)
         except Exception as e:
-            error_msg = f"❌ Error processing {src}: {e}"
-            log_and_echo(error_msg, logfile, error=True)
-            return False
-    return True
+            invalidate_dir(os.path.dirname(dst))
+            error = e
+            if logger is None:
+                log_and_echo(f"❌ Error processing {src}: {e}", logfile, error=True)
+    if logger is not None:
+        _log_transfer_event(logger, action, src, dst, copy, dry_run, start, error)
+    return error is None
 
 
 def initialize_sync(
     root_dir, raw_dir, jpg_dir, raw_extensions, jpg_extensions, log_file
 ):
     """同期処理の初期化を行う"""
-    raw_ext_list = [ext.strip() for ext in raw_extensions.split(",")]
-    jpg_ext_list = [ext.strip() for ext in jpg_extensions.split(",")]
+    # 大文字小文字・先頭の . の有無を問わない frozenset（".arw" と "ARW" は同じ）
+    raw_ext_list = extension_set(raw_extensions.split(","))
+    jpg_ext_list = extension_set(jpg_extensions.split(","))
 
     raw_dir_path = os.path.join(root_dir, raw_dir)
     jpg_dir_path = os.path.join(root_dir, jpg_dir)
     orphan_dir = os.path.join(raw_dir_path, DEFAULT_ORPHAN_DIR)
 
+    # 過去の実行のログを残すため追記する（サイズ・期間の上限はローテーションで管理）
     if log_file:
-        with open(log_file, "w", encoding="utf-8") as f:
-            f.write(f"# RAW/JPG sync log\n# Root: {os.path.abspath(root_dir)}\n")
-            f.write(f"# RAW dir: {raw_dir}\n# JPG dir: {jpg_dir}\n\n")
+        write_log(
+            log_file,
+            f"# RAW/JPG sync log\n# Root: {os.path.abspath(root_dir)}\n"
+            f"# RAW dir: {raw_dir}\n# JPG dir: {jpg_dir}\n",
+        )
 
     return raw_ext_list, jpg_ext_list, raw_dir_path, jpg_dir_path, orphan_dir
 
 
 def sync_raw_to_jpg_structure(
-    jpg_dir_path, raw_dir_path, raw_files, jpg_ext_list, copy, dry_run, log_file
+    jpg_dir_path,
+    raw_dir_path,
+    raw_files,
+    jpg_ext_list,
+    copy,
+    dry_run,
+    log_file,
+    file_stats=None,
+    stats=None,
+    link_mode="copy",
+    logger=None,
+    sidecars=None,
 ):
-    """JPG構造に合わせてRAWファイルを同期する"""
-    matched_raws = set()
+    """JPG構造に合わせてRAWファイルを同期する
+
+    既に正しい位置にあるRAWファイルは move_or_copy を呼ばずにスキップし、
+    stats（Counter）の "skipped" に件数を加算する。
+    raw_files には find_raw_files の dict のほか、find_raw_files_bounded の
+    RawIndex・SpilledRawFiles（マージジョインで同期）を渡せる。
+    サイドカー（sidecars、省略時は raw_files.sidecars）は RAW と同じフォルダへ移す
+    """
+    if stats is None:
+        stats = Counter()
+    if sidecars is None:
+        sidecars = getattr(raw_files, "sidecars", None)
+    jpg_ext_list = extension_set(jpg_ext_list)
     log_and_echo("🔍 Matching RAW files to JPG structure...", log_file)
+    if isinstance(raw_files, SpilledRawFiles):
+        return _sync_merge_join(
+            jpg_dir_path,
+            raw_dir_path,
+            raw_files,
+            jpg_ext_list,
+            copy,
+            dry_run,
+            log_file,
+            file_stats,
+            stats,
+            link_mode,
+            logger,
+            sidecars,
+        )
+    matched_raws = MatchedStems(raw_files) if isinstance(raw_files, RawIndex) else set()
 
     for root, dirs, files in os.walk(jpg_dir_path):
         for file in files:
@@ -100,18 +405,21 @@ def sync_raw_to_jpg_structure(
 
             # 対応するRAWファイルを検索
             if jpg_name in raw_files:
-                raw_src_path = raw_files[jpg_name]
-                raw_file = os.path.basename(raw_src_path)
-                raw_dest_path = os.path.join(raw_dest_dir, raw_file)
-                move_or_copy(
-                    raw_src_path,
-                    raw_dest_path,
-                    copy=copy,
-                    dry_run=dry_run,
-                    logfile=log_file,
-                )
                 matched_raws.add(jpg_name)
+                _sync_raw_file(
+                    raw_files[jpg_name],
+                    raw_dest_dir,
+                    copy,
+                    dry_run,
+                    log_file,
+                    file_stats,
+                    stats,
+                    link_mode,
+                    logger,
+                    sidecars.get(jpg_name, ()) if sidecars else (),
+                )
             else:
+                stats["missing_raw"] += 1
                 log_and_echo(
                     f"⚠️ No RAW found for JPG: {jpg_name}", log_file, error=True
                 )
@@ -119,30 +427,333 @@ def sync_raw_to_jpg_structure(
     return matched_raws
 
 
+def _sync_raw_file(
+    raw_src_path,
+    raw_dest_dir,
+    copy,
+    dry_run,
+    log_file,
+    file_stats,
+    stats,
+    link_mode,
+    logger,
+    sidecars=(),
+):
+    """対応する JPG のフォルダ（raw_dest_dir）へ RAW ファイルとサイドカーを移動・コピーする
+
+    RAW の移動に失敗した場合、サイドカーは元の場所に残す
+    """
+    raw_dest_path = os.path.join(raw_dest_dir, os.path.basename(raw_src_path))
+    if is_already_in_place(raw_src_path, raw_dest_path, copy, file_stats):
+        stats["skipped"] += 1
+    elif move_or_copy(
+        raw_src_path,
+        raw_dest_path,
+        copy=copy,
+        dry_run=dry_run,
+        logfile=log_file,
+        link_mode=link_mode,
+        stats=stats,
+        logger=logger,
+    ):
+        stats["processed"] += 1
+    else:
+        stats["errors"] += 1
+        return
+    _sync_sidecars(
+        sidecars,
+        raw_dest_dir,
+        copy,
+        dry_run,
+        log_file,
+        file_stats,
+        stats,
+        link_mode,
+        logger,
+    )
+
+
+def _sync_sidecars(
+    sidecars,
+    dest_dir,
+    copy,
+    dry_run,
+    log_file,
+    file_stats,
+    stats,
+    link_mode,
+    logger,
+):
+    """サイドカーを RAW と同じフォルダ（dest_dir）へ同じ方式で移動・コピーする"""
+    for path in sidecars:
+        dest = os.path.join(dest_dir, os.path.basename(path))
+        if is_already_in_place(path, dest, copy, file_stats):
+            continue
+        if move_or_copy(
+            path,
+            dest,
+            copy=copy,
+            dry_run=dry_run,
+            logfile=log_file,
+            link_mode=link_mode,
+            stats=stats,
+            logger=logger,
+        ):
+            stats["sidecars"] += 1
+        else:
+            stats["errors"] += 1
+
+
+def _sync_merge_join(
+    jpg_dir_path,
+    raw_dir_path,
+    raw_files,
+    jpg_ext_list,
+    copy,
+    dry_run,
+    log_file,
+    file_stats,
+    stats,
+    link_mode,
+    logger,
+    sidecars=None,
+):
+    """JPG 一覧もステム順に外部ソートし、SpilledRawFiles とマージジョインする
+
+    対応した RAW のステムはディスク上の SortedStemSet に記録して返す
+    """
+    runs = raw_files.runs
+    jpg_files = SortedRuns(runs.chunk, runs.directory)
+    for root, dirs, files in os.walk(jpg_dir_path):
+        rel_path = None
+        for file in files:
+            jpg_name, ext = os.path.splitext(file)
+            if ext.lower() not in jpg_ext_list:
+                continue
+            if rel_path is None:
+                rel_path = os.path.relpath(root, jpg_dir_path)
+            jpg_files.add((jpg_name, rel_path))
+
+    matched_raws = SortedStemSet(runs.chunk, runs.directory)
+    raws = raw_files.items()
+    raw = next(raws, None)
+    try:
+        for jpg_name, rel_path in jpg_files:
+            while raw is not None and raw[0] < jpg_name:
+                raw = next(raws, None)
+            if raw is not None and raw[0] == jpg_name:
+                matched_raws.add(jpg_name)
+                _sync_raw_file(
+                    raw[1],
+                    os.path.join(raw_dir_path, rel_path),
+                    copy,
+                    dry_run,
+                    log_file,
+                    file_stats,
+                    stats,
+                    link_mode,
+                    logger,
+                    sidecars.get(jpg_name, ()) if sidecars else (),
+                )
+            else:
+                stats["missing_raw"] += 1
+                log_and_echo(
+                    f"⚠️ No RAW found for JPG: {jpg_name}", log_file, error=True
+                )
+    finally:
+        jpg_files.close()
+    return matched_raws
+
+
 def handle_orphan_files(
-    raw_files, matched_raws, orphan_dir, isolate_orphans, copy, dry_run, log_file
+    raw_files,
+    matched_raws,
+    orphan_dir,
+    isolate_orphans,
+    copy,
+    dry_run,
+    log_file,
+    link_mode="copy",
+    stats=None,
+    logger=None,
+    sidecars=None,
 ):
-    """孤立RAWファイルを処理する"""
-    orphan_files = {
-        stem: path for stem, path in raw_files.items() if stem not in matched_raws
-    }
+    """孤立RAWファイルを処理する
 
-    if isolate_orphans and orphan_files:
+    孤立ファイルの一覧は作らず、raw_files を順に読みながら処理する。
+    サイドカー（sidecars、省略時は raw_files.sidecars）も RAW と一緒に扱う
+    """
+    if sidecars is None:
+        sidecars = getattr(raw_files, "sidecars", None)
+    orphan_files = (
+        (stem, path) for stem, path in raw_files.items() if stem not in matched_raws
+    )
+    first = next(orphan_files, None)
+    if first is None:
+        return
+    orphan_files = itertools.chain([first], orphan_files)
+
+    if isolate_orphans:
         log_and_echo("🧹 Checking for orphan RAW files...", log_file)
-        for stem, raw_path in orphan_files.items():
-            if not raw_path.startswith(orphan_dir):
-                raw_file = os.path.basename(raw_path)
-                dest = os.path.join(orphan_dir, raw_file)
-                move_or_copy(
-                    raw_path, dest, copy=copy, dry_run=dry_run, logfile=log_file
+        for stem, raw_path in orphan_files:
+            paths = [raw_path]
+            if sidecars:
+                paths.extend(sidecars.get(stem, ()))
+            for path in paths:
+                if path.startswith(orphan_dir):
+                    continue
+                moved = move_or_copy(
+                    path,
+                    os.path.join(orphan_dir, os.path.basename(path)),
+                    copy=copy,
+                    dry_run=dry_run,
+                    logfile=log_file,
+                    link_mode=link_mode,
+                    stats=stats,
+                    logger=logger,
                 )
-    elif orphan_files:
+                if not moved and path is raw_path:
+                    # RAW を移せなければサイドカーも残す
+                    break
+    else:
         log_and_echo("📋 Listing orphan RAW files (not moved):", log_file)
-        for stem, raw_path in orphan_files.items():
+        for stem, raw_path in orphan_files:
             log_and_echo(f"  - {os.path.basename(raw_path)}", log_file)
+            for path in sidecars.get(stem, ()) if sidecars else ():
+                log_and_echo(f"    + {os.path.basename(path)}", log_file)
+
+
+def report_summary(stats, log_file=None):
+    """処理結果のサマリーを表示"""
+    log_and_echo("📊 Summary:", log_file)
+    log_and_echo(f"  Processed: {stats['processed']}", log_file)
+    log_and_echo(f"  Skipped (already in place): {stats['skipped']}", log_file)
+    log_and_echo(f"  JPG without RAW: {stats['missing_raw']}", log_file)
+    if stats["sidecars"]:
+        log_and_echo(f"  Sidecars placed with RAW: {stats['sidecars']}", log_file)
+    if stats["shards"]:
+        log_and_echo(
+            f"  Shards: {stats['shards']} (reassigned: {stats['reassigned']})",
+            log_file,
+        )
+        if stats["duplicate_jpg"]:
+            log_and_echo(
+                f"  JPG sharing a RAW with another JPG: {stats['duplicate_jpg']}",
+                log_file,
+            )
+    linked = stats["placed_by_hardlink"] + stats["placed_by_reflink"]
+    if linked:
+        log_and_echo(
+            f"  Linked instead of copied: {linked} "
+            f"(hardlink: {stats['placed_by_hardlink']}, "
+            f"reflink: {stats['placed_by_reflink']})",
+            log_file,
+        )
+        log_and_echo(
+            f"  Bytes avoided: {format_size(stats['bytes_avoided'])}", log_file
+        )
+    verifier = get_verifier()
+    if verifier:
+        for line in verifier.summary_lines():
+            log_and_echo(f"  {line}", log_file, error=bool(verifier.failures))
+    mirrors = get_mirrors()
+    if mirrors:
+        for line in mirrors.summary_lines():
+            log_and_echo(f"  {line}", log_file, error=bool(mirrors.failures))
+    if stats["shards"]:
+        # --workers: 各ワーカーの検証・ミラーの件数の合計
+        if "verified" in stats:
+            log_and_echo(
+                f"  Verified: {stats['verified']} files, "
+                f"failures: {stats['verify_failures']}",
+                log_file,
+                error=bool(stats["verify_failures"]),
+            )
+        if "mirrored" in stats:
+            log_and_echo(
+                f"  Mirrored: {stats['mirrored']} files, "
+                f"failures: {stats['mirror_failures']}",
+                log_file,
+                error=bool(stats["mirror_failures"]),
+            )
+    if stats["errors"]:
+        log_and_echo(f"  Errors: {stats['errors']}", log_file, error=True)
+
+
+def _run_sharded(
+    root_dir,
+    raw_dir,
+    jpg_dir,
+    raw_ext_list,
+    jpg_ext_list,
+    sidecar_ext_list,
+    copy,
+    link_mode,
+    isolate_orphans,
+    dry_run,
+    log_file,
+    event_logger,
+    workers,
+    shard_by,
+    shards,
+    shard_db,
+    join,
+    options,
+):
+    """--workers / --join: シャードに分けて複数のワーカープロセスで同期する"""
+    import tempfile
+
+    from photo_organizer import shard
+
+    if join:
+        log_and_echo(f"🧩 Joining shard queue: {shard_db}", log_file)
+        worker = shard.worker_id()
+        try:
+            return shard.run_worker(shard_db, root_dir, options, worker)
+        finally:
+            shard.merge_worker_logs(options["log_file"], [worker], event_logger)
+
+    settings = {
+        "raw_dir": raw_dir,
+        "jpg_dir": jpg_dir,
+        "jpg_extensions": sorted(jpg_ext_list),
+        "orphan_dir": DEFAULT_ORPHAN_DIR,
+        "copy": copy,
+        "dry_run": dry_run,
+        "link_mode": link_mode,
+        "shard_by": shard_by,
+        "shards": shards or workers * 4,
+    }
+    if shard_db:
+        return shard.run_coordinator(
+            root_dir,
+            settings,
+            options,
+            raw_ext_list,
+            sidecar_ext_list,
+            workers,
+            shard_db,
+            isolate_orphans,
+            log_file,
+            event_logger,
+        )
+    with tempfile.TemporaryDirectory(prefix="photo_organizer-") as tmp:
+        return shard.run_coordinator(
+            root_dir,
+            settings,
+            options,
+            raw_ext_list,
+            sidecar_ext_list,
+            workers,
+            os.path.join(tmp, "shards.sqlite3"),
+            isolate_orphans,
+            log_file,
+            event_logger,
+        )
 
 
 @click.command()
+@job_options("photo_organizer")
 @click.option(
     "--root-dir",
     type=click.Path(exists=True, file_okay=False),
@@ -161,15 +772,38 @@ def handle_orphan_files(
 )
 @click.option(
     "--raw-extensions",
-    default=",".join(DEFAULT_RAW_EXTENSIONS),
-    help=f"RAW file extensions, comma-separated (default: {','.join(DEFAULT_RAW_EXTENSIONS)})",
+    default=None,
+    help=f"RAW file extensions, comma-separated (default: the 'raw' category of "
+    f"--extensions-config, or {','.join(DEFAULT_RAW_EXTENSIONS)})",
 )
 @click.option(
     "--jpg-extensions",
-    default=",".join(DEFAULT_JPG_EXTENSIONS),
-    help=f"JPG file extensions, comma-separated (default: {','.join(DEFAULT_JPG_EXTENSIONS)})",
+    default=None,
+    help=f"JPG file extensions, comma-separated (default: the 'jpg' category of "
+    f"--extensions-config, or {','.join(DEFAULT_JPG_EXTENSIONS)})",
+)
+@click.option(
+    "--sidecar-extensions",
+    default=None,
+    help=f"Sidecar extensions moved together with their RAW file, comma-separated; "
+    f"'' disables (default: the 'sidecars' category of --extensions-config, or "
+    f"{','.join(DEFAULT_SIDECAR_EXTENSIONS)})",
+)
+@click.option(
+    "--extensions-config",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="JSON/TOML file defining extension categories ('raw' and 'jpg' are used here)",
 )
 @click.option("--copy", is_flag=True, help="Copy files instead of moving them")
+@click.option(
+    "--link-mode",
+    type=click.Choice(LINK_MODES),
+    default="copy",
+    show_default=True,
+    help="How --copy places files: full copy, hardlink, reflink (FICLONE) "
+    "or auto (reflink → hardlink → copy, per destination device)",
+)
 @click.option(
     "--isolate-orphans",
     is_flag=True,
@@ -185,21 +819,228 @@ def handle_orphan_files(
     type=click.Path(dir_okay=False, writable=True),
     help="Path to a log file to write actions",
 )
+@click.option(
+    "--log-format",
+    type=click.Choice(LOG_FORMATS),
+    default="text",
+    show_default=True,
+    help="Log file format: human-readable text or JSON Lines (one event per line)",
+)
+@click.option(
+    "--log-max-size",
+    default=None,
+    callback=validate_size,
+    help="Rotate the log file when it exceeds this size, e.g. 100M",
+)
+@click.option(
+    "--log-rotate",
+    type=click.Choice(tuple(ROTATE_INTERVALS)),
+    default=None,
+    help="Rotate the log file every hour or day",
+)
+@click.option(
+    "--log-backups",
+    type=click.IntRange(min=0),
+    default=DEFAULT_LOG_BACKUPS,
+    show_default=True,
+    help="Number of rotated (gzip-compressed) log files to keep (0 = unlimited)",
+)
+@click.option(
+    "--max-bandwidth",
+    default=None,
+    callback=validate_size,
+    help="Limit transfer bandwidth, e.g. 100M (bytes/sec, 1K = 1024)",
+)
+@click.option(
+    "--max-iops",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Limit I/O operations per second",
+)
+@click.option(
+    "--low-priority",
+    is_flag=True,
+    help="Lower CPU (nice) and I/O (ioprio) priority of this process",
+)
+@click.option(
+    "--drop-cache",
+    is_flag=True,
+    help="Drop copied data from the page cache (posix_fadvise DONTNEED)",
+)
+@click.option(
+    "--buffer-size",
+    default=None,
+    callback=validate_size,
+    help="Copy buffer size, e.g. 4M (default: 1M when a tuned copy is used)",
+)
+@click.option(
+    "--direct-io",
+    is_flag=True,
+    help="Bypass the page cache with O_DIRECT where the filesystem supports it",
+)
+@click.option(
+    "--verify",
+    type=click.Choice(VERIFY_MODES),
+    is_flag=False,
+    flag_value="readback",
+    default=None,
+    help="Verify copies by re-reading the destination bypassing the cache and "
+    "comparing with the checksum computed during the copy; manifest also reports "
+    "files whose checksum differs from the folder's manifest (source changed)",
+)
+@click.option(
+    "--mirror",
+    multiple=True,
+    type=click.Path(file_okay=False),
+    metavar="DIR",
+    help="Also write every file placed under ROOT_DIR to the same relative "
+    "path under DIR, reading the source once for all destinations (repeatable)",
+)
+@click.option(
+    "--memory-budget",
+    default=None,
+    callback=validate_size,
+    help="Keep the RAW/JPG bookkeeping within about this much memory, e.g. 512M: "
+    "use a compact index and switch to a disk-based sorted merge (in TMPDIR) "
+    "when it would not fit",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Shard the JPG tree and match/move RAW files in this many worker "
+    "processes, coordinated through a SQLite queue (see --shard-db)",
+)
+@click.option(
+    "--shard-by",
+    type=click.Choice(("dir", "hash")),
+    default="dir",
+    show_default=True,
+    help="Shard by top-level JPG directory or by a hash of the file stem",
+)
+@click.option(
+    "--shards",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Number of shards for --shard-by hash (default: 4 per worker)",
+)
+@click.option(
+    "--shard-db",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="SQLite queue shared by the coordinator and workers (default: a "
+    "temporary file). Put it on shared storage to add workers on other hosts",
+)
+@click.option(
+    "--join",
+    is_flag=True,
+    help="Only work on the shards queued in --shard-db by a running coordinator "
+    "(for additional workers, e.g. on other hosts mounting the same archive)",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    help="Count filesystem calls and their latency and print a report to stderr",
+)
+@click.option(
+    "--profile-output",
+    type=click.Path(dir_okay=False),
+    help="Also write the --profile report as JSON (implies --profile)",
+)
+@click.option(
+    "--cprofile",
+    type=click.Path(dir_okay=False),
+    help="Write cProfile statistics (pstats format) to this file",
+)
 def cli(
     root_dir,
     raw_dir,
     jpg_dir,
     raw_extensions,
     jpg_extensions,
+    sidecar_extensions,
+    extensions_config,
     copy,
+    link_mode,
     isolate_orphans,
     dry_run,
     log_file,
+    log_format,
+    log_max_size,
+    log_rotate,
+    log_backups,
+    max_bandwidth,
+    max_iops,
+    low_priority,
+    drop_cache,
+    buffer_size,
+    direct_io,
+    verify,
+    mirror,
+    memory_budget,
+    workers,
+    shard_by,
+    shards,
+    shard_db,
+    join,
+    profile,
+    profile_output,
+    cprofile,
 ):
     """Sync RAW/ folder structure to match JPG/ structure in ROOT_DIR."""
+    start_cli_profiling(profile, profile_output, cprofile)
+    if join and not shard_db:
+        raise click.BadParameter("requires --shard-db", param_hint="--join")
+    if (workers or join) and memory_budget:
+        raise click.BadParameter(
+            "cannot be combined with --workers/--join (the RAW index is kept in "
+            "the shard queue)",
+            param_hint="--memory-budget",
+        )
+    try:
+        classifier = configure_classifier(extensions_config)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--extensions-config")
+    try:
+        configure_mirrors(root_dir, () if dry_run else mirror)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--mirror")
+    raw_extensions = raw_extensions or ",".join(
+        classifier.extensions("raw") or DEFAULT_RAW_EXTENSIONS
+    )
+    jpg_extensions = jpg_extensions or ",".join(
+        classifier.extensions("jpg") or DEFAULT_JPG_EXTENSIONS
+    )
+    if sidecar_extensions is None:
+        sidecar_extensions = ",".join(
+            classifier.extensions("sidecars") or DEFAULT_SIDECAR_EXTENSIONS
+        )
+    # 複合拡張子（"arw.xmp"）は最後の拡張子で判定する（sidecar_stem が RAW の拡張子を外す）
+    sidecar_ext_list = extension_set(
+        ext.rsplit(".", 1)[-1] for ext in sidecar_extensions.split(",")
+    )
 
-    # ログ機能を初期化
-    logger = UnifiedLogger(name="photo_organizer", log_file=log_file, console=True)
+    # ログ機能を初期化（JSON 形式では転送イベントを UnifiedLogger に記録し、
+    # テキストのログファイルには書き込まない）
+    logger = UnifiedLogger(
+        name="photo_organizer",
+        log_file=log_file,
+        console=True,
+        log_format=log_format,
+        max_bytes=parse_size(log_max_size) if log_max_size else 0,
+        rotate=log_rotate,
+        backup_count=log_backups,
+    )
+    event_logger = logger if log_format == "json" else None
+    # テキストの行（log_and_echo）もローテーションの対象にする
+    set_rotating_log(
+        log_file if not event_logger and (log_max_size or log_rotate) else None,
+        logger,
+    )
+    # ワーカーは <ログ>.<ワーカー> に書き、終了後にこのログへまとめる（--workers）
+    worker_log_file = log_file
+    if event_logger:
+        log_file = None
 
     logger.info("🎯 Photo Organizer ツールを開始")
     logger.info(f"📁 処理ディレクトリ: {root_dir}")
@@ -225,22 +1066,107 @@ def cli(
         log_and_echo(error_msg, log_file, error=True)
         raise click.ClickException(error_msg)
 
-    # RAWファイルを事前に検索
-    raw_files = find_raw_files(raw_dir_path, raw_ext_list)
+    # 帯域制限・優先度・コピー方式・検証の設定
+    configure_throttle(max_bandwidth, max_iops)
+    configure_copy_engine(buffer_size, direct_io, drop_cache)
+    configure_verifier(verify)
+    if low_priority:
+        lower_priority()
+
+    if workers or join:
+        stats = _run_sharded(
+            root_dir,
+            raw_dir,
+            jpg_dir,
+            raw_ext_list,
+            jpg_ext_list,
+            sidecar_ext_list,
+            copy,
+            link_mode,
+            isolate_orphans,
+            dry_run,
+            log_file,
+            event_logger,
+            workers,
+            shard_by,
+            shards,
+            shard_db,
+            join,
+            {
+                "log_file": worker_log_file,
+                "log_format": log_format,
+                "max_bandwidth": max_bandwidth,
+                "max_iops": max_iops,
+                "low_priority": low_priority,
+                "drop_cache": drop_cache,
+                "buffer_size": buffer_size,
+                "direct_io": direct_io,
+                "verify": verify,
+                "mirror": mirror,
+            },
+        )
+        report_summary(stats, log_file)
+        return
+
+    # RAWファイルを事前に検索（コピー時は冪等性チェック用にサイズ・更新時刻も取得。
+    # --memory-budget 指定時は保持せず、必要なときに stat する）
+    # サイドカーは同じ走査で RAW 一覧に記録する
+    if memory_budget:
+        file_stats = OnDemandStats() if copy else None
+        raw_files = find_raw_files_bounded(
+            raw_dir_path,
+            raw_ext_list,
+            parse_size(memory_budget),
+            sidecar_extensions=sidecar_ext_list,
+        )
+        sidecars = None
+    else:
+        file_stats = {} if copy else None
+        sidecars = {}
+        raw_files = find_raw_files(
+            raw_dir_path, raw_ext_list, file_stats, sidecars, sidecar_ext_list
+        )
 
     if not raw_files:
         warning_msg = f"⚠️ No RAW files found in {raw_dir_path}"
         log_and_echo(warning_msg, log_file, error=True)
 
     # JPG構造に合わせてRAWファイルを同期
+    stats = Counter()
     matched_raws = sync_raw_to_jpg_structure(
-        jpg_dir_path, raw_dir_path, raw_files, jpg_ext_list, copy, dry_run, log_file
+        jpg_dir_path,
+        raw_dir_path,
+        raw_files,
+        jpg_ext_list,
+        copy,
+        dry_run,
+        log_file,
+        file_stats=file_stats,
+        stats=stats,
+        link_mode=link_mode,
+        logger=event_logger,
+        sidecars=sidecars,
     )
 
     # 孤立RAWファイルの処理
     handle_orphan_files(
-        raw_files, matched_raws, orphan_dir, isolate_orphans, copy, dry_run, log_file
+        raw_files,
+        matched_raws,
+        orphan_dir,
+        isolate_orphans,
+        copy,
+        dry_run,
+        log_file,
+        link_mode=link_mode,
+        stats=stats,
+        logger=event_logger,
+        sidecars=sidecars,
     )
+    if isinstance(raw_files, SpilledRawFiles):
+        raw_files.close()
+        matched_raws.close()
+
+    report_summary(stats, log_file)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,363 @@
+"""大量の RAW ファイルを一定のメモリで扱うためのデータ構造（--memory-budget）
+
+- RawIndex: ステム → パスの対応を、ディレクトリ名・拡張子の共有（intern）と
+  配列で保持する Mapping。1件あたり数十バイトで、dict の数分の1の大きさ
+- SortedRuns: 一定件数ごとにソートしてディスクに書き出し、heapq.merge で
+  順に読み出す外部ソート
+- SpilledRawFiles: RawIndex が予算を超えたときに切り替える、ディスク上の
+  ステム順の RAW 一覧（JPG 一覧とのマージジョインで同期する）
+- SpilledSidecars: SpilledRawFiles と同じくディスク上に置いたサイドカーの一覧
+
+どちらの RAW 一覧も、RAW と同じ走査で見つけたサイドカー（XMP など）を
+sidecars（ステム → パスのリスト）に持つ。
+"""
+
+import heapq
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+from array import array
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# ソート済みランのレコード1件あたりのメモリの見積もり（タプルと文字列）
+RECORD_BYTES = 256
+# ランを読み出すときのバッチの件数（マージ中のメモリは ラン数 × バッチ）
+_BATCH_RECORDS = 256
+_MIN_CHUNK_RECORDS = 16
+
+
+def chunk_records(memory_budget: int) -> int:
+    """予算から、1つのランにまとめてソートする件数を決める（予算の 1/4）"""
+    return max(_MIN_CHUNK_RECORDS, memory_budget // 4 // RECORD_BYTES)
+
+
+def _encode(stem: str) -> bytes:
+    return stem.encode("utf-8", "surrogateescape")
+
+
+class RawIndex(Mapping):
+    """ステム名 → RAW ファイルのパス（find_raw_files の dict と同じ使い方ができる）
+
+    ステムは1つの bytearray に連結し、開始位置・ディレクトリ番号・拡張子番号を
+    array に持つ。検索は array 上のオープンアドレス法のハッシュ表で行う。
+    同じステムを追加すると、dict と同様に後から追加したパスで上書きする。
+    """
+
+    def __init__(self):
+        self._dirs: List[str] = []
+        self._dir_ids: Dict[str, int] = {}
+        self._dir_bytes = 0
+        self._exts: List[str] = []
+        self._ext_ids: Dict[str, int] = {}
+        self._blob = bytearray()
+        self._offsets = array("Q", [0])
+        self._dir = array("I")
+        self._ext = array("H")
+        self._table = array("i", [-1]) * 1024
+        self._mask = 1023
+        # サイドカーは RAW より少ないため dict に持つ（ステム → パスのリスト）
+        self.sidecars: Dict[str, List[str]] = {}
+        self._sidecar_bytes = 0
+
+    def _intern(self, value: str, values: List[str], ids: Dict[str, int]) -> int:
+        index = ids.get(value)
+        if index is None:
+            index = ids[value] = len(values)
+            values.append(value)
+            if values is self._dirs:
+                self._dir_bytes += sys.getsizeof(value) + 100
+        return index
+
+    def _key(self, index: int) -> bytes:
+        return bytes(self._blob[self._offsets[index] : self._offsets[index + 1]])
+
+    def _find(self, key: bytes) -> Tuple[int, int]:
+        """(ハッシュ表の位置, 要素番号) を返す。見つからなければ要素番号は -1"""
+        table, mask, blob, offsets = self._table, self._mask, self._blob, self._offsets
+        slot = hash(key) & mask
+        while True:
+            index = table[slot]
+            if index < 0 or blob[offsets[index] : offsets[index + 1]] == key:
+                return slot, index
+            slot = (slot + 1) & mask
+
+    def _grow(self):
+        size = len(self._table) * 2
+        table = array("i", [-1]) * size
+        mask = size - 1
+        for index in range(len(self._dir)):
+            slot = hash(self._key(index)) & mask
+            while table[slot] >= 0:
+                slot = (slot + 1) & mask
+            table[slot] = index
+        self._table, self._mask = table, mask
+
+    def add(self, directory: str, filename: str):
+        """directory にある filename を登録する"""
+        stem, ext = os.path.splitext(filename)
+        key = _encode(stem)
+        dir_id = self._intern(directory, self._dirs, self._dir_ids)
+        ext_id = self._intern(ext, self._exts, self._ext_ids)
+        slot, index = self._find(key)
+        if index >= 0:
+            self._dir[index] = dir_id
+            self._ext[index] = ext_id
+            return
+        self._table[slot] = len(self._dir)
+        self._blob += key
+        self._offsets.append(len(self._blob))
+        self._dir.append(dir_id)
+        self._ext.append(ext_id)
+        if len(self._dir) * 2 > len(self._table):
+            self._grow()
+
+    def add_sidecar(self, stem: str, path: str):
+        """stem の RAW のサイドカーを登録する（RAW より先に見つかってもよい）"""
+        self.sidecars.setdefault(stem, []).append(path)
+        self._sidecar_bytes += sys.getsizeof(path) + 64
+
+    def index_of(self, stem: str) -> int:
+        """ステムの要素番号（無ければ -1）"""
+        return self._find(_encode(stem))[1]
+
+    def _stem(self, index: int) -> str:
+        return self._key(index).decode("utf-8", "surrogateescape")
+
+    def _path(self, index: int, stem: str) -> str:
+        return os.path.join(
+            self._dirs[self._dir[index]], stem + self._exts[self._ext[index]]
+        )
+
+    def __getitem__(self, stem: str) -> str:
+        index = self.index_of(stem)
+        if index < 0:
+            raise KeyError(stem)
+        return self._path(index, stem)
+
+    def __contains__(self, stem) -> bool:
+        return isinstance(stem, str) and self.index_of(stem) >= 0
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(len(self._dir)):
+            yield self._stem(index)
+
+    def __len__(self) -> int:
+        return len(self._dir)
+
+    def items(self) -> Iterator[Tuple[str, str]]:
+        for index in range(len(self._dir)):
+            stem = self._stem(index)
+            yield stem, self._path(index, stem)
+
+    @property
+    def nbytes(self) -> int:
+        """保持しているデータのおおよそのバイト数"""
+        return (
+            len(self._blob)
+            + self._offsets.itemsize * len(self._offsets)
+            + self._dir.itemsize * len(self._dir)
+            + self._ext.itemsize * len(self._ext)
+            + self._table.itemsize * len(self._table)
+            + self._dir_bytes
+            + self._sidecar_bytes
+        )
+
+
+class MatchedStems:
+    """RawIndex のどの要素が JPG と対応したかを要素ごと1バイトで記録する集合"""
+
+    def __init__(self, index: RawIndex):
+        self._index = index
+        self._flags = bytearray(len(index))
+        self._count = 0
+
+    def add(self, stem: str):
+        position = self._index.index_of(stem)
+        if position < 0:
+            raise KeyError(stem)
+        if not self._flags[position]:
+            self._flags[position] = 1
+            self._count += 1
+
+    def __contains__(self, stem) -> bool:
+        position = self._index.index_of(stem)
+        return position >= 0 and bool(self._flags[position])
+
+    def __len__(self) -> int:
+        return self._count
+
+
+class SortedRuns:
+    """レコード（タプル）を外部ソートする
+
+    chunk 件たまるごとにソートして一時ディレクトリに書き出し、反復時に
+    heapq.merge で全体をソート順に読み出す。1つのランに収まる場合は
+    ディスクを使わない。反復は何度でもできる。
+    """
+
+    def __init__(self, chunk: int, directory: Optional[str] = None):
+        self.chunk = chunk
+        self.directory = directory
+        self._records: list = []
+        self._runs: List[str] = []
+        self._tmp: Optional[str] = None
+        self._count = 0
+
+    def add(self, record: tuple):
+        self._records.append(record)
+        self._count += 1
+        if len(self._records) >= self.chunk:
+            self._flush()
+
+    def _flush(self):
+        if self._tmp is None:
+            self._tmp = tempfile.mkdtemp(prefix="photo_organizer-", dir=self.directory)
+        self._records.sort()
+        path = os.path.join(self._tmp, f"run{len(self._runs):06d}")
+        with open(path, "wb") as f:
+            for start in range(0, len(self._records), _BATCH_RECORDS):
+                batch = self._records[start : start + _BATCH_RECORDS]
+                pickle.dump(batch, f, pickle.HIGHEST_PROTOCOL)
+        self._runs.append(path)
+        self._records = []
+
+    @staticmethod
+    def _read(path: str) -> Iterator[tuple]:
+        with open(path, "rb") as f:
+            while True:
+                try:
+                    batch = pickle.load(f)
+                except EOFError:
+                    return
+                yield from batch
+
+    def __iter__(self) -> Iterator[tuple]:
+        if not self._runs:
+            self._records.sort()
+            return iter(self._records)
+        if self._records:
+            self._flush()
+        return heapq.merge(*(self._read(path) for path in self._runs))
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def spilled_runs(self) -> int:
+        return len(self._runs)
+
+    def close(self):
+        """一時ファイルを削除する"""
+        self._records = []
+        self._runs = []
+        if self._tmp is not None:
+            shutil.rmtree(self._tmp, ignore_errors=True)
+            self._tmp = None
+
+
+class SpilledRawFiles:
+    """ディスク上にステム順で保持した RAW 一覧
+
+    runs のレコードは (ステム, 見つけた順番, パス)。同じステムが複数ある場合は
+    dict と同じく後から見つけたパスを使う。items() はステム順に返す。
+    """
+
+    def __init__(self, runs: SortedRuns, sidecars: Optional["SpilledSidecars"] = None):
+        self.runs = runs
+        self.sidecars = sidecars
+
+    def items(self) -> Iterator[Tuple[str, str]]:
+        previous = None
+        for stem, _, path in self.runs:
+            if previous is not None and previous[0] != stem:
+                yield previous
+            previous = (stem, path)
+        if previous is not None:
+            yield previous
+
+    def __len__(self) -> int:
+        return len(self.runs)
+
+    def close(self):
+        self.runs.close()
+        if self.sidecars is not None:
+            self.sidecars.close()
+
+
+class SpilledSidecars:
+    """ディスク上にステム順で保持したサイドカーの一覧（runs のレコードは (ステム, パス)）
+
+    get() はステムの昇順に問い合わせる（SpilledRawFiles.items() の順）。
+    前回より小さいステムを問い合わせた場合は先頭から読み直す。
+    """
+
+    def __init__(self, runs: SortedRuns):
+        self.runs = runs
+        self._cursor = None
+        self._current = None
+        self._last = None
+
+    def _next(self):
+        self._current = next(self._cursor, None)
+
+    def get(self, stem: str, default=()):
+        if self._cursor is None or stem < self._last:
+            self._cursor = iter(self.runs)
+            self._next()
+        self._last = stem
+        while self._current is not None and self._current[0] < stem:
+            self._next()
+        paths = []
+        while self._current is not None and self._current[0] == stem:
+            paths.append(self._current[1])
+            self._next()
+        return paths or default
+
+    def close(self):
+        self.runs.close()
+
+
+class SortedStemSet:
+    """昇順に追加したステムの集合（ディスク上）
+
+    ステムの昇順に問い合わせる場合にのみ使える（SpilledRawFiles.items() の順）。
+    """
+
+    def __init__(self, chunk: int, directory: Optional[str] = None):
+        self._runs = SortedRuns(chunk, directory)
+        self._last = None
+        self._cursor = None
+        self._current = None
+
+    def add(self, stem: str):
+        if stem != self._last:
+            self._runs.add((stem,))
+            self._last = stem
+
+    def __contains__(self, stem: str) -> bool:
+        if self._cursor is None:
+            self._cursor = iter(self._runs)
+            self._current = next(self._cursor, None)
+        while self._current is not None and self._current[0] < stem:
+            self._current = next(self._cursor, None)
+        return self._current is not None and self._current[0] == stem
+
+    def __len__(self) -> int:
+        return len(self._runs)
+
+    def close(self):
+        self._runs.close()
+
+
+class OnDemandStats:
+    """file_stats の代わりに、問い合わせのたびに stat する（メモリに保持しない）"""
+
+    def get(self, path: str, default=None):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return default
+        return (st.st_size, int(st.st_mtime))
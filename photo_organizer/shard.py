@@ -0,0 +1,735 @@
+"""photo_organizer の分散実行（コーディネーターとワーカー）
+
+数 TB のアーカイブを1プロセスで処理すると時間がかかるため、JPG ツリーを
+シャード（トップレベルのフォルダ、またはステムのハッシュ）に分け、複数の
+ワーカープロセス（別のホストでも可）で RAW の対応付けと移動を並列に行う。
+
+ワーカーとは共有の SQLite ファイル（キュー）でやり取りする:
+
+- raws: RAW の一覧（ステム → RAW フォルダからの相対パス）。コーディネーターが1回だけ走査して作る
+- sidecars: 同じ走査で見つけたサイドカー（ステム → 相対パス、1つのステムに複数可）
+- jpgs: --shard-by hash のときの JPG の一覧（シャード → フォルダ・ファイル名）。
+  コーディネーターが JPG ツリーを1回だけ走査して作り、ワーカーは自分のシャードの行だけを読む
+- matched: 対応付けたステムと、それを処理したシャード。同じステムの JPG が
+  複数のシャードにあっても、RAW を移動するのは最初に記録したシャードだけ
+- shards: シャードの状態（pending / running / done）・リースの期限・集計
+
+ワーカーは処理中のシャードのリースを別スレッドで延長し続ける（1つの転送が
+リースより長くかかっても取られない）。期限が切れたシャード
+（ワーカーのプロセスやホストが止まった）は別のワーカーが取り直して最初から処理する。
+移動済みの RAW は移動先にあればスキップするため、やり直しても結果は変わらない。
+全シャードが終わったら、コーディネーターが matched に無い RAW を孤立ファイルとして処理する。
+
+ワーカーはログをプロセスごとのファイル（<ログ>.<ワーカー>）に書き、コーディネーターが
+最後に自分のログへまとめる（ローテーションするのはコーディネーターだけ）。
+
+パスは --root-dir からの相対パスで記録するため、別のホストでは同じアーカイブを
+別の場所にマウントしていてもよい（--join でキューに参加する）。SQLite のロックが
+効かない共有（一部の NFS など）にはキューを置かない。
+"""
+
+import heapq
+import json
+import os
+import re
+import socket
+import sqlite3
+import threading
+import time
+import zlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from common.mirror import configure_mirrors, get_mirrors, set_mirrors
+from common.throttle import configure_throttle, lower_priority
+from common.transfer import configure_copy_engine
+from common.verify import configure_verifier, get_verifier, set_verifier
+from photo_organizer.main import (
+    _sync_raw_file,
+    _sync_sidecars,
+    handle_orphan_files,
+    log_and_echo,
+    sidecar_stem,
+    write_log,
+)
+from photo_organizer.raw_index import OnDemandStats
+
+SHARD_MODES = ("dir", "hash")
+
+# リースの長さ（秒）。ワーカーは処理中、この 1/3 ごとに別スレッドで延長する
+DEFAULT_LEASE = 60.0
+
+# ファイルを直接 JPG/ に置いた場合のシャード（--shard-by dir）
+ROOT_SHARD = "."
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS raws (stem TEXT PRIMARY KEY, path TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS sidecars (stem TEXT NOT NULL, path TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS sidecars_stem ON sidecars (stem);
+CREATE TABLE IF NOT EXISTS jpgs (key TEXT NOT NULL, dir TEXT NOT NULL, name TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS jpgs_key ON jpgs (key);
+CREATE TABLE IF NOT EXISTS matched (stem TEXT PRIMARY KEY, shard INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS shards (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    stats TEXT
+);
+"""
+
+# ワーカーのログファイル名に使えない文字（ホスト名:PID の : など）
+_UNSAFE = re.compile(r"[^\w.-]")
+
+# SQLite の1文に渡すパラメーターの数
+_LOOKUP_CHUNK = 500
+
+
+def shard_of(stem: str, count: int) -> int:
+    """ステムのハッシュによるシャード番号（ホストや実行に依らず同じ値）"""
+    return zlib.crc32(stem.encode("utf-8", "surrogateescape")) % count
+
+
+def shard_keys(jpg_dir_path: str, shard_by: str, count: int) -> List[str]:
+    """シャードの一覧（dir: JPG/ 直下のフォルダ名と ROOT_SHARD、hash: 番号）"""
+    if shard_by == "hash":
+        return [str(i) for i in range(count)]
+    with os.scandir(jpg_dir_path) as entries:
+        dirs = sorted(e.name for e in entries if e.is_dir())
+    return [ROOT_SHARD] + dirs
+
+
+def scan_jpgs(
+    jpg_dir_path: str, jpg_ext_list, count: int
+) -> Iterator[Tuple[str, str, str]]:
+    """JPG を (ハッシュのシャード, JPG フォルダからの相対フォルダ, ファイル名) で返す"""
+    for root, dirs, files in os.walk(jpg_dir_path):
+        rel = os.path.normpath(os.path.relpath(root, jpg_dir_path))
+        for file in files:
+            stem, ext = os.path.splitext(file)
+            if ext.lower() in jpg_ext_list:
+                yield str(shard_of(stem, count)), rel, file
+
+
+def shard_files(
+    queue: "ShardQueue", jpg_dir_path: str, shard_by: str, key: str
+) -> Iterator[Tuple[str, List[str]]]:
+    """シャードに含まれるファイルを (フォルダ, ファイル名の一覧) で返す
+
+    hash はコーディネーターが記録した一覧から読む（シャードごとに JPG ツリーを走査しない）
+    """
+    if shard_by == "hash":
+        for rel, files in queue.jpgs(key):
+            yield os.path.normpath(os.path.join(jpg_dir_path, rel)), files
+    elif key == ROOT_SHARD:
+        with os.scandir(jpg_dir_path) as entries:
+            yield jpg_dir_path, [e.name for e in entries if e.is_file()]
+    else:
+        yield from (
+            (root, files)
+            for root, dirs, files in os.walk(os.path.join(jpg_dir_path, key))
+        )
+
+
+def scan_raws(
+    raw_dir_path: str,
+    raw_ext_list,
+    sidecar_ext_list=frozenset(),
+    sidecars: Optional[list] = None,
+) -> Iterator[Tuple[str, str]]:
+    """RAW を (ステム, RAW フォルダからの相対パス) で返す（find_raw_files と同じ順）
+
+    同じ走査で見つけたサイドカーは sidecars（リスト）に (ステム, 相対パス) で追加する
+    """
+    for root, dirs, files in os.walk(raw_dir_path):
+        rel = os.path.relpath(root, raw_dir_path)
+        for file in files:
+            stem, ext = os.path.splitext(file)
+            ext = ext.lower()
+            if ext in raw_ext_list:
+                yield stem, os.path.normpath(os.path.join(rel, file))
+            elif sidecars is not None and ext in sidecar_ext_list:
+                sidecars.append(
+                    (
+                        sidecar_stem(file, raw_ext_list, sidecar_ext_list),
+                        os.path.normpath(os.path.join(rel, file)),
+                    )
+                )
+
+
+class ShardQueue:
+    """コーディネーターとワーカーが共有する SQLite のキュー"""
+
+    def __init__(self, path: str, timeout: float = 60.0):
+        self.path = path
+        self.db = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self.db.executescript(_SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    @contextmanager
+    def _transaction(self):
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        self.db.execute("COMMIT")
+
+    def create(
+        self,
+        settings: dict,
+        keys: Sequence[str],
+        raws: Iterable[Tuple[str, str]],
+        sidecars: Iterable[Tuple[str, str]] = (),
+        jpgs: Iterable[Tuple[str, str, str]] = (),
+    ):
+        """キューを作り直す（前回の内容は消す）。同じステムの RAW は後のものを使う
+
+        sidecars は raws を読み終えてから読む（scan_raws が走査中に追加するリストでよい）。
+        jpgs は --shard-by hash のときの scan_jpgs の結果
+        """
+        with self._transaction():
+            for table in ("meta", "raws", "sidecars", "jpgs", "matched", "shards"):
+                self.db.execute(f"DELETE FROM {table}")
+            self.db.executemany(
+                "INSERT OR REPLACE INTO raws (stem, path) VALUES (?, ?)", raws
+            )
+            self.db.executemany(
+                "INSERT INTO sidecars (stem, path) VALUES (?, ?)", sidecars
+            )
+            self.db.executemany(
+                "INSERT INTO jpgs (key, dir, name) VALUES (?, ?, ?)", jpgs
+            )
+            self.db.executemany(
+                "INSERT INTO shards (key) VALUES (?)", ((key,) for key in keys)
+            )
+            self.db.execute(
+                "INSERT INTO meta (key, value) VALUES ('settings', ?)",
+                (json.dumps(settings),),
+            )
+
+    def settings(self) -> Optional[dict]:
+        """コーディネーターが記録した設定（キューが未作成なら None）"""
+        row = self.db.execute(
+            "SELECT value FROM meta WHERE key = 'settings'"
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def claim(self, worker: str, lease: float) -> Optional[Tuple[int, str, int]]:
+        """未処理か、リースの切れたシャードを取る (id, key, 何回目の処理か)"""
+        now = time.time()
+        with self._transaction():
+            row = self.db.execute(
+                "SELECT id, key, attempts FROM shards WHERE state = 'pending' "
+                "OR (state = 'running' AND lease < ?) ORDER BY id LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            self.db.execute(
+                "UPDATE shards SET state = 'running', worker = ?, lease = ?, "
+                "attempts = attempts + 1 WHERE id = ?",
+                (worker, now + lease, row[0]),
+            )
+        return row[0], row[1], row[2] + 1
+
+    def renew(self, shard: int, worker: str, lease: float) -> bool:
+        """リースを延長する（別のワーカーに取られていたら False）"""
+        cursor = self.db.execute(
+            "UPDATE shards SET lease = ? WHERE id = ? AND worker = ? "
+            "AND state = 'running'",
+            (time.time() + lease, shard, worker),
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, shard: int, worker: str, stats: Counter) -> bool:
+        cursor = self.db.execute(
+            "UPDATE shards SET state = 'done', lease = NULL, stats = ? "
+            "WHERE id = ? AND worker = ? AND state = 'running'",
+            (json.dumps(stats), shard, worker),
+        )
+        return cursor.rowcount == 1
+
+    def done(self) -> bool:
+        """全シャードが終わったか"""
+        row = self.db.execute(
+            "SELECT COUNT(*) FROM shards WHERE state != 'done'"
+        ).fetchone()
+        return row[0] == 0
+
+    def _select(self, table: str, stems: Sequence[str]) -> Iterator[Tuple[str, str]]:
+        for i in range(0, len(stems), _LOOKUP_CHUNK):
+            chunk = stems[i : i + _LOOKUP_CHUNK]
+            yield from self.db.execute(
+                f"SELECT stem, path FROM {table} WHERE stem IN "
+                f"({','.join('?' * len(chunk))})",
+                chunk,
+            )
+
+    def jpgs(self, key: str) -> Iterator[Tuple[str, List[str]]]:
+        """シャードの JPG を (相対フォルダ, ファイル名の一覧) で返す（走査した順）"""
+        # 処理中に同じ接続で書き込むため、読み切ってから返す
+        rows = self.db.execute(
+            "SELECT dir, name FROM jpgs WHERE key = ? ORDER BY rowid", (key,)
+        ).fetchall()
+        current, files = None, []
+        for directory, name in rows:
+            if directory != current:
+                if files:
+                    yield current, files
+                current, files = directory, []
+            files.append(name)
+        if files:
+            yield current, files
+
+    def lookup(self, stems: Sequence[str]) -> Dict[str, str]:
+        """ステム → RAW の相対パス（RAW の無いステムは含まない）"""
+        return dict(self._select("raws", stems))
+
+    def sidecars(self, stems: Sequence[str]) -> Dict[str, List[str]]:
+        """ステム → サイドカーの相対パスのリスト（サイドカーの無いステムは含まない）"""
+        found: Dict[str, List[str]] = {}
+        for stem, path in self._select("sidecars", stems):
+            found.setdefault(stem, []).append(path)
+        return found
+
+    def match(self, stem: str, shard: int) -> bool:
+        """ステムを shard の対応済みとして記録する（他のシャードが記録済みなら False）"""
+        self.db.execute(
+            "INSERT OR IGNORE INTO matched (stem, shard) VALUES (?, ?)", (stem, shard)
+        )
+        row = self.db.execute(
+            "SELECT shard FROM matched WHERE stem = ?", (stem,)
+        ).fetchone()
+        return row[0] == shard
+
+    def unmatched(self) -> Iterator[Tuple[str, str]]:
+        """どの JPG とも対応しなかった RAW (ステム, 相対パス)"""
+        return self.db.execute(
+            "SELECT stem, path FROM raws r WHERE NOT EXISTS "
+            "(SELECT 1 FROM matched m WHERE m.stem = r.stem) ORDER BY rowid"
+        )
+
+    def totals(self) -> Counter:
+        """終わったシャードの集計の合計（shards: シャード数、reassigned: 取り直した数）"""
+        totals = Counter()
+        for stats, attempts in self.db.execute(
+            "SELECT stats, attempts FROM shards WHERE state = 'done'"
+        ):
+            totals.update(json.loads(stats))
+            totals["shards"] += 1
+            totals["reassigned"] += attempts > 1
+        return totals
+
+
+class _UnmatchedRaws:
+    """handle_orphan_files に渡す孤立 RAW の一覧（キューから順に読む）"""
+
+    def __init__(self, queue: ShardQueue, raw_dir_path: str):
+        self.queue = queue
+        self.raw_dir_path = raw_dir_path
+        self.sidecars = self
+
+    def items(self):
+        for stem, rel in self.queue.unmatched():
+            yield stem, os.path.join(self.raw_dir_path, rel)
+
+    def get(self, stem: str, default=()):
+        """孤立 RAW のサイドカー（sidecars として使う）"""
+        rels = self.queue.sidecars([stem]).get(stem)
+        if not rels:
+            return default
+        return [os.path.join(self.raw_dir_path, rel) for rel in rels]
+
+
+def _counters() -> Counter:
+    """このプロセスの検証・ミラーの件数（シャードごとの差分を集計に加える）"""
+    counters = Counter()
+    verifier = get_verifier()
+    if verifier:
+        counters["verified"] = verifier.files
+        counters["verify_failures"] = verifier.failures
+    mirrors = get_mirrors()
+    if mirrors:
+        counters["mirrored"] = mirrors.files
+        counters["mirror_failures"] = len(mirrors.failures)
+    return counters
+
+
+def _configure(root_dir: str, settings: dict, options: dict):
+    """ワーカーのプロセスで帯域制限・コピー方式・検証・ミラーを設定する"""
+    configure_throttle(options.get("max_bandwidth"), options.get("max_iops"))
+    configure_copy_engine(
+        options.get("buffer_size"),
+        options.get("direct_io", False),
+        options.get("drop_cache", False),
+    )
+    configure_verifier(options.get("verify"))
+    configure_mirrors(
+        root_dir, () if settings["dry_run"] else options.get("mirror", ())
+    )
+    if options.get("low_priority"):
+        lower_priority()
+
+
+def worker_id() -> str:
+    """このプロセスのワーカー名（ホスト名:プロセス ID）"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def worker_log_path(log_file: str, worker: str) -> str:
+    """ワーカーのログファイル（<log_file>.<ワーカー名>）。書くのはそのワーカーだけ"""
+    return f"{log_file}.{_UNSAFE.sub('-', worker)}"
+
+
+def _event_logger(options: dict, worker: str):
+    """JSON ログのときだけ転送イベント用のロガーを作る（ワーカーのログファイルに書く）"""
+    if options.get("log_format") != "json" or not options.get("log_file"):
+        return None
+    from common.logger import UnifiedLogger
+
+    logger = UnifiedLogger(
+        name=f"photo_organizer-worker.{worker}",
+        log_file=worker_log_path(options["log_file"], worker),
+        console=False,
+        log_format="json",
+    )
+    # fork したワーカーに残るコーディネーターのハンドラーには渡さない
+    logger.logger.propagate = False
+    return logger
+
+
+def merge_worker_logs(log_file: Optional[str], workers: Iterable[str], logger=None):
+    """ワーカーごとのログをまとめて log_file に追記し、ワーカーのログを削除する
+
+    JSON（logger を渡す）は全ワーカーのレコードを時刻順に並べて logger から書く
+    （ローテーションは logger だけが行う）。テキストはワーカーの順に続けて追記する
+    """
+    if not log_file:
+        return
+    paths = [worker_log_path(log_file, worker) for worker in workers]
+    paths = [path for path in paths if os.path.exists(path)]
+    if not paths:
+        return
+    files = [open(path, encoding="utf-8") for path in paths]
+    try:
+        if logger is not None:
+            from common.logstats import iter_events
+
+            # 各ワーカーのログは時刻順なので、読みながら並べ替える
+            logger.replay(
+                heapq.merge(
+                    *(iter_events(f) for f in files), key=lambda r: r.get("ts", 0)
+                )
+            )
+        else:
+            for f in files:
+                for line in f:
+                    write_log(log_file, line.rstrip("\n"))
+    finally:
+        for f in files:
+            f.close()
+    for path in paths:
+        os.unlink(path)
+
+
+class LeaseKeeper:
+    """処理中のシャードのリースを別スレッドで延長し続ける
+
+    延長は転送と並行して行うため、帯域制限や遅い共有、検証の読み直しで1つの
+    転送がリースより長くかかっても、シャードが別のワーカーに取られない。
+    延長できなかった（プロセスが止まっていた間に取り直された）場合は lost を立てる
+    """
+
+    def __init__(self, queue_path: str, shard: int, worker: str, lease: float):
+        self.queue_path = queue_path
+        self.shard = shard
+        self.worker = worker
+        self.lease = lease
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        # SQLite の接続はスレッドごとに作る
+        queue = ShardQueue(self.queue_path)
+        try:
+            while not self._stop.wait(self.lease / 3):
+                try:
+                    renewed = queue.renew(self.shard, self.worker, self.lease)
+                except sqlite3.OperationalError:
+                    # ロックの待ち時間切れ。次の周期にもう一度延長する
+                    continue
+                if not renewed:
+                    self.lost.set()
+                    return
+        finally:
+            queue.close()
+
+    def __enter__(self) -> "LeaseKeeper":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def process_shard(
+    queue: ShardQueue,
+    root_dir: str,
+    settings: dict,
+    shard: int,
+    key: str,
+    attempt: int,
+    worker: str,
+    lease: float,
+    log_file=None,
+    logger=None,
+) -> Optional[Counter]:
+    """1つのシャードの JPG に対応する RAW を移動・コピーする
+
+    処理の間は LeaseKeeper がリースを延長する。リースを失った（別のワーカーに
+    取り直された）場合は途中でやめて None を返す
+    """
+    raw_dir_path = os.path.join(root_dir, settings["raw_dir"])
+    jpg_dir_path = os.path.join(root_dir, settings["jpg_dir"])
+    jpg_ext_list = frozenset(settings["jpg_extensions"])
+    copy, dry_run = settings["copy"], settings["dry_run"]
+    file_stats = OnDemandStats() if copy else None
+    stats = Counter()
+    with LeaseKeeper(queue.path, shard, worker, lease) as keeper:
+        for root, files in shard_files(queue, jpg_dir_path, settings["shard_by"], key):
+            stems = [
+                os.path.splitext(f)[0]
+                for f in files
+                if os.path.splitext(f)[1].lower() in jpg_ext_list
+            ]
+            if not stems:
+                continue
+            raw_dest_dir = os.path.join(
+                raw_dir_path, os.path.relpath(root, jpg_dir_path)
+            )
+            found = queue.lookup(stems)
+            found_sidecars = queue.sidecars(stems)
+            for stem in stems:
+                if keeper.lost.is_set():
+                    return None
+                rel = found.get(stem)
+                if rel is None:
+                    stats["missing_raw"] += 1
+                    log_and_echo(
+                        f"⚠️ No RAW found for JPG: {stem}", log_file, error=True
+                    )
+                    continue
+                if not queue.match(stem, shard):
+                    stats["duplicate_jpg"] += 1
+                    log_and_echo(
+                        f"⚠️ RAW already matched by another JPG: {stem}",
+                        log_file,
+                        error=True,
+                    )
+                    continue
+                src = os.path.join(raw_dir_path, rel)
+                sidecars = [
+                    os.path.join(raw_dir_path, path)
+                    for path in found_sidecars.get(stem, ())
+                    # 止まったワーカーが移動済みのサイドカーは除く
+                    if attempt == 1
+                    or copy
+                    or os.path.lexists(os.path.join(raw_dir_path, path))
+                ]
+                if (
+                    attempt > 1
+                    and not copy
+                    and not os.path.lexists(src)
+                    and os.path.exists(
+                        os.path.join(raw_dest_dir, os.path.basename(rel))
+                    )
+                ):
+                    # 止まったワーカーが RAW を移動済み（サイドカーは残りを移す）
+                    stats["skipped"] += 1
+                    _sync_sidecars(
+                        sidecars,
+                        raw_dest_dir,
+                        copy,
+                        dry_run,
+                        log_file,
+                        file_stats,
+                        stats,
+                        settings["link_mode"],
+                        logger,
+                    )
+                    continue
+                _sync_raw_file(
+                    src,
+                    raw_dest_dir,
+                    copy,
+                    dry_run,
+                    log_file,
+                    file_stats,
+                    stats,
+                    settings["link_mode"],
+                    logger,
+                    sidecars,
+                )
+    return stats
+
+
+def run_worker(
+    queue_path: str,
+    root_dir: str,
+    options: dict,
+    worker: Optional[str] = None,
+    lease: float = DEFAULT_LEASE,
+    poll: float = 1.0,
+) -> Counter:
+    """キューのシャードを全て終わるまで処理する（他のワーカーのシャードも、
+    リースが切れたら取り直す）
+
+    options はホストごとの設定（log_file・log_format・帯域制限・コピー方式・
+    verify・mirror・low_priority）。対応付けの設定はコーディネーターが
+    キューに記録したものを使う
+    """
+    worker = worker or worker_id()
+    queue = ShardQueue(queue_path)
+    try:
+        settings = queue.settings()
+        while settings is None:
+            # コーディネーターがキューを作るのを待つ
+            time.sleep(poll)
+            settings = queue.settings()
+        _configure(root_dir, settings, options)
+        log_file = options.get("log_file")
+        if log_file:
+            log_file = (
+                worker_log_path(log_file, worker)
+                if options.get("log_format") != "json"
+                else None
+            )
+        logger = _event_logger(options, worker)
+        total = Counter()
+        while True:
+            claimed = queue.claim(worker, lease)
+            if claimed is None:
+                if queue.done():
+                    break
+                time.sleep(min(poll, lease / 4))
+                continue
+            shard, key, attempt = claimed
+            before = _counters()
+            stats = process_shard(
+                queue,
+                root_dir,
+                settings,
+                shard,
+                key,
+                attempt,
+                worker,
+                lease,
+                log_file,
+                logger,
+            )
+            if stats is None:
+                continue
+            stats.update(_counters() - before)
+            if queue.complete(shard, worker, stats):
+                total.update(stats)
+                total["shards"] += 1
+        mirrors = get_mirrors()
+        if mirrors:
+            for target, error in mirrors.failures:
+                log_and_echo(f"Mirror failed: {target}: {error}", log_file, error=True)
+        return total
+    finally:
+        queue.close()
+
+
+def run_coordinator(
+    root_dir: str,
+    settings: dict,
+    options: dict,
+    raw_ext_list,
+    sidecar_ext_list,
+    workers: int,
+    queue_path: str,
+    isolate_orphans: bool,
+    log_file=None,
+    logger=None,
+    lease: float = DEFAULT_LEASE,
+) -> Counter:
+    """キューを作り、workers 個のワーカープロセスで全シャードを処理して孤立 RAW をまとめる
+
+    ワーカーが途中で止まった場合は、残ったシャードをこのプロセスが取り直して処理する
+    """
+    raw_dir_path = os.path.join(root_dir, settings["raw_dir"])
+    jpg_dir_path = os.path.join(root_dir, settings["jpg_dir"])
+    queue = ShardQueue(queue_path)
+    try:
+        keys = shard_keys(jpg_dir_path, settings["shard_by"], settings["shards"])
+        sidecars: List[Tuple[str, str]] = []
+        jpgs = ()
+        if settings["shard_by"] == "hash":
+            jpgs = scan_jpgs(
+                jpg_dir_path, frozenset(settings["jpg_extensions"]), settings["shards"]
+            )
+        queue.create(
+            settings,
+            keys,
+            scan_raws(raw_dir_path, raw_ext_list, sidecar_ext_list, sidecars),
+            sidecars,
+            jpgs,
+        )
+        log_and_echo(
+            f"🧩 Sharded by {settings['shard_by']}: {len(keys)} shards, "
+            f"{workers} workers",
+            log_file,
+        )
+        names = [f"{worker_id()}-{i}" for i in range(workers)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(run_worker, queue_path, root_dir, options, name, lease)
+                for name in names
+            ]
+            for future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    log_and_echo(f"⚠️ Worker failed: {e!r}", log_file, error=True)
+        # 止まったワーカーのシャード（リースが切れるのを待って取り直す）
+        names.append(worker_id())
+        try:
+            run_worker(queue_path, root_dir, options, names[-1], lease)
+        finally:
+            merge_worker_logs(options.get("log_file"), names, logger)
+
+        # 集計は各ワーカーがキューに記録したもの（このプロセスの分も含む）の合計
+        stats = queue.totals()
+        before = _counters()
+        handle_orphan_files(
+            _UnmatchedRaws(queue, raw_dir_path),
+            (),
+            os.path.join(raw_dir_path, settings["orphan_dir"]),
+            isolate_orphans,
+            settings["copy"],
+            settings["dry_run"],
+            log_file,
+            link_mode=settings["link_mode"],
+            stats=stats,
+            logger=logger,
+        )
+        stats.update(_counters() - before)
+        # report_summary には合計を表示させる（このプロセスの検証・ミラーの分は集計済み）
+        set_verifier(None)
+        set_mirrors(None)
+        return stats
+    finally:
+        queue.close()
@@ -0,0 +1,135 @@
+"""--memory-budget（コンパクトな索引・ディスク上のマージジョイン）のテスト"""
+
+import os
+
+from click.testing import CliRunner
+
+from photo_organizer import main as organizer
+from photo_organizer.raw_index import (
+    MatchedStems,
+    RawIndex,
+    SortedRuns,
+    SpilledRawFiles,
+)
+
+
+def _make_tree(root, count=60):
+    """JPG/day*/ に JPG、ARW/ に RAW を置く（RAW の無い JPG・JPG の無い RAW を含む）"""
+    for i in range(count):
+        name = f"DSC{i:05d}"
+        if i % 10 != 9:
+            jpg_dir = root / "JPG" / f"day{i % 3}"
+            jpg_dir.mkdir(parents=True, exist_ok=True)
+            (jpg_dir / f"{name}.JPG").write_bytes(b"jpg")
+        if i % 10 != 5:
+            raw_dir = root / "ARW"
+            raw_dir.mkdir(parents=True, exist_ok=True)
+            (raw_dir / f"{name}.ARW").write_bytes(b"raw")
+
+
+def _tree(root):
+    return sorted(
+        os.path.relpath(os.path.join(directory, name), root)
+        for directory, _, files in os.walk(root)
+        for name in files
+    )
+
+
+def test_raw_index_matches_dict():
+    index = RawIndex()
+    expected = {}
+    for i in range(5000):
+        directory = f"/card/ARW/{i % 7}"
+        filename = f"IMG_{i % 3000:05d}é.ARW"
+        index.add(directory, filename)
+        expected[os.path.splitext(filename)[0]] = os.path.join(directory, filename)
+
+    assert len(index) == len(expected) == 3000
+    assert dict(index.items()) == expected
+    assert "IMG_00001é" in index and "IMG_99999" not in index
+    assert index["IMG_02999é"] == expected["IMG_02999é"]
+    assert index.nbytes < 200 * len(index)
+
+    matched = MatchedStems(index)
+    matched.add("IMG_00001é")
+    matched.add("IMG_00001é")
+    assert "IMG_00001é" in matched and "IMG_00002é" not in matched
+    assert len(matched) == 1
+
+
+def test_sorted_runs_merge_spilled_chunks(tmp_path):
+    runs = SortedRuns(chunk=16, directory=str(tmp_path))
+    values = [(i * 7919 % 1000,) for i in range(1000)]
+    for value in values:
+        runs.add(value)
+    assert runs.spilled_runs > 1
+    assert list(runs) == sorted(values)
+    assert list(runs) == sorted(values)
+    runs.close()
+    assert os.listdir(tmp_path) == []
+
+
+def test_bounded_modes_match_default(tmp_path):
+    results = {}
+    for budget in (None, "64M", "1K"):
+        root = tmp_path / (budget or "default")
+        _make_tree(root)
+        args = ["--root-dir", str(root), "--isolate-orphans"]
+        if budget:
+            args += ["--memory-budget", budget]
+        result = CliRunner().invoke(organizer.cli, args)
+        assert result.exit_code == 0, result.output
+        assert "Processed: 48" in result.output
+        assert "JPG without RAW: 6" in result.output
+        results[budget] = _tree(root)
+
+    assert results["64M"] == results["1K"] == results[None]
+    assert "ARW/orphans/DSC00009.ARW" in results[None]
+
+
+def test_bounded_scan_spills_over_budget(tmp_path):
+    _make_tree(tmp_path)
+    raw_dir = str(tmp_path / "ARW")
+    assert isinstance(
+        organizer.find_raw_files_bounded(raw_dir, [".arw"], 64 * 1024 * 1024),
+        RawIndex,
+    )
+    spilled = organizer.find_raw_files_bounded(raw_dir, [".arw"], 1024)
+    assert isinstance(spilled, SpilledRawFiles)
+    assert dict(spilled.items()) == organizer.find_raw_files(raw_dir, [".arw"])
+    spilled.close()
+
+
+def test_bounded_scan_spills_within_one_directory(tmp_path, monkeypatch):
+    """1つのディレクトリに大量の RAW があっても、走査の途中で書き出す"""
+    raw_dir = tmp_path / "ARW"
+    raw_dir.mkdir()
+    for i in range(3000):
+        (raw_dir / f"DSC{i:05d}.ARW").write_bytes(b"")
+    peak = []
+
+    class PeakIndex(RawIndex):
+        def add(self, directory, filename):
+            super().add(directory, filename)
+            peak.append(self.nbytes)
+
+    monkeypatch.setattr(organizer, "RawIndex", PeakIndex)
+    budget = 16 * 1024
+    spilled = organizer.find_raw_files_bounded(str(raw_dir), [".arw"], budget)
+    assert isinstance(spilled, SpilledRawFiles)
+    assert len(dict(spilled.items())) == 3000
+    spilled.close()
+    # 予算の半分を超えてから BUDGET_CHECK_ENTRIES 件以内に索引を手放す
+    assert len(peak) < 3000 and max(peak) < budget
+
+
+def test_bounded_copy_rerun_skips(tmp_path):
+    _make_tree(tmp_path, count=20)
+    args = ["--root-dir", str(tmp_path), "--copy", "--memory-budget", "1K"]
+    first = CliRunner().invoke(organizer.cli, args)
+    assert "Processed: 16" in first.output
+
+    second = CliRunner().invoke(organizer.cli, args)
+    assert second.exit_code == 0, second.output
+    assert "Processed: 0" in second.output
+    assert "Skipped (already in place): 16" in second.output
@@ -0,0 +1,273 @@
+"""--workers（シャードに分けた分散実行）のテスト"""
+
+import gzip
+import json
+import logging
+import os
+import time
+
+import pytest
+from click.testing import CliRunner
+
+from common.mirror import set_mirrors
+from common.verify import set_verifier
+from photo_organizer import main as organizer
+from photo_organizer import shard
+
+
+@pytest.fixture(autouse=True)
+def _reset():
+    yield
+    set_mirrors(None)
+    set_verifier(None)
+
+
+def _make_tree(root, count=60):
+    """JPG/day*/ と JPG/ 直下に JPG、ARW/ に RAW を置く（RAW の無い JPG・JPG の無い RAW を含む）"""
+    for i in range(count):
+        name = f"DSC{i:05d}"
+        if i % 10 != 9:
+            jpg_dir = root / "JPG" / (f"day{i % 3}" if i % 4 else "")
+            jpg_dir.mkdir(parents=True, exist_ok=True)
+            (jpg_dir / f"{name}.JPG").write_bytes(b"jpg")
+        if i % 10 != 5:
+            raw_dir = root / "ARW"
+            raw_dir.mkdir(parents=True, exist_ok=True)
+            (raw_dir / f"{name}.ARW").write_bytes(b"raw")
+
+
+def _tree(root):
+    return sorted(
+        os.path.relpath(os.path.join(directory, name), root)
+        for directory, _, files in os.walk(root)
+        for name in files
+    )
+
+
+def _options(**options):
+    return {"verify": None, "mirror": (), **options}
+
+
+def _settings(shard_by="dir", shards=4, **settings):
+    return {
+        "raw_dir": "ARW",
+        "jpg_dir": "JPG",
+        "jpg_extensions": [".jpg"],
+        "orphan_dir": "orphans",
+        "copy": False,
+        "dry_run": False,
+        "link_mode": "copy",
+        "shard_by": shard_by,
+        "shards": shards,
+        **settings,
+    }
+
+
+@pytest.mark.parametrize("shard_by", ["dir", "hash"])
+def test_sharded_matches_single_process(tmp_path, shard_by):
+    results = {}
+    for mode in ("single", "sharded"):
+        root = tmp_path / mode
+        _make_tree(root)
+        args = ["--root-dir", str(root), "--isolate-orphans"]
+        if mode == "sharded":
+            args += ["--workers", "2", "--shard-by", shard_by]
+        result = CliRunner().invoke(organizer.cli, args)
+        assert result.exit_code == 0, result.output
+        assert "Processed: 33" in result.output
+        assert "Skipped (already in place): 15" in result.output
+        assert "JPG without RAW: 6" in result.output
+        results[mode] = _tree(root)
+
+    assert results["sharded"] == results["single"]
+    assert "ARW/day1/DSC00001.ARW" in results["sharded"]
+    assert "ARW/orphans/DSC00009.ARW" in results["sharded"]
+
+
+def test_sharded_copy_rerun_skips(tmp_path):
+    _make_tree(tmp_path, count=20)
+    args = ["--root-dir", str(tmp_path), "--copy", "--verify", "--workers", "2"]
+    args += ["--shard-by", "hash", "--shard-db", str(tmp_path / "queue.sqlite3")]
+    first = CliRunner().invoke(organizer.cli, args)
+    assert first.exit_code == 0, first.output
+    assert "Processed: 11" in first.output
+    assert "Shards: 8 (reassigned: 0)" in first.output
+    assert "Verified: 11 files, failures: 0" in first.output
+
+    second = CliRunner().invoke(organizer.cli, args)
+    assert "Processed: 0" in second.output
+    assert "Skipped (already in place): 16" in second.output
+
+
+def test_lost_worker_shard_is_reassigned(tmp_path):
+    _make_tree(tmp_path, count=30)
+    queue_path = str(tmp_path / "queue.sqlite3")
+    queue = shard.ShardQueue(queue_path)
+    jpg_dir = str(tmp_path / "JPG")
+    queue.create(
+        _settings(),
+        shard.shard_keys(jpg_dir, "dir", 0),
+        shard.scan_raws(str(tmp_path / "ARW"), {".arw"}),
+    )
+
+    # 2つのシャードを取ったまま止まったワーカー（2つ目では RAW を1つ移動済み）
+    assert queue.claim("lost", lease=0.05)[1:] == (shard.ROOT_SHARD, 1)
+    shard_id, key, attempt = queue.claim("lost", lease=0.05)
+    assert key == "day0"
+    assert queue.match("DSC00003", shard_id)
+    (tmp_path / "ARW" / "day0").mkdir()
+    os.rename(tmp_path / "ARW" / "DSC00003.ARW", tmp_path / "ARW/day0/DSC00003.ARW")
+    time.sleep(0.1)
+
+    stats = shard.run_worker(queue_path, str(tmp_path), _options(), "w1", poll=0.01)
+    assert queue.done()
+    assert not queue.complete(shard_id, "lost", stats)
+    totals = queue.totals()
+    assert totals["shards"] == stats["shards"] == 4 and totals["reassigned"] == 2
+    assert (totals["processed"], totals["skipped"]) == (15, 9)
+    assert totals["missing_raw"] == 3 and "errors" not in totals
+    assert sorted(stem for stem, _ in queue.unmatched()) == [
+        "DSC00009",
+        "DSC00019",
+        "DSC00029",
+    ]
+    assert (tmp_path / "ARW" / "day0" / "DSC00003.ARW").exists()
+    queue.close()
+
+
+def test_hash_shards_read_jpgs_from_queue(tmp_path, monkeypatch):
+    _make_tree(tmp_path, count=30)
+    queue_path = str(tmp_path / "queue.sqlite3")
+    queue = shard.ShardQueue(queue_path)
+    jpg_dir = str(tmp_path / "JPG")
+    settings = _settings(shard_by="hash", shards=8)
+    queue.create(
+        settings,
+        shard.shard_keys(jpg_dir, "hash", 8),
+        shard.scan_raws(str(tmp_path / "ARW"), {".arw"}),
+        jpgs=shard.scan_jpgs(jpg_dir, {".jpg"}, 8),
+    )
+    assert (
+        sum(len(files) for key in map(str, range(8)) for _, files in queue.jpgs(key))
+        == 27
+    )
+
+    # ワーカーは JPG ツリーを走査しない（コーディネーターが1回だけ走査した一覧を読む）
+    walked = []
+    walk = os.walk
+
+    def counting(top, *args, **kwargs):
+        walked.append(top)
+        return walk(top, *args, **kwargs)
+
+    monkeypatch.setattr(os, "walk", counting)
+    stats = shard.run_worker(queue_path, str(tmp_path), _options(), "w1", poll=0.01)
+    assert walked == []
+    assert stats["shards"] == 8
+    assert (stats["processed"], stats["skipped"]) == (16, 8)
+    assert (tmp_path / "ARW" / "day1" / "DSC00001.ARW").exists()
+    queue.close()
+
+
+def test_slow_transfer_keeps_lease(tmp_path, monkeypatch):
+    _make_tree(tmp_path, count=10)
+    queue_path = str(tmp_path / "queue.sqlite3")
+    queue = shard.ShardQueue(queue_path)
+    queue.create(
+        _settings(),
+        ["day1"],
+        shard.scan_raws(str(tmp_path / "ARW"), {".arw"}),
+    )
+    shard_id, key, attempt = queue.claim("w1", lease=0.2)
+    other = shard.ShardQueue(queue_path)
+    sync_raw_file = shard._sync_raw_file
+    stolen = []
+
+    def slow(*args, **kwargs):
+        # 1つの転送がリースより長くかかる（帯域制限・遅い共有など）
+        time.sleep(0.5)
+        stolen.append(other.claim("w2", lease=0.2))
+        return sync_raw_file(*args, **kwargs)
+
+    monkeypatch.setattr(shard, "_sync_raw_file", slow)
+    stats = shard.process_shard(
+        queue, str(tmp_path), _settings(), shard_id, key, attempt, "w1", 0.2
+    )
+    assert stolen == [None, None]
+    assert stats is not None and stats["processed"] == 2
+    assert queue.complete(shard_id, "w1", stats)
+    other.close()
+    queue.close()
+
+
+def test_stem_in_two_shards_moves_once(tmp_path):
+    for day in ("day1", "day2"):
+        (tmp_path / "JPG" / day).mkdir(parents=True)
+        (tmp_path / "JPG" / day / "DSC00001.JPG").write_bytes(b"jpg")
+    (tmp_path / "ARW").mkdir()
+    (tmp_path / "ARW" / "DSC00001.ARW").write_bytes(b"raw")
+
+    result = CliRunner().invoke(
+        organizer.cli, ["--root-dir", str(tmp_path), "--workers", "2"]
+    )
+    assert result.exit_code == 0, result.output
+    assert "Processed: 1" in result.output
+    assert "JPG sharing a RAW with another JPG: 1" in result.output
+    assert "Errors" not in result.output
+    # どちらのシャードが先に対応付けるかはワーカーの順序による
+    assert _tree(tmp_path / "ARW") in (["day1/DSC00001.ARW"], ["day2/DSC00001.ARW"])
+
+
+def test_worker_logs_are_merged_by_coordinator(tmp_path):
+    _make_tree(tmp_path)
+    log_file = tmp_path / "sync.jsonl"
+    result = CliRunner().invoke(
+        organizer.cli,
+        ["--root-dir", str(tmp_path), "--workers", "2", "--log-file", str(log_file)]
+        + ["--log-format", "json", "--log-max-size", "2K"],
+    )
+    assert result.exit_code == 0, result.output
+    handler = logging.getLogger("photo_organizer").handlers[-1]
+    handler.wait_for_compression()
+
+    # ワーカーのログは残らず、ローテーションするのはコーディネーターだけ
+    names = sorted(p.name for p in tmp_path.iterdir() if p.name != "sync.jsonl")
+    assert names == ["ARW", "JPG"] + [
+        os.path.basename(p) for p in handler.rotated_files()
+    ]
+    assert all(name.endswith(".gz") for name in names[2:]) and len(names) > 3
+    records = []
+    for path in handler.rotated_files() + [str(log_file)]:
+        with (gzip.open if path.endswith(".gz") else open)(
+            path, "rt", encoding="utf-8"
+        ) as f:
+            records.extend(json.loads(line) for line in f)
+    moves = [r for r in records if r["event"] == "move"]
+    assert len(moves) == 33 and len({r["src"] for r in moves}) == 33
+    assert {r["logger"].split(".")[0] for r in moves} == {"photo_organizer-worker"}
+    handler.close()
+
+
+def test_worker_text_logs_are_merged(tmp_path):
+    _make_tree(tmp_path)
+    log_file = tmp_path / "sync.log"
+    result = CliRunner().invoke(
+        organizer.cli,
+        ["--root-dir", str(tmp_path), "--workers", "2", "--log-file", str(log_file)],
+    )
+    assert result.exit_code == 0, result.output
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["ARW", "JPG", "sync.log"]
+    text = log_file.read_text(encoding="utf-8")
+    assert text.count("No RAW found for JPG") == 6
+    assert text.index("Sharded by dir") < text.index("No RAW found for JPG")
+
+
+def test_sharded_option_errors(tmp_path):
+    _make_tree(tmp_path, count=5)
+    result = CliRunner().invoke(organizer.cli, ["--root-dir", str(tmp_path), "--join"])
+    assert result.exit_code == 2 and "requires --shard-db" in result.output
+    result = CliRunner().invoke(
+        organizer.cli,
+        ["--root-dir", str(tmp_path), "--workers", "2", "--memory-budget", "1M"],
+    )
+    assert result.exit_code == 2 and "--memory-budget" in result.output
@@ -0,0 +1,112 @@
+"""サイドカー（XMP・XML・PP3）を RAW と一緒に扱うテスト"""
+
+import os
+
+import pytest
+from click.testing import CliRunner
+
+from photo_organizer import main as organizer
+
+RAW_EXTS = frozenset({".arw"})
+SIDECAR_EXTS = frozenset({".xmp", ".xml", ".pp3"})
+
+
+def _make_tree(root):
+    """対応する RAW（サイドカー3つ）・孤立 RAW（サイドカー1つ）・RAW の無いサイドカー"""
+    (root / "JPG" / "day1").mkdir(parents=True)
+    (root / "JPG" / "day1" / "DSC00001.JPG").write_bytes(b"jpg")
+    raw = root / "ARW"
+    raw.mkdir()
+    for name in (
+        "DSC00001.ARW",
+        "DSC00001.ARW.xmp",
+        "DSC00001.xmp",
+        "DSC00001.ARW.pp3",
+        "DSC00002.ARW",
+        "DSC00002.xmp",
+        "DSC00003.xmp",
+    ):
+        (raw / name).write_bytes(name.encode())
+
+
+def _tree(root):
+    return sorted(
+        os.path.relpath(os.path.join(directory, name), root)
+        for directory, _, files in os.walk(root)
+        for name in files
+    )
+
+
+@pytest.mark.parametrize(
+    "filename, stem",
+    [
+        ("DSC00001.xmp", "DSC00001"),
+        ("DSC00001.ARW.xmp", "DSC00001"),
+        ("DSC00001.arw.PP3", "DSC00001"),
+        ("C0001M01.XML", "C0001"),
+        ("DSC00001.JPG.xmp", "DSC00001.JPG"),
+        ("DSC00001.ARW", None),
+        (".xmp", None),
+    ],
+)
+def test_sidecar_stem(filename, stem):
+    assert organizer.sidecar_stem(filename, RAW_EXTS, SIDECAR_EXTS) == stem
+
+
+@pytest.mark.parametrize(
+    "extra",
+    [[], ["--memory-budget", "64M"], ["--memory-budget", "1K"], ["--workers", "2"]],
+)
+def test_sidecars_follow_raw(tmp_path, monkeypatch, extra):
+    _make_tree(tmp_path)
+    walked = []
+    walk = os.walk
+
+    def counting(top, *args, **kwargs):
+        walked.append(os.path.basename(top))
+        return walk(top, *args, **kwargs)
+
+    monkeypatch.setattr(os, "walk", counting)
+    result = CliRunner().invoke(
+        organizer.cli, ["--root-dir", str(tmp_path), "--isolate-orphans"] + extra
+    )
+    assert result.exit_code == 0, result.output
+    # サイドカーのための追加の走査はしない
+    assert walked.count("ARW") == 1
+    assert "Processed: 1" in result.output
+    assert "Sidecars placed with RAW: 3" in result.output
+    assert _tree(tmp_path / "ARW") == [
+        "DSC00003.xmp",
+        "day1/DSC00001.ARW",
+        "day1/DSC00001.ARW.pp3",
+        "day1/DSC00001.ARW.xmp",
+        "day1/DSC00001.xmp",
+        "orphans/DSC00002.ARW",
+        "orphans/DSC00002.xmp",
+    ]
+
+
+def test_sidecars_copy_rerun_and_listing(tmp_path):
+    _make_tree(tmp_path)
+    args = ["--root-dir", str(tmp_path), "--copy"]
+    first = CliRunner().invoke(organizer.cli, args)
+    assert "Sidecars placed with RAW: 3" in first.output
+    assert "  - DSC00002.ARW\n    + DSC00002.xmp" in first.output
+    assert (tmp_path / "ARW" / "DSC00001.xmp").exists()
+    assert (tmp_path / "ARW" / "day1" / "DSC00001.xmp").exists()
+
+    second = CliRunner().invoke(organizer.cli, args)
+    assert second.exit_code == 0, second.output
+    assert "Skipped (already in place): 1" in second.output
+    assert "Sidecars placed with RAW" not in second.output
+
+
+def test_sidecars_can_be_disabled(tmp_path):
+    _make_tree(tmp_path)
+    result = CliRunner().invoke(
+        organizer.cli, ["--root-dir", str(tmp_path), "--sidecar-extensions", ""]
+    )
+    assert result.exit_code == 0, result.output
+    assert _tree(tmp_path / "ARW")[:2] == ["DSC00001.ARW.pp3", "DSC00001.ARW.xmp"]
+    assert "day1/DSC00001.ARW" in _tree(tmp_path / "ARW")
+    assert "Sidecars placed with RAW" not in result.output
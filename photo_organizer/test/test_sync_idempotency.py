@@ -0,0 +1,135 @@
+"""RAW同期の冪等性テスト"""
+
+import gzip
+import logging
+import os
+from collections import Counter
+
+from click.testing import CliRunner
+
+from photo_organizer import main as organizer
+
+
+def _make_tree(root):
+    jpg_dir = root / "JPG" / "2024" / "01"
+    raw_dir = root / "ARW"
+    jpg_dir.mkdir(parents=True)
+    raw_dir.mkdir(parents=True)
+    for name in ("IMG_001", "IMG_002"):
+        (jpg_dir / f"{name}.jpg").write_bytes(b"jpg")
+        (raw_dir / f"{name}.arw").write_bytes(b"raw" * 10)
+    return str(root / "JPG"), str(raw_dir)
+
+
+def _sync(jpg_dir, raw_dir, copy, stats):
+    file_stats = {} if copy else None
+    raw_files = organizer.find_raw_files(raw_dir, [".arw"], file_stats)
+    return organizer.sync_raw_to_jpg_structure(
+        jpg_dir,
+        raw_dir,
+        raw_files,
+        [".jpg"],
+        copy,
+        False,
+        None,
+        file_stats=file_stats,
+        stats=stats,
+    )
+
+
+def test_move_rerun_skips_without_move_or_copy(tmp_path, monkeypatch):
+    jpg_dir, raw_dir = _make_tree(tmp_path)
+
+    first = Counter()
+    _sync(jpg_dir, raw_dir, False, first)
+    assert first["processed"] == 2
+    assert os.path.exists(os.path.join(raw_dir, "2024", "01", "IMG_001.arw"))
+
+    def fail(*args, **kwargs):
+        raise AssertionError("move_or_copy must not be called for in-place files")
+
+    monkeypatch.setattr(organizer, "move_or_copy", fail)
+    second = Counter()
+    matched = _sync(jpg_dir, raw_dir, False, second)
+    assert second["skipped"] == 2
+    assert second["processed"] == 0
+    assert matched == {"IMG_001", "IMG_002"}
+
+
+def test_copy_rerun_skips_identical_destination(tmp_path, monkeypatch):
+    jpg_dir, raw_dir = _make_tree(tmp_path)
+
+    first = Counter()
+    _sync(jpg_dir, raw_dir, True, first)
+    assert first["processed"] == 2
+
+    monkeypatch.setattr(organizer, "move_or_copy", lambda *a, **k: False)
+    second = Counter()
+    _sync(jpg_dir, raw_dir, True, second)
+    assert second["skipped"] == 2
+    assert second["errors"] == 0
+
+
+def test_copy_not_in_place_when_destination_differs():
+    file_stats = {
+        os.path.normpath("ARW/IMG_001.arw"): (30, 1700000000),
+        os.path.normpath("ARW/2024/01/IMG_001.arw"): (9, 1700000000),
+    }
+    assert not organizer.is_already_in_place(
+        "ARW/IMG_001.arw", "ARW/2024/01/IMG_001.arw", True, file_stats
+    )
+    assert not organizer.is_already_in_place(
+        "ARW/IMG_001.arw", "ARW/2024/02/IMG_001.arw", True, file_stats
+    )
+    assert organizer.is_already_in_place(
+        "ARW/2024/01/IMG_001.arw", "ARW/./2024/01/IMG_001.arw", True, file_stats
+    )
+
+
+def test_rerun_appends_to_log_file(tmp_path):
+    """再実行しても前回のログを消さない"""
+    _make_tree(tmp_path)
+    log_file = tmp_path / "sync.log"
+    args = ["--root-dir", str(tmp_path), "--copy", "--log-file", str(log_file)]
+
+    for _ in range(2):
+        result = CliRunner().invoke(organizer.cli, args)
+        assert result.exit_code == 0, result.output
+
+    log = log_file.read_text(encoding="utf-8")
+    assert log.count("# RAW/JPG sync log") == 2
+    assert log.count("Processed: 2") == 1
+    assert log.count("Skipped (already in place): 2") == 1
+
+
+def test_text_log_rotates_with_log_max_size(tmp_path):
+    """--log-max-size のときはテキストの行もローテーションする"""
+    jpg_dir = tmp_path / "JPG" / "2024"
+    raw_dir = tmp_path / "ARW"
+    jpg_dir.mkdir(parents=True)
+    raw_dir.mkdir()
+    for i in range(300):
+        (jpg_dir / f"IMG_{i:04d}.jpg").write_bytes(b"jpg")
+        (raw_dir / f"IMG_{i:04d}.arw").write_bytes(b"raw")
+    log_dir = tmp_path / "rot"
+    log_dir.mkdir()
+    log_file = log_dir / "log.txt"
+    result = CliRunner().invoke(
+        organizer.cli,
+        ["--root-dir", str(tmp_path), "--log-file", str(log_file), "--dry-run"]
+        + ["--log-max-size", "2K", "--log-backups", "3"],
+    )
+    assert result.exit_code == 0, result.output
+    handler = logging.getLogger("photo_organizer").handlers[-1]
+    handler.wait_for_compression()
+    handler.close()
+
+    backups = handler.rotated_files()
+    assert len(backups) == 3 and all(p.endswith(".gz") for p in backups)
+    assert sorted(os.listdir(log_dir)) == sorted(
+        ["log.txt"] + [os.path.basename(p) for p in backups]
+    )
+    assert log_file.stat().st_size <= 2048
+    with gzip.open(backups[-1], "rt", encoding="utf-8") as f:
+        assert "IMG_" in f.read()
+    assert "Processed: 300" in log_file.read_text(encoding="utf-8")
@@ -0,0 +1,342 @@
+"""取り込みパイプライン: 取り込み → 日付フォルダへの整理 → RAW 同期 → プレビュー
+
+move/main.py → photo_organizer/main.py → make_preview を順に実行すると、
+各ツールが同じフォルダを走査し直し、同じファイルを stat し直す。
+このパイプラインはインポート元を1回だけ走査し、その stat 結果を持った
+FileMover をメモリ上で各段に渡す。
+
+- 整理: move と同じ export_dir/YYYY/MM月/YYYY-MM-DD/拡張子/ 構成に移動
+- RAW 同期: 日付フォルダのファイルを全て移動し終えた時点で、そのフォルダを
+  photo_organizer と同じ処理で同期（今回新しく作ったフォルダは走査せずに
+  移動結果から RAW の一覧を作る）
+- プレビュー: 動画は移動した時点でバックグラウンドのスレッドに渡し、
+  写真の整理と並行して日付フォルダの preview/ に作成する
+"""
+
+import os
+import sys
+
+if __name__ == "__main__":
+    # 空のインポートフォルダに対する実行は重いモジュールを読み込む前に終了する
+    from common.startup import exit_if_no_files
+
+    exit_if_no_files(
+        sys.argv[1:],
+        "--import-dir",
+        message="No files to import in {directory}",
+        tool="pipeline",
+    )
+
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import click
+
+from common.extensions import configure_classifier, get_classifier
+from common.jobs import job_options
+from common.logger import LOG_FORMATS, UnifiedLogger
+from common.profiler import start_cli_profiling
+from make_preview.encoders import BACKENDS as ENCODER_BACKENDS
+from make_preview.encoders import configure_encoder
+from move.main import COLORS, SUPPORTED_EXTENSIONS, FileMover, color_print
+from photo_organizer.main import (
+    DEFAULT_JPG_DIR,
+    DEFAULT_JPG_EXTENSIONS,
+    DEFAULT_RAW_DIR,
+    DEFAULT_RAW_EXTENSIONS,
+    find_raw_files,
+    report_summary,
+    sync_raw_to_jpg_structure,
+)
+
+PREVIEW_DIR = "preview"
+
+# プレビューを作成する動画の拡張子（LRF/LRV はカメラが作る低解像度の代替動画）
+PREVIEW_EXTENSIONS = {
+    f".{ext.lower()}"
+    for ext in SUPPORTED_EXTENSIONS["videos"]
+    if ext not in ("LRF", "LRV")
+}
+
+
+def scan_import_dir(import_dir: str) -> List[FileMover]:
+    """インポート元を1回だけ走査し、stat 結果付きの FileMover を作る"""
+    movers = [
+        FileMover(entry.path, stat_result=entry.stat())
+        for entries in get_classifier().classify_dir(import_dir).values()
+        for entry in entries
+    ]
+    movers.sort(key=lambda m: m.path.name)
+    return movers
+
+
+def group_by_date_dir(
+    movers: List[FileMover], export_dir: str
+) -> Dict[Path, List[FileMover]]:
+    """移動先の日付フォルダ（YYYY-MM-DD/）ごとにまとめる（日付順）"""
+    groups: Dict[Path, List[FileMover]] = {}
+    for mover in movers:
+        date_dir = mover.get_date_dir(export_dir)
+        groups.setdefault(date_dir, []).append(mover)
+    return dict(sorted(groups.items()))
+
+
+def _load_preview_maker() -> Optional[Callable]:
+    """make_preview を読み込む（OpenCV が無ければ None）"""
+    try:
+        from make_preview.make_preview import make_preview_movie
+    except ImportError as e:
+        color_print(f"Previews disabled: {e}", COLORS["yellow"])
+        return None
+    return make_preview_movie
+
+
+def sync_date_dir(
+    date_dir: Path,
+    movers: List[FileMover],
+    fresh: bool,
+    stats: Counter,
+    log_file: Optional[str] = None,
+    logger: Optional[UnifiedLogger] = None,
+):
+    """日付フォルダの RAW を JPG の構成に合わせる（photo_organizer と同じ処理）
+
+    fresh（今回の実行で作ったフォルダ）なら、中身は移動したファイルだけなので
+    RAW フォルダを走査せずに移動結果から一覧を作る。
+    """
+    raw_dir_path = str(date_dir / DEFAULT_RAW_DIR)
+    jpg_dir_path = str(date_dir / DEFAULT_JPG_DIR)
+    if not (os.path.isdir(raw_dir_path) and os.path.isdir(jpg_dir_path)):
+        return
+
+    if fresh:
+        raw_files = {
+            m.destination.stem: str(m.destination)
+            for m in movers
+            if m.destination is not None
+            and m.destination.parent.name == DEFAULT_RAW_DIR
+            and m.destination.suffix.lower() in DEFAULT_RAW_EXTENSIONS
+        }
+    else:
+        raw_files = find_raw_files(raw_dir_path, DEFAULT_RAW_EXTENSIONS)
+
+    sync_raw_to_jpg_structure(
+        jpg_dir_path,
+        raw_dir_path,
+        raw_files,
+        DEFAULT_JPG_EXTENSIONS,
+        False,
+        False,
+        log_file,
+        stats=stats,
+        logger=logger,
+    )
+
+
+def run_pipeline(
+    import_dir: str,
+    export_dir: str,
+    dry_run: bool = False,
+    previews: bool = True,
+    preview_workers: int = 1,
+    log_file: Optional[str] = None,
+    logger: Optional[UnifiedLogger] = None,
+) -> Tuple[Counter, Counter]:
+    """全ての段を実行する
+
+    Args:
+        log_file: RAW 同期のテキストログ（photo_organizer の --log-file 相当）
+        logger: 移動・同期のイベントを記録するロガー
+
+    Returns:
+        (取り込み・プレビューの集計, RAW 同期の集計)
+    """
+    stats = Counter()
+    sync_stats = Counter()
+
+    movers = scan_import_dir(import_dir)
+    stats["scanned"] += len(movers)
+    groups = group_by_date_dir(movers, export_dir)
+
+    make_preview = _load_preview_maker() if previews and not dry_run else None
+    executor = (
+        ThreadPoolExecutor(max_workers=preview_workers, thread_name_prefix="preview")
+        if make_preview
+        else None
+    )
+    pending = []
+
+    try:
+        for date_dir, group in groups.items():
+            fresh = not date_dir.exists()
+            for mover in group:
+                if not mover.move(export_dir, dry_run, logger):
+                    stats["errors"] += 1
+                    continue
+                stats["filed"] += 1
+                if (
+                    executor is not None
+                    and mover.destination is not None
+                    and mover.destination.suffix.lower() in PREVIEW_EXTENSIONS
+                ):
+                    pending.append(
+                        executor.submit(
+                            make_preview,
+                            str(mover.destination),
+                            str(date_dir / PREVIEW_DIR),
+                        )
+                    )
+            if not dry_run:
+                sync_date_dir(date_dir, group, fresh, sync_stats, log_file, logger)
+    finally:
+        for future in pending:
+            try:
+                future.result()
+                stats["previews"] += 1
+            except Exception as e:
+                stats["preview_errors"] += 1
+                color_print(f"Preview failed: {e}", COLORS["red"])
+        if executor is not None:
+            executor.shutdown()
+    return stats, sync_stats
+
+
+@click.command()
+@job_options("pipeline")
+@click.option("--import-dir", default=".", help="Import directory")
+@click.option("--export-dir", default="export", help="Export directory")
+@click.option(
+    "--dry-run",
+    is_flag=True,
+    help="Show what would be done without actually moving files",
+)
+@click.option(
+    "--extensions-config",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="JSON/TOML file adding or overriding the extension categories to import",
+)
+@click.option(
+    "--previews/--no-previews",
+    default=True,
+    show_default=True,
+    help="Create video previews in each date folder (requires OpenCV)",
+)
+@click.option(
+    "--preview-workers",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of threads encoding previews while files are being filed",
+)
+@click.option(
+    "--preview-backend",
+    type=click.Choice(list(ENCODER_BACKENDS)),
+    default=None,
+    help="OpenCV videoio backend for previews (default: fastest probed)",
+)
+@click.option(
+    "--preview-codec",
+    default=None,
+    help="FourCC of the previews, e.g. avc1 (default: fastest probed)",
+)
+@click.option("--log-file", type=click.Path(), help="Log file path")
+@click.option(
+    "--log-format",
+    type=click.Choice(LOG_FORMATS),
+    default="text",
+    show_default=True,
+    help="Log file format: human-readable text or JSON Lines (one event per line)",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    help="Count filesystem calls and their latency and print a report to stderr",
+)
+@click.option(
+    "--profile-output",
+    type=click.Path(dir_okay=False),
+    help="Also write the --profile report as JSON (implies --profile)",
+)
+@click.option(
+    "--cprofile",
+    type=click.Path(dir_okay=False),
+    help="Write cProfile statistics (pstats format) to this file",
+)
+def main(
+    import_dir,
+    export_dir,
+    dry_run,
+    extensions_config,
+    previews,
+    preview_workers,
+    preview_backend,
+    preview_codec,
+    log_file,
+    log_format,
+    profile,
+    profile_output,
+    cprofile,
+):
+    """
+    取り込み・日付フォルダへの整理・RAW 同期・動画プレビューを1回の走査で実行する
+
+    ファイルは move と同じ構造で整理されます:
+    export_dir/YYYY/MM月/YYYY-MM-DD/拡張子/ファイル名
+    """
+    if not os.path.isdir(import_dir):
+        raise click.ClickException(f"Import directory not found: {import_dir}")
+    try:
+        configure_classifier(extensions_config)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--extensions-config")
+    if preview_backend or preview_codec:
+        try:
+            configure_encoder(preview_backend, preview_codec)
+        except ValueError as e:
+            raise click.BadParameter(str(e))
+    start_cli_profiling(profile, profile_output, cprofile)
+
+    logger = None
+    if log_file:
+        logger = UnifiedLogger(
+            name="pipeline", log_file=log_file, console=False, log_format=log_format
+        )
+
+    mode = "DRY RUN" if dry_run else "ACTUAL RUN"
+    color_print(f"=== Import Pipeline ({mode}) ===", COLORS["blue"])
+    color_print(f"Import directory: {import_dir}", COLORS["blue"])
+    color_print(f"Export directory: {export_dir}", COLORS["blue"])
+
+    start = time.perf_counter()
+    stats, sync_stats = run_pipeline(
+        import_dir,
+        export_dir,
+        dry_run=dry_run,
+        previews=previews,
+        preview_workers=preview_workers,
+        log_file=log_file if log_format == "text" else None,
+        logger=logger,
+    )
+    elapsed = time.perf_counter() - start
+
+    color_print("\n=== Summary ===", COLORS["blue"])
+    color_print(f"Filed: {stats['filed']} / {stats['scanned']} files", COLORS["green"])
+    if stats["errors"]:
+        color_print(f"Errors: {stats['errors']} files", COLORS["red"])
+    if not dry_run:
+        report_summary(sync_stats)
+        if previews:
+            color_print(
+                f"Previews: {stats['previews']} "
+                f"(failed: {stats['preview_errors']})",
+                COLORS["green"],
+            )
+    color_print(f"Elapsed: {elapsed:.2f}s", COLORS["blue"])
+
+
+if __name__ == "__main__":
+    main()
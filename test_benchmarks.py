@@ -0,0 +1,104 @@
+"""ベンチマーク用ツリー生成とランナーのテスト"""
+
+import os
+
+import pytest
+
+from benchmarks import (
+    bench_async_move,
+    bench_fanout,
+    bench_layout,
+    bench_memory,
+    bench_segmented,
+    bench_tools,
+)
+from benchmarks.cardgen import generate_card
+
+
+def _snapshot(root):
+    entries = []
+    for dirpath, _, files in os.walk(root):
+        for name in files:
+            st = os.stat(os.path.join(dirpath, name))
+            rel = os.path.relpath(os.path.join(dirpath, name), root)
+            entries.append((rel, st.st_size, int(st.st_mtime)))
+    return sorted(entries)
+
+
+def test_same_seed_same_tree(tmp_path):
+    options = dict(files=300, photo_size=1024, raw_size=4096, video_size=1 << 30)
+    first = generate_card(str(tmp_path / "a"), seed=7, **options)
+    second = generate_card(str(tmp_path / "b"), seed=7, **options)
+    other = generate_card(str(tmp_path / "c"), seed=8, **options)
+
+    assert first == second
+    assert _snapshot(tmp_path / "a") == _snapshot(tmp_path / "b")
+    assert _snapshot(tmp_path / "a") != _snapshot(tmp_path / "c")
+    assert os.path.isdir(tmp_path / "a" / "DCIM" / "100MSDCF")
+    assert first["files"] == len(_snapshot(tmp_path / "a"))
+    assert other["files"] == len(_snapshot(tmp_path / "c"))
+
+
+def test_videos_are_sparse(tmp_path):
+    generate_card(str(tmp_path), files=20, video_ratio=1.0, video_size=1 << 30)
+    clip = tmp_path / "PRIVATE" / "M4ROOT" / "CLIP" / "C0001.MP4"
+    st = clip.stat()
+    assert st.st_size == 1 << 30
+    assert st.st_blocks * 512 < 1 << 20
+
+
+def test_organizer_layout_orphans(tmp_path):
+    counts = generate_card(
+        str(tmp_path), files=100, layout="organizer", raw_ratio=1.0, orphan_ratio=1.0
+    )
+    assert counts == {"ARW": 100, "files": 100, "bytes": 0}
+    assert len(os.listdir(tmp_path / "ARW")) == 100
+
+
+def test_runners_write_results():
+    names = ("find_raw_files", "sync_raw_to_jpg_structure", "move_files")
+    results = bench_tools.run_benchmarks(names, files=50, seed=0, repeat=1)
+    assert [r["name"] for r in results] == list(names)
+    assert all(r["items"] > 0 and r["seconds"] > 0 for r in results)
+
+
+def test_memory_measure_reports_peak_rss(tmp_path):
+    generate_card(str(tmp_path), files=50, layout="organizer")
+    result = bench_memory.measure(str(tmp_path), "1K")
+    assert result["budget"] == "1K"
+    assert result["peak_rss"] > 1024 * 1024
+
+
+def test_async_move_benchmark_with_latency(tmp_path):
+    stat = os.stat
+    result = bench_async_move.measure(str(tmp_path), 20, 0, 0.0001, "async", 4)
+    assert result["files"] > 0 and result["seconds"] > 0
+    assert os.stat is stat
+
+
+def test_fanout_benchmark_reads_source_once(tmp_path):
+    src = tmp_path / "src.bin"
+    src.write_bytes(os.urandom(100_000))
+    results = {
+        mode: bench_fanout.measure(str(tmp_path), [str(src)], 2, mode, 4096)
+        for mode in bench_fanout.MODES
+    }
+    assert results["sequential"]["read_bytes"] == 3 * 100_000
+    assert results["fanout"]["read_bytes"] == 100_000
+
+
+def test_layout_benchmark_matches_legacy_paths():
+    movers = bench_layout.make_movers(200, days=3, seed=0)
+    layout = bench_layout.layout_export_dir(bench_layout.Layout("default"))
+    for mover in movers:
+        assert layout(mover, "export") == bench_layout.legacy_export_dir(
+            mover, "export"
+        )
+
+
+def test_segmented_benchmark_measures(tmp_path):
+    pytest.importorskip("cv2")
+    clip = str(tmp_path / "C0001.MP4")
+    bench_segmented.make_clip(clip, 1, fps=10, size=(320, 240))
+    assert bench_segmented.measure(clip, str(tmp_path), 0, 0.5) > 0
+    assert bench_segmented.measure(clip, str(tmp_path), 2, 0.5) > 0
@@ -0,0 +1,91 @@
+"""ディレクトリ作成キャッシュのテスト"""
+
+import os
+from collections import Counter
+
+import pytest
+
+from common import dircache
+from move import main as mover
+from photo_organizer import main as organizer
+
+
+@pytest.fixture
+def mkdir_calls(monkeypatch):
+    """os.mkdir の呼び出しをパスごとに数える"""
+    dircache.clear_dir_cache()
+    calls = Counter()
+    real_mkdir = os.mkdir
+
+    def counting_mkdir(path, *args, **kwargs):
+        calls[os.path.normpath(os.fspath(path))] += 1
+        return real_mkdir(path, *args, **kwargs)
+
+    monkeypatch.setattr(os, "mkdir", counting_mkdir)
+    yield calls
+    dircache.clear_dir_cache()
+
+
+def test_move_files_mkdir_once_per_directory(tmp_path, mkdir_calls):
+    import_dir = tmp_path / "import"
+    export_dir = tmp_path / "export"
+    import_dir.mkdir()
+    for i in range(20):
+        path = import_dir / f"DSC{i:05d}.JPG"
+        path.write_bytes(b"x")
+        os.utime(path, (1700000000, 1700000000 + (i % 2) * 86400))
+
+    success, errors = mover.move_files("JPG", str(import_dir), str(export_dir))
+
+    assert (success, errors) == (20, 0)
+    assert mkdir_calls
+    assert max(mkdir_calls.values()) == 1
+
+
+def test_move_or_copy_mkdir_once_per_directory(tmp_path, mkdir_calls):
+    src_dir = tmp_path / "src"
+    src_dir.mkdir()
+    dest_dir = tmp_path / "ARW" / "2024" / "01"
+    for i in range(10):
+        src = src_dir / f"IMG_{i:03d}.arw"
+        src.write_bytes(b"raw")
+        assert organizer.move_or_copy(str(src), str(dest_dir / src.name))
+
+    assert mkdir_calls[os.path.normpath(str(dest_dir))] == 1
+    assert max(mkdir_calls.values()) == 1
+
+
+def test_invalidate_recreates_removed_directory(tmp_path, mkdir_calls):
+    target = tmp_path / "a" / "b"
+    assert dircache.ensure_dir(target)
+    assert not dircache.ensure_dir(target)
+
+    os.rmdir(target)
+    dircache.invalidate_dir(tmp_path / "a")
+    assert dircache.ensure_dir(target)
+    assert target.is_dir()
+
+
+def test_relative_paths_read_cwd_once(tmp_path, monkeypatch, mkdir_calls):
+    monkeypatch.chdir(tmp_path)
+    getcwd = Counter()
+    real_getcwd = os.getcwd
+
+    def counting_getcwd():
+        getcwd["calls"] += 1
+        return real_getcwd()
+
+    monkeypatch.setattr(os, "getcwd", counting_getcwd)
+    for i in range(10):
+        dircache.ensure_dir(os.path.join("export", f"day{i % 2}"))
+    # 相対パスと絶対パスは同じディレクトリとして扱う
+    assert not dircache.ensure_dir(tmp_path / "export" / "day0")
+    assert getcwd["calls"] == 1
+    assert mkdir_calls[os.path.join(str(tmp_path), "export", "day1")] == 1
+
+    # clear_dir_cache() の後は作業ディレクトリを取得し直す
+    (tmp_path / "other").mkdir()
+    monkeypatch.chdir(tmp_path / "other")
+    dircache.clear_dir_cache()
+    assert dircache.ensure_dir("export")
+    assert (tmp_path / "other" / "export").is_dir()
@@ -0,0 +1,125 @@
+"""common/extensions.py（拡張子の分類）のテスト"""
+
+import json
+
+import pytest
+from click.testing import CliRunner
+
+from common.extensions import (
+    DEFAULT_CATEGORIES,
+    ExtensionClassifier,
+    extension_set,
+    for_suffixes,
+    get_classifier,
+    load_categories,
+    set_classifier,
+)
+from common.profiler import IOProfiler
+from move import main as move
+from photo_organizer.main import cli as photo_organizer_cli
+
+
+@pytest.fixture(autouse=True)
+def _reset_classifier():
+    yield
+    set_classifier(None)
+
+
+def test_mixed_case_and_compound_extensions():
+    classifier = ExtensionClassifier(
+        {"raw": [".ARW", "dng"], "sidecars": ["xmp", "arw.xmp"]}
+    )
+    assert classifier.split("DSC00001.arw") == ("DSC00001", "arw", "raw")
+    assert classifier.split("DSC00001.Arw") == ("DSC00001", "Arw", "raw")
+    assert classifier.split("DSC00001.ARW.xmp") == ("DSC00001", "ARW.xmp", "sidecars")
+    assert classifier.split("DSC00001.JPG.xmp") == ("DSC00001.JPG", "xmp", "sidecars")
+    assert classifier.split("notes.txt") == ("notes", "txt", None)
+    assert classifier.split(".arw") == (".arw", "", None)
+    assert classifier.split("README") == ("README", "", None)
+    with pytest.raises(TypeError):
+        classifier.table["jpg"] = "images"
+
+
+def test_conflicting_categories():
+    with pytest.raises(ValueError):
+        ExtensionClassifier({"images": ["arw"], "raw": ["ARW"]})
+
+
+def test_suffixes_match_previous_get_suffixes():
+    expected = sorted(
+        {
+            s
+            for exts in DEFAULT_CATEGORIES.values()
+            for ext in exts
+            for s in (ext.lower(), ext.upper())
+        }
+    )
+    assert move.get_suffixes() == expected
+    assert get_classifier().suffixes() is get_classifier().suffixes()
+    assert move.SUPPORTED_EXTENSIONS["images"][:2] == ["JPEG", "JPG"]
+
+
+def test_classify_dir_single_scan(tmp_path):
+    for name in ("A.JPG", "b.jpg", "C.MP4", "notes.txt"):
+        (tmp_path / name).write_bytes(b"x")
+    (tmp_path / "folder.jpg").mkdir()
+    with IOProfiler() as profiler:
+        result = get_classifier().classify_dir(str(tmp_path))
+    assert profiler.counts().get("scandir") == 1
+    assert "stat" not in profiler.counts()
+    assert {c: sorted(e.name for e in entries) for c, entries in result.items()} == {
+        "images": ["A.JPG", "b.jpg"],
+        "videos": ["C.MP4"],
+    }
+    by_ext = for_suffixes(["JPG", "jpg", "mp4"]).classify_dir(str(tmp_path))
+    assert sorted(by_ext) == ["jpg", "mp4"]
+
+
+def test_load_categories(tmp_path):
+    toml = tmp_path / "extensions.toml"
+    toml.write_text('[categories]\nimages = ["jpg"]\nraw = ["arw", "dng"]\n')
+    categories = load_categories(str(toml))
+    assert categories["images"] == ("jpg",)
+    assert categories["raw"] == ("arw", "dng")
+    ExtensionClassifier(categories)
+    assert categories["videos"] == DEFAULT_CATEGORIES["videos"]
+
+    path = tmp_path / "extensions.json"
+    path.write_text(
+        json.dumps({"replace_defaults": True, "categories": {"raw": ["arw"]}})
+    )
+    assert load_categories(str(path)) == {"raw": ("arw",)}
+    path.write_text(json.dumps({"categories": {"raw": ["ARW"]}}))
+    assert "arw" not in load_categories(str(path))["images"]
+    path.write_text(json.dumps({"categories": ["arw"]}))
+    with pytest.raises(ValueError):
+        load_categories(str(path))
+    assert extension_set(["ARW", ".dng ", ""]) == {".arw", ".dng"}
+
+
+def test_cli_extensions_config(tmp_path):
+    config = tmp_path / "extensions.json"
+    config.write_text(json.dumps({"categories": {"raw": ["dng"], "jpg": ["jpg"]}}))
+    card = tmp_path / "card"
+    card.mkdir()
+    for name in ("DSC00001.DNG", "DSC00001.JPG"):
+        (card / name).write_bytes(b"x")
+
+    args = ["--import-dir", str(card), "--export-dir", str(tmp_path / "out")]
+    result = CliRunner().invoke(move.main, args + ["--extensions-config", str(config)])
+    assert result.exit_code == 0, result.output
+    moved = sorted(p.name for p in (tmp_path / "out").rglob("*") if p.is_file())
+    assert moved == ["DSC00001.DNG", "DSC00001.JPG"]
+
+    # photo_organizer は設定の raw / jpg の分類を既定の拡張子として使う
+    root = tmp_path / "root"
+    (root / "ARW").mkdir(parents=True)
+    (root / "JPG" / "picks").mkdir(parents=True)
+    (root / "ARW" / "DSC00002.dng").write_bytes(b"x")
+    (root / "JPG" / "picks" / "DSC00002.JPG").write_bytes(b"x")
+    result = CliRunner().invoke(
+        photo_organizer_cli,
+        ["--root-dir", str(root), "--extensions-config", str(config)],
+    )
+    assert result.exit_code == 0, result.output
+    assert (root / "ARW" / "picks" / "DSC00002.dng").exists()
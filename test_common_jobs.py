@@ -0,0 +1,154 @@
+"""common/jobs.py（ジョブファイル）のテスト"""
+
+import json
+
+import pytest
+from click.testing import CliRunner
+
+from common import jobs
+from common.startup import exit_if_no_files
+from make_preview import still_preview
+from move import main as move
+from photo_organizer.main import cli as photo_organizer_cli
+from pipeline.main import main as pipeline_main
+
+JOBS_TOML = """
+[jobs.card-a]
+description = "カード A → アーカイブ B"
+import_dir = "{card}"
+export_dir = "{archive}"
+max_bandwidth = "100M"
+verify = "readback"
+
+[jobs.card-a.move]
+concurrency = 2
+layout = "{{ext}}"
+
+[jobs.card-a.photo_organizer]
+root_dir = "{archive}"
+copy = true
+link_mode = "hardlink"
+
+[jobs.empty]
+import_dir = "{empty}"
+"""
+
+
+@pytest.fixture
+def jobs_file(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    for name in ("card", "archive", "empty"):
+        (tmp_path / name).mkdir()
+    path = tmp_path / "jobs.toml"
+    path.write_text(
+        JOBS_TOML.format(
+            card=tmp_path / "card",
+            archive=tmp_path / "archive",
+            empty=tmp_path / "empty",
+        )
+    )
+    return path
+
+
+def test_shared_keys_are_options():
+    commands = [move.main, photo_organizer_cli, pipeline_main, still_preview.main]
+    options = {p.name for command in commands for p in command.params}
+    assert jobs.SHARED_KEYS <= options
+
+
+def test_resolve_job(jobs_file):
+    loaded = jobs.read_jobs(str(jobs_file))
+    assert jobs.job_names(str(jobs_file)) == ["card-a", "empty"]
+    values = jobs.resolve_job(loaded, "card-a", "move")
+    assert values["concurrency"] == 2 and values["verify"] == "readback"
+    assert "description" not in values and "link_mode" not in values
+
+    # photo_organizer は import_dir / export_dir を持たないため除かれる
+    values = jobs.load_job(
+        str(jobs_file), "card-a", "photo_organizer", photo_organizer_cli
+    )
+    assert values["link_mode"] == "hardlink"
+    assert "import_dir" not in values and "concurrency" not in values
+    with pytest.raises(ValueError, match="available: card-a, empty"):
+        jobs.resolve_job(loaded, "card-b", "move")
+
+
+@pytest.mark.parametrize(
+    "job, message",
+    [
+        ({"move": {"concurrency": 0}}, "concurrency"),
+        ({"move": {"max_bandwidth": "fast"}}, "max_bandwidth"),
+        ({"move": {"link_mode": "hardlink"}}, "has no option 'link_mode'"),
+        ({"move": {"job": "other"}}, "has no option 'job'"),
+        ({"verify": "sometimes"}, "verify"),
+    ],
+)
+def test_invalid_job_options(tmp_path, monkeypatch, job, message):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    path = tmp_path / "jobs.json"
+    path.write_text(json.dumps({"jobs": {"bad": job}}))
+    with pytest.raises(ValueError, match=message):
+        jobs.load_job(str(path), "bad", "move", move.main)
+
+
+def test_invalid_job_file(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    path = tmp_path / "jobs.toml"
+    path.write_text("[jobs.card]\nconcurency = 4\n")
+    with pytest.raises(ValueError, match="unknown key 'concurency'"):
+        jobs.read_jobs(str(path))
+    path.write_text("[jobs.card.move]\nlayout = 2024-01-01T00:00:00\n")
+    with pytest.raises(ValueError, match="unsupported value"):
+        jobs.read_jobs(str(path))
+
+
+def test_validated_jobs_are_cached(jobs_file, monkeypatch):
+    path = str(jobs_file)
+    first = jobs.load_job(path, "card-a", "move", move.main)
+
+    # 2回目はジョブファイルを解析せず、検証もしない
+    def fail(*args):
+        raise AssertionError("not cached")
+
+    monkeypatch.setattr(jobs, "_parse", fail)
+    monkeypatch.setattr(jobs, "validate_values", fail)
+    assert jobs.load_job(path, "card-a", "move", move.main) == first
+    monkeypatch.undo()
+    monkeypatch.setenv("XDG_CACHE_HOME", str(jobs_file.parent / "cache"))
+
+    # ジョブファイルが変われば読み直す
+    jobs_file.write_text(jobs_file.read_text().replace("concurrency = 2", "pair = 1"))
+    values = jobs.load_job(path, "card-a", "move", move.main)
+    assert "concurrency" not in values and values["pair"] == 1
+
+
+def test_cli_uses_job(jobs_file, tmp_path):
+    (tmp_path / "card" / "DSC00001.JPG").write_bytes(b"x")
+    args = ["--jobs-file", str(jobs_file), "--job", "card-a"]
+    result = CliRunner().invoke(move.main, args + ["--dry-run"])
+    assert result.exit_code == 0, result.output
+    assert "Async engine: up to 2 operations" in result.output
+    assert "Successfully processed: 1 files" in result.output
+
+    # コマンドラインのオプションはジョブより優先
+    result = CliRunner().invoke(move.main, args + ["--dry-run", "--concurrency", "1"])
+    assert "Async engine: up to 1 operations" in result.output
+    result = CliRunner().invoke(move.main, args)
+    assert result.exit_code == 0, result.output
+    assert (tmp_path / "archive" / "JPG" / "DSC00001.JPG").exists()
+
+    result = CliRunner().invoke(
+        move.main, ["--jobs-file", str(jobs_file), "--job", "x"]
+    )
+    assert result.exit_code == 2
+    assert "Unknown job" in result.output
+
+
+def test_startup_reads_import_dir_from_job(jobs_file, monkeypatch):
+    monkeypatch.setenv("XDG_CONFIG_HOME", str(jobs_file.parent / "config"))
+    args = ["--jobs-file", str(jobs_file), "--job", "empty"]
+    with pytest.raises(SystemExit):
+        exit_if_no_files(args, "--import-dir", tool="move")
+    # コマンドラインの --import-dir が優先、読めないジョブは click に任せる
+    exit_if_no_files(args + ["--import-dir", str(jobs_file.parent)], "--import-dir")
+    exit_if_no_files(["--job", "empty"], "--import-dir", tool="move")
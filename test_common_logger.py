@@ -1,16 +1,28 @@
 #!/usr/bin/env python3
 """共通ログ機構のテストスクリプト"""
 
+import gzip
+import json
+import logging
+import os
 import tempfile
+import threading
+import time
 from pathlib import Path
-from common.logger import UnifiedLogger, create_logger, create_file_logger, create_console_logger
+from common.logger import (
+    RotatingLogHandler,
+    UnifiedLogger,
+    create_logger,
+    create_file_logger,
+    create_console_logger,
+)
 
 
 def test_console_logger():
     """コンソールログのテスト"""
     print("=== Console Logger Test ===")
     logger = create_console_logger("test_console")
-    
+
     logger.info("This is an info message")
     logger.warning("This is a warning message")
     logger.error("This is an error message")
@@ -22,25 +34,25 @@ def test_console_logger():
 def test_file_logger():
     """ファイルログのテスト"""
     print("\n=== File Logger Test ===")
-    
-    with tempfile.NamedTemporaryFile(suffix='.log', delete=False) as tmp:
+
+    with tempfile.NamedTemporaryFile(suffix=".log", delete=False) as tmp:
         log_file = tmp.name
-    
+
     logger = create_file_logger("test_file", log_file)
-    
+
     logger.start_operation("Test Operation", param1="value1", param2="value2")
     logger.info("Processing files...")
     logger.success("File processed successfully")
     logger.warning("Minor issue detected")
     logger.end_operation("Test Operation", success_count=5, error_count=1)
-    
+
     print(f"Log file created: {log_file}")
-    
+
     # ログファイルの内容を表示
-    with open(log_file, 'r', encoding='utf-8') as f:
+    with open(log_file, "r", encoding="utf-8") as f:
         print("Log file contents:")
         print(f.read())
-    
+
     # クリーンアップ
     Path(log_file).unlink()
 
@@ -48,28 +60,165 @@ def test_file_logger():
 def test_unified_logger():
     """統一ログのテスト"""
     print("\n=== Unified Logger Test ===")
-    
-    with tempfile.NamedTemporaryFile(suffix='.log', delete=False) as tmp:
+
+    with tempfile.NamedTemporaryFile(suffix=".log", delete=False) as tmp:
         log_file = tmp.name
-    
+
     # コンソールとファイル両方に出力
     logger = UnifiedLogger("test_unified", log_file=log_file, console=True)
-    
+
     logger.separator("*", 40)
     logger.info("Testing unified logger")
     logger.debug("This debug message won't appear (level is INFO)")
     logger.success("All tests passed!")
     logger.separator("*", 40)
-    
+
     print(f"Log file created: {log_file}")
-    
+
     # クリーンアップ
     Path(log_file).unlink()
 
 
+def test_json_logger_writes_events(tmp_path):
+    """JSON Lines 形式のテスト"""
+    log_file = tmp_path / "events.jsonl"
+    logger = UnifiedLogger(
+        "test_json", log_file=str(log_file), console=False, log_format="json"
+    )
+
+    logger.info("plain message")
+    logger.event(
+        "move",
+        "Moved: %s -> %s",
+        "a.jpg",
+        "b/a.jpg",
+        src="a.jpg",
+        dst="b/a.jpg",
+        bytes=10,
+        duration=0.5,
+    )
+
+    records = [
+        json.loads(line) for line in log_file.read_text(encoding="utf-8").splitlines()
+    ]
+    assert records[0]["event"] == "message"
+    assert records[0]["message"] == "plain message"
+    assert records[1]["event"] == "move"
+    assert records[1]["src"] == "a.jpg"
+    assert records[1]["bytes"] == 10
+    assert "message" not in records[1]
+
+
+def test_event_formatting_is_deferred(tmp_path):
+    """書き出すハンドラーがなければメッセージを組み立てない"""
+    formatted = []
+
+    class Spy:
+        def __str__(self):
+            formatted.append(True)
+            return "spy"
+
+    log_file = tmp_path / "events.jsonl"
+    logger = UnifiedLogger(
+        "test_lazy", log_file=str(log_file), console=False, log_format="json"
+    )
+    logger.logger.propagate = False  # pytest のログキャプチャを除外
+    logger.event("move", "%s", Spy(), src="a")
+    logger.event("debug_only", "%s", Spy(), level=logging.DEBUG)
+    assert formatted == []
+
+    text_file = tmp_path / "events.log"
+    text_logger = UnifiedLogger(
+        "test_lazy_text", log_file=str(text_file), console=False
+    )
+    text_logger.event("move", src="a.jpg", dst="b.jpg", bytes=3)
+    assert "move a.jpg -> b.jpg bytes=3" in text_file.read_text(encoding="utf-8")
+
+
+def _read_all_lines(log_file):
+    """ローテーション済み（gzip）と現在のログの全行"""
+    lines = []
+    for path in sorted(log_file.parent.glob(log_file.name + ".*")):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            lines.extend(f.read().splitlines())
+    lines.extend(log_file.read_text(encoding="utf-8").splitlines())
+    return lines
+
+
+def test_rotation_under_concurrent_writers(tmp_path):
+    """複数スレッドから書き込んでも行が欠けたり混ざったりしない"""
+    log_file = tmp_path / "move.jsonl"
+    logger = UnifiedLogger(
+        "test_rotate",
+        log_file=str(log_file),
+        console=False,
+        log_format="json",
+        max_bytes=4096,
+        backup_count=0,
+    )
+    logger.logger.propagate = False
+    handler = logger.logger.handlers[0]
+    assert isinstance(handler, RotatingLogHandler)
+
+    def writer(n):
+        for i in range(300):
+            logger.event("move", src=f"w{n}/{i}.jpg", dst="x", bytes=i)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    handler.wait_for_compression()
+
+    rotated = handler.rotated_files()
+    assert len(rotated) > 10
+    assert all(path.endswith(".gz") for path in rotated)
+    records = [json.loads(line) for line in _read_all_lines(log_file)]
+    assert sorted(r["src"] for r in records) == sorted(
+        f"w{n}/{i}.jpg" for n in range(8) for i in range(300)
+    )
+    handler.close()
+
+
+def test_rotation_keeps_backup_count(tmp_path):
+    log_file = tmp_path / "sync.log"
+    handler = RotatingLogHandler(str(log_file), max_bytes=100, backup_count=2)
+    logger = logging.getLogger("test_backups")
+    logger.propagate = False
+    logger.addHandler(handler)
+    for i in range(50):
+        logger.warning("line %d %s", i, "x" * 40)
+    handler.wait_for_compression()
+
+    assert len(handler.rotated_files()) == 2
+    lines = _read_all_lines(log_file)
+    assert lines[-1].startswith("line 49")
+    logger.removeHandler(handler)
+    handler.close()
+
+
+def test_time_rotation_after_previous_run(tmp_path):
+    """前回の実行で書かれたファイルは日付が変わっていればローテーションする"""
+    log_file = tmp_path / "daily.log"
+    log_file.write_text("yesterday\n", encoding="utf-8")
+    old = time.time() - 2 * 86400
+    os.utime(log_file, (old, old))
+
+    handler = RotatingLogHandler(str(log_file), rotate="daily")
+    handler.emit(logging.makeLogRecord({"msg": "today"}))
+    handler.close()
+
+    rotated = handler.rotated_files()
+    assert len(rotated) == 1
+    with gzip.open(rotated[0], "rt", encoding="utf-8") as f:
+        assert f.read() == "yesterday\n"
+    assert log_file.read_text(encoding="utf-8") == "today\n"
+
+
 if __name__ == "__main__":
     test_console_logger()
     test_file_logger()
     test_unified_logger()
-    
+
     print("\n✅ All tests completed successfully!")
@@ -0,0 +1,75 @@
+"""JSON Lines ログ集計のテスト"""
+
+import json
+import os
+import subprocess
+import sys
+
+from click.testing import CliRunner
+
+from common import logstats
+from move import main as mover
+
+
+def test_aggregate_throughput():
+    lines = [
+        json.dumps({"ts": 100.0, "event": "message", "message": "start"}),
+        json.dumps({"ts": 101.0, "event": "move", "bytes": 1000, "duration": 0.5}),
+        "not json",
+        json.dumps({"ts": 102.0, "event": "move", "bytes": 3000, "duration": 1.5}),
+        json.dumps({"ts": 104.0, "event": "error", "error": "boom"}),
+    ]
+
+    stats = logstats.aggregate(logstats.iter_events(lines))
+
+    assert stats["wall_seconds"] == 4.0
+    move = stats["events"]["move"]
+    assert move["count"] == 2
+    assert move["bytes"] == 4000
+    assert move["throughput_bytes_per_sec"] == 2000
+    assert move["files_per_sec"] == 0.5
+    assert move["duration_max"] == 1.5
+    assert stats["events"]["error"]["count"] == 1
+
+
+def test_move_json_log_roundtrip(tmp_path):
+    import_dir = tmp_path / "import"
+    import_dir.mkdir()
+    for i in range(3):
+        (import_dir / f"DSC{i}.JPG").write_bytes(b"x" * 100)
+    log_file = tmp_path / "move.jsonl"
+
+    result = CliRunner().invoke(
+        mover.main,
+        [
+            "--import-dir",
+            str(import_dir),
+            "--export-dir",
+            str(tmp_path / "export"),
+            "--log-file",
+            str(log_file),
+            "--log-format",
+            "json",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+
+    result = CliRunner().invoke(logstats.main, [str(log_file), "--json"])
+    assert result.exit_code == 0, result.output
+    stats = json.loads(result.output)
+    assert stats["events"]["move"]["count"] == 3
+    assert stats["events"]["move"]["bytes"] == 300
+    assert os.path.getsize(log_file) > 0
+
+
+def test_logstats_does_not_import_transfer():
+    """集計ツールはコピー処理（common.transfer）を読み込まない"""
+    code = "import sys, common.logstats; print('common.transfer' in sys.modules)"
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == "False"
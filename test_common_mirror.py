@@ -0,0 +1,205 @@
+"""ミラー（1回の読み込みで複数のコピー先に書き込む）のテスト"""
+
+import errno
+import hashlib
+import os
+
+import pytest
+from click.testing import CliRunner
+
+from common import transfer
+from common.dircache import clear_dir_cache
+from common.mirror import Mirrors, get_mirrors, set_mirrors
+from common.verify import set_verifier
+from move import main as move
+from photo_organizer.main import cli as photo_organizer_cli
+
+BUFFER = transfer.DIRECT_IO_ALIGNMENT
+
+
+@pytest.fixture(autouse=True)
+def _reset():
+    yield
+    set_mirrors(None)
+    set_verifier(None)
+    transfer.set_copy_engine(None)
+    clear_dir_cache()
+
+
+@pytest.fixture
+def reads(monkeypatch):
+    """コピー元から読んだバイト数"""
+    counter = {"bytes": 0}
+    read_into = transfer._read_into
+
+    def counting(fd, view):
+        n = read_into(fd, view)
+        counter["bytes"] += n
+        return n
+
+    monkeypatch.setattr(transfer, "_read_into", counting)
+    return counter
+
+
+class RecordingEngine(transfer.CopyEngine):
+    """開いたコピー先の fd を記録する"""
+
+    def __init__(self):
+        super().__init__(BUFFER, readahead=False)
+        self.fds = {}
+
+    def _open(self, path, flags):
+        fd = super()._open(path, flags)
+        self.fds[os.path.basename(path)] = fd
+        return fd
+
+
+@pytest.mark.parametrize("size", [0, 100, BUFFER * 10 + 7])
+def test_copy_many_reads_once(tmp_path, reads, size):
+    data = os.urandom(size)
+    src = tmp_path / "DSC00001.ARW"
+    src.write_bytes(data)
+    os.utime(src, (1700000000, 1700000000))
+    dsts = [str(tmp_path / f"copy{i}.ARW") for i in range(3)]
+
+    digest = hashlib.sha256()
+    engine = transfer.CopyEngine(BUFFER)
+    copied, failed = engine.copy_many(str(src), dsts, digest=digest, slots=2)
+
+    assert (copied, failed) == (size, {})
+    assert reads["bytes"] == size
+    assert digest.hexdigest() == hashlib.sha256(data).hexdigest()
+    for dst in dsts:
+        with open(dst, "rb") as f:
+            assert f.read() == data
+        assert os.stat(dst).st_mtime == 1700000000
+
+
+def test_copy_many_isolates_failed_destination(tmp_path, monkeypatch):
+    data = os.urandom(BUFFER * 20)
+    src = tmp_path / "C0001.MP4"
+    src.write_bytes(data)
+    engine = RecordingEngine()
+    write_all = transfer._write_all
+    writes = []
+
+    def disk_full(fd, view):
+        if fd == engine.fds["full.MP4"]:
+            writes.append(fd)
+            if len(writes) > 2:
+                raise OSError(errno.ENOSPC, "No space left on device")
+        write_all(fd, view)
+
+    monkeypatch.setattr(transfer, "_write_all", disk_full)
+    dsts = [
+        str(tmp_path / "ok.MP4"),
+        str(tmp_path / "full.MP4"),
+        str(tmp_path / "missing" / "dir.MP4"),
+    ]
+    copied, failed = engine.copy_many(str(src), dsts, slots=2)
+
+    assert copied == len(data)
+    assert sorted(os.path.basename(p) for p in failed) == ["dir.MP4", "full.MP4"]
+    assert failed[dsts[1]].errno == errno.ENOSPC
+    assert (tmp_path / "ok.MP4").read_bytes() == data
+    assert not (tmp_path / "full.MP4").exists()
+
+
+def test_copy_many_source_error_removes_all(tmp_path, monkeypatch):
+    src = tmp_path / "C0001.MP4"
+    src.write_bytes(os.urandom(BUFFER * 8))
+    read_into = transfer._read_into
+    calls = []
+
+    def failing(fd, view):
+        calls.append(fd)
+        if len(calls) == 3:
+            raise OSError(errno.EIO, "Input/output error")
+        return read_into(fd, view)
+
+    monkeypatch.setattr(transfer, "_read_into", failing)
+    dsts = [str(tmp_path / "a.MP4"), str(tmp_path / "b.MP4")]
+    with pytest.raises(OSError):
+        transfer.CopyEngine(BUFFER).copy_many(str(src), dsts, slots=2)
+    assert not any(os.path.exists(dst) for dst in dsts)
+
+
+def test_mirror_targets(tmp_path):
+    mirrors = Mirrors(str(tmp_path / "archive"), [str(tmp_path / "backup")])
+    target = tmp_path / "archive" / "2024" / "JPG" / "DSC00001.JPG"
+    assert mirrors.targets(str(target)) == [
+        str(tmp_path / "backup" / "2024" / "JPG" / "DSC00001.JPG")
+    ]
+    assert mirrors.targets(str(tmp_path / "archive-old" / "a.JPG")) == []
+    with pytest.raises(ValueError):
+        Mirrors(str(tmp_path / "archive"), [str(tmp_path / "archive" / "backup")])
+
+
+@pytest.mark.parametrize("cross_device", [False, True])
+def test_move_cli_mirror(tmp_path, monkeypatch, reads, cross_device):
+    card = tmp_path / "card"
+    card.mkdir()
+    files = {f"DSC0000{i}.JPG": os.urandom(3000 + i) for i in range(3)}
+    for name, data in files.items():
+        (card / name).write_bytes(data)
+        os.utime(card / name, (1700000000, 1700000000))
+    if cross_device:
+        rename = os.rename
+
+        def exdev(src, dst):
+            if str(card) in str(src):
+                raise OSError(errno.EXDEV, "Invalid cross-device link")
+            rename(src, dst)
+
+        monkeypatch.setattr(transfer.os, "rename", exdev)
+
+    result = CliRunner().invoke(
+        move.main,
+        [
+            "--import-dir",
+            str(card),
+            "--export-dir",
+            str(tmp_path / "archive"),
+            "--mirror",
+            str(tmp_path / "backup"),
+            "--verify",
+            "--layout",
+            "{ext}",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    assert "Mirrored: 3 files to 1 mirror, failures: 0" in result.output
+    for name, data in files.items():
+        assert (tmp_path / "archive" / "JPG" / name).read_bytes() == data
+        assert (tmp_path / "backup" / "JPG" / name).read_bytes() == data
+    assert not list(card.iterdir())
+    # コピー元（またはリネーム後の移動先）は1回だけ読む
+    assert reads["bytes"] == sum(map(len, files.values()))
+    assert get_mirrors().files == 3
+
+
+def test_photo_organizer_copy_mirror(tmp_path):
+    root = tmp_path / "root"
+    (root / "ARW").mkdir(parents=True)
+    (root / "JPG" / "picks").mkdir(parents=True)
+    (root / "ARW" / "DSC00001.ARW").write_bytes(b"raw")
+    (root / "JPG" / "picks" / "DSC00001.JPG").write_bytes(b"jpg")
+
+    result = CliRunner().invoke(
+        photo_organizer_cli,
+        [
+            "--root-dir",
+            str(root),
+            "--copy",
+            "--link-mode",
+            "hardlink",
+            "--mirror",
+            str(tmp_path / "backup"),
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    assert (root / "ARW" / "picks" / "DSC00001.ARW").exists()
+    assert (tmp_path / "backup" / "ARW" / "picks" / "DSC00001.ARW").read_bytes() == (
+        b"raw"
+    )
+    assert "Mirrored: 1 files to 1 mirror" in result.output
@@ -0,0 +1,144 @@
+"""ファイル操作の計測（--profile）のテスト
+
+計測結果から1ファイルあたりのシステムコール数の上限（予算）を確認する。
+"""
+
+import builtins
+import contextlib
+import io
+import json
+import logging
+import os
+
+import pytest
+from click.testing import CliRunner
+
+from common.profiler import IOProfiler
+from move import main as move
+from photo_organizer.main import find_raw_files, sync_raw_to_jpg_structure
+
+TIMESTAMP = 1700000000
+
+
+def _files(directory, names):
+    directory.mkdir(parents=True, exist_ok=True)
+    for name in names:
+        path = directory / name
+        path.write_bytes(b"x")
+        os.utime(path, (TIMESTAMP, TIMESTAMP))
+
+
+def test_uninstall_restores_originals():
+    stat, opener, emit = os.stat, builtins.open, logging.FileHandler.emit
+    with IOProfiler() as profiler:
+        assert os.stat is not stat
+        os.stat(".")
+        with pytest.raises(RuntimeError):
+            IOProfiler().install()
+    assert (os.stat, builtins.open, logging.FileHandler.emit) == (stat, opener, emit)
+    counted = profiler.counts()["stat"]
+    assert counted >= 1
+
+    os.stat(".")
+    assert profiler.counts()["stat"] == counted
+
+
+def test_report_histogram():
+    with IOProfiler() as profiler:
+        for _ in range(5):
+            os.stat(".")
+        with pytest.raises(FileNotFoundError):
+            os.stat("does-not-exist")
+    op = profiler.report()["operations"]["stat"]
+    assert op["count"] == 6
+    assert sum(op["histogram_us"].values()) == 6
+    assert op["p50_us"] <= op["p99_us"] <= op["max_us"] + 1
+    assert profiler.summary_lines()[2].split()[:2] == ["stat", "6"]
+
+
+@pytest.mark.parametrize("count", [10, 40])
+def test_move_files_syscall_budget(tmp_path, count):
+    _files(tmp_path / "card", [f"DSC{i:05d}.JPG" for i in range(count)])
+    with contextlib.redirect_stdout(io.StringIO()), IOProfiler() as profiler:
+        move.move_files("JPG", str(tmp_path / "card"), str(tmp_path / "export"))
+    counts = profiler.counts()
+
+    assert counts["rename"] == count
+    assert counts.get("listdir", 0) + counts.get("scandir", 0) == 1
+    # 日付フォルダの作成は1回だけ（export/YYYY/MM月/YYYY-MM-DD/JPG の各階層）
+    assert counts["mkdir"] <= 5
+    assert counts["stat"] <= 5 * count + 10
+    assert "open" not in counts
+
+
+def test_photo_organizer_syscall_budget(tmp_path):
+    count = 30
+    names = [f"DSC{i:05d}" for i in range(count)]
+    _files(tmp_path / "ARW", [f"{name}.ARW" for name in names])
+    _files(tmp_path / "JPG" / "picks", [f"{name}.JPG" for name in names])
+
+    with IOProfiler() as profiler:
+        raw_files = find_raw_files(str(tmp_path / "ARW"), [".arw"])
+    # 走査は scandir 1回で、ファイルごとの stat は無い
+    assert profiler.counts().get("scandir") == 1
+    assert profiler.counts().get("stat", 0) <= 1
+
+    with contextlib.redirect_stdout(io.StringIO()), IOProfiler() as profiler:
+        sync_raw_to_jpg_structure(
+            str(tmp_path / "JPG"),
+            str(tmp_path / "ARW"),
+            raw_files,
+            [".jpg"],
+            False,
+            False,
+            None,
+        )
+    counts = profiler.counts()
+    assert counts["rename"] == count
+    assert counts["mkdir"] == 1
+    assert counts["stat"] <= count + 2
+
+
+def test_cli_profile_outputs(tmp_path):
+    _files(tmp_path / "card", ["DSC00001.JPG", "DSC00002.JPG"])
+    report_path = tmp_path / "profile.json"
+    stats_path = tmp_path / "run.pstats"
+    result = CliRunner(mix_stderr=False).invoke(
+        move.main,
+        [
+            "--import-dir",
+            str(tmp_path / "card"),
+            "--export-dir",
+            str(tmp_path / "export"),
+            "--log-file",
+            str(tmp_path / "move.log"),
+            "--profile-output",
+            str(report_path),
+            "--cprofile",
+            str(stats_path),
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    assert "I/O profile" in result.stderr
+
+    operations = json.loads(report_path.read_text())["operations"]
+    assert operations["rename"]["count"] == 2
+    assert operations["log_write"]["count"] > 0
+    assert stats_path.stat().st_size > 0
+    assert not hasattr(os.stat, "__wrapped__")
+
+
+def test_cprofile_alone_skips_io_profiler(tmp_path, monkeypatch):
+    _files(tmp_path / "card", ["DSC00001.JPG"])
+    stats_path = tmp_path / "run.pstats"
+    installed = []
+    monkeypatch.setattr(IOProfiler, "install", lambda self: installed.append(self))
+    result = CliRunner(mix_stderr=False).invoke(
+        move.main,
+        ["--import-dir", str(tmp_path / "card"), "--export-dir", str(tmp_path / "out")]
+        + ["--cprofile", str(stats_path)],
+    )
+    assert result.exit_code == 0, result.output
+    assert installed == []
+    assert "I/O profile" not in result.stderr
+    assert stats_path.stat().st_size > 0
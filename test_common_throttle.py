@@ -0,0 +1,126 @@
+"""帯域・IOPS 制限のテスト"""
+
+import time
+
+import pytest
+
+from common import throttle as throttle_mod
+from common.throttle import IOThrottle, TokenBucket, parse_size, validate_size
+from common.transfer import CopyEngine, copy_file, move_file
+
+# 目標レートとの許容誤差
+TOLERANCE = 0.05
+
+
+class FakeClock:
+    """sleep した分だけ進む仮想時計"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture(autouse=True)
+def no_global_throttle():
+    throttle_mod.set_throttle(None)
+    yield
+    throttle_mod.set_throttle(None)
+
+
+def test_parse_size():
+    assert parse_size("100") == 100
+    assert parse_size("100M") == 100 * 1024**2
+    assert parse_size("1.5G") == int(1.5 * 1024**3)
+    assert parse_size("512kb") == 512 * 1024
+    assert parse_size("10MB/s") == 10 * 1024**2
+    with pytest.raises(ValueError):
+        parse_size("fast")
+
+
+def test_validate_size_option():
+    import click
+
+    assert validate_size(None, None, None) is None
+    assert validate_size(None, None, "10M") == "10M"
+    with pytest.raises(click.BadParameter, match="Invalid size: fast"):
+        validate_size(None, None, "fast")
+
+
+@pytest.mark.parametrize("chunk", [1024, 64 * 1024, 4 * 1024 * 1024])
+def test_bucket_rate_within_tolerance(chunk):
+    clock = FakeClock()
+    rate = 1024 * 1024
+    bucket = TokenBucket(rate, clock=clock, sleep=clock.sleep)
+
+    total = 0
+    while total < 16 * rate:
+        bucket.consume(chunk)
+        total += chunk
+
+    achieved = total / clock.now
+    assert abs(achieved - rate) / rate <= TOLERANCE
+
+
+def test_bucket_burst_limited_to_capacity():
+    clock = FakeClock()
+    bucket = TokenBucket(100, capacity=10, clock=clock, sleep=clock.sleep)
+    clock.now = 1000.0  # 長時間アイドル
+    bucket.consume(10)
+    assert clock.now == 1000.0
+    bucket.consume(10)
+    assert clock.now == pytest.approx(1000.1)
+
+
+def test_iops_limit():
+    clock = FakeClock()
+    limiter = IOThrottle(max_iops=50, clock=clock, sleep=clock.sleep)
+    for _ in range(200):
+        limiter.io()
+    assert abs(200 / clock.now - 50) / 50 <= TOLERANCE
+
+
+def test_copy_file_rate(tmp_path):
+    """copy_file の転送レートが目標の±5%に収まることを確認（仮想時計）"""
+    rate = 8 * 1024 * 1024
+    src = tmp_path / "src.bin"
+    src.write_bytes(b"\0" * (4 * 1024 * 1024))
+    clock = FakeClock()
+    limiter = IOThrottle(max_bandwidth=rate, clock=clock, sleep=clock.sleep)
+
+    engine = CopyEngine(256 * 1024)
+    copied = copy_file(str(src), str(tmp_path / "dst.bin"), limiter, engine)
+
+    assert copied == src.stat().st_size
+    assert abs(copied / clock.now - rate) / rate <= TOLERANCE
+
+
+def test_copy_file_real_rate_never_exceeds_limit(tmp_path):
+    """実時間でも目標より速くならない（負荷で遅くなるのは許すので上限だけを確かめる）"""
+    rate = 8 * 1024 * 1024
+    src = tmp_path / "src.bin"
+    src.write_bytes(b"\0" * (2 * 1024 * 1024))
+    limiter = IOThrottle(max_bandwidth=rate)
+
+    engine = CopyEngine(256 * 1024)
+    start = time.monotonic()
+    copied = copy_file(str(src), str(tmp_path / "dst.bin"), limiter, engine)
+    elapsed = time.monotonic() - start
+
+    assert copied == src.stat().st_size
+    assert copied / elapsed <= rate * (1 + TOLERANCE)
+
+
+def test_move_file_uses_global_throttle(tmp_path):
+    clock = FakeClock()
+    throttle_mod.set_throttle(IOThrottle(max_iops=10, clock=clock, sleep=clock.sleep))
+    for i in range(5):
+        src = tmp_path / f"{i}.jpg"
+        src.write_bytes(b"x")
+        move_file(str(src), str(tmp_path / f"{i}.moved"))
+    assert clock.now == pytest.approx(0.5)
+    assert not (tmp_path / "0.jpg").exists()
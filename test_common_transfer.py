@@ -0,0 +1,162 @@
+"""ファイル転送（コピー・リンク）のテスト"""
+
+import errno
+import os
+
+import pytest
+from click.testing import CliRunner
+
+from common import transfer
+from photo_organizer import main as organizer
+
+
+@pytest.fixture(autouse=True)
+def reset_probe():
+    transfer.reset_link_probe()
+    yield
+    transfer.reset_link_probe()
+
+
+def test_hardlink_shares_inode(tmp_path):
+    src = tmp_path / "a.arw"
+    src.write_bytes(b"raw")
+    dst = tmp_path / "b.arw"
+
+    assert transfer.link_or_copy(str(src), str(dst), "hardlink") == "hardlink"
+    assert os.stat(src).st_ino == os.stat(dst).st_ino
+
+
+def test_hardlink_replaces_existing_destination(tmp_path):
+    src = tmp_path / "a.arw"
+    src.write_bytes(b"raw")
+    dst = tmp_path / "b.arw"
+    dst.write_bytes(b"old")
+
+    assert transfer.link_or_copy(str(src), str(dst), "hardlink") == "hardlink"
+    assert dst.read_bytes() == b"raw"
+
+
+def test_hardlink_temp_name_is_unique(tmp_path):
+    src = tmp_path / "a.arw"
+    src.write_bytes(b"raw")
+    dst = tmp_path / "b.arw"
+    dst.write_bytes(b"old")
+    # 別のプロセスが同じファイルを置いている途中
+    other = tmp_path / "b.arw.link-tmp"
+    other.write_bytes(b"other")
+
+    assert transfer.link_or_copy(str(src), str(dst), "hardlink") == "hardlink"
+    assert dst.read_bytes() == b"raw"
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "a.arw",
+        "b.arw",
+        "b.arw.link-tmp",
+    ]
+
+
+def test_mirror_error_does_not_disable_link(tmp_path, monkeypatch):
+    calls = []
+
+    def failing(path, throttle=None):
+        calls.append(path)
+        raise OSError(errno.EPERM, "Operation not permitted")
+
+    monkeypatch.setattr(transfer, "_copy_to_mirrors", failing)
+    src = tmp_path / "a.arw"
+    src.write_bytes(b"raw")
+    dst = tmp_path / "b.arw"
+
+    with pytest.raises(PermissionError):
+        transfer.link_or_copy(str(src), str(dst), "hardlink")
+    # リンクは作成済みで、コピーへのフォールバックやミラーへの2回目のコピーはしない
+    assert calls == [str(dst)]
+    assert os.stat(src).st_ino == os.stat(dst).st_ino
+    assert transfer._unsupported == {}
+
+
+def test_unsupported_reflink_probed_once_per_device(tmp_path, monkeypatch):
+    calls = []
+
+    def unsupported(src, dst):
+        calls.append(dst)
+        raise OSError(errno.EOPNOTSUPP, "not supported")
+
+    monkeypatch.setattr(transfer, "_reflink", unsupported)
+    for i in range(5):
+        src = tmp_path / f"{i}.arw"
+        src.write_bytes(b"raw")
+        method = transfer.link_or_copy(str(src), str(tmp_path / f"{i}.copy"), "auto")
+        assert method == "hardlink"
+
+    assert len(calls) == 1
+
+
+def test_explicit_mode_falls_back_to_copy(tmp_path, monkeypatch):
+    def cross_device(src, dst):
+        raise OSError(errno.EXDEV, "cross-device link")
+
+    monkeypatch.setattr(transfer, "_hardlink", cross_device)
+    src = tmp_path / "a.arw"
+    src.write_bytes(b"raw")
+    dst = tmp_path / "b.arw"
+
+    assert transfer.link_or_copy(str(src), str(dst), "hardlink") == "copy"
+    assert dst.read_bytes() == b"raw"
+    assert os.stat(src).st_ino != os.stat(dst).st_ino
+
+
+def test_other_errors_are_raised(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        transfer.link_or_copy(
+            str(tmp_path / "missing.arw"), str(tmp_path / "b.arw"), "hardlink"
+        )
+
+
+def test_cli_reports_bytes_avoided(tmp_path):
+    (tmp_path / "JPG" / "2024").mkdir(parents=True)
+    (tmp_path / "ARW").mkdir()
+    (tmp_path / "JPG" / "2024" / "IMG_001.jpg").write_bytes(b"jpg")
+    (tmp_path / "ARW" / "IMG_001.arw").write_bytes(b"r" * 2048)
+
+    result = CliRunner().invoke(
+        organizer.cli,
+        ["--root-dir", str(tmp_path), "--copy", "--link-mode", "hardlink"],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert "Bytes avoided: 2.0 KB" in result.output
+    assert (tmp_path / "ARW" / "2024" / "IMG_001.arw").exists()
+
+
+@pytest.mark.parametrize("direct", [False, True])
+@pytest.mark.parametrize("size", [0, 1, 4095, 4096, 100_000, 3 * 65536 + 7])
+def test_copy_engine_copies_exact_content(tmp_path, size, direct):
+    src = tmp_path / "src.bin"
+    src.write_bytes(os.urandom(size))
+    os.utime(src, (1700000000, 1700000000))
+    dst = tmp_path / "dst.bin"
+
+    engine = transfer.CopyEngine(65536, direct=direct, drop_cache=True)
+    assert engine.copy(str(src), str(dst)) == size
+    assert dst.read_bytes() == src.read_bytes()
+    assert dst.stat().st_mtime == src.stat().st_mtime
+
+
+def test_copy_engine_rounds_buffer_to_alignment():
+    assert transfer.CopyEngine(1000).buffer_size == transfer.DIRECT_IO_ALIGNMENT
+    assert transfer.CopyEngine(8192).buffer_size == 8192
+
+
+def test_copy_file_uses_global_engine(tmp_path, monkeypatch):
+    used = []
+
+    class RecordingEngine(transfer.CopyEngine):
+        def copy(self, src, dst, throttle=None):
+            used.append(src)
+            return super().copy(src, dst, throttle)
+
+    monkeypatch.setattr(transfer, "_engine", RecordingEngine())
+    src = tmp_path / "a.arw"
+    src.write_bytes(b"raw")
+    transfer.copy_file(str(src), str(tmp_path / "b.arw"))
+    assert used == [str(src)]
@@ -0,0 +1,123 @@
+"""コピー検証とマニフェストのテスト"""
+
+import errno
+import hashlib
+import os
+
+import pytest
+from click.testing import CliRunner
+
+from common import transfer, verify
+from move import main as mover
+
+
+@pytest.fixture(autouse=True)
+def reset_verifier():
+    verify.set_verifier(None)
+    yield
+    verify.set_verifier(None)
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def test_readback_writes_sha256sum_manifest(tmp_path):
+    data = os.urandom(300_000)
+    src = tmp_path / "src.arw"
+    src.write_bytes(data)
+    dest_dir = tmp_path / "dest"
+    dest_dir.mkdir()
+
+    verifier = verify.configure_verifier("readback")
+    transfer.copy_file(str(src), str(dest_dir / "src.arw"))
+
+    manifest = (dest_dir / verify.MANIFEST_NAME).read_text(encoding="utf-8")
+    assert manifest == f"{_sha256(data)}  src.arw\n"
+    assert verifier.files == 1
+    assert verifier.bytes == len(data)
+    assert verifier.failures == 0
+    assert verifier.readback_seconds > 0
+
+
+@pytest.mark.parametrize("mode", verify.VERIFY_MODES)
+def test_readback_mismatch_removes_destination(tmp_path, monkeypatch, mode):
+    src = tmp_path / "src.arw"
+    src.write_bytes(b"raw")
+    dst = tmp_path / "dst.arw"
+    # 書き込みや媒体の不良（初回のコピーでも、マニフェストがあっても検出する）
+    monkeypatch.setattr(verify, "read_back_digest", lambda path: "0" * 64)
+
+    verify.configure_verifier(mode)
+    with pytest.raises(verify.VerifyError):
+        transfer.copy_file(str(src), str(dst))
+    assert not dst.exists()
+    assert verify.get_verifier().failures == 1
+
+
+def test_manifest_mode_updates_entry_when_source_changed(tmp_path):
+    src = tmp_path / "src.arw"
+    src.write_bytes(b"raw")
+    dest_dir = tmp_path / "dest"
+    dest_dir.mkdir()
+    (dest_dir / verify.MANIFEST_NAME).write_text(
+        f"{_sha256(b'other')}  src.arw\n", encoding="utf-8"
+    )
+
+    verifier = verify.configure_verifier("manifest")
+    transfer.copy_file(str(src), str(dest_dir / "src.arw"))
+    assert (dest_dir / "src.arw").read_bytes() == b"raw"
+    assert verifier.changed == [str(dest_dir / "src.arw")]
+    assert "Manifest entries updated (source changed): 1" in verifier.summary_lines()
+    assert verify.Manifest(str(dest_dir)).entries == {"src.arw": _sha256(b"raw")}
+
+    verifier = verify.configure_verifier("manifest")
+    transfer.copy_file(str(src), str(dest_dir / "src.arw"))
+    assert verifier.changed == [] and verifier.readback_seconds > 0
+
+
+def test_cross_device_move_keeps_source_on_failure(tmp_path, monkeypatch):
+    def cross_device(src, dst):
+        raise OSError(errno.EXDEV, "cross-device link")
+
+    monkeypatch.setattr(os, "rename", cross_device)
+    monkeypatch.setattr(verify, "read_back_digest", lambda path: "bad")
+    src = tmp_path / "src.arw"
+    src.write_bytes(b"raw")
+
+    verify.configure_verifier("readback")
+    with pytest.raises(verify.VerifyError):
+        transfer.move_file(str(src), str(tmp_path / "dst.arw"))
+    assert src.exists()
+    assert not (tmp_path / "dst.arw").exists()
+
+
+def test_move_cli_writes_manifest_per_date_folder(tmp_path, monkeypatch):
+    def cross_device(src, dst):
+        raise OSError(errno.EXDEV, "cross-device link")
+
+    monkeypatch.setattr(os, "rename", cross_device)
+    import_dir = tmp_path / "import"
+    import_dir.mkdir()
+    for name in ("A.JPG", "A.ARW"):
+        path = import_dir / name
+        path.write_bytes(name.encode())
+        os.utime(path, (1700000000, 1700000000))
+
+    result = CliRunner().invoke(
+        mover.main,
+        [
+            "--import-dir",
+            str(import_dir),
+            "--export-dir",
+            str(tmp_path / "export"),
+            "--verify",
+        ],
+    )
+
+    assert result.exit_code == 0, result.output
+    manifests = list((tmp_path / "export").rglob(verify.MANIFEST_NAME))
+    assert len(manifests) == 1
+    entries = verify.Manifest(str(manifests[0].parent)).entries
+    assert entries == {"ARW/A.ARW": _sha256(b"A.ARW"), "JPG/A.JPG": _sha256(b"A.JPG")}
+    assert "Verified: 2 files (readback)" in result.output
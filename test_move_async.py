@@ -0,0 +1,165 @@
+"""move の asyncio エンジン（--concurrency）のテスト"""
+
+import contextlib
+import io
+import os
+import threading
+
+from click.testing import CliRunner
+
+from common.dircache import clear_dir_cache
+from common.profiler import IOProfiler
+from move import main as move
+from move.async_engine import AsyncMover, move_files_async
+
+DAY = 86400
+TIMESTAMP = 1700000000
+
+
+def _card(import_dir, count=30):
+    import_dir.mkdir()
+    names = []
+    for i in range(count):
+        name = f"DSC{i:05d}.{('JPG', 'ARW', 'mp4')[i % 3]}"
+        path = import_dir / name
+        path.write_bytes(b"x" * i)
+        mtime = TIMESTAMP + (i % 2) * DAY
+        os.utime(path, (mtime, mtime))
+        names.append(name)
+    return names
+
+
+def _tree(root):
+    return sorted(
+        os.path.relpath(os.path.join(directory, name), root)
+        for directory, _, files in os.walk(root)
+        for name in files
+    )
+
+
+def _quiet(func, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+def test_same_result_as_move_files(tmp_path):
+    _card(tmp_path / "sync")
+    _card(tmp_path / "async")
+
+    total = [0, 0]
+    for suffix in move.get_suffixes():
+        success, errors = _quiet(
+            move.move_files, suffix, str(tmp_path / "sync"), str(tmp_path / "out1")
+        )
+        total[0] += success
+        total[1] += errors
+    result = _quiet(
+        move_files_async,
+        move.get_suffixes(),
+        str(tmp_path / "async"),
+        str(tmp_path / "out2"),
+        concurrency=8,
+    )
+
+    assert result == tuple(total) == (30, 0)
+    assert _tree(tmp_path / "out2") == _tree(tmp_path / "out1")
+    assert os.listdir(tmp_path / "async") == []
+
+
+def test_directories_created_once(tmp_path):
+    clear_dir_cache()
+    _card(tmp_path / "card")
+    with IOProfiler() as profiler:
+        result = _quiet(
+            move_files_async,
+            ["jpg"],
+            str(tmp_path / "card"),
+            str(tmp_path / "out"),
+            concurrency=16,
+        )
+    assert result == (10, 0)
+    counts = profiler.counts()
+    assert counts["rename"] == 10
+    # export/YYYY/MM月/YYYY-MM-DD/JPG を2日分
+    assert counts["mkdir"] <= 10
+
+
+def test_failed_mkdir_is_retried(tmp_path, monkeypatch):
+    """フォルダの作成に失敗しても、同じフォルダの次のファイルで作り直す"""
+    from move import async_engine
+
+    clear_dir_cache()
+    (tmp_path / "card").mkdir()
+    for i in range(3):
+        path = tmp_path / "card" / f"DSC{i:05d}.JPG"
+        path.write_bytes(b"x")
+        os.utime(path, (TIMESTAMP, TIMESTAMP))
+    calls = []
+    real = async_engine.ensure_dir
+
+    def flaky(directory):
+        calls.append(directory)
+        if len(calls) == 1:
+            raise OSError("EIO")
+        real(directory)
+
+    monkeypatch.setattr(async_engine, "ensure_dir", flaky)
+    result = _quiet(
+        move_files_async,
+        ["jpg"],
+        str(tmp_path / "card"),
+        str(tmp_path / "out"),
+        concurrency=1,
+    )
+    # 最初の1ファイルだけが失敗し、残りは作り直したフォルダに移動する
+    assert result == (2, 1)
+    assert len(calls) == 2 and calls[0] == calls[1]
+    assert len(_tree(tmp_path / "out")) == 2
+
+
+def test_missing_import_dir(tmp_path):
+    result = _quiet(move_files_async, ["jpg"], str(tmp_path / "nope"), str(tmp_path))
+    assert result == (0, 1)
+
+
+def test_interrupt_leaves_no_half_moved_files(tmp_path, monkeypatch):
+    names = _card(tmp_path / "card", count=60)
+    mover = AsyncMover(str(tmp_path / "card"), str(tmp_path / "out"), concurrency=4)
+    original = move.FileMover.move
+    calls = []
+    lock = threading.Lock()
+
+    def move_then_interrupt(self, *args, **kwargs):
+        with lock:
+            calls.append(self.path)
+            if len(calls) == 5:
+                mover._loop.call_soon_threadsafe(mover.interrupt)
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(move.FileMover, "move", move_then_interrupt)
+    success, errors = _quiet(mover.run, move.get_suffixes())
+
+    assert mover.interrupted
+    assert errors == 0
+    assert success == len(calls) < len(names)
+    left = os.listdir(tmp_path / "card")
+    moved = [os.path.basename(p) for p in _tree(tmp_path / "out")]
+    assert sorted(left + moved) == sorted(names)
+
+
+def test_cli_concurrency(tmp_path):
+    _card(tmp_path / "card", count=9)
+    result = CliRunner().invoke(
+        move.main,
+        [
+            "--import-dir",
+            str(tmp_path / "card"),
+            "--export-dir",
+            str(tmp_path / "out"),
+            "--concurrency",
+            "4",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    assert "Successfully processed: 9 files" in result.output
+    assert len(_tree(tmp_path / "out")) == 9
@@ -0,0 +1,164 @@
+"""move のレイアウトテンプレート（--layout）のテスト"""
+
+import errno
+import os
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from move import main as move
+from move.layout import Layout, get_layout, set_layout
+
+WHEN = datetime(2024, 3, 9, 15, 30)
+
+
+@pytest.fixture(autouse=True)
+def _reset_layout():
+    yield
+    set_layout(None)
+
+
+def test_default_layout_matches_previous_structure():
+    path = Layout("default").directory("export", WHEN, "JPG")
+    assert path == Path("export", "2024", "03月", "2024-03-09", "JPG")
+    assert get_layout().template == Layout("default").template
+
+
+def test_templates_and_variables():
+    assert Layout("{date}/{ext_lower}").directory("out", WHEN, "JPG") == Path(
+        "out/2024-03-09/jpg"
+    )
+    month = Layout("month").directory("out", WHEN, "arw")
+    assert month == Path("out/2024/2024-03/ARW")
+    event = Layout("event", {"event": "wedding {A}"})
+    assert event.directory("out", WHEN, "MP4") == Path(
+        "out/2024/wedding {A}/2024-03-09/MP4"
+    )
+
+
+def test_directory_is_memoized_per_date_and_extension():
+    layout = Layout("default")
+    first = layout.directory("export", WHEN, "JPG")
+    assert layout.directory("export", WHEN.replace(hour=1), "JPG") is first
+    assert layout.directory("export", WHEN, "ARW") is not first
+
+
+@pytest.mark.parametrize(
+    "template",
+    [
+        "{year}/{camera}",
+        "{year!r}",
+        "{year:zz}",
+        "/abs/{date}",
+        "{date}/../{ext}",
+        "{date",
+    ],
+)
+def test_invalid_layouts(template):
+    with pytest.raises(ValueError):
+        Layout(template)
+
+
+def test_variable_cannot_escape_export_dir():
+    with pytest.raises(ValueError):
+        Layout("{event}/{date}", {"event": ".."})
+
+
+def test_cli_layout(tmp_path):
+    card = tmp_path / "card"
+    card.mkdir()
+    photo = card / "DSC00001.JPG"
+    photo.write_bytes(b"x")
+    mtime = WHEN.timestamp()
+    os.utime(photo, (mtime, mtime))
+
+    result = CliRunner().invoke(
+        move.main,
+        [
+            "--import-dir",
+            str(card),
+            "--export-dir",
+            str(tmp_path / "out"),
+            "--layout",
+            "event",
+            "--layout-var",
+            "event=trip",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    assert (tmp_path / "out/2024/trip/2024-03-09/JPG/DSC00001.JPG").exists()
+
+    result = CliRunner().invoke(
+        move.main, ["--import-dir", str(card), "--layout", "{camera}"]
+    )
+    assert result.exit_code == 2
+    assert "Unknown field {camera}" in result.output
+
+
+@pytest.mark.parametrize(
+    "name, depth, manifests",
+    [
+        (
+            "default",
+            1,
+            {
+                "2024/03月/2024-03-09": ["JPG/A.JPG"],
+                "2024/03月/2024-03-11": ["JPG/B.JPG"],
+            },
+        ),
+        ("date", 1, {"2024-03-09": ["JPG/A.JPG"], "2024-03-11": ["JPG/B.JPG"]}),
+        ("date-only", 0, {"2024-03-09": ["A.JPG"], "2024-03-11": ["B.JPG"]}),
+        ("month", 0, {"2024/2024-03/JPG": ["A.JPG", "B.JPG"]}),
+        (
+            "event",
+            1,
+            {
+                "2024/trip/2024-03-09": ["JPG/A.JPG"],
+                "2024/trip/2024-03-11": ["JPG/B.JPG"],
+            },
+        ),
+    ],
+)
+def test_manifest_per_date_folder_of_each_layout(
+    tmp_path, monkeypatch, name, depth, manifests
+):
+    from common.verify import MANIFEST_NAME, Manifest, set_verifier
+
+    def cross_device(src, dst):
+        # 検証するのはコピーだけなので、別のデバイスへの移動にする
+        raise OSError(errno.EXDEV, "cross-device link")
+
+    monkeypatch.setattr(os, "rename", cross_device)
+    assert Layout(name, {"event": "trip"}).manifest_depth == depth
+    card = tmp_path / "card"
+    card.mkdir()
+    for photo, when in (("A.JPG", WHEN), ("B.JPG", WHEN.replace(day=11))):
+        (card / photo).write_bytes(photo.encode())
+        os.utime(card / photo, (when.timestamp(), when.timestamp()))
+
+    result = CliRunner().invoke(
+        move.main,
+        [
+            "--import-dir",
+            str(card),
+            "--export-dir",
+            str(tmp_path / "export"),
+            "--verify",
+            "--layout",
+            name,
+            "--layout-var",
+            "event=trip",
+        ],
+    )
+    set_verifier(None)
+    assert result.exit_code == 0, result.output
+    export = tmp_path / "export"
+    found = {
+        path.parent.relative_to(export).as_posix(): sorted(
+            Manifest(str(path.parent)).entries
+        )
+        for path in export.rglob(MANIFEST_NAME)
+    }
+    assert found == manifests
@@ -0,0 +1,101 @@
+"""move の RAW+JPG 組単位の移動（--pair）のテスト"""
+
+import contextlib
+import io
+import os
+from datetime import datetime
+
+from click.testing import CliRunner
+
+from move import main as move
+
+DAY1 = datetime(2024, 5, 1, 23, 59).timestamp()
+DAY2 = datetime(2024, 5, 2, 0, 1).timestamp()
+
+
+def _write(directory, name, mtime):
+    directory.mkdir(exist_ok=True)
+    path = directory / name
+    path.write_bytes(name.encode())
+    os.utime(path, (mtime, mtime))
+
+
+def _card(card):
+    # RAW は日付が変わる前、JPG・HIF は変わった後に書き込まれた
+    _write(card, "DSC00001.ARW", DAY1)
+    _write(card, "DSC00001.JPG", DAY2)
+    _write(card, "DSC00001.HIF", DAY2)
+    _write(card, "C0001.MP4", DAY2)
+    _write(card, "C0001M01.XML", DAY1)
+    _write(card, "DSC00002.PNG", DAY2)
+
+
+def _quiet(func, *args):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args)
+
+
+def test_group_files_pairs_stems_and_sidecars(tmp_path):
+    _card(tmp_path)
+    groups = move.group_files(str(tmp_path), move.get_suffixes())
+    names = [[m.path.name for m in movers] for movers in groups]
+    assert names == [
+        ["C0001.MP4", "C0001M01.XML"],
+        ["DSC00001.ARW", "DSC00001.HIF", "DSC00001.JPG"],
+        ["DSC00002.PNG"],
+    ]
+    for movers in groups[:2]:
+        assert {m.capture_time for m in movers} == {datetime.fromtimestamp(DAY1)}
+
+
+def test_group_moves_to_earliest_date(tmp_path):
+    _card(tmp_path / "card")
+    result = _quiet(
+        move.move_paired,
+        move.get_suffixes(),
+        str(tmp_path / "card"),
+        str(tmp_path / "out"),
+    )
+    assert result == (6, 0)
+    day1 = tmp_path / "out" / "2024" / "05月" / "2024-05-01"
+    day2 = tmp_path / "out" / "2024" / "05月" / "2024-05-02"
+    for relative in ("ARW/DSC00001.ARW", "JPG/DSC00001.JPG", "HIF/DSC00001.HIF"):
+        assert (day1 / relative).exists()
+    assert (day1 / "MP4" / "C0001.MP4").exists()
+    assert (day1 / "XML" / "C0001M01.XML").exists()
+    assert (day2 / "PNG" / "DSC00002.PNG").exists()
+
+
+def test_failed_member_rolls_back_group(tmp_path, monkeypatch):
+    _card(tmp_path / "card")
+    original = move.move_file
+
+    def fail_on_jpg(src, dst, *args):
+        if src.endswith(".JPG"):
+            raise OSError("disk full")
+        return original(src, dst, *args)
+
+    monkeypatch.setattr(move, "move_file", fail_on_jpg)
+    success, errors = _quiet(
+        move.move_paired,
+        move.get_suffixes(),
+        str(tmp_path / "card"),
+        str(tmp_path / "out"),
+    )
+
+    assert (success, errors) == (3, 3)
+    left = sorted(os.listdir(tmp_path / "card"))
+    assert left == ["DSC00001.ARW", "DSC00001.HIF", "DSC00001.JPG"]
+    moved = [name for _, _, files in os.walk(tmp_path / "out") for name in files]
+    assert sorted(moved) == ["C0001.MP4", "C0001M01.XML", "DSC00002.PNG"]
+
+
+def test_cli_pair_options(tmp_path):
+    _card(tmp_path / "card")
+    args = ["--import-dir", str(tmp_path / "card"), "--export-dir", str(tmp_path)]
+    result = CliRunner().invoke(move.main, args + ["--pair", "--dry-run"])
+    assert result.exit_code == 0, result.output
+    assert "Processing 6 files in 3 groups (2 with several files)" in result.output
+
+    result = CliRunner().invoke(move.main, args + ["--pair", "--concurrency", "4"])
+    assert result.exit_code == 2
@@ -0,0 +1,98 @@
+"""取り込みパイプラインのテスト"""
+
+import os
+import threading
+
+from click.testing import CliRunner
+
+from pipeline import main as pipeline
+
+TIMESTAMP = 1700000000  # 2023-11-14/15（ローカル時刻）
+
+
+def _card(import_dir, names):
+    import_dir.mkdir(exist_ok=True)
+    for name in names:
+        path = import_dir / name
+        path.write_bytes(name.encode())
+        os.utime(path, (TIMESTAMP, TIMESTAMP))
+
+
+def _date_dir(export_dir):
+    [date_dir] = [p for p in export_dir.glob("*/*/*") if p.is_dir()]
+    return date_dir
+
+
+def test_pipeline_files_syncs_and_previews(tmp_path, monkeypatch):
+    import_dir = tmp_path / "card"
+    export_dir = tmp_path / "export"
+    _card(import_dir, ["A.JPG", "A.ARW", "B.JPG", "C.MOV", "C.LRF"])
+
+    made = []
+
+    def fake_preview(movie_path, output_dir):
+        os.makedirs(output_dir, exist_ok=True)
+        made.append((movie_path, threading.current_thread().name))
+
+    monkeypatch.setattr(pipeline, "_load_preview_maker", lambda: fake_preview)
+    stats, sync_stats = pipeline.run_pipeline(str(import_dir), str(export_dir))
+
+    date_dir = _date_dir(export_dir)
+    assert stats["scanned"] == 5
+    assert stats["filed"] == 5
+    assert stats["previews"] == 1
+    assert (date_dir / "ARW" / "A.ARW").exists()
+    assert sync_stats["skipped"] == 1
+    assert sync_stats["missing_raw"] == 1
+    assert made == [(str(date_dir / "MOV" / "C.MOV"), made[0][1])]
+    assert made[0][1].startswith("preview")
+    assert (date_dir / "preview").is_dir()
+    assert not any(import_dir.iterdir())
+
+
+def test_existing_date_folder_is_rescanned(tmp_path):
+    """既存の日付フォルダでは選別済みの JPG 構成に RAW を合わせる"""
+    import_dir = tmp_path / "card"
+    export_dir = tmp_path / "export"
+    _card(import_dir, ["A.JPG", "A.ARW"])
+    pipeline.run_pipeline(str(import_dir), str(export_dir), previews=False)
+
+    date_dir = _date_dir(export_dir)
+    (date_dir / "JPG" / "picks").mkdir()
+    os.rename(date_dir / "JPG" / "A.JPG", date_dir / "JPG" / "picks" / "A.JPG")
+
+    _card(import_dir, ["B.JPG"])
+    stats, sync_stats = pipeline.run_pipeline(
+        str(import_dir), str(export_dir), previews=False
+    )
+
+    assert stats["filed"] == 1
+    assert sync_stats["processed"] == 1
+    assert (date_dir / "ARW" / "picks" / "A.ARW").exists()
+
+
+def test_cli_dry_run_leaves_files(tmp_path):
+    import_dir = tmp_path / "card"
+    _card(import_dir, ["A.JPG", "A.ARW"])
+
+    result = CliRunner().invoke(
+        pipeline.main,
+        ["--import-dir", str(import_dir), "--export-dir", str(tmp_path / "export")],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.output
+    assert "Filed: 2 / 2 files" in result.output
+
+    _card(import_dir, ["B.JPG"])
+    result = CliRunner().invoke(
+        pipeline.main,
+        [
+            "--import-dir",
+            str(import_dir),
+            "--export-dir",
+            str(tmp_path / "export"),
+            "--dry-run",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    assert (import_dir / "B.JPG").exists()
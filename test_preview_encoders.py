@@ -0,0 +1,168 @@
+"""make_preview/encoders.py（プレビューのバックエンド・FourCC の選択）のテスト"""
+
+import json
+
+import pytest
+from click.testing import CliRunner
+
+from make_preview import encoders
+from make_preview.encoders import Encoder
+from pipeline import main as pipeline
+
+
+class FakeCv2:
+    """探索に必要な属性だけを持つ cv2 の代わり（実際のエンコードはしない）"""
+
+    __version__ = "4.9.0"
+    CAP_ANY = 0
+    CAP_FFMPEG = 1900
+    CAP_GSTREAMER = 1800
+
+    class videoio_registry:
+        @staticmethod
+        def getWriterBackends():
+            return [1900, 1800]
+
+
+RESULTS = [
+    {"backend": "gstreamer", "fourcc": "avc1", "ok": True, "seconds": 0.1},
+    {"backend": "ffmpeg", "fourcc": "mp4v", "ok": True, "seconds": 0.2},
+    {"backend": "ffmpeg", "fourcc": "avc1", "ok": False},
+]
+
+
+@pytest.fixture(autouse=True)
+def _reset_encoder():
+    yield
+    encoders.configure_encoder(None, None)
+
+
+@pytest.fixture
+def probes(monkeypatch):
+    calls = []
+
+    def fake_benchmark(cv2, *args, container=".mp4", **kwargs):
+        calls.append(cv2.__version__)
+        return RESULTS
+
+    monkeypatch.setattr(encoders, "benchmark_codecs", fake_benchmark)
+    return calls
+
+
+def test_available_backends():
+    assert encoders.available_backends(FakeCv2) == ["ffmpeg", "gstreamer"]
+
+
+def test_probe_is_cached_per_machine(tmp_path, probes):
+    cache = str(tmp_path / "encoder.json")
+    assert encoders.probe_encoder(FakeCv2, cache) == Encoder("gstreamer", "avc1")
+    assert encoders.probe_encoder(FakeCv2, cache) == Encoder("gstreamer", "avc1")
+    assert len(probes) == 1
+    with open(cache) as f:
+        assert json.load(f)["machine"]["opencv"] == "4.9.0"
+
+    class Upgraded(FakeCv2):
+        __version__ = "4.10.0"
+
+    encoders.probe_encoder(Upgraded, cache)
+    assert probes == ["4.9.0", "4.10.0"]
+    encoders.probe_encoder(Upgraded, cache, refresh=True)
+    assert len(probes) == 3
+
+
+def test_probe_with_overrides(tmp_path, probes):
+    cache = str(tmp_path / "encoder.json")
+    probe = encoders.probe_encoder
+    assert probe(FakeCv2, cache, backend="ffmpeg") == Encoder("ffmpeg", "mp4v")
+    assert probe(FakeCv2, cache, fourcc="mp4v") == Encoder("ffmpeg", "mp4v")
+    # 動く組み合わせが無ければ指定どおりに使う
+    assert probe(FakeCv2, cache, backend="ffmpeg", fourcc="avc1") == Encoder(
+        "ffmpeg", "avc1"
+    )
+    assert probe(FakeCv2, cache, fourcc="XVID") == Encoder("any", "XVID")
+
+
+def test_configure_encoder(monkeypatch, tmp_path, probes):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    encoders.configure_encoder("ffmpeg", "avc1")
+    assert encoders.get_encoder(FakeCv2) == Encoder("ffmpeg", "avc1")
+    assert probes == []
+
+    encoders.configure_encoder(codec="mp4v")
+    assert encoders.get_encoder(FakeCv2) == Encoder("ffmpeg", "mp4v")
+    assert (tmp_path / "my-data-backup" / "encoder.json").exists()
+
+    # ジョブの encoder_cache（--encoder-cache）で記録先を変える
+    encoders.configure_encoder(cache_file=str(tmp_path / "job" / "encoder.json"))
+    assert encoders.get_encoder(FakeCv2) == Encoder("gstreamer", "avc1")
+    assert (tmp_path / "job" / "encoder.json").exists()
+
+    with pytest.raises(ValueError):
+        encoders.configure_encoder("vaapi")
+    with pytest.raises(ValueError):
+        encoders.configure_encoder(codec="h264x")
+
+
+def test_pipeline_rejects_bad_codec(tmp_path):
+    result = CliRunner().invoke(
+        pipeline.main,
+        ["--import-dir", str(tmp_path), "--preview-codec", "h264x", "--dry-run"],
+    )
+    assert result.exit_code == 2
+    assert "FourCC must be 4 characters" in result.output
+
+
+def test_benchmark_codecs_with_opencv():
+    cv2 = pytest.importorskip("cv2")
+    results = encoders.benchmark_codecs(cv2, frames=5, size=(64, 48))
+    assert results and all("fourcc" in r for r in results)
+    ok = [r for r in results if r["ok"]]
+    assert ok == sorted(ok, key=lambda r: (r["oversized"], r["seconds"]))
+
+
+def test_probe_per_container(monkeypatch, tmp_path):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    containers = []
+
+    def fake_benchmark(cv2, *args, container=".mp4", **kwargs):
+        containers.append(container)
+        fourcc = "avc1" if container == ".mp4" else "mp4v"
+        return [{"backend": "ffmpeg", "fourcc": fourcc, "ok": True, "seconds": 0.1}]
+
+    monkeypatch.setattr(encoders, "benchmark_codecs", fake_benchmark)
+    assert encoders.container_of("/cards/00001.MTS") == ".mts"
+    assert encoders.get_encoder(FakeCv2, ".mts") == Encoder("ffmpeg", "mp4v")
+    assert encoders.get_encoder(FakeCv2) == Encoder("ffmpeg", "avc1")
+    assert encoders.get_encoder(FakeCv2, ".mts") == Encoder("ffmpeg", "mp4v")
+    assert containers == [".mts", ".mp4"]
+    # 形式ごとに記録し、他の形式の探索では計測し直さない
+    encoders.set_encoder(None)
+    assert encoders.get_encoder(FakeCv2, ".mts") == Encoder("ffmpeg", "mp4v")
+    assert containers == [".mts", ".mp4"]
+    cache = tmp_path / "my-data-backup" / "encoder.json"
+    assert sorted(json.loads(cache.read_text())["containers"]) == [".mp4", ".mts"]
+
+
+def test_benchmark_ranks_oversized_output_last(monkeypatch):
+    cv2 = pytest.importorskip("cv2")
+    measured = {
+        "mp4v": {"bytes": 100_000, "seconds": 0.3},
+        "MJPG": {"bytes": 900_000, "seconds": 0.1},
+        "avc1": {"bytes": 80_000, "seconds": 0.5},
+    }
+
+    def fake_measure(cv2, encoder, work_dir, frames, size, container):
+        return {
+            "backend": encoder.backend,
+            "fourcc": encoder.fourcc,
+            "ok": True,
+            **measured[encoder.fourcc],
+        }
+
+    monkeypatch.setattr(encoders, "measure_encoder", fake_measure)
+    results = encoders.benchmark_codecs(
+        cv2, frames=1, size=(8, 8), backends=["any"], fourccs=list(measured)
+    )
+    # MJPG は最速でも出力が最小（avc1）の3倍を超えるため最後
+    assert [r["fourcc"] for r in results] == ["mp4v", "avc1", "MJPG"]
+    assert [r["oversized"] for r in results] == [False, False, True]
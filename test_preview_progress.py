@@ -0,0 +1,135 @@
+"""make_preview/progress.py（動画プレビューの進捗）のテスト"""
+
+import io
+
+import pytest
+
+from make_preview.progress import (
+    ProgressAggregator,
+    ProgressTracker,
+    estimate_duration,
+    print_progress,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeCv2:
+    CAP_PROP_FPS = 5
+    CAP_PROP_FRAME_COUNT = 7
+    CAP_PROP_BITRATE = 47
+
+
+class FakeCapture:
+    def __init__(self, **props):
+        self.props = props
+
+    def get(self, prop):
+        names = {5: "fps", 7: "frame_count", 47: "bitrate"}
+        return self.props.get(names[prop], 0.0)
+
+
+def test_events_at_fixed_interval():
+    clock = FakeClock()
+    events = []
+    tracker = ProgressTracker(
+        "C0001.MP4", 10.0, 30.0, events.append, interval=0.5, clock=clock
+    )
+    for _ in range(33):
+        tracker.frame()
+        clock.now += 1 / 64
+    # 33 フレーム目（0.5 秒後）で最初の通知
+    assert len(events) == 1
+
+    event = events[0]
+    assert event.frames == 33
+    assert event.position == pytest.approx(33 / 30)
+    assert event.fraction == pytest.approx(33 / 30 / 10)
+    assert event.fps == pytest.approx(66)
+    # 動画の 1.1 秒を 0.5 秒で処理 -> 残り 8.9 秒は 8.9 / 2.2 秒
+    assert event.eta == pytest.approx((10 - 33 / 30) / (33 / 30 / 0.5))
+
+    final = tracker.finish()
+    assert final.done and final.fraction == 1.0 and final.eta == 0.0
+    assert events[-1] is final
+
+
+def test_position_callback_and_wrong_duration():
+    clock = FakeClock()
+    events = []
+    position = [0.0]
+    tracker = ProgressTracker(
+        "00001.MTS",
+        duration=2.0,
+        callback=events.append,
+        interval=1.0,
+        position=lambda: position[0],
+        clock=clock,
+    )
+    position[0] = 1.5
+    clock.now += 1.0
+    tracker.frame()
+    assert events[-1].fraction == pytest.approx(0.75)
+
+    # メタデータより長い動画だった場合は長さ不明として扱う
+    position[0] = 3.0
+    clock.now += 1.0
+    tracker.frame()
+    assert events[-1].duration is None
+    assert events[-1].fraction is None and events[-1].eta is None
+
+
+def test_estimate_duration(tmp_path):
+    mp4 = tmp_path / "C0001.MP4"
+    mts = tmp_path / "00001.MTS"
+    for path in (mp4, mts):
+        path.write_bytes(b"\0" * 250000)  # 2 Mbps で 1 秒
+
+    capture = FakeCapture(fps=25.0, frame_count=100, bitrate=2000)
+    assert estimate_duration(FakeCv2, capture, str(mp4)) == pytest.approx(4.0)
+    assert estimate_duration(FakeCv2, capture, str(mts)) == pytest.approx(1.0)
+    capture = FakeCapture(fps=25.0, frame_count=0, bitrate=2000)
+    assert estimate_duration(FakeCv2, capture, str(mp4)) == pytest.approx(1.0)
+    assert estimate_duration(FakeCv2, FakeCapture(fps=25.0), str(mp4)) is None
+
+
+def test_aggregator_combines_encodes():
+    clock = FakeClock()
+    totals = []
+    aggregator = ProgressAggregator(totals.append, clock=clock)
+    first = ProgressTracker("A.MP4", 10.0, 10.0, aggregator, clock=clock)
+    second = ProgressTracker("B.MTS", None, 10.0, aggregator, clock=clock)
+
+    for _ in range(20):
+        first.frame()
+        second.frame()
+    clock.now += 1.0
+    first.frame()
+    second.frame()
+    summary = aggregator.summary()
+    assert summary.path is None
+    assert summary.frames == 42
+    assert summary.duration == 10.0  # 長さが分かっている A だけ
+    assert summary.fraction == pytest.approx(0.21)
+    assert not summary.done
+
+    first.finish()
+    second.finish()
+    assert totals[-1].done and totals[-1].fraction == 1.0
+
+
+def test_print_progress():
+    clock = FakeClock()
+    tracker = ProgressTracker("C0001.MP4", 10.0, 30.0, clock=clock)
+    for _ in range(30):
+        tracker.frame()
+    clock.now += 1.0
+    stream = io.StringIO()
+    print_progress(tracker._emit(False), stream)
+    assert stream.getvalue().startswith("\rC0001.MP4   10.0%    30.0 fps  ETA 0:09")
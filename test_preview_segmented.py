@@ -0,0 +1,279 @@
+"""make_preview/segmented.py（区間ごとの並列プレビュー作成）のテスト"""
+
+import os
+
+import pytest
+from click.testing import CliRunner
+
+from make_preview import segmented
+from make_preview.encoders import Encoder, configure_encoder
+
+_encode_segment = segmented.encode_segment
+
+
+def _fail_after_first(movie_path, output_path, first, *args):
+    """最初の区間以外は失敗する encode_segment（ワーカーは fork で引き継ぐ）"""
+    if first:
+        raise RuntimeError("decoder crashed")
+    return _encode_segment(movie_path, output_path, first, *args)
+
+
+def test_plan_segments():
+    assert segmented.plan_segments(300, 30.0, 4) == [(0, 120), (120, 240), (240, None)]
+    assert segmented.plan_segments(240, 30.0, 4) == [(0, 120), (120, None)]
+    # 長さが分からなければ1区間
+    assert segmented.plan_segments(0, 30.0, 4) == [(0, None)]
+    assert segmented.plan_segments(300, 0.0, 4) == [(0, None)]
+
+
+class FakeCv2:
+    CAP_PROP_POS_FRAMES = 1
+    CAP_PROP_POS_MSEC = 0
+
+
+class KeyframeCapture:
+    """シークが直前のキーフレーム（または行き過ぎたフレーム）に止まる動画"""
+
+    def __init__(self, count=300, fps=10.0, gop=12, overshoot=0, timestamps=True):
+        self.count, self.fps, self.gop = count, fps, gop
+        self.overshoot, self.timestamps = overshoot, timestamps
+        self.next = 0
+        self.released = False
+
+    def set(self, prop, value):
+        if prop == FakeCv2.CAP_PROP_POS_MSEC:
+            value = round(value * self.fps / 1000)
+        else:
+            assert prop == FakeCv2.CAP_PROP_POS_FRAMES
+        self.next = value // self.gop * self.gop + self.overshoot
+
+    def get(self, prop):
+        assert prop == FakeCv2.CAP_PROP_POS_MSEC
+        return (self.next - 1) * 1000 / self.fps if self.timestamps else 0.0
+
+    def grab(self):
+        if self.next >= self.count:
+            return False
+        self.next += 1
+        return True
+
+    def read(self):
+        return (True, self.next - 1) if self.grab() else (False, None)
+
+    def release(self):
+        self.released = True
+
+
+@pytest.mark.parametrize("by_time", [False, True])
+@pytest.mark.parametrize(
+    "first", [36, 30]
+)  # 30 は手前のキーフレーム（24）から読み進める
+def test_seek_frame_lands_on_exact_frame(first, by_time):
+    capture = KeyframeCapture()
+    ret, frame = segmented.seek_frame(FakeCv2, capture, first, 10.0, by_time)
+    assert (ret, frame) == (True, first)
+    assert capture.read() == (True, first + 1)
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"overshoot": 13},  # 行き過ぎた
+        {"timestamps": False},  # 位置を確かめられない
+        {"gop": 1000},  # MAX_SEEK_SKIP_SECONDS より手前に止まった
+    ],
+)
+def test_seek_frame_raises_without_decoding_from_start(options):
+    capture = KeyframeCapture(**options)
+    with pytest.raises(segmented.SeekError):
+        segmented.seek_frame(FakeCv2, capture, 150, 10.0)
+    # 先頭から数えて読み直さない
+    assert capture.next <= 151 + options.get("overshoot", 0)
+
+
+def test_seek_frame_beyond_end():
+    ret, frame = segmented.seek_frame(FakeCv2, KeyframeCapture(count=20), 30, 10.0)
+    assert (ret, frame) == (False, None)
+
+
+def test_index_checkpoints(tmp_path):
+    movie = tmp_path / "C0001.MP4"
+    movie.write_bytes(b"movie")
+    key = segmented._source_key(str(movie), 60, Encoder("ffmpeg", "avc1"))
+    directory = str(tmp_path / "C0001.MP4.segments")
+    os.makedirs(directory)
+    for i in (0, 2):
+        (tmp_path / "C0001.MP4.segments" / f"seg-000{i}.MP4").write_bytes(b"x")
+    entries = {
+        i: {"file": f"seg-000{i}.MP4", "first": i * 10, "frames": 10, "seconds": 1.0}
+        for i in (0, 1, 2)
+    }
+    segmented.save_index(directory, key, entries)
+
+    # ファイルが無い区間（1）は作り直す
+    assert sorted(segmented.load_index(directory, key)) == [0, 2]
+    # 元の動画やエンコーダーが変わったら全て作り直す
+    other = segmented._source_key(str(movie), 60, Encoder("ffmpeg", "mp4v"))
+    assert segmented.load_index(directory, other) == {}
+    movie.write_bytes(b"edited movie")
+    changed = segmented._source_key(str(movie), 60, Encoder("ffmpeg", "avc1"))
+    assert segmented.load_index(directory, changed) == {}
+
+
+def test_playlist(tmp_path):
+    directory = tmp_path / "C0001.MP4.segments"
+    entries = {
+        1: {"file": "seg-0001.MP4", "frames": 75, "seconds": 2.5},
+        0: {"file": "seg-0000.MP4", "frames": 300, "seconds": 10.0},
+        # 見積もった長さが長すぎた場合の空の区間は載せない
+        2: {"file": "seg-0002.MP4", "frames": 0, "seconds": 0.0},
+    }
+    playlist = tmp_path / "C0001.MP4.m3u"
+    segmented.write_playlist(str(directory), entries, str(playlist))
+    assert playlist.read_text().splitlines() == [
+        "#EXTM3U",
+        "#EXTINF:10.000,seg-0000.MP4",
+        "C0001.MP4.segments/seg-0000.MP4",
+        "#EXTINF:2.500,seg-0001.MP4",
+        "C0001.MP4.segments/seg-0001.MP4",
+    ]
+
+
+def test_segmented_preview_resumes(tmp_path):
+    cv2 = pytest.importorskip("cv2")
+    from benchmarks.bench_segmented import make_clip
+
+    clip = str(tmp_path / "C0001.MP4")
+    make_clip(clip, 3, fps=10, size=(320, 240))
+    encoder = Encoder("any", "mp4v")
+    out = str(tmp_path / "preview")
+
+    result = segmented.make_segmented_preview(
+        clip, out, 1, workers=2, join=False, encoder=encoder
+    )
+    assert (result["segments"], result["encoded"], result["reused"]) == (3, 3, 0)
+    entries = segmented.load_index(
+        segmented.segments_dir(out, clip),
+        segmented._source_key(clip, 1, encoder, 3),
+    )
+    assert sum(e["frames"] for e in entries.values()) == 30
+
+    # 1区間を失った状態から再実行すると、その区間だけを作る
+    os.unlink(os.path.join(segmented.segments_dir(out, clip), "seg-0001.MP4"))
+    result = segmented.make_segmented_preview(clip, out, 1, workers=2, encoder=encoder)
+    assert (result["encoded"], result["reused"]) == (1, 2)
+    capture = cv2.VideoCapture(result["output"])
+    assert int(capture.get(cv2.CAP_PROP_FRAME_COUNT)) == 30
+    capture.release()
+    assert not os.path.exists(segmented.segments_dir(out, clip))
+
+
+def test_seek_frame_matches_sequential_decode(tmp_path):
+    cv2 = pytest.importorskip("cv2")
+    from benchmarks.bench_segmented import make_clip
+
+    clip = str(tmp_path / "C0001.MP4")
+    make_clip(clip, 6, fps=10, size=(160, 120))
+    capture = cv2.VideoCapture(clip)
+    frames = []
+    while True:
+        ret, frame = capture.read()
+        if not ret:
+            break
+        frames.append(frame)
+    capture.release()
+
+    for first in (1, 13, 37, 58):
+        capture = cv2.VideoCapture(clip)
+        ret, frame = segmented.seek_frame(cv2, capture, first, 10.0)
+        assert ret and (frame == frames[first]).all()
+        assert (capture.read()[1] == frames[first + 1]).all()
+        capture.release()
+
+
+@pytest.mark.parametrize(
+    "duration, frames",
+    [
+        (2.5, [10, 10, 10]),  # 短めの見積もりは最後の区間が末尾まで読む
+        (4.5, [10, 10, 10, 0, 0]),  # 長すぎる見積もりの余った区間は空になる
+    ],
+)
+def test_unreliable_frame_count_splits_by_time(tmp_path, monkeypatch, duration, frames):
+    cv2 = pytest.importorskip("cv2")
+    from benchmarks.bench_segmented import make_clip
+
+    clip = str(tmp_path / "00001.MTS")
+    make_clip(clip, 3, fps=10, size=(160, 120))
+    # フレーム数は使わず、見積もった長さから区間を決める
+    monkeypatch.setattr(segmented, "estimate_duration", lambda cv2, cap, path: duration)
+    encoder = Encoder("any", "mp4v")
+    out = str(tmp_path / "preview")
+    result = segmented.make_segmented_preview(
+        clip, out, 1, workers=2, join=False, encoder=encoder
+    )
+    assert (result["segments"], result["encoded"]) == (len(frames), len(frames))
+    entries = segmented.load_index(
+        segmented.segments_dir(out, clip),
+        segmented._source_key(clip, 1, encoder, len(frames)),
+    )
+    # 区間の始まりはタイムスタンプで決まる
+    assert [(e["first"], e["frames"]) for _, e in sorted(entries.items())] == [
+        (i * 10, n) for i, n in enumerate(frames)
+    ]
+    result = segmented.make_segmented_preview(clip, out, 1, encoder=encoder)
+    capture = cv2.VideoCapture(result["output"])
+    assert int(capture.get(cv2.CAP_PROP_FRAME_COUNT)) == 30
+    capture.release()
+
+
+def test_failed_segments_are_reported_and_retried(tmp_path, monkeypatch):
+    pytest.importorskip("cv2")
+    from benchmarks.bench_segmented import make_clip
+    from make_preview.make_preview import main
+
+    clip = str(tmp_path / "C0001.MP4")
+    make_clip(clip, 3, fps=10, size=(160, 120))
+    out = str(tmp_path / "preview")
+    args = ["preview", clip, "--output-dir", out, "--segment-seconds", "1"]
+    args += ["--workers", "2", "--backend", "any", "--codec", "mp4v"]
+
+    monkeypatch.setattr(segmented, "encode_segment", _fail_after_first)
+    try:
+        result = CliRunner().invoke(main, args)
+    finally:
+        configure_encoder()
+    assert result.exit_code == 1
+    assert "2 segment(s) failed" in result.output
+    assert "segment 1: RuntimeError: decoder crashed" in result.output
+    assert "Traceback" not in result.output
+    # できた区間は記録され、再実行では失敗した区間だけを作る
+    encoder = Encoder("any", "mp4v")
+    directory = segmented.segments_dir(out, clip)
+    key = segmented._source_key(clip, 1, encoder, 3)
+    assert sorted(segmented.load_index(directory, key)) == [0]
+    assert not os.path.exists(os.path.join(out, "C0001.MP4"))
+
+    monkeypatch.undo()
+    result = segmented.make_segmented_preview(clip, out, 1, workers=2, encoder=encoder)
+    assert (result["encoded"], result["reused"]) == (2, 1)
+
+
+def test_unseekable_movie_is_one_segment(tmp_path, monkeypatch):
+    pytest.importorskip("cv2")
+    from benchmarks.bench_segmented import make_clip
+
+    clip = str(tmp_path / "C0001.MP4")
+    make_clip(clip, 3, fps=10, size=(160, 120))
+    tried = []
+
+    def can_seek(cv2, encoder, movie_path, first, by_time):
+        tried.append(first)
+        return False
+
+    # 最初の境界でシークが合わなければ、区間に分けずに1回で作る
+    monkeypatch.setattr(segmented, "can_seek", can_seek)
+    result = segmented.make_segmented_preview(
+        clip, str(tmp_path / "preview"), 1, workers=2, encoder=Encoder("any", "mp4v")
+    )
+    assert (result["segments"], result["encoded"]) == (1, 1)
+    assert tried == [10]
@@ -0,0 +1,55 @@
+"""CLI 起動時の読み込みモジュールの回帰テスト
+
+時間の予算は負荷で結果が変わるため benchmarks/bench_startup.py だけで検査し、
+ここでは読み込むモジュールの数と、重いモジュールを読み込まないことを確かめる。
+"""
+
+from benchmarks.bench_startup import (
+    EMPTY_RUN_FORBIDDEN,
+    HELP_FORBIDDEN,
+    JOB_RUN_FORBIDDEN,
+    run_scenarios,
+)
+from common.startup import has_files, option_value
+
+
+def test_option_value_last_wins():
+    args = ["--import-dir", "a", "--dry-run", "--import-dir=b", "--", "--import-dir"]
+    assert option_value(args, "--import-dir") == "b"
+    assert option_value(["--dry-run"], "--import-dir", ".") == "."
+
+
+def test_has_files_recursive(tmp_path):
+    (tmp_path / "a" / "b").mkdir(parents=True)
+    assert not has_files(str(tmp_path), recursive=True)
+    (tmp_path / "a" / "b" / "DSC00001.ARW").write_bytes(b"raw")
+    assert not has_files(str(tmp_path))
+    assert has_files(str(tmp_path), recursive=True)
+
+
+def test_import_count_within_budget():
+    for result in run_scenarios(runs=1):
+        assert result["module_count"] <= result["module_budget"], (
+            f"{result['scenario']}: {result['module_count']} modules "
+            f"(budget {result['module_budget']})"
+        )
+
+
+def test_empty_import_dir_skips_heavy_modules():
+    for result in run_scenarios(
+        runs=1, scenarios=["move-empty", "photo_organizer-empty"]
+    ):
+        assert not set(EMPTY_RUN_FORBIDDEN) & set(result["modules"]), result["scenario"]
+
+
+def test_cached_job_skips_heavy_modules():
+    # 2回目以降はジョブファイルの検証結果のキャッシュから import_dir を読む
+    [result] = run_scenarios(runs=1, scenarios=["move-job-empty"])
+    assert not set(JOB_RUN_FORBIDDEN) & set(result["modules"])
+
+
+def test_help_skips_video_modules():
+    for result in run_scenarios(
+        runs=1, scenarios=["move-help", "photo_organizer-help"]
+    ):
+        assert not set(HELP_FORBIDDEN) & set(result["modules"]), result["scenario"]
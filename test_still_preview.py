@@ -0,0 +1,162 @@
+"""make_preview/still_preview.py（静止画のプレビュー）のテスト"""
+
+import os
+import struct
+
+import pytest
+from click.testing import CliRunner
+
+from make_preview import still_preview
+
+
+def _jpeg(width, height, payload=b""):
+    # SOI + APP0 + SOF0 + EOI だけの最小限の JPEG（デコードはしない）
+    app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + b"\x00" * 9
+    sof0 = (
+        b"\xff\xc0" + struct.pack(">HBHHB", 11, 8, height, width, 1) + b"\x01\x11\x00"
+    )
+    return b"\xff\xd8" + app0 + sof0 + payload + b"\xff\xd9"
+
+
+def _tiff(order, preview, thumbnail):
+    """IFD0 → SubIFD（JPEG 圧縮の1ストリップ）、IFD1（JPEGInterchangeFormat）の TIFF"""
+    header = (b"II" if order == "<" else b"MM") + struct.pack(order + "HI", 42, 8)
+
+    def ifd(entries, next_ifd):
+        data = struct.pack(order + "H", len(entries))
+        for tag, type_, value in entries:
+            fmt = "HHIH2x" if type_ == 3 else "HHII"
+            data += struct.pack(order + fmt, tag, type_, 1, value)
+        return data + struct.pack(order + "I", next_ifd)
+
+    ifd0_at = 8
+    ifd0_size = 2 + 12 * 1 + 4
+    sub_at = ifd0_at + ifd0_size
+    sub_size = 2 + 12 * 3 + 4
+    ifd1_at = sub_at + sub_size
+    ifd1_size = 2 + 12 * 2 + 4
+    preview_at = ifd1_at + ifd1_size
+    thumbnail_at = preview_at + len(preview) + 100
+    data = header
+    data += ifd([(0x014A, 4, sub_at)], ifd1_at)
+    data += ifd(
+        [
+            (0x0103, 3, 7),
+            (0x0111, 4, preview_at),
+            (0x0117, 4, len(preview)),
+        ],
+        0,
+    )
+    data += ifd([(0x0201, 4, thumbnail_at), (0x0202, 4, len(thumbnail))], 0)
+    data += preview + b"\x00" * 100 + thumbnail + b"\x00" * 4096
+    return data
+
+
+@pytest.mark.parametrize("order", ["<", ">"])
+def test_find_embedded_jpeg_picks_largest(tmp_path, order):
+    preview = _jpeg(1616, 1080, b"\x00" * 500)
+    thumbnail = _jpeg(160, 120)
+    raw = tmp_path / "DSC00001.ARW"
+    raw.write_bytes(_tiff(order, preview, thumbnail))
+
+    start, length = still_preview.find_embedded_jpeg(str(raw))
+    assert raw.read_bytes()[start : start + length] == preview
+    assert still_preview.read_jpeg_bytes(str(raw)) == preview
+    assert still_preview.jpeg_size(preview) == (1616, 1080)
+
+
+def test_find_embedded_jpeg_rejects_other_files(tmp_path):
+    path = tmp_path / "DSC00001.ARW"
+    path.write_bytes(b"not a tiff file")
+    assert still_preview.find_embedded_jpeg(str(path)) is None
+    # JPEG でないデータを指すエントリは候補にしない
+    path.write_bytes(_tiff("<", b"\x00" * 50, b"\x00" * 10))
+    assert still_preview.find_embedded_jpeg(str(path)) is None
+
+
+def test_jpeg_size_and_reduced_flag():
+    assert still_preview.jpeg_size(b"not jpeg") is None
+
+    class FakeCv2:
+        IMREAD_COLOR = 1
+        IMREAD_REDUCED_COLOR_2 = 17
+        IMREAD_REDUCED_COLOR_4 = 33
+        IMREAD_REDUCED_COLOR_8 = 65
+
+    flag = still_preview.reduced_decode_flag
+    assert flag(FakeCv2, (6000, 4000), 640) == FakeCv2.IMREAD_REDUCED_COLOR_8
+    assert flag(FakeCv2, (1616, 1080), 640) == FakeCv2.IMREAD_REDUCED_COLOR_2
+    assert flag(FakeCv2, (1000, 800), 640) == FakeCv2.IMREAD_COLOR
+    assert flag(FakeCv2, None, 640) == FakeCv2.IMREAD_COLOR
+
+
+def test_cache_key(tmp_path):
+    path = tmp_path / "DSC00001.JPG"
+    path.write_bytes(b"a" * 10)
+    os.utime(path, (1700000000, 1700000000))
+    mtime_key = still_preview.cache_key(str(path))
+    content_key = still_preview.cache_key(str(path), "content")
+    assert mtime_key != content_key
+    assert still_preview.cache_key(str(path), max_size=320) != mtime_key
+
+    os.utime(path, (1700000001, 1700000001))
+    assert still_preview.cache_key(str(path)) != mtime_key
+    assert still_preview.cache_key(str(path), "content") == content_key
+
+    target = still_preview.cache_path("cache", content_key)
+    assert target == os.path.join("cache", content_key[:2], content_key + ".jpg")
+
+
+def test_cached_thumbnail_skips_decode(tmp_path):
+    path = tmp_path / "DSC00001.JPG"
+    path.write_bytes(_jpeg(100, 100))
+    cache = tmp_path / "cache"
+    target = still_preview.cache_path(str(cache), still_preview.cache_key(str(path)))
+    os.makedirs(os.path.dirname(target))
+    with open(target, "wb") as f:
+        f.write(b"thumbnail")
+
+    assert still_preview.make_cached_thumbnail(str(path), str(cache)) == (
+        "cached",
+        target,
+    )
+    hif = tmp_path / "DSC00001.HIF"
+    hif.write_bytes(b"heif")
+    assert still_preview.make_cached_thumbnail(str(hif), str(cache)) == (
+        "unsupported",
+        None,
+    )
+
+
+def test_make_still_previews_renders(tmp_path):
+    cv2 = pytest.importorskip("cv2")
+    import numpy as np
+
+    image = np.zeros((1200, 1800, 3), dtype=np.uint8)
+    ok, encoded = cv2.imencode(".jpg", image)
+    assert ok
+    preview = encoded.tobytes()
+    raw = tmp_path / "DSC00001.ARW"
+    raw.write_bytes(_tiff("<", preview, _jpeg(160, 120)))
+
+    out = tmp_path / "preview"
+    stats = still_preview.make_still_previews(
+        [str(raw)], str(out), str(tmp_path / "cache"), max_size=320, workers=1
+    )
+    assert stats["created"] == 1
+    thumbnail = cv2.imread(str(out / "DSC00001.ARW.jpg"))
+    assert max(thumbnail.shape[:2]) == 320
+
+    stats = still_preview.make_still_previews(
+        [str(raw)], str(out), str(tmp_path / "cache"), max_size=320, workers=1
+    )
+    assert stats["cached"] == 1
+
+
+@pytest.mark.parametrize("value", ["0", "-320"])
+def test_cli_rejects_non_positive_max_size(tmp_path, value):
+    result = CliRunner().invoke(
+        still_preview.main, [str(tmp_path), "--max-size", value]
+    )
+    assert result.exit_code == 2
+    assert "--max-size" in result.output